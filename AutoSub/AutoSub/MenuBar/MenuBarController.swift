@@ -697,6 +697,14 @@ final class MenuBarController: NSObject, NSMenuDelegate {
             }
         }
 
+        // 翻譯 backlog 追趕狀態回呼
+        bridge.onBacklogStatus = { [weak state] isCatchingUp, pending in
+            print("[MenuBarController] Backlog status: catchingUp=\(isCatchingUp), pending=\(pending)")
+            Task { @MainActor in
+                state?.isCatchingUp = isCatchingUp
+            }
+        }
+
         // 狀態變更回呼
         bridge.onStatusChange = { status in
             print("[MenuBarController] Python status: \(status)")
@@ -719,6 +727,7 @@ final class MenuBarController: NSObject, NSMenuDelegate {
         bridge.onInterim = nil
         bridge.onTranslationUpdate = nil
         bridge.onTranslationStreaming = nil
+        bridge.onBacklogStatus = nil
         bridge.onError = nil
         bridge.onStatusChange = nil
     }
@@ -797,6 +806,7 @@ final class MenuBarController: NSObject, NSMenuDelegate {
         // 保留 captureStartTime 給匯出功能使用
         appState.status = .idle
         appState.currentSubtitle = nil
+        appState.isCatchingUp = false
         appState.clearInterim()
         // 不再延遲清空字幕歷史（sessionSubtitles 會保留完整內容）
     }
@@ -101,6 +101,10 @@ class AppState: ObservableObject {
     /// 當前 interim 文字（正在說的話，尚未 final）
     @Published var currentInterim: String?
 
+    // MARK: - 翻譯追趕
+    /// 翻譯落後即時音訊，正在合併/略過/降級舊字幕以追上
+    @Published var isCatchingUp: Bool = false
+
     // MARK: - 字幕位置
     /// 字幕框是否鎖定
     @Published var isSubtitleLocked: Bool = true
@@ -241,6 +245,7 @@ class AppState: ObservableObject {
     /// 清空 Session 字幕（開始新 Session 時呼叫）
     func clearSession() {
         clearInterim()
+        isCatchingUp = false
         sessionSubtitles.removeAll()
         subtitleHistory.removeAll()
         currentSubtitle = nil
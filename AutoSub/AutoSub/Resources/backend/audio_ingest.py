@@ -0,0 +1,126 @@
+"""
+音訊輸入層
+以 readinto 把 PCM 讀進預先配置的 ring buffer，避免每個 frame 配置新的 bytes 物件；
+每次輸出完整、對齊 sample 的 frame，frame 長度可調（越短首字延遲越低）。
+PcmRing 為同樣預先配置的環形緩衝，供 Transcriber 保留最近音訊以便重連後重播
+"""
+
+from typing import BinaryIO, Iterator, Optional
+
+MIN_FRAME_MS = 20
+MAX_FRAME_MS = 200
+DEFAULT_FRAME_MS = 100
+DEFAULT_SLOTS = 4
+
+
+def frame_bytes_for(frame_ms: int, sample_rate: int, channels: int, bytes_per_sample: int = 2) -> int:
+    """frame 長度（毫秒，限制在 20~200）換算成 bytes，一定是整數個 sample frame"""
+    frame_ms = max(MIN_FRAME_MS, min(MAX_FRAME_MS, int(frame_ms)))
+    samples = max(1, sample_rate * frame_ms // 1000)
+    return samples * channels * bytes_per_sample
+
+
+class FrameReader:
+    """
+    零複製 frame 讀取器
+
+    ring 由 slots 個 frame 大小的 slot 組成，read_frame() 依序填滿下一個 slot 並回傳其 memoryview。
+    回傳的 memoryview 在 ring 繞一圈後會被覆寫，消費端需在讀取 slots 個 frame 之前用完（送出或複製）。
+
+    讀到不足一個 frame 時（pipe 的 short read）會繼續讀到滿；EOF 時最後不足一個 frame 的部分
+    截到整數個 sample frame 後輸出，不完整的 sample 丟棄。
+
+    Args:
+        stream: 支援 readinto 的二進位串流（如 sys.stdin.buffer）
+        frame_bytes: 每個 frame 的 bytes 數（用 frame_bytes_for() 計算）
+        block_align: 一個 sample frame 的 bytes 數（channels × bytes_per_sample）
+        slots: ring 的 slot 數
+    """
+
+    def __init__(self, stream: BinaryIO, frame_bytes: int, block_align: int, slots: int = DEFAULT_SLOTS):
+        if frame_bytes <= 0 or frame_bytes % block_align:
+            raise ValueError(f"frame_bytes={frame_bytes} is not a multiple of block_align={block_align}")
+        self._stream = stream
+        self.frame_bytes = frame_bytes
+        self.block_align = block_align
+        self._buffer = bytearray(frame_bytes * max(1, slots))
+        self._slots = [
+            memoryview(self._buffer)[index * frame_bytes:(index + 1) * frame_bytes]
+            for index in range(max(1, slots))
+        ]
+        self._next_slot = 0
+        self._eof = False
+        self.frames_read = 0
+        self.short_reads = 0
+        self.discarded_bytes = 0
+
+    def read_frame(self) -> Optional[memoryview]:
+        """讀取下一個 frame，EOF 時回傳 None"""
+        if self._eof:
+            return None
+        slot = self._slots[self._next_slot]
+        filled = 0
+        while filled < self.frame_bytes:
+            count = self._stream.readinto(slot[filled:] if filled else slot)
+            if not count:
+                self._eof = True
+                break
+            if filled + count < self.frame_bytes:
+                self.short_reads += 1
+            filled += count
+
+        usable = filled - filled % self.block_align
+        self.discarded_bytes += filled - usable
+        if not usable:
+            return None
+        self._next_slot = (self._next_slot + 1) % len(self._slots)
+        self.frames_read += 1
+        return slot if usable == self.frame_bytes else slot[:usable]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            yield frame
+
+
+class PcmRing:
+    """
+    固定容量的 PCM 環形緩衝（預先配置，append 只做記憶體複製）
+
+    以串流中的絕對 byte 位置定址，只保留最近 capacity bytes；
+    segments() 回傳的 memoryview 指向 ring 本身，下一次 append 前有效
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(0, capacity)
+        self._view = memoryview(bytearray(self.capacity))
+        self.total_bytes = 0
+
+    @property
+    def oldest_position(self) -> int:
+        return max(0, self.total_bytes - self.capacity)
+
+    def append(self, data) -> None:
+        size = len(data)
+        if self.capacity:
+            view = memoryview(data)
+            if size > self.capacity:
+                view = view[size - self.capacity:]
+            length = len(view)
+            start = (self.total_bytes + size - length) % self.capacity
+            first = min(length, self.capacity - start)
+            self._view[start:start + first] = view[:first]
+            if first < length:
+                self._view[:length - first] = view[first:]
+        self.total_bytes += size
+
+    def segments(self, position: int, chunk_bytes: int) -> Iterator[memoryview]:
+        """從 position 到目前結尾，依 chunk_bytes 切段（不跨越 ring 邊界）"""
+        position = max(position, self.oldest_position)
+        while position < self.total_bytes:
+            start = position % self.capacity
+            size = min(chunk_bytes, self.total_bytes - position, self.capacity - start)
+            yield self._view[start:start + size]
+            position += size
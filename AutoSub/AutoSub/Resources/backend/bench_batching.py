@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Backlog 合併 benchmark：一次湧入多句時，比較逐句翻譯與合併翻譯的 request 數與清空時間
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_batching.py --burst 12 --base-latency-ms 400
+"""
+
+import argparse
+import time
+
+from stand_ins import SAMPLE_LINES, FakeGeminiClient
+from translation_queue import PendingUtterance, TranslationQueue
+from translator import Translator
+
+
+def run(batch_threshold: int, args) -> tuple[int, float]:
+    """回傳 (request 數, 清空 burst 的秒數)"""
+    client = FakeGeminiClient(
+        base_latency_sec=args.base_latency_ms / 1000,
+        per_token_latency_sec=args.per_token_latency_us / 1_000_000,
+    )
+    translator = Translator(api_key="stand-in", client=client)
+    previous = [None, None]
+
+    def on_items(items):
+        if len(items) == 1:
+            current, _ = translator.translate_with_context_correction_streaming(
+                items[0].text, previous[0], previous[1]
+            )
+            previous[:] = [items[0].text, current]
+            return
+        translations, _ = translator.translate_batch(
+            [(item.transcript_id, item.text) for item in items], previous[0], previous[1]
+        )
+        previous[:] = [items[-1].text, translations.get(items[-1].transcript_id)]
+
+    queue = TranslationQueue(on_items, batch_threshold=batch_threshold, max_batch_size=args.max_batch_size)
+    queue.start()
+    start = time.time()
+    for index in range(args.burst):
+        queue.put(PendingUtterance(f"id-{index}", SAMPLE_LINES[index % len(SAMPLE_LINES)]))
+    queue.wait_idle()
+    elapsed = time.time() - start
+    queue.close()
+    translator.close()
+    return len(client.requests), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-utterance vs batched translation of a burst")
+    parser.add_argument("--burst", type=int, default=12)
+    parser.add_argument("--batch-threshold", type=int, default=3)
+    parser.add_argument("--max-batch-size", type=int, default=6)
+    parser.add_argument("--base-latency-ms", type=float, default=400.0)
+    parser.add_argument("--per-token-latency-us", type=float, default=50.0)
+    args = parser.parse_args()
+
+    for label, threshold in (("per-utterance", 0), ("batched", args.batch_threshold)):
+        requests, elapsed = run(threshold, args)
+        print(f"[{label}] requests={requests} time to clear={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Compact history benchmark：比較 legacy / compact 每輪格式下，每次摘要重建前可容納的輪數
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_compact_history.py --turns 400 --max-context-tokens 20000
+"""
+
+import argparse
+
+from stand_ins import SAMPLE_LINES, FakeGeminiClient
+from translator import Translator
+
+
+def run(compact_history: bool, args) -> tuple[list[int], float]:
+    """回傳 (每次重建的輪數, 平均每輪 prompt tokens 增量)"""
+    client = FakeGeminiClient()
+    translator = Translator(
+        api_key="stand-in",
+        max_context_tokens=args.max_context_tokens,
+        compact_history=compact_history,
+        client=client,
+    )
+    prev_text = prev_translation = None
+    for turn in range(args.turns):
+        text = SAMPLE_LINES[turn % len(SAMPLE_LINES)]
+        current, _ = translator.translate_with_context_correction_streaming(
+            text, prev_text, prev_translation
+        )
+        prev_text, prev_translation = text, current
+
+    streams = [r["prompt_tokens"] for r in client.requests if r["kind"] == "chat_stream"]
+    deltas = [b - a for a, b in zip(streams, streams[1:]) if b > a]
+    per_turn = sum(deltas) / len(deltas) if deltas else 0.0
+    return translator.rebuild_turn_counts, per_turn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turns per rebuild: legacy vs compact history")
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--max-context-tokens", type=int, default=20_000)
+    args = parser.parse_args()
+
+    results = {}
+    for label, compact in (("legacy", False), ("compact", True)):
+        counts, per_turn = run(compact, args)
+        results[label] = counts
+        avg = sum(counts) / len(counts) if counts else float(args.turns)
+        print(f"[{label}] rebuilds={len(counts)} turns/rebuild={avg:.1f} "
+              f"history tokens/turn={per_turn:.1f}")
+
+    if results["legacy"] and results["compact"]:
+        legacy_avg = sum(results["legacy"]) / len(results["legacy"])
+        compact_avg = sum(results["compact"]) / len(results["compact"])
+        print(f"compact / legacy turns per rebuild: {compact_avg / legacy_avg:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+修正需求預測 benchmark：每句都帶前句（修正 prompt）vs 依 CorrectionPredictor 決定
+
+replay fixture 逐句翻譯（Gemini 為本地替身），替身只在「前句確實需要修正」時回傳 correction：
+- 前句在句子中間被切斷（fixture 產生時已知）
+- 另有約 4% 的句子即使完整也會在看到下一句後修正（依原文雜湊決定，預測器無從得知）
+統計 token 數、以延遲模型（base + 每輸入 / 輸出 token）估計的 request 延遲，
+以及漏掉的修正（完整模式會修正、預測器卻改用短 prompt 的句子）。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_correction_predictor.py --sentences 200
+"""
+
+import argparse
+import json
+import random
+import re
+import zlib
+
+import logger
+from bench_flush_boundaries import ends_at_boundary
+from bench_flush_boundaries import make_fixture as make_monologue_messages
+from correction_predictor import CorrectionPredictor
+from stand_ins import SAMPLE_LINES, FakeGeminiClient, default_responder
+from transcriber import Transcriber
+from translator import Translator
+
+_PREV_SOURCE_RE = re.compile(r"^前：(.*)$", re.M)
+# (base 秒, 每輸入 token 秒, 每輸出 token 秒)
+LATENCY_MODEL = (0.3, 0.0001, 0.004)
+
+
+def _ambiguous(text: str) -> bool:
+    """完整句子中約 4% 需要後文才能翻對"""
+    return zlib.crc32(text.encode("utf-8")) % 25 == 0
+
+
+def drama_fixture(sentences: int, seed: int = 5) -> list[tuple[str, tuple[float, float], bool]]:
+    """對話：句間停頓 0.3~3 秒，約每 5 句有一句在「、」處被切成兩句"""
+    rng = random.Random(seed)
+    # Deepgram smart_format 會加句尾標點
+    lines = [line if line[-1] in "。？！" else line + "。" for line in SAMPLE_LINES] + [
+        "昨日の会議で決まったことを、みんなに伝えておいてください。",
+        "田中さんが来るまで、ここで待っていよう。",
+        "そのお店、前にも行ったことがあるよ。",
+    ]
+    utterances = []
+    now = 0.0
+    for index in range(sentences):
+        text = lines[index % len(lines)]
+        cut = text.find("、")
+        parts = [text[:cut + 1], text[cut + 1:]] if cut > 0 and rng.random() < 0.2 else [text]
+        for position, part in enumerate(parts):
+            end = now + len(part) / 7.0
+            needs_correction = position < len(parts) - 1 or _ambiguous(part)
+            utterances.append((part, (now, end), needs_correction))
+            now = end + (0.1 if position < len(parts) - 1 else rng.uniform(0.3, 3.0))
+    return utterances
+
+
+def monologue_fixture(sentences: int, max_buffer_chars: int = 30) -> list[tuple[str, tuple[float, float], bool]]:
+    """連續說話經過 Transcriber（整段送出）：片段多，間隔短"""
+    utterances = []
+    transcriber = Transcriber(
+        api_key="stand-in",
+        on_transcript=lambda transcript_id, text, *previous: utterances.append(
+            (text, transcriber.last_flush_span, not ends_at_boundary(text) or _ambiguous(text))
+        ),
+        max_buffer_chars=max_buffer_chars,
+        split_at_boundaries=False,
+    )
+    for message in make_monologue_messages(sentences):
+        transcriber._on_message(message)
+    transcriber._flush_buffer("finalize")
+    return utterances
+
+
+FIXTURES = {"drama": drama_fixture, "monologue": monologue_fixture}
+
+
+def oracle_responder(needs_correction: set[str]):
+    """帶前譯且前句需要修正時才回傳 correction"""
+    state = {"previous": None}
+
+    def respond(prompt: str) -> str:
+        result = json.loads(default_responder(prompt))
+        source = result["current"].removeprefix("譯:")
+        match = _PREV_SOURCE_RE.search(prompt)
+        previous = match.group(1) if match else state["previous"]
+        if "前譯：" in prompt and previous in needs_correction:
+            result["correction"] = f"譯:{previous}{source}"
+        state["previous"] = source
+        return json.dumps(result, ensure_ascii=False)
+
+    return respond
+
+
+def run(utterances, predictor, args) -> dict:
+    client = FakeGeminiClient(responder=oracle_responder({text for text, _, needs in utterances if needs}))
+    translator = Translator(api_key="stand-in", client=client, max_context_tokens=args.max_context_tokens)
+    correction_prompts = corrections = missed = 0
+    previous = None
+    for text, span, needs_correction in utterances:
+        prev_text = prev_translation = None
+        if previous is not None:
+            prev_text, prev_translation, prev_span, prev_needs = previous
+            gap_sec = span[0] - prev_span[1] if span and prev_span else None
+            if predictor and not predictor.should_correct(prev_text, text, gap_sec):
+                missed += prev_needs
+                prev_text = prev_translation = None
+        correction_prompts += prev_text is not None
+        current, correction = translator.translate_with_context_correction_streaming(text, prev_text, prev_translation)
+        corrections += correction is not None
+        previous = (text, current, span, needs_correction)
+    translator.close()
+
+    base, per_input, per_output = LATENCY_MODEL
+    latencies = [base + per_input * r["prompt_tokens"] + per_output * r["output_tokens"] for r in client.requests]
+    return {
+        "utterances": len(utterances),
+        "correction_prompts": correction_prompts,
+        "corrections": corrections,
+        "missed": missed,
+        "tokens": sum(r["prompt_tokens"] + r["output_tokens"] for r in client.requests),
+        "latency": sum(latencies) / max(1, len(latencies)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Always-correct vs predicted context correction")
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--max-context-tokens", type=int, default=20000)
+    args = parser.parse_args()
+    logger.configure("warning")
+
+    for name, make_fixture in FIXTURES.items():
+        utterances = make_fixture(args.sentences)
+        needed = sum(needs for _, _, needs in utterances[:-1])
+        baseline = None
+        for label, predictor in (("always", None), ("predictor", CorrectionPredictor(threshold=args.threshold))):
+            result = run(utterances, predictor, args)
+            baseline = baseline or result
+            print(
+                f"[{name}/{label}] utterances={result['utterances']} needed={needed} "
+                f"correction prompts={result['correction_prompts']} corrections={result['corrections']} "
+                f"missed={result['missed']} ({result['missed'] / max(1, needed):.1%}) "
+                f"tokens={result['tokens']} ({result['tokens'] / baseline['tokens'] - 1:+.1%}) "
+                f"modeled latency={result['latency'] * 1000:.0f}ms "
+                f"({result['latency'] / baseline['latency'] - 1:+.1%})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+超過 max_buffer_chars 時的切分方式 benchmark：整段送出 vs 在句子 / 子句邊界切開
+
+連續說話（很少 speech_final）的 replay fixture 經過 Transcriber 後逐句翻譯，統計：
+- 片段率：送出的句子不是在句尾 / 子句邊界結束的比例
+- 修正率：回應帶 correction（translation_update）的比例
+  替身的判斷方式：前句在子句中間被切斷時，下一句的回應修正前句
+- 每句 token 數（prompt + output，以替身的字元數估算）
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_flush_boundaries.py --sentences 200 --max-buffer-chars 30
+"""
+
+import argparse
+import json
+import random
+
+import logger
+from stand_ins import FakeGeminiClient, FakeResultsMessage, default_responder
+from transcriber import Transcriber
+from transcriber_base import CLAUSE_BOUNDARIES, SENTENCE_BOUNDARIES
+from translator import Translator
+
+MONOLOGUE = [
+    "今日は朝から雨が降っていたので、駅まで歩くのをやめてバスに乗りました。",
+    "バスの中はとても混んでいて、座る場所がまったくありませんでした。",
+    "会社に着いたら、部長がもう会議室で待っていました。",
+    "新しいプロジェクトの話を聞いて、正直なところ少し驚きました。",
+    "予算は去年の半分なのに、期間は同じだというのです。",
+    "それでも、チームのみんなはやる気に満ちていました。",
+    "昼休みには近くの定食屋に行って、焼き魚定食を食べました。",
+    "午後はずっと資料を作っていたので、肩がすっかり凝ってしまいました。",
+    "帰りに本屋に寄って、前から気になっていた小説を買いました。",
+    "家に帰ってからは、その小説を夜遅くまで読み続けました。",
+]
+SPEAKING_CHARS_PER_SEC = 8.0
+
+
+def ends_at_boundary(text: str) -> bool:
+    stripped = text.rstrip("」』）)】〉》\"'”’")
+    return bool(stripped) and (stripped[-1] in SENTENCE_BOUNDARIES or stripped[-1] in CLAUSE_BOUNDARIES)
+
+
+def make_fixture(sentences: int, seed: int = 11) -> list:
+    """連續說話：全文每 6~14 字切成一個 final，只有少數句尾帶 speech_final（真正的停頓）"""
+    rng = random.Random(seed)
+    text = "".join(MONOLOGUE[index % len(MONOLOGUE)] for index in range(sentences))
+    messages = []
+    position = 0
+    while position < len(text):
+        end = min(len(text), position + rng.randint(6, 14))
+        chunk = text[position:end]
+        speech_final = end == len(text) or (chunk[-1] == "。" and rng.random() < 0.2)
+        messages.append(FakeResultsMessage(
+            chunk, position / SPEAKING_CHARS_PER_SEC, end / SPEAKING_CHARS_PER_SEC,
+            is_final=True, speech_final=speech_final,
+        ))
+        position = end
+    return messages
+
+
+def fragment_aware_responder():
+    """前句在子句中間被切斷時回傳 correction（模擬模型看到後半句後修正前句）"""
+    state = {"previous": None}
+
+    def respond(prompt: str) -> str:
+        result = json.loads(default_responder(prompt))
+        source = result["current"].removeprefix("譯:")
+        previous = state["previous"]
+        if previous is not None and not ends_at_boundary(previous):
+            result["correction"] = f"譯:{previous}{source}"
+        state["previous"] = source
+        return json.dumps(result, ensure_ascii=False)
+
+    return respond
+
+
+def run(split_at_boundaries: bool, args) -> dict:
+    utterances = []
+    transcriber = Transcriber(
+        api_key="stand-in",
+        on_transcript=lambda transcript_id, text, *previous: utterances.append(text),
+        max_buffer_chars=args.max_buffer_chars,
+        split_at_boundaries=split_at_boundaries,
+    )
+    for message in make_fixture(args.sentences):
+        transcriber._on_message(message)
+    transcriber._flush_buffer("finalize")
+
+    client = FakeGeminiClient(responder=fragment_aware_responder())
+    translator = Translator(api_key="stand-in", client=client, max_context_tokens=args.max_context_tokens)
+    corrections = 0
+    prev_text = prev_translation = None
+    for text in utterances:
+        current, correction = translator.translate_with_context_correction_streaming(text, prev_text, prev_translation)
+        corrections += correction is not None
+        prev_text, prev_translation = text, current
+    translator.close()
+
+    tokens = sum(request["prompt_tokens"] + request["output_tokens"] for request in client.requests)
+    return {
+        "utterances": len(utterances),
+        "fragments": sum(not ends_at_boundary(text) for text in utterances),
+        "corrections": corrections,
+        "tokens": tokens,
+        "requests": client.request_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whole-buffer vs boundary-aware max_buffer_chars flushing")
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--max-buffer-chars", type=int, default=30)
+    parser.add_argument("--max-context-tokens", type=int, default=20000)
+    args = parser.parse_args()
+    logger.configure("warning")
+
+    for label, split in (("whole buffer", False), ("boundary", True)):
+        result = run(split, args)
+        count = max(1, result["utterances"])
+        print(
+            f"[{label}] utterances={result['utterances']} "
+            f"fragments={result['fragments'] / count:.1%} corrections={result['corrections'] / count:.1%} "
+            f"tokens/utterance={result['tokens'] / count:.0f} total tokens={result['tokens']} "
+            f"requests={result['requests']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+History 模式 benchmark：比較 chat / window 模式的 TTFT 與 prompt 大小隨輪次的變化
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_history_modes.py --turns 200            # 本地替身（延遲與輸入 token 成正比）
+    GEMINI_API_KEY=xxx python bench_history_modes.py --live --turns 60
+
+輸出每 --every 輪一行：turn、各模式的 TTFT(ms) 與 prompt tokens
+"""
+
+import argparse
+import os
+import sys
+
+from stand_ins import SAMPLE_LINES, FakeGeminiClient
+from translator import HISTORY_MODE_CHAT, HISTORY_MODE_WINDOW, Translator
+
+
+def run_mode(mode: str, turns: int, args) -> list[tuple[int, float, int]]:
+    """回傳 [(turn, ttft_sec, prompt_tokens)]"""
+    if args.live:
+        client = None
+        api_key = os.environ.get("GEMINI_API_KEY", "")
+    else:
+        client = FakeGeminiClient(
+            base_latency_sec=args.base_latency_ms / 1000,
+            per_token_latency_sec=args.per_token_latency_us / 1_000_000,
+        )
+        api_key = "stand-in"
+
+    translator = Translator(
+        api_key=api_key,
+        model=args.model,
+        max_context_tokens=args.max_context_tokens,
+        history_mode=mode,
+        history_window_turns=args.window_turns,
+        client=client,
+    )
+
+    samples = []
+    prev_text = prev_translation = None
+    for turn in range(turns):
+        text = SAMPLE_LINES[turn % len(SAMPLE_LINES)]
+        current, _ = translator.translate_with_context_correction_streaming(
+            text, prev_text, prev_translation
+        )
+        prompt_tokens = client.requests[-1]["prompt_tokens"] if client else translator._total_tokens
+        samples.append((turn, translator.last_ttft_sec or 0.0, prompt_tokens))
+        prev_text, prev_translation = text, current
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TTFT vs turn index for history modes")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--every", type=int, default=10, help="每幾輪輸出一行")
+    parser.add_argument("--window-turns", type=int, default=8)
+    parser.add_argument("--max-context-tokens", type=int, default=20_000)
+    parser.add_argument("--model", default="gemini-2.5-flash-lite-preview-09-2025")
+    parser.add_argument("--live", action="store_true", help="使用真實 Gemini API")
+    parser.add_argument("--base-latency-ms", type=float, default=5.0)
+    parser.add_argument("--per-token-latency-us", type=float, default=20.0)
+    args = parser.parse_args()
+
+    if args.live and not os.environ.get("GEMINI_API_KEY"):
+        print("錯誤: --live 需要 GEMINI_API_KEY 環境變數")
+        sys.exit(1)
+
+    results = {
+        mode: run_mode(mode, args.turns, args)
+        for mode in (HISTORY_MODE_CHAT, HISTORY_MODE_WINDOW)
+    }
+
+    print(f"{'turn':>6} | {'chat ttft(ms)':>13} {'tokens':>7} | {'window ttft(ms)':>15} {'tokens':>7}")
+    for index in range(0, args.turns, args.every):
+        _, chat_ttft, chat_tokens = results[HISTORY_MODE_CHAT][index]
+        _, window_ttft, window_tokens = results[HISTORY_MODE_WINDOW][index]
+        print(f"{index:>6} | {chat_ttft * 1000:>13.1f} {chat_tokens:>7} | "
+              f"{window_ttft * 1000:>15.1f} {window_tokens:>7}")
+
+    for mode, samples in results.items():
+        ttfts = sorted(s[1] for s in samples)
+        tokens = [s[2] for s in samples]
+        p50 = ttfts[len(ttfts) // 2] * 1000
+        p95 = ttfts[int(len(ttfts) * 0.95) - 1] * 1000
+        print(f"[{mode}] ttft p50={p50:.1f}ms p95={p95:.1f}ms, "
+              f"prompt tokens min={min(tokens)} max={max(tokens)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+音訊輸入 benchmark：read(CHUNK_SIZE) vs FrameReader（readinto 預先配置 ring），各 frame 長度
+
+- 配置量：以 tracemalloc 量測每讀一個 frame 新配置的 bytes（不含 ring 的一次性配置），換算成每秒音訊的配置量
+- 延遲：producer 以即時速度每 10ms 寫入一小塊到 pipe（模擬音訊擷取回呼），
+  量測 frame 內第一個 byte（最舊的 sample）寫入到 frame 交給下游的時間，與 frame 數 / 秒
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_ingest.py --seconds 2 --frames 20,50,100,200
+"""
+
+import argparse
+import io
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+
+from audio_ingest import FrameReader, frame_bytes_for
+
+SAMPLE_RATE = 24000
+CHANNELS = 2
+BLOCK_ALIGN = CHANNELS * 2
+PRODUCER_BLOCK_MS = 10
+
+
+def legacy_frames(stream, frame_bytes: int):
+    """原本 main.py 的讀法：每次 read 配置新的 bytes，short read 原樣送出"""
+    while True:
+        data = stream.read(frame_bytes)
+        if not data:
+            return
+        yield data
+
+
+def ring_frames(stream, frame_bytes: int):
+    # ring 在這裡一次配置好，不計入每秒配置量
+    return iter(FrameReader(stream, frame_bytes, BLOCK_ALIGN))
+
+
+def measure_allocations(make_frames, frame_bytes: int, seconds: float) -> float:
+    """每秒音訊新配置的 KB"""
+    data = bytes(int(seconds * SAMPLE_RATE) * BLOCK_ALIGN)
+    stream = io.BufferedReader(io.BytesIO(data))
+    frames = make_frames(stream, frame_bytes)
+    allocated = 0
+    checksum = 0
+    tracemalloc.start()
+    try:
+        while True:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            frame = next(frames, None)
+            _, peak = tracemalloc.get_traced_memory()
+            if frame is None:
+                break
+            allocated += peak - before
+            checksum += frame[0]
+            del frame
+    finally:
+        tracemalloc.stop()
+    return allocated / 1024 / seconds
+
+
+def measure_latency(make_frames, frame_bytes: int, seconds: float) -> dict:
+    bytes_per_second = SAMPLE_RATE * BLOCK_ALIGN
+    block_bytes = bytes_per_second * PRODUCER_BLOCK_MS // 1000
+    blocks = int(seconds * 1000 / PRODUCER_BLOCK_MS)
+    read_fd, write_fd = os.pipe()
+    written_at: list[float] = []
+
+    def produce():
+        block = bytes(block_bytes)
+        started = time.perf_counter()
+        with os.fdopen(write_fd, "wb", buffering=0) as pipe:
+            for index in range(blocks):
+                delay = started + index * PRODUCER_BLOCK_MS / 1000 - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                written_at.append(time.perf_counter())
+                pipe.write(block)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    latencies = []
+    sizes = []
+    position = 0
+    with os.fdopen(read_fd, "rb") as stream:
+        for frame in make_frames(stream, frame_bytes):
+            now = time.perf_counter()
+            latencies.append(now - written_at[position // block_bytes])
+            sizes.append(len(frame))
+            position += len(frame)
+    producer.join()
+    latencies.sort()
+    return {
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "frames_per_sec": len(sizes) / seconds,
+        "misaligned": sum(1 for size in sizes if size % BLOCK_ALIGN),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark audio ingest allocation and latency vs frame size")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每個組合餵入的音訊秒數")
+    parser.add_argument("--frames", default="20,50,100,200", help="frame 長度（毫秒，逗號分隔）")
+    args = parser.parse_args()
+
+    print(f"{'frame':>6} {'mode':>7} | {'alloc KB/s':>10} | {'latency mean':>12} {'p95':>7} | "
+          f"{'frames/s':>8} {'misaligned':>10}")
+    for frame_ms in (int(ms) for ms in args.frames.split(",") if ms.strip()):
+        frame_bytes = frame_bytes_for(frame_ms, SAMPLE_RATE, CHANNELS)
+        for name, make_frames in (("read", legacy_frames), ("ring", ring_frames)):
+            allocated = measure_allocations(make_frames, frame_bytes, args.seconds)
+            latency = measure_latency(make_frames, frame_bytes, args.seconds)
+            print(f"{frame_ms:>4}ms {name:>7} | {allocated:>10.1f} | {latency['mean_ms']:>10.1f}ms "
+                  f"{latency['p95_ms']:>5.1f}ms | {latency['frames_per_sec']:>8.1f} {latency['misaligned']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+本地語音辨識 benchmark：CPU 執行緒數對 real-time factor 與延遲的影響
+
+以 LocalTranscriber + WhisperEngine（faster-whisper）轉錄音訊檔，依 --speed 模擬即時串流，
+每個執行緒數各載入一次模型（先暖機一次解碼）後統計：
+- RTF：累計解碼時間 / 音訊長度（> 1 表示跟不上即時，視窗與延遲會持續累積）
+- decode：單次解碼時間 p50 / p95（Whisper 每次都補滿 30 秒輸入，單次成本與視窗長度關係不大）
+- interim / final：畫面上的 interim 與送出的字幕，其音訊尾端送出後多久出現（final 含 endpointing 等待）
+
+需要 faster-whisper（第一次執行會下載模型）；只在 CPU 上執行，結果取決於機器核心數。
+--speed 0 表示以最快速度送音訊（每個 chunk 後等解碼跟上），只看 RTF。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_local_transcriber.py speech.wav --threads 1 2 4 8 --model small
+"""
+
+import argparse
+import bisect
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Optional
+
+import logger
+from local_transcriber import LocalTranscriber, WhisperEngine
+from transcribe_file import BYTES_PER_SAMPLE, DEFAULT_CHANNELS, DEFAULT_SAMPLE_RATE, open_audio
+
+CHUNK_MS = 100
+WARMUP_SEC = 2.0
+
+
+class _TimedEngine:
+    """記錄每次解碼時間"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.durations: list[float] = []
+
+    def transcribe(self, *args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return self.engine.transcribe(*args, **kwargs)
+        finally:
+            self.durations.append(time.perf_counter() - started_at)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def load_pcm(args) -> tuple[bytes, int, int]:
+    with open_audio(args.audio, args.raw, args.sample_rate, args.channels) as (read, sample_rate, channels):
+        limit = int(args.limit_sec * sample_rate * channels * BYTES_PER_SAMPLE) if args.limit_sec else None
+        chunks = []
+        total = 0
+        while limit is None or total < limit:
+            chunk = read(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            total += len(chunk)
+    pcm = b"".join(chunks)
+    return (pcm[:limit] if limit else pcm), sample_rate, channels
+
+
+def run(pcm: bytes, sample_rate: int, channels: int, threads: int, args) -> dict:
+    engine = WhisperEngine(model=args.model, cpu_threads=threads, compute_type=args.compute_type)
+    bytes_per_second = sample_rate * channels * BYTES_PER_SAMPLE
+    # 暖機：第一次解碼含模型初始化，不計入
+    engine.transcribe(pcm[:int(WARMUP_SEC * bytes_per_second)], sample_rate, channels,
+                      language=args.language)
+    timed = _TimedEngine(engine)
+
+    # 各 chunk 的音訊尾端時間與送出時間，用於換算結果延遲
+    sent_ends: list[float] = []
+    sent_at: list[float] = []
+    interim_latencies: list[float] = []
+    final_latencies: list[float] = []
+    lock = threading.Lock()
+    holder: list = []
+
+    def latency(span_end: float) -> Optional[float]:
+        index = bisect.bisect_left(sent_ends, span_end - 1e-6)
+        if index >= len(sent_at):
+            return None
+        return time.perf_counter() - sent_at[index]
+
+    def on_interim(text):
+        span = holder[0]._interim_span if holder else None
+        if span:
+            with lock:
+                value = latency(span[1])
+                if value is not None:
+                    interim_latencies.append(value)
+
+    def on_transcript(transcript_id, text, *previous):
+        span = holder[0].last_flush_span if holder else None
+        if span:
+            with lock:
+                value = latency(span[1])
+                if value is not None:
+                    final_latencies.append(value)
+
+    transcriber = LocalTranscriber(
+        timed,
+        step_sec=args.step_sec,
+        language=args.language,
+        on_transcript=on_transcript,
+        on_interim=on_interim,
+        endpointing_ms=args.endpointing_ms,
+        sample_rate=sample_rate,
+        channels=channels,
+    )
+    holder.append(transcriber)
+    transcriber.start()
+    chunk_bytes = bytes_per_second * CHUNK_MS // 1000
+    started_at = time.perf_counter()
+    for offset in range(0, len(pcm), chunk_bytes):
+        chunk = pcm[offset:offset + chunk_bytes]
+        audio_end = (offset + len(chunk)) / bytes_per_second
+        if args.speed > 0:
+            delay = started_at + audio_end / args.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        with lock:
+            sent_ends.append(audio_end)
+            sent_at.append(time.perf_counter())
+        transcriber.send_audio(chunk)
+        if args.speed <= 0:
+            transcriber.wait_decoded(60)
+    transcriber.finalize(timeout=120)
+    transcriber.stop()
+
+    audio_sec = len(pcm) / bytes_per_second
+    return {
+        "rtf": sum(timed.durations) / audio_sec if audio_sec else 0.0,
+        "decodes": len(timed.durations),
+        "decode_p50": _percentile(timed.durations, 0.5),
+        "decode_p95": _percentile(timed.durations, 0.95),
+        "interim_p50": _percentile(interim_latencies, 0.5),
+        "interim_p95": _percentile(interim_latencies, 0.95),
+        "final_p50": _percentile(final_latencies, 0.5),
+        "final_p95": _percentile(final_latencies, 0.95),
+        "finals": len(final_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local CPU transcription: real-time factor and latency vs threads")
+    parser.add_argument("audio", help="音訊檔（.wav / .pcm / .raw，或 ffmpeg 可讀的格式）")
+    parser.add_argument("--raw", action="store_true", help="視為 16-bit little-endian PCM")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE)
+    parser.add_argument("--channels", type=int, default=DEFAULT_CHANNELS)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4], help="CTranslate2 執行緒數")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--language", default="ja")
+    parser.add_argument("--step-sec", type=float, default=1.0, help="WHISPER_STEP_SEC")
+    parser.add_argument("--endpointing-ms", type=int, default=200)
+    parser.add_argument("--speed", type=float, default=1.0, help="送音訊的速度（1 為即時，0 為最快）")
+    parser.add_argument("--limit-sec", type=float, default=120.0, help="只用前幾秒音訊（0 表示全部）")
+    args = parser.parse_args()
+    logger.configure("warning")
+
+    try:
+        pcm, sample_rate, channels = load_pcm(args)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    audio_sec = len(pcm) / (sample_rate * channels * BYTES_PER_SAMPLE)
+    print(f"audio {audio_sec:.1f}s, model={args.model} ({args.compute_type}), step={args.step_sec}s, "
+          f"speed={args.speed or 'max'}, {platform.machine()} x{os.cpu_count()} cores")
+    print(f"{'threads':>7} {'RTF':>6} {'decodes':>8} {'decode p50/p95':>15} "
+          f"{'interim p50/p95':>16} {'final p50/p95':>14} {'finals':>7}")
+    for threads in args.threads:
+        try:
+            result = run(pcm, sample_rate, channels, threads, args)
+        except RuntimeError as e:
+            print(f"error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"{threads:>7} {result['rtf']:>6.2f} {result['decodes']:>8} "
+              f"{result['decode_p50']:>6.2f}/{result['decode_p95']:<5.2f}s "
+              f"{result['interim_p50']:>7.2f}/{result['interim_p95']:<5.2f}s "
+              f"{result['final_p50']:>5.2f}/{result['final_p95']:<5.2f}s {result['finals']:>7}")
+
+
+if __name__ == "__main__":
+    main()
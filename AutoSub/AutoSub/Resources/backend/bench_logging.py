@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+日誌 benchmark：呼叫端每筆事件的成本
+- print：原本的 print(f"...", file=stderr, flush=True)（每筆一次 write syscall）
+- disabled：低於 LOG_LEVEL 的 log.debug()（只做一次比較）
+- async：log.info() 放入佇列，由寫入執行緒格式化並批次寫入
+
+stderr 以 /dev/null 模擬；--slow-ms 讓每次 write 額外等待（模擬 host 端讀取 stderr 較慢、pipe 塞滿），
+此時 print 會直接卡住呼叫端（listener / 翻譯執行緒），async 只會在佇列滿時丟棄。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_logging.py --events 20000 --slow-ms 0.2
+"""
+
+import argparse
+import os
+import time
+
+import logger
+
+
+class _DevNull:
+    def __init__(self, slow_ms: float):
+        self._file = open(os.devnull, "w")
+        self._slow_sec = slow_ms / 1000
+
+    def write(self, text: str) -> int:
+        if self._slow_sec:
+            time.sleep(self._slow_sec)
+        return self._file.write(text)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+
+def run(mode: str, events: int, stream: _DevNull) -> float:
+    transcript = "this is an interim transcript of moderate length"
+    log = logger.get_logger("Bench")
+    started_at = time.perf_counter()
+    if mode == "print":
+        for index in range(events):
+            print(f"[Bench] transcript={transcript!r}, is_final={index % 2 == 0}", file=stream, flush=True)
+    elif mode == "disabled":
+        for index in range(events):
+            log.debug("transcript=%r, is_final=%s", transcript, index % 2 == 0)
+    else:
+        for index in range(events):
+            log.info("transcript=%r, is_final=%s", transcript, index % 2 == 0)
+    elapsed = time.perf_counter() - started_at
+    return elapsed * 1e6 / events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark print vs leveled async logging")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--slow-ms", type=float, default=0.0, help="每次 write 額外延遲（毫秒）")
+    args = parser.parse_args()
+
+    print(f"{'mode':>9} | {'µs/event':>9} | {'dropped':>7}")
+    for mode in ("print", "disabled", "async"):
+        stream = _DevNull(args.slow_ms)
+        logger.configure("info", stream=stream, max_queue=10000)
+        dropped_before = logger.dropped_count()
+        per_event = run(mode, args.events, stream)
+        dropped = logger.dropped_count() - dropped_before
+        logger.flush(timeout=30)
+        print(f"{mode:>9} | {per_event:>9.2f} | {dropped:>7}")
+
+
+if __name__ == "__main__":
+    main()
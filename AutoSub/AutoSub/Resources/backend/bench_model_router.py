@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+逐句模型路由 benchmark：整個 session 用同一個模型 vs ModelRouter（快速 / 主要模型）
+
+以 SubtitleSession 實際跑翻譯 worker（Gemini 為本地替身），依固定間隔送入短句與長句混合的轉錄結果；
+執行到中段時主要模型變慢（TTFT 乘上 --slow-scale），最後一段恢復。依階段統計：
+- 字幕延遲：transcript 送出到 subtitle 的平均 / p95
+- 各模型的 request 數，以及長句（>= 路由短句門檻）由主要模型翻譯的比例
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_model_router.py --utterances 45 --interval 0.6
+"""
+
+import argparse
+import re
+import threading
+import time
+
+import logger
+from stand_ins import SAMPLE_LINES, FakeDeepgramClient, FakeGeminiClient, content_text
+
+STRONG_MODEL = "gemini-2.5-flash"
+FAST_MODEL = "gemini-2.5-flash-lite"
+INTERJECTIONS = ["うん", "えっ？", "なるほど", "そうそう", "マジで？", "はい"]
+LONG_LINES = [
+    "昨日の会議で決まったことを、みんなに伝えておいてください。",
+    "新しいプロジェクトの話を聞いて、正直なところ少し驚きました。",
+    "予算は去年の半分なのに、期間は同じだというのです。",
+]
+PHASES = ("normal", "slow", "recovered")
+SHORT_CHARS = 12
+_SOURCE_RE = re.compile(r"原：(.*)")
+
+
+def make_utterances(count: int) -> list[str]:
+    """感嘆詞 / 一般對話 / 長句交錯"""
+    pools = (INTERJECTIONS, SAMPLE_LINES, LONG_LINES)
+    return [pools[index % 3][index // 3 % len(pools[index % 3])] for index in range(count)]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def run(routed: bool, args) -> dict:
+    from session import SessionSettings, SubtitleSession
+
+    env = {
+        "GEMINI_MODEL": STRONG_MODEL,
+        "SUBTITLE_MAX_AGE_SEC": "0",
+        "MODEL_ROUTER_SHORT_CHARS": str(SHORT_CHARS),
+        "MODEL_ROUTER_LATENCY_BUDGET_SEC": str(args.budget),
+        "MODEL_ROUTER_LATENCY_WINDOW_SEC": str(args.window),
+    }
+    if routed:
+        env["GEMINI_FAST_MODEL"] = FAST_MODEL
+    settings = SessionSettings.from_env(env)
+    events: dict[str, dict[str, float]] = {}
+    lock = threading.Lock()
+
+    def emit(message: dict) -> None:
+        now = time.time()
+        if message.get("type") in ("transcript", "subtitle"):
+            with lock:
+                events.setdefault(message["id"], {}).setdefault(message["type"], now)
+
+    gemini = FakeGeminiClient(
+        base_latency_sec=args.base_latency,
+        per_token_latency_sec=args.per_token_latency,
+        model_latency_scale={FAST_MODEL: args.fast_scale},
+    )
+    session = SubtitleSession(settings, emit, gemini_client=gemini, deepgram_client=FakeDeepgramClient([]))
+    session.start()
+    utterances = make_utterances(args.utterances)
+    phase_of: dict[str, str] = {}
+    phase_started: list[float] = []
+    for index, text in enumerate(utterances):
+        phase = PHASES[min(len(PHASES) - 1, index * len(PHASES) // len(utterances))]
+        if len(phase_started) < PHASES.index(phase) + 1:
+            phase_started.append(time.time())
+            # 中段主要模型變慢，最後一段恢復
+            gemini.model_latency_scale[STRONG_MODEL] = args.slow_scale if phase == "slow" else 1.0
+        phase_of[f"u{index}"] = phase
+        session._on_transcript(f"u{index}", text)
+        time.sleep(args.interval)
+    session.close()
+
+    results = {}
+    for phase in PHASES:
+        latencies = [
+            e["subtitle"] - e["transcript"] for transcript_id, e in events.items()
+            if phase_of[transcript_id] == phase and "subtitle" in e
+        ]
+        start = phase_started[PHASES.index(phase)]
+        end = phase_started[PHASES.index(phase) + 1] if phase != PHASES[-1] else float("inf")
+        requests = [r for r in gemini.requests if r["kind"].startswith("chat") and start <= r["started_at"] < end]
+        long_requests = [
+            r for r in requests if len(_SOURCE_RE.findall(content_text(r["contents"]))[-1]) >= SHORT_CHARS
+        ]
+        results[phase] = {
+            "mean": sum(latencies) / max(1, len(latencies)),
+            "p95": _percentile(latencies, 0.95),
+            "strong": sum(r["model"] == STRONG_MODEL for r in requests),
+            "fast": sum(r["model"] == FAST_MODEL for r in requests),
+            "long_on_strong": sum(r["model"] == STRONG_MODEL for r in long_requests) / max(1, len(long_requests)),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single model vs per-utterance model routing")
+    parser.add_argument("--utterances", type=int, default=45)
+    parser.add_argument("--interval", type=float, default=0.6, help="Seconds between transcripts")
+    parser.add_argument("--base-latency", type=float, default=0.3)
+    parser.add_argument("--per-token-latency", type=float, default=0.0001)
+    parser.add_argument("--fast-scale", type=float, default=0.5, help="Fast model latency relative to primary")
+    parser.add_argument("--slow-scale", type=float, default=6.0, help="Primary model slowdown in the middle phase")
+    parser.add_argument("--budget", type=float, default=1.5, help="MODEL_ROUTER_LATENCY_BUDGET_SEC")
+    parser.add_argument("--window", type=float, default=6.0, help="MODEL_ROUTER_LATENCY_WINDOW_SEC")
+    args = parser.parse_args()
+    logger.configure("warning")
+
+    print(f"{'mode':<8} {'phase':<10} {'mean':>7} {'p95':>7} {'strong':>7} {'fast':>5} {'long->strong':>13}")
+    for label, routed in (("single", False), ("routed", True)):
+        for phase, result in run(routed, args).items():
+            print(f"{label:<8} {phase:<10} {result['mean']:>6.2f}s {result['p95']:>6.2f}s "
+                  f"{result['strong']:>7} {result['fast']:>5} {result['long_on_strong']:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
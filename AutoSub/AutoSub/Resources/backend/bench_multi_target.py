@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+多目標語言 benchmark：同一個 request 多輸出語言 vs 每個語言各跑一條翻譯 pipeline
+
+兩種做法都共用同一份轉錄結果（STT 串流只有一條），比較翻譯端的成本：
+request 數、輸入 / 輸出 token 與總耗時（本地替身，延遲與輸入 token 成正比）。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_multi_target.py --turns 100 --languages zh-TW,en,ko
+"""
+
+import argparse
+import time
+
+from stand_ins import SAMPLE_LINES, FakeGeminiClient, default_responder, multi_target_responder
+from translator import Translator
+
+
+def run(translators: list[Translator], client: FakeGeminiClient, turns: int) -> dict:
+    started_at = time.time()
+    previous = [(None, None)] * len(translators)
+    for turn in range(turns):
+        text = SAMPLE_LINES[turn % len(SAMPLE_LINES)]
+        for index, translator in enumerate(translators):
+            prev_text, prev_translation = previous[index]
+            current, _ = translator.translate_with_context_correction_streaming(
+                text, prev_text, prev_translation
+            )
+            previous[index] = (text, current)
+    return {
+        "requests": len(client.requests),
+        "input": sum(r["prompt_tokens"] for r in client.requests),
+        "output": sum(r["output_tokens"] for r in client.requests),
+        "seconds": time.time() - started_at,
+    }
+
+
+def make_client(args, responder) -> FakeGeminiClient:
+    return FakeGeminiClient(
+        responder=responder,
+        base_latency_sec=args.base_latency_ms / 1000,
+        per_token_latency_sec=args.per_token_latency_us / 1_000_000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-target fan-out vs separate pipelines")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--languages", default="zh-TW,en,ko", help="第一個為主要語言")
+    parser.add_argument("--max-context-tokens", type=int, default=20_000)
+    parser.add_argument("--base-latency-ms", type=float, default=2.0)
+    parser.add_argument("--per-token-latency-us", type=float, default=5.0)
+    args = parser.parse_args()
+
+    languages = [lang.strip() for lang in args.languages.split(",") if lang.strip()]
+    rows = []
+    for count in range(1, len(languages) + 1):
+        primary, extras = languages[0], languages[1:count]
+
+        client = make_client(args, multi_target_responder(extras) if extras else default_responder)
+        fan_out = run([Translator(
+            api_key="stand-in", client=client, target_language=primary,
+            max_context_tokens=args.max_context_tokens, extra_target_languages=extras,
+        )], client, args.turns)
+
+        client = make_client(args, default_responder)
+        separate = run([
+            Translator(api_key="stand-in", client=client, target_language=lang,
+                       max_context_tokens=args.max_context_tokens)
+            for lang in languages[:count]
+        ], client, args.turns)
+        rows.append((count, fan_out, separate))
+
+    print(f"{'langs':>5} | {'fan-out req':>11} {'in':>8} {'out':>7} {'sec':>6} | "
+          f"{'pipelines req':>13} {'in':>8} {'out':>7} {'sec':>6}")
+    for count, fan_out, separate in rows:
+        print(f"{count:>5} | {fan_out['requests']:>11} {fan_out['input']:>8} {fan_out['output']:>7} "
+              f"{fan_out['seconds']:>6.2f} | {separate['requests']:>13} {separate['input']:>8} "
+              f"{separate['output']:>7} {separate['seconds']:>6.2f}")
+
+    base = rows[0][1]
+    for count, fan_out, separate in rows[1:]:
+        extra = count - 1
+        print(f"[+{extra} lang] fan-out: +{(fan_out['input'] - base['input']) / extra:.0f} input / "
+              f"+{(fan_out['output'] - base['output']) / extra:.0f} output tokens per language; "
+              f"separate pipeline: +{(separate['input'] - base['input']) / extra:.0f} input / "
+              f"+{(separate['output'] - base['output']) / extra:.0f} output tokens per language")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+斷句 benchmark：以 replay fixture（依語速產生的 Deepgram 訊息序列）比較固定門檻與自適應斷句
+
+fixture 在音訊時間上重播：Transcriber 實際處理每則 Results / UtteranceEnd 訊息，
+翻譯 worker 依延遲模型（base + 每字延遲）在同一條時間軸上模擬（合併規則與 TranslationQueue 相同），
+因此結果可重現、不需等待真實時間。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_segmentation.py --minutes 10
+"""
+
+import argparse
+import random
+from collections import deque
+
+from segmentation import SegmentationController
+from stand_ins import SAMPLE_LINES, FakeResultsMessage
+from transcriber import Transcriber
+
+# (說話速度 字/秒, 句間停頓範圍 秒)
+PROFILES = {
+    "drama": (5.0, (1.0, 3.0)),
+    "variety": (12.0, (0.25, 0.7)),
+}
+# (base 秒, 每字秒數)
+GEMINI_LATENCY = {
+    "normal": (0.6, 0.01),
+    "slow": (2.0, 0.03),
+}
+ENDPOINTING_SEC = 0.2
+UTTERANCE_END_SEC = 1.0
+
+
+class UtteranceEndMessage:
+    type = "UtteranceEnd"
+
+
+def make_fixture(profile: str, minutes: float, seed: int = 7) -> list[tuple[float, object]]:
+    """回傳 [(音訊時間, 訊息)]：每句一個 final，停頓超過 endpointing 為 speech_final，超過 1 秒另有 UtteranceEnd"""
+    speaking_cps, (gap_min, gap_max) = PROFILES[profile]
+    rng = random.Random(seed)
+    events = []
+    now = 0.5
+    index = 0
+    while now < minutes * 60:
+        text = SAMPLE_LINES[index % len(SAMPLE_LINES)]
+        index += 1
+        end = now + len(text) / speaking_cps
+        gap = rng.uniform(gap_min, gap_max)
+        speech_final = gap >= ENDPOINTING_SEC
+        events.append((end, FakeResultsMessage(text, now, end, is_final=True, speech_final=speech_final)))
+        if gap >= UTTERANCE_END_SEC:
+            events.append((end + UTTERANCE_END_SEC, UtteranceEndMessage()))
+        now = end + gap
+    return events
+
+
+class SimulatedWorker:
+    """在音訊時間軸上模擬單一翻譯 worker（batch_threshold / max_batch_size 規則同 TranslationQueue）"""
+
+    def __init__(self, latency, segmentation=None, on_finished=None, batch_threshold: int = 3, max_batch_size: int = 6):
+        self.base_sec, self.per_char_sec = latency
+        self.segmentation = segmentation
+        self.on_finished = on_finished
+        self.batch_threshold = batch_threshold
+        self.max_batch_size = max_batch_size
+        self.pending: deque[tuple[float, float, str]] = deque()  # (入列時間, 說話結束時間, 文字)
+        self.busy_until = 0.0
+        self.duration = 0.0
+        self.in_flight: list[tuple[float, float, str]] = []
+        self.requests = 0
+        self.request_chars: list[int] = []
+        self.latencies: list[float] = []
+        self.max_depth = 0
+
+    def put(self, now: float, speech_end: float, text: str) -> None:
+        self.pending.append((now, speech_end, text))
+        self.max_depth = max(self.max_depth, len(self.pending))
+        if self.segmentation:
+            self.segmentation.observe_queue_depth(len(self.pending))
+
+    def advance(self, until: float) -> None:
+        """完成 until 之前結束的 request，並開始下一批"""
+        while True:
+            if self.in_flight:
+                if self.busy_until > until:
+                    return
+                for _, speech_end, _ in self.in_flight:
+                    self.latencies.append(self.busy_until - speech_end)
+                self.in_flight = []
+                if self.segmentation:
+                    self.segmentation.observe_translation(self.duration)
+                    self.segmentation.observe_queue_depth(len(self.pending))
+                if self.on_finished:
+                    self.on_finished(self.busy_until)
+            if not self.pending or self.pending[0][0] > until:
+                return
+            start = max(self.busy_until, self.pending[0][0])
+            count = 1
+            if self.batch_threshold and len(self.pending) >= self.batch_threshold:
+                count = min(len(self.pending), self.max_batch_size)
+            self.in_flight = [self.pending.popleft() for _ in range(count)]
+            chars = sum(len(text) for _, _, text in self.in_flight)
+            self.duration = self.base_sec + self.per_char_sec * chars
+            self.busy_until = start + self.duration
+            self.requests += 1
+            self.request_chars.append(chars)
+            if self.segmentation:
+                self.segmentation.translation_started()
+                self.segmentation.observe_queue_depth(len(self.pending))
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def run(profile: str, gemini: str, adaptive: bool, minutes: float) -> dict:
+    clock = [0.0]
+    segmentation = SegmentationController(clock=lambda: clock[0]) if adaptive else None
+
+    def on_finished(at: float) -> None:
+        # 同 SubtitleSession：worker 閒下來時送出保留中的短句
+        clock[0] = at
+        transcriber.release_held_buffer()
+
+    worker = SimulatedWorker(GEMINI_LATENCY[gemini], segmentation, on_finished)
+    utterances = []
+
+    def on_transcript(transcript_id, text, *previous):
+        span = transcriber.last_flush_span
+        utterances.append(text)
+        worker.put(clock[0], span[1] if span else clock[0], text)
+
+    transcriber = Transcriber(api_key="stand-in", on_transcript=on_transcript, segmentation=segmentation)
+
+    def advance_to(at: float) -> None:
+        worker.advance(at)
+        # 保留逾時在 deadline 當下 flush（watchdog 的行為）
+        deadline = segmentation.hold_deadline if segmentation else None
+        if deadline is not None and deadline <= at:
+            clock[0] = deadline
+            transcriber.release_held_buffer()
+            worker.advance(at)
+        clock[0] = at
+
+    for at, message in make_fixture(profile, minutes):
+        advance_to(at)
+        transcriber._on_message(message)
+    advance_to(clock[0] + 60)
+    worker.advance(float("inf"))
+
+    latencies = worker.latencies
+    return {
+        "utterances": len(utterances),
+        "requests": worker.requests,
+        "chars_per_request": sum(worker.request_chars) / max(1, worker.requests),
+        "mean_latency": sum(latencies) / max(1, len(latencies)),
+        "p95_latency": _percentile(latencies, 0.95),
+        "max_depth": worker.max_depth,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed vs adaptive segmentation on replay fixtures")
+    parser.add_argument("--minutes", type=float, default=10.0, help="Audio minutes per fixture")
+    args = parser.parse_args()
+
+    print(f"{'fixture':<9} {'gemini':<7} {'mode':<9} {'utts':>5} {'reqs':>5} {'chars/req':>9} "
+          f"{'mean lat':>9} {'p95 lat':>8} {'max q':>6}")
+    for profile in PROFILES:
+        for gemini in GEMINI_LATENCY:
+            for adaptive in (False, True):
+                result = run(profile, gemini, adaptive, args.minutes)
+                print(f"{profile:<9} {gemini:<7} {'adaptive' if adaptive else 'fixed':<9} "
+                      f"{result['utterances']:>5} {result['requests']:>5} {result['chars_per_request']:>9.1f} "
+                      f"{result['mean_latency']:>8.2f}s {result['p95_latency']:>7.2f}s {result['max_depth']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+多 session benchmark：每多開一個 session 增加的 RSS 與 CPU
+
+同一個 server process 依序開到 --sessions 個 session（本地 Deepgram / Gemini 替身），
+每一階段以即時速度餵 --seconds 秒音訊，量測 RSS 與 CPU 使用率；
+並與「每個來源各開一個 backend process」的估算值（N × 單 session process 的 RSS）比較。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_sessions.py --sessions 4 --seconds 5
+"""
+
+import argparse
+import threading
+import time
+
+from stand_ins import current_rss_mb
+
+CHUNK_MS = 100
+SAMPLE_RATE = 24000
+CHANNELS = 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RSS / CPU per additional session")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0, help="每階段餵入的音訊秒數")
+    parser.add_argument("--gemini-latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    rss_interpreter = current_rss_mb()
+
+    # import 成本計入單一 process 的固定開銷
+    from server import FRAME_AUDIO, FRAME_CLOSE, FRAME_OPEN, SessionServer
+    from session import SessionSettings
+    from stand_ins import SAMPLE_LINES, FakeDeepgramClient, FakeGeminiClient
+
+    rss_imported = current_rss_mb()
+
+    # 每 1.5 秒一句，足夠涵蓋所有階段
+    total_seconds = args.seconds * (args.sessions + 1)
+    script = []
+    t = 0.2
+    while t < total_seconds:
+        script.append((t, t + 1.0, SAMPLE_LINES[len(script) % len(SAMPLE_LINES)]))
+        t += 1.5
+
+    subtitles = [0]
+    lock = threading.Lock()
+
+    def emit(data):
+        if data.get("type") == "subtitle":
+            with lock:
+                subtitles[0] += 1
+
+    settings = SessionSettings.from_env({})
+    server = SessionServer(
+        settings, emit,
+        gemini_client=FakeGeminiClient(base_latency_sec=args.gemini_latency_ms / 1000),
+        deepgram_client=FakeDeepgramClient(script),
+        max_sessions=args.sessions,
+    )
+    chunk = b"\x00" * (SAMPLE_RATE * CHANNELS * 2 * CHUNK_MS // 1000)
+
+    rows = []
+    for count in range(1, args.sessions + 1):
+        server.handle_frame(FRAME_OPEN, count, b"")
+        while server.session_count < count:
+            time.sleep(0.01)
+
+        cpu_start = time.process_time()
+        wall_start = time.time()
+        for tick in range(int(args.seconds * 1000 / CHUNK_MS)):
+            for session_id in range(1, count + 1):
+                server.handle_frame(FRAME_AUDIO, session_id, chunk)
+            # 即時速度
+            sleep = wall_start + (tick + 1) * CHUNK_MS / 1000 - time.time()
+            if sleep > 0:
+                time.sleep(sleep)
+        cpu = (time.process_time() - cpu_start) / (time.time() - wall_start) * 100
+        rows.append((count, current_rss_mb(), cpu))
+
+    for session_id in range(1, args.sessions + 1):
+        server.handle_frame(FRAME_CLOSE, session_id, b"")
+    server.close_all()
+
+    print(f"interpreter RSS: {rss_interpreter:.1f} MB, after imports: {rss_imported:.1f} MB")
+    print(f"{'sessions':>8} | {'RSS(MB)':>8} {'+/session':>9} | {'CPU%':>6} | {'N processes RSS(MB)':>19}")
+    single_rss = rows[0][1]
+    for index, (count, rss, cpu) in enumerate(rows):
+        delta = rss - rows[index - 1][1] if index else rss - rss_imported
+        print(f"{count:>8} | {rss:>8.1f} {delta:>9.1f} | {cpu:>6.1f} | {single_rss * count:>19.1f}")
+    per_session = (rows[-1][1] - single_rss) / max(1, len(rows) - 1)
+    print(f"[server] +{per_session:.1f} MB per additional session vs +{single_rss:.1f} MB per extra process; "
+          f"{subtitles[0]} subtitles emitted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+音訊傳輸 benchmark：PCM 走 stdin pipe vs 共享記憶體 ring（pipe 只送 1 byte 通知）
+
+producer 為獨立 process（與 host app → backend 相同的拓撲），以最快速度寫入 --megabytes MB 的
+frame；consumer 以 FrameReader 讀取。量測吞吐量、consumer CPU 時間與 pipe 上實際傳輸的 bytes。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_shm_transport.py --megabytes 200 --frame-ms 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from audio_ingest import FrameReader, frame_bytes_for
+from shm_transport import ShmRingProducer, ShmRingReader
+
+SAMPLE_RATE = 24000
+CHANNELS = 2
+BLOCK_ALIGN = CHANNELS * 2
+
+
+def produce(mode: str, path: str, frame_bytes: int, frames: int, capacity: int) -> None:
+    """producer process：寫到 stdout（pipe 模式）或共享記憶體 ring"""
+    out = sys.stdout.buffer
+    frame = bytes(range(256)) * (frame_bytes // 256) + bytes(frame_bytes % 256)
+    if mode == "pipe":
+        for _ in range(frames):
+            out.write(frame)
+        out.flush()
+        return
+    producer = ShmRingProducer(path, capacity, out)
+    # 空通知：告訴 consumer ring 已建立
+    out.write(b"\x00")
+    out.flush()
+    for _ in range(frames):
+        # benchmark 不丟 frame：滿了就等 consumer
+        while producer.free_bytes < frame_bytes:
+            time.sleep(0.0001)
+        producer.write(frame)
+    producer.close()
+
+
+def consume(mode: str, args, frame_bytes: int, frames: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "audio.ring")
+    command = [sys.executable, __file__, "--produce", mode, "--path", path,
+               "--frame-bytes", str(frame_bytes), "--frames", str(frames),
+               "--capacity", str(args.capacity_kb * 1024)]
+    cpu_start = time.process_time()
+    started_at = time.perf_counter()
+    child = subprocess.Popen(command, stdout=subprocess.PIPE)
+    source = child.stdout
+    if mode == "shm":
+        child.stdout.read(1)
+        source = ShmRingReader(path, child.stdout, BLOCK_ALIGN)
+    received = 0
+    for frame in FrameReader(source, frame_bytes, BLOCK_ALIGN):
+        received += len(frame)
+    elapsed = time.perf_counter() - started_at
+    cpu = time.process_time() - cpu_start
+    child.wait()
+    stats = {"dropped": 0, "overruns": 0}
+    if mode == "shm":
+        stats = {"dropped": source.dropped_frames, "overruns": source.overruns}
+        source.close()
+        os.unlink(path)
+    megabytes = received / 1024 / 1024
+    return {
+        "mb_per_sec": megabytes / elapsed,
+        "cpu_ms_per_mb": cpu * 1000 / megabytes,
+        "pipe_bytes": received if mode == "pipe" else frames + 1,
+        "complete": received == frames * frame_bytes,
+        **stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipe vs shared-memory audio transport")
+    parser.add_argument("--megabytes", type=float, default=200.0)
+    parser.add_argument("--frame-ms", type=int, default=20)
+    parser.add_argument("--capacity-kb", type=int, default=1024, help="ring 容量（KB）")
+    parser.add_argument("--produce", choices=["pipe", "shm"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--frame-bytes", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--frames", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--capacity", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.produce:
+        produce(args.produce, args.path, args.frame_bytes, args.frames, args.capacity)
+        return
+
+    frame_bytes = frame_bytes_for(args.frame_ms, SAMPLE_RATE, CHANNELS)
+    frames = int(args.megabytes * 1024 * 1024 // frame_bytes)
+    audio_hours = frames * frame_bytes / (SAMPLE_RATE * BLOCK_ALIGN) / 3600
+    print(f"{frames} frames × {frame_bytes} bytes ({audio_hours:.2f}h of audio)")
+    print(f"{'mode':>5} | {'MB/s':>8} {'CPU ms/MB':>10} | {'pipe bytes':>12} | {'dropped':>7} {'overruns':>8} {'ok':>3}")
+    for mode in ("pipe", "shm"):
+        result = consume(mode, args, frame_bytes, frames)
+        print(f"{mode:>5} | {result['mb_per_sec']:>8.1f} {result['cpu_ms_per_mb']:>10.2f} | "
+              f"{result['pipe_bytes']:>12} | {result['dropped']:>7} {result['overruns']:>8} "
+              f"{'yes' if result['complete'] else 'NO':>3}")
+
+
+if __name__ == "__main__":
+    main()
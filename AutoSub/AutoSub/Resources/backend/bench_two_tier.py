@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+兩階段翻譯 benchmark：inline（當句 request 同時修正前句）vs deferred（當句只翻譯，修正在背景成批檢查）
+
+以 SubtitleSession 實際跑翻譯 worker 與 CorrectionReviewer（Gemini 為本地替身，
+延遲 = base + 每輸入 token + 每輸出 token），依固定間隔送入轉錄結果，統計：
+- 首字延遲：transcript 送出到第一個 translation_streaming
+- 字幕延遲：transcript 送出到 subtitle（需等整個回應，包含 inline 模式的前句修正輸出）
+- 修正率：translation_update 數 / 字幕數，以及修正送達的延遲（subtitle 之後多久）
+- token 與 request 數
+
+替身的修正判斷與 bench_flush_boundaries 相同：句子在子句中間被切斷時，看到後一句後修正。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python bench_two_tier.py --utterances 40 --interval 0.8
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+
+import logger
+from bench_flush_boundaries import MONOLOGUE, ends_at_boundary
+from stand_ins import REVIEW_LINE_RE, FakeDeepgramClient, FakeGeminiClient, default_responder
+
+_PREV_SOURCE_RE = re.compile(r"^前：(.*)$", re.M)
+
+
+def make_utterances(count: int, fragment_every: int = 4) -> list[str]:
+    """每 fragment_every 句在第一個「、」切成兩句（前半句為片段）"""
+    utterances = []
+    index = 0
+    while len(utterances) < count:
+        sentence = MONOLOGUE[index % len(MONOLOGUE)]
+        cut = sentence.find("、")
+        if index % fragment_every == 0 and cut > 0:
+            utterances += [sentence[:cut], sentence[cut + 1:]]
+        else:
+            utterances.append(sentence)
+        index += 1
+    return utterances[:count]
+
+
+def fragment_aware_responder():
+    """inline：帶前譯的 prompt 且前句是片段時修正；修正 prompt：待檢查的片段句以後一句補完"""
+    state = {"previous": None}
+
+    def respond(prompt: str) -> str:
+        review_lines = REVIEW_LINE_RE.findall(prompt)
+        if review_lines:
+            results = []
+            for index, (short_id, marked, source, _) in enumerate(review_lines):
+                following = review_lines[index + 1][2] if index + 1 < len(review_lines) else None
+                if marked and following is not None and not ends_at_boundary(source):
+                    results.append({"id": short_id, "correction": f"譯:{source}{following}"})
+            return json.dumps({"results": results}, ensure_ascii=False)
+
+        result = json.loads(default_responder(prompt))
+        source = result["current"].removeprefix("譯:")
+        # compact 格式的前句即為上一輪原文時只帶「前譯」
+        match = _PREV_SOURCE_RE.search(prompt)
+        previous = match.group(1) if match else state["previous"]
+        if "前譯：" in prompt and previous is not None and not ends_at_boundary(previous):
+            result["correction"] = f"譯:{previous}{source}"
+        state["previous"] = source
+        return json.dumps(result, ensure_ascii=False)
+
+    return respond
+
+
+def _mean(values: list[float]) -> float:
+    return sum(values) / max(1, len(values))
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def run(mode: str, args) -> dict:
+    from session import SessionSettings, SubtitleSession
+
+    settings = SessionSettings.from_env({
+        "DEEPGRAM_API_KEY": "stand-in",
+        "GEMINI_API_KEY": "stand-in",
+        "TRANSLATION_CORRECTION_MODE": mode,
+        "SUBTITLE_MAX_AGE_SEC": "0",
+        "STATS_INTERVAL_SEC": "0",
+    })
+    events: dict[str, dict[str, float]] = {}
+    updates: list[tuple[str, float]] = []
+    lock = threading.Lock()
+
+    def emit(message: dict) -> None:
+        now = time.time()
+        with lock:
+            kind = message.get("type")
+            if kind == "translation_update":
+                updates.append((message["id"], now))
+            elif kind in ("transcript", "translation_streaming", "subtitle"):
+                events.setdefault(message["id"], {}).setdefault(kind, now)
+
+    gemini = FakeGeminiClient(
+        responder=fragment_aware_responder(),
+        base_latency_sec=args.base_latency,
+        per_token_latency_sec=args.per_token_latency,
+        per_output_token_latency_sec=args.per_output_token_latency,
+    )
+    session = SubtitleSession(settings, emit, gemini_client=gemini, deepgram_client=FakeDeepgramClient([]))
+    session.start()
+    utterances = make_utterances(args.utterances)
+    for index, text in enumerate(utterances):
+        session._on_transcript(f"u{index}", text)
+        time.sleep(args.interval)
+    session.close()
+
+    first_partial = [e["translation_streaming"] - e["transcript"] for e in events.values() if "translation_streaming" in e]
+    subtitle = [e["subtitle"] - e["transcript"] for e in events.values() if "subtitle" in e]
+    correction_delay = [at - events[transcript_id]["subtitle"] for transcript_id, at in updates]
+    return {
+        "utterances": len(utterances),
+        "fragments": sum(not ends_at_boundary(text) for text in utterances),
+        "first_partial": _mean(first_partial),
+        "subtitle": _mean(subtitle),
+        "subtitle_p95": _percentile(subtitle, 0.95),
+        "corrections": len(updates),
+        "correction_delay": _mean(correction_delay),
+        "tokens": sum(r["prompt_tokens"] + r["output_tokens"] for r in gemini.requests),
+        "requests": gemini.request_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combined prompt vs two-tier (deferred correction) translation")
+    parser.add_argument("--utterances", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.8, help="Seconds between transcripts")
+    parser.add_argument("--base-latency", type=float, default=0.15)
+    parser.add_argument("--per-token-latency", type=float, default=0.0001, help="Seconds per prompt token")
+    parser.add_argument("--per-output-token-latency", type=float, default=0.004, help="Seconds per output token")
+    args = parser.parse_args()
+    logger.configure("warning")
+
+    for mode in ("inline", "deferred"):
+        result = run(mode, args)
+        count = max(1, result["utterances"])
+        print(
+            f"[{mode}] utterances={result['utterances']} fragments={result['fragments']} "
+            f"first partial={result['first_partial'] * 1000:.0f}ms "
+            f"subtitle mean={result['subtitle'] * 1000:.0f}ms p95={result['subtitle_p95'] * 1000:.0f}ms "
+            f"corrections={result['corrections']} ({result['corrections'] / count:.1%}, "
+            f"+{result['correction_delay']:.2f}s after subtitle) "
+            f"requests={result['requests']} tokens={result['tokens']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+前句修正需求預測（CORRECTION_PREDICTOR=1）
+
+inline 模式下只要有前句，每個 request 都帶「前 / 前譯」並要求模型回傳 correction，
+但大多數回應的 correction 都是 null。這裡以本地規則為每句估計「前句需要修正」的可能性，
+低於門檻時改用只帶原文的短 prompt（輸入與輸出都較短）。
+
+訊號（分數相加，上限 1）：
+- 前句是 [暫停] 落地的不完整句：必定帶前句
+- 前句停在子句中間（結尾為逗號 / 接續助詞；轉錄結果有句尾標點時，沒有句尾標點即視為中途切斷）、
+  當句以接續詞 / 助詞開頭
+- 前句有指示詞 / 代名詞（指涉對象可能在當句才出現）
+- keyterms（人名 / 專有名詞）出現在前句或當句（需要前後一致）
+- 與前句的間隔：很短時加分，超過 max_gap_sec 時分數減半（多半已換話題）
+"""
+
+import re
+from typing import Optional
+
+from metrics import counter
+from transcriber_base import BOUNDARY_CLOSERS, CLAUSE_BOUNDARIES, SENTENCE_BOUNDARIES, BaseTranscriber
+
+DECISIONS = counter(
+    "autosub_correction_predictor_decisions_total",
+    "Per-utterance choice between the correction and the simple prompt", labels=("decision",),
+)
+
+# 句子停在這些結尾時多半會在下一句接續（日文接續助詞 / 連用形，英文功能詞）
+CONTINUATION_ENDINGS = (
+    "て", "で", "が", "けど", "けれど", "から", "ので", "のに", "し", "ば", "たら", "と", "は", "を", "に", "も",
+)
+CONTINUATION_WORDS = frozenset(("and", "but", "or", "so", "because", "the", "a", "an", "to", "of", "in", "with"))
+# 以這些開頭的句子是在補完前句
+CONTINUATION_STARTS = (
+    "て", "で", "が", "けど", "から", "ので", "のに", "って", "と", "を", "に", "は", "し",
+    "and ", "but ", "or ", "because ", "which ", "that ",
+)
+REFERENCE_WORDS = (
+    "それ", "あれ", "これ", "その", "あの", "この", "そこ", "あそこ", "彼", "彼女", "あいつ", "こいつ", "同じ",
+)
+_REFERENCE_WORDS_EN_RE = re.compile(r"\b(he|she|it|they|him|her|them|this|that|those)\b", re.I)
+
+
+def ends_mid_clause(text: str, punctuated: bool = False) -> bool:
+    """
+    句子是否停在子句中間（以逗號 / 接續語結尾）
+
+    Args:
+        punctuated: 轉錄結果會加句尾標點（此時沒有句尾標點即為中途切斷）
+    """
+    stripped = text.rstrip().rstrip("".join(BOUNDARY_CLOSERS))
+    if not stripped:
+        return False
+    last = stripped[-1]
+    if last in SENTENCE_BOUNDARIES:
+        return False
+    if last in CLAUSE_BOUNDARIES or punctuated:
+        return True
+    words = stripped.split()
+    if words and words[-1].lower() in CONTINUATION_WORDS:
+        return True
+    # 沒有標點時只看接續語：Deepgram 未加標點的完整句（例如「〜ですね」）不算片段
+    return stripped.endswith(CONTINUATION_ENDINGS)
+
+
+class CorrectionPredictor:
+    """
+    前句修正需求的本地預測器
+
+    Args:
+        keyterms: 重要詞彙（人名 / 專有名詞），出現時傾向帶前句
+        threshold: 分數達此值才使用帶前句的修正 prompt
+        max_gap_sec: 與前句的間隔超過此秒數時分數減半
+    """
+
+    INCOMPLETE_SCORE = 1.0
+    FRAGMENT_SCORE = 0.6
+    CONTINUATION_START_SCORE = 0.5
+    REFERENCE_SCORE = 0.3
+    KEYTERM_SCORE = 0.3
+    SHORT_GAP_SCORE = 0.2
+    SHORT_GAP_SEC = 0.5
+
+    def __init__(self, keyterms: Optional[list[str]] = None, threshold: float = 0.5, max_gap_sec: float = 3.0):
+        self.keyterms = [term for term in (keyterms or []) if term.strip()]
+        self.threshold = threshold
+        self.max_gap_sec = max_gap_sec
+        # 看過以句尾標點結束的句子後，視為有標點的轉錄結果
+        self._punctuated = False
+
+    def score(self, prev_text: str, current_text: str, gap_sec: Optional[float] = None) -> float:
+        """0~1：前句需要修正的可能性"""
+        if prev_text.endswith(BaseTranscriber.INCOMPLETE_SUFFIX):
+            return self.INCOMPLETE_SCORE
+        if not self._punctuated:
+            self._punctuated = any(
+                text.rstrip().rstrip("".join(BOUNDARY_CLOSERS))[-1:] in SENTENCE_BOUNDARIES
+                for text in (prev_text, current_text) if text.strip()
+            )
+        score = 0.0
+        if ends_mid_clause(prev_text, self._punctuated):
+            score += self.FRAGMENT_SCORE
+        if current_text.lstrip().lower().startswith(CONTINUATION_STARTS):
+            score += self.CONTINUATION_START_SCORE
+        if any(word in prev_text for word in REFERENCE_WORDS) or _REFERENCE_WORDS_EN_RE.search(prev_text):
+            score += self.REFERENCE_SCORE
+        if any(term in prev_text or term in current_text for term in self.keyterms):
+            score += self.KEYTERM_SCORE
+        if gap_sec is not None:
+            if gap_sec <= self.SHORT_GAP_SEC:
+                score += self.SHORT_GAP_SCORE
+            elif gap_sec >= self.max_gap_sec:
+                score *= 0.5
+        return min(1.0, score)
+
+    def should_correct(self, prev_text: str, current_text: str, gap_sec: Optional[float] = None) -> bool:
+        """是否使用帶前句的修正 prompt"""
+        correct = self.score(prev_text, current_text, gap_sec) >= self.threshold
+        DECISIONS.inc(decision="correct" if correct else "skip")
+        return correct
+
+
+def predictor_from_settings(settings) -> Optional[CorrectionPredictor]:
+    """CORRECTION_PREDICTOR=1 時依 session 設定建立預測器，否則回傳 None（每句都帶前句）"""
+    if not settings.correction_predictor:
+        return None
+    return CorrectionPredictor(
+        keyterms=settings.keyterms,
+        threshold=settings.correction_predictor_threshold,
+        max_gap_sec=settings.correction_predictor_max_gap_sec,
+    )
@@ -0,0 +1,173 @@
+"""
+兩階段翻譯的背景修正（TRANSLATION_CORRECTION_MODE=deferred）
+
+即時翻譯只送當句原文（最短 prompt、最快 TTFT，輸出也不含前句修正）；
+已送出的字幕在這裡累積，等後一句出現（上下文足以判斷是否要修正）後成批交給
+Translator.review_translations 檢查，修正結果與 inline 模式相同，以 translation_update 送出。
+
+修正 request 的優先序低於即時翻譯：翻譯 worker 忙碌時先等待，
+只有最舊的待檢查句子超過 max_delay_sec 才不管 worker 狀態直接送出。
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from logger import get_logger
+from metrics import counter
+
+log = get_logger("Review")
+
+REVIEWED_LINES = counter("autosub_correction_reviewed_lines_total", "Subtitles checked by background review")
+REVIEW_REQUESTS = counter("autosub_correction_review_requests_total", "Background review requests")
+REVIEW_CORRECTIONS = counter(
+    "autosub_correction_review_updates_total", "Subtitles corrected by background review"
+)
+
+CORRECTION_INLINE = "inline"      # 當句 request 同時修正前句（預設）
+CORRECTION_DEFERRED = "deferred"  # 當句只翻譯，前句修正交給 CorrectionReviewer
+CORRECTION_MODES = (CORRECTION_INLINE, CORRECTION_DEFERRED)
+
+
+@dataclass
+class ReviewLine:
+    transcript_id: str
+    source: str
+    translation: str
+    added_at: float
+
+
+class CorrectionReviewer:
+    """
+    已送出字幕的背景修正 worker
+
+    Args:
+        review: (lines: [(transcript_id, 原文, 翻譯, 是否檢查)]) -> {transcript_id: 修正}，
+                在 worker 執行緒上呼叫（一般為 Translator.review_translations）
+        on_correction: (transcript_id, correction) -> None，送出 translation_update
+        is_busy: () -> bool，即時翻譯是否忙碌（忙碌時延後送出）；None 表示不等待
+        batch_size: 單次檢查的最多句數（累積滿才送出，除非逾時）
+        max_delay_sec: 最舊的待檢查句子最長等待秒數
+        context_lines: 每次檢查附帶的已檢查句子數（前文）
+        clock: 計時用的時鐘
+    """
+
+    POLL_INTERVAL_SEC = 0.1
+    # close() 等待 worker 的上限：一次檢查 request 的 timeout（10 秒）加上餘裕，卡住的 request 不會拖住 session 關閉
+    JOIN_TIMEOUT_SEC = 12.0
+
+    def __init__(
+        self,
+        review: Callable[[list[tuple[str, str, str, bool]]], dict[str, str]],
+        on_correction: Callable[[str, str], None],
+        is_busy: Optional[Callable[[], bool]] = None,
+        batch_size: int = 3,
+        max_delay_sec: float = 4.0,
+        context_lines: int = 1,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.review = review
+        self.on_correction = on_correction
+        self.is_busy = is_busy
+        self.batch_size = max(1, batch_size)
+        self.max_delay_sec = max_delay_sec
+        self.clock = clock
+        self._pending: deque[ReviewLine] = deque()
+        self._context: deque[ReviewLine] = deque(maxlen=max(0, context_lines))
+        self._condition = threading.Condition()
+        self._closed = False
+        self._flush_on_close = True
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def add(self, transcript_id: str, source: str, translation: str) -> None:
+        """翻譯 worker：字幕送出後登記（依送出順序）"""
+        with self._condition:
+            self._pending.append(ReviewLine(transcript_id, source, translation, self.clock()))
+            self._condition.notify()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def close(self, flush: bool = True) -> None:
+        """
+        停止 worker
+
+        Args:
+            flush: 先檢查剩餘的句子（最後一句沒有後文，仍一併檢查）
+        """
+        with self._condition:
+            self._closed = True
+            self._flush_on_close = flush
+            self._condition.notify()
+        if self._worker:
+            self._worker.join(timeout=self.JOIN_TIMEOUT_SEC)
+            if self._worker.is_alive():
+                log.warning("Review worker still busy after %.0fs, abandoning remaining reviews", self.JOIN_TIMEOUT_SEC)
+                # 目前的 request 結束後不再取下一批
+                with self._condition:
+                    self._flush_on_close = False
+            self._worker = None
+
+    # ------------------------------------------------------------------
+
+    def _take_batch_locked(self) -> Optional[list[tuple[str, str, str, bool]]]:
+        """取出可檢查的一批（前文 + 待檢查 + 一句後文），還不該送出時回傳 None"""
+        if self._closed and not self._flush_on_close:
+            return None
+        flushing = self._closed
+        # 最後一句要等後一句出現才檢查（關閉時除外）
+        reviewable = len(self._pending) if flushing else len(self._pending) - 1
+        if reviewable <= 0:
+            return None
+        if not flushing:
+            overdue = self.clock() - self._pending[0].added_at >= self.max_delay_sec
+            idle = self.is_busy is None or not self.is_busy()
+            if not overdue and not (idle and reviewable >= self.batch_size):
+                return None
+
+        count = min(reviewable, self.batch_size)
+        batch = [self._pending.popleft() for _ in range(count)]
+        lines = [(line.transcript_id, line.source, line.translation, False) for line in self._context]
+        lines += [(line.transcript_id, line.source, line.translation, True) for line in batch]
+        if self._pending:
+            following = self._pending[0]
+            lines.append((following.transcript_id, following.source, following.translation, False))
+        self._context.extend(batch)
+        return lines
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                lines = self._take_batch_locked()
+                while lines is None:
+                    if self._closed:
+                        return
+                    self._condition.wait(self.POLL_INTERVAL_SEC if self._pending else None)
+                    lines = self._take_batch_locked()
+            self._review(lines)
+
+    def _review(self, lines: list[tuple[str, str, str, bool]]) -> None:
+        reviewed = sum(reviewable for *_, reviewable in lines)
+        try:
+            corrections = self.review(lines)
+        except Exception as e:
+            log.warning("Review failed: %s", e)
+            return
+        REVIEW_REQUESTS.inc()
+        REVIEWED_LINES.inc(reviewed)
+        for transcript_id, correction in corrections.items():
+            with self._condition:
+                for line in self._context:
+                    # 後續檢查以修正後的翻譯作為前文
+                    if line.transcript_id == transcript_id:
+                        line.translation = correction
+            REVIEW_CORRECTIONS.inc()
+            self.on_correction(transcript_id, correction)
+        log.debug("Reviewed %d lines, %d corrected", reviewed, len(corrections))
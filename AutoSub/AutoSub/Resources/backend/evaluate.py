@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+離線翻譯評估：以錄下的轉錄序列比較 prompt / 模型 / thinking 設定的延遲與品質
+
+每個設定對每個序列建立新的 Translator，逐句以 streaming 翻譯（與 session inline 模式相同，帶前句做上下文修正），
+記錄每句 TTFT、總延遲與最終翻譯（套用後續修正），並統計 token（依呼叫類型，見 token_ledger.py）、
+修正頻率與降級次數；序列帶參考譯文時以評分函式（--scorer，預設字元 bigram F1）比較。
+
+語料（檔案或目錄）：
+- 字幕 journal（session-*.jsonl，subtitle_journal.py）：原文為序列，已修正的翻譯作為參考譯文
+- JSON Lines：每行 {"text": 原文, "reference": 參考譯文（可省略）}
+- 文字檔：每行一句，可用 tab 分隔參考譯文
+
+設定檔（--configs，JSON 陣列），每項：
+    {"name": "lite-compact", "model": "...", "compact_history": true, "history_mode": "chat",
+     "max_context_tokens": 20000, "thinking": {"thinking_budget": 0},
+     "context_correction_template": "CONTEXT_CORRECTION_PROMPT_TEMPLATE", "streaming": true}
+prompt 欄位可以是 translator.py 中的模板名稱或模板字串本身。
+
+錄製 / 重播（不需網路即可重現）：
+- --record cassette.jsonl：呼叫 Gemini API 並把每個回應（文字、chunk、usage、TTFT、延遲）追加到 cassette
+- --replay cassette.jsonl：不連網，依 request 內容從 cassette 取回應，並依錄下的時間送出（--replay-speed 調整）
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    GEMINI_API_KEY=xxx python evaluate.py corpus/ --configs eval.json --record cassette.jsonl
+    python evaluate.py corpus/ --configs eval.json --replay cassette.jsonl --outputs side-by-side.tsv
+"""
+
+import argparse
+import csv
+import hashlib
+import importlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Optional
+
+from google.genai import types
+
+import logger
+import translator as translator_module
+from stand_ins import FakeGeminiClient, FakeResponse, FakeUsage, config_value, content_text
+from subtitle_journal import OP_SUBTITLE, iter_subtitles
+from token_ledger import CALL_FALLBACK, TokenLedger
+from translator import Translator
+
+# 可直接帶入 Translator 的設定欄位
+TRANSLATOR_OPTIONS = ("model", "history_mode", "history_window_turns", "compact_history", "explicit_cache",
+                      "max_context_tokens", "source_language", "target_language", "translation_context", "keyterms")
+TEMPLATE_OPTIONS = {
+    "context_correction_template": "_context_correction_template",
+    "context_reference_template": "_context_reference_template",
+    "simple_translate_template": "_simple_translate_template",
+}
+
+
+@dataclass
+class Utterance:
+    text: str
+    reference: Optional[str] = None
+
+
+@dataclass
+class TranscriptSequence:
+    name: str
+    utterances: list[Utterance]
+
+
+@dataclass
+class LineResult:
+    source: str
+    reference: Optional[str]
+    translation: str
+    corrected: bool = False
+    ttft_sec: Optional[float] = None
+    latency_sec: float = 0.0
+    score: Optional[float] = None
+
+
+@dataclass
+class ConfigResult:
+    name: str
+    config: dict
+    sequences: dict[str, list[LineResult]] = field(default_factory=dict)
+    tokens: dict[str, dict] = field(default_factory=dict)
+    replay_misses: int = 0
+
+    def lines(self) -> list[LineResult]:
+        return [line for lines in self.sequences.values() for line in lines]
+
+    def summary(self) -> dict:
+        lines = self.lines()
+        ttfts = [line.ttft_sec for line in lines if line.ttft_sec is not None]
+        latencies = [line.latency_sec for line in lines]
+        scores = [line.score for line in lines if line.score is not None]
+        with_previous = max(1, len(lines) - len(self.sequences))
+        total = {key: sum(entry[key] for entry in self.tokens.values()) for key in ("input", "output", "cached")}
+        return {
+            "lines": len(lines),
+            "ttft_p50_ms": _ms(_percentile(ttfts, 0.5)),
+            "ttft_p95_ms": _ms(_percentile(ttfts, 0.95)),
+            "latency_mean_ms": _ms(statistics.fmean(latencies) if latencies else None),
+            "latency_p95_ms": _ms(_percentile(latencies, 0.95)),
+            "input_tokens": total["input"],
+            "output_tokens": total["output"],
+            "cached_tokens": total["cached"],
+            "tokens_per_line": round((total["input"] + total["output"]) / max(1, len(lines)), 1),
+            "correction_rate": round(sum(line.corrected for line in lines) / with_previous, 3),
+            "fallbacks": self.tokens.get(CALL_FALLBACK, {}).get("requests", 0),
+            "score": round(statistics.fmean(scores), 4) if scores else None,
+            "replay_misses": self.replay_misses,
+        }
+
+
+def _percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 1)
+
+
+# ----------------------------------------------------------------------
+# 語料
+# ----------------------------------------------------------------------
+
+
+def _load_jsonl(path: str) -> list[Utterance]:
+    with open(path, encoding="utf-8") as f:
+        first = next((line for line in f if line.strip()), "")
+    try:
+        is_journal = json.loads(first).get("op") == OP_SUBTITLE
+    except (ValueError, AttributeError):
+        is_journal = False
+    if is_journal:
+        return [Utterance(record["original"], record.get("translation") or None) for record in iter_subtitles(path)]
+    utterances = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            utterances.append(Utterance(record["text"], record.get("reference")))
+    return utterances
+
+
+def _load_text(path: str) -> list[Utterance]:
+    utterances = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            text, _, reference = line.rstrip("\n").partition("\t")
+            if text.strip():
+                utterances.append(Utterance(text.strip(), reference.strip() or None))
+    return utterances
+
+
+def load_corpus(path: str) -> list[TranscriptSequence]:
+    """讀取單一檔案或目錄下的所有 .jsonl / .txt（依檔名排序），每個檔案是一個序列"""
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith((".jsonl", ".txt"))
+        )
+    else:
+        files = [path]
+    sequences = []
+    for file_path in files:
+        loader = _load_jsonl if file_path.endswith(".jsonl") else _load_text
+        utterances = loader(file_path)
+        if utterances:
+            sequences.append(TranscriptSequence(os.path.splitext(os.path.basename(file_path))[0], utterances))
+    return sequences
+
+
+# ----------------------------------------------------------------------
+# 評分
+# ----------------------------------------------------------------------
+
+
+def _bigrams(text: str) -> dict[str, int]:
+    compact = "".join(text.split())
+    grams: dict[str, int] = {}
+    for index in range(max(1, len(compact) - 1)):
+        gram = compact[index:index + 2]
+        grams[gram] = grams.get(gram, 0) + 1
+    return grams
+
+
+def char_f1(reference: str, hypothesis: str) -> float:
+    """字元 bigram F1（不分詞，適用 CJK）"""
+    ref, hyp = _bigrams(reference), _bigrams(hypothesis)
+    overlap = sum(min(count, hyp.get(gram, 0)) for gram, count in ref.items())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(hyp.values())
+    recall = overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def load_scorer(spec: Optional[str]) -> Callable[[str, str], float]:
+    """--scorer module:function，(reference, hypothesis) -> float"""
+    if not spec:
+        return char_f1
+    module_name, _, function_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), function_name or "score")
+
+
+# ----------------------------------------------------------------------
+# 錄製 / 重播
+# ----------------------------------------------------------------------
+
+
+def request_key(model: str, config, contents) -> str:
+    """cassette 查詢鍵：模型、inline system instruction 與完整 contents（含歷史）"""
+    digest = hashlib.sha256()
+    for part in (model, content_text(config_value(config, "system_instruction")), content_text(contents)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def _usage_dict(usage) -> dict:
+    return {
+        "input": getattr(usage, "prompt_token_count", None) or 0,
+        "output": getattr(usage, "candidates_token_count", None) or 0,
+        "cached": getattr(usage, "cached_content_token_count", None) or 0,
+    }
+
+
+class Cassette:
+    """錄下的回應（JSON Lines，同一個鍵以最後一筆為準）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._entries[entry["key"]] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._entries.get(key)
+
+    def append(self, entry: dict) -> None:
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class _RecordingModels:
+    def __init__(self, recorder: "RecordingClient"):
+        self._recorder = recorder
+
+    def generate_content(self, model, contents, config=None):
+        return self._recorder.call(model, config, contents, lambda: self._recorder.client.models.generate_content(
+            model=model, contents=contents, config=config,
+        ))
+
+    def generate_content_stream(self, model, contents, config=None):
+        return self._recorder.stream(model, config, contents, lambda: self._recorder.client.models.generate_content_stream(
+            model=model, contents=contents, config=config,
+        ))
+
+
+class _RecordingChats:
+    def __init__(self, recorder: "RecordingClient"):
+        self._recorder = recorder
+
+    def create(self, model, config=None, history=None):
+        chat = self._recorder.client.chats.create(model=model, config=config, history=history)
+        return _RecordingChat(self._recorder, chat, model, config)
+
+
+class _RecordingChat:
+    def __init__(self, recorder: "RecordingClient", chat, model: str, config):
+        self._recorder = recorder
+        self._chat = chat
+        self._model = model
+        self._config = config
+
+    def get_history(self):
+        return self._chat.get_history()
+
+    def _contents(self, message) -> list:
+        return list(self._chat.get_history()) + [content_text(message)]
+
+    def send_message(self, message, config=None):
+        send = (lambda: self._chat.send_message(message, config=config)) if config else (
+            lambda: self._chat.send_message(message)
+        )
+        return self._recorder.call(self._model, config or self._config, self._contents(message), send)
+
+    def send_message_stream(self, message, config=None):
+        return self._recorder.stream(
+            self._model, config or self._config, self._contents(message),
+            lambda: self._chat.send_message_stream(message),
+        )
+
+
+class RecordingClient:
+    """包住真正的 genai.Client，把每個回應寫入 cassette（caches 等其餘介面直接轉送）"""
+
+    def __init__(self, client, cassette: Cassette):
+        self.client = client
+        self.cassette = cassette
+        self.models = _RecordingModels(self)
+        self.chats = _RecordingChats(self)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _save(self, model, config, contents, chunks: list[str], usage, ttft_sec, latency_sec) -> None:
+        self.cassette.append({
+            "key": request_key(model, config, contents),
+            "model": model,
+            "prompt": content_text(contents[-1] if isinstance(contents, (list, tuple)) and contents else contents),
+            "chunks": chunks,
+            "usage": _usage_dict(usage),
+            "ttft_sec": round(ttft_sec, 4),
+            "latency_sec": round(latency_sec, 4),
+        })
+
+    def call(self, model, config, contents, send):
+        started_at = time.time()
+        response = send()
+        latency = time.time() - started_at
+        self._save(model, config, contents, [response.text or ""], response.usage_metadata, latency, latency)
+        return response
+
+    def stream(self, model, config, contents, send):
+        started_at = time.time()
+        chunks: list[str] = []
+        ttft = None
+        usage = None
+        for chunk in send():
+            if ttft is None and chunk.text:
+                ttft = time.time() - started_at
+            chunks.append(chunk.text or "")
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+        latency = time.time() - started_at
+        self._save(model, config, contents, chunks, usage, ttft if ttft is not None else latency, latency)
+
+
+class ReplayClient(FakeGeminiClient):
+    """
+    依 cassette 重播回應的 Gemini 替身（不連網）
+
+    Args:
+        cassette: 錄下的回應
+        speed: 重播時間倍率（1 為錄製時的 TTFT / 延遲，0 為不等待）
+    """
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0):
+        super().__init__()
+        self.cassette = cassette
+        self.speed = speed
+        self.misses = 0
+
+    def _entry(self, request: dict) -> dict:
+        entry = self.cassette.get(request_key(request["model"], request["config"], request["contents"]))
+        if entry is None:
+            self.misses += 1
+            raise RuntimeError("No recorded response for request (re-record the cassette)")
+        request["output_tokens"] = entry["usage"]["output"]
+        return entry
+
+    @staticmethod
+    def _usage(entry: dict) -> FakeUsage:
+        usage = entry["usage"]
+        return FakeUsage(usage["input"], usage["output"], usage["cached"])
+
+    def _respond(self, request: dict, last_text: str) -> FakeResponse:
+        entry = self._entry(request)
+        time.sleep(entry["latency_sec"] * self.speed)
+        return FakeResponse("".join(entry["chunks"]), self._usage(entry))
+
+    def _respond_stream(self, request: dict, last_text: str):
+        entry = self._entry(request)
+        chunks = entry["chunks"] or [""]
+        time.sleep(entry["ttft_sec"] * self.speed)
+        gap = max(0.0, entry["latency_sec"] - entry["ttft_sec"]) / max(1, len(chunks) - 1)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(gap * self.speed)
+            yield FakeResponse(chunk, self._usage(entry) if index == len(chunks) - 1 else None)
+
+
+# ----------------------------------------------------------------------
+# 執行
+# ----------------------------------------------------------------------
+
+
+class _ConfiguredTranslator(Translator):
+    """可覆寫 thinking 設定的 Translator（thinking=None 沿用依模型的預設）"""
+
+    def __init__(self, *args, thinking: Optional[dict] = None, **kwargs):
+        self._thinking = thinking
+        super().__init__(*args, **kwargs)
+
+    def _resolve_thinking_config(self, model: Optional[str] = None):
+        if self._thinking is None:
+            return super()._resolve_thinking_config(model)
+        return types.ThinkingConfig(**self._thinking)
+
+
+def _resolve_template(value: Optional[str]) -> Optional[str]:
+    """translator.py 的模板名稱換成模板內容，其餘視為模板字串"""
+    if value and value.isidentifier() and hasattr(translator_module, value):
+        return getattr(translator_module, value)
+    return value
+
+
+def build_translator(config: dict, client, ledger: TokenLedger) -> Translator:
+    options = {key: config[key] for key in TRANSLATOR_OPTIONS if key in config}
+    translator = _ConfiguredTranslator(
+        api_key=os.environ.get("GEMINI_API_KEY", ""), client=client, ledger=ledger,
+        thinking=config.get("thinking"), **options,
+    )
+    for key, attribute in TEMPLATE_OPTIONS.items():
+        if key in config:
+            setattr(translator, attribute, _resolve_template(config[key]))
+    if "context_correction_template" in config and "context_reference_template" not in config:
+        # 換掉修正模板時不沿用 compact 的「省略前句原文」變體
+        translator._context_reference_template = None
+    return translator
+
+
+def run_sequence(translator: Translator, sequence: TranscriptSequence, streaming: bool = True) -> list[LineResult]:
+    """依 session inline 模式逐句翻譯：帶前句，修正套用到前一句的最終翻譯"""
+    results: list[LineResult] = []
+    for utterance in sequence.utterances:
+        previous = results[-1] if results else None
+        prev_text = previous.source if previous else None
+        prev_translation = previous.translation if previous else None
+        started_at = time.time()
+        if streaming:
+            current, correction = translator.translate_with_context_correction_streaming(
+                utterance.text, prev_text, prev_translation,
+            )
+            ttft = translator.last_ttft_sec
+        else:
+            current, correction = translator.translate_with_context_correction(
+                utterance.text, prev_text, prev_translation,
+            )
+            ttft = None
+        latency = time.time() - started_at
+        if previous and correction and correction != previous.translation:
+            previous.translation = correction
+            previous.corrected = True
+        results.append(LineResult(utterance.text, utterance.reference, current, ttft_sec=ttft, latency_sec=latency))
+    return results
+
+
+def run_evaluation(
+    sequences: list[TranscriptSequence],
+    configs: list[dict],
+    client,
+    scorer: Callable[[str, str], float] = char_f1,
+) -> list[ConfigResult]:
+    """每個設定對每個序列各跑一次（新的 Translator，歷史不跨序列）"""
+    results = []
+    for config in configs:
+        name = config.get("name") or config.get("model") or "default"
+        result = ConfigResult(name, config)
+        ledger = TokenLedger(profile=name)
+        misses_before = getattr(client, "misses", 0)
+        for sequence in sequences:
+            translator = build_translator(config, client, ledger)
+            try:
+                lines = run_sequence(translator, sequence, streaming=config.get("streaming", True))
+            finally:
+                translator.close()
+            for line in lines:
+                if line.reference and line.translation:
+                    line.score = scorer(line.reference, line.translation)
+            result.sequences[sequence.name] = lines
+        result.tokens = ledger.totals()
+        result.replay_misses = getattr(client, "misses", 0) - misses_before
+        results.append(result)
+    return results
+
+
+def write_outputs(results: list[ConfigResult], output) -> None:
+    """並排輸出各設定的最終翻譯（TSV）"""
+    writer = csv.writer(output, delimiter="\t", lineterminator="\n")
+    writer.writerow(["sequence", "line", "source", "reference"] + [result.name for result in results])
+    first = results[0]
+    for sequence_name, lines in first.sequences.items():
+        for index, line in enumerate(lines):
+            writer.writerow(
+                [sequence_name, index, line.source, line.reference or ""]
+                + [result.sequences[sequence_name][index].translation for result in results]
+            )
+
+
+SUMMARY_COLUMNS = (
+    ("ttft_p50_ms", "ttft p50"), ("ttft_p95_ms", "ttft p95"), ("latency_mean_ms", "lat mean"),
+    ("latency_p95_ms", "lat p95"), ("tokens_per_line", "tok/line"), ("correction_rate", "corr"),
+    ("fallbacks", "fallback"), ("score", "score"),
+)
+
+
+def print_summary(results: list[ConfigResult]) -> None:
+    width = max(len(result.name) for result in results)
+    print(f"{'config':<{width}} " + " ".join(f"{label:>9}" for _, label in SUMMARY_COLUMNS))
+    for result in results:
+        summary = result.summary()
+        cells = ["-" if summary[key] is None else str(summary[key]) for key, _ in SUMMARY_COLUMNS]
+        print(f"{result.name:<{width}} " + " ".join(f"{cell:>9}" for cell in cells))
+        if summary["replay_misses"]:
+            print(f"  ({summary['replay_misses']} requests missing from the cassette)")
+
+
+def load_configs(path: Optional[str], models: list[str]) -> list[dict]:
+    configs = []
+    if path:
+        with open(path, encoding="utf-8") as f:
+            configs = json.load(f)
+        if not isinstance(configs, list):
+            raise ValueError("config file must contain a JSON array")
+    configs += [{"name": model, "model": model} for model in models]
+    return configs or [{"name": "default"}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline latency / quality evaluation of translation configs")
+    parser.add_argument("corpus", help="語料檔或目錄（journal / JSON Lines / 文字檔）")
+    parser.add_argument("--configs", help="設定檔（JSON 陣列）")
+    parser.add_argument("--model", action="append", default=[], help="額外加入只改模型的設定（可重複）")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="CASSETTE", help="呼叫 Gemini API 並錄下回應")
+    mode.add_argument("--replay", metavar="CASSETTE", help="從錄下的回應重播（不連網）")
+    mode.add_argument("--stand-in", action="store_true", help="使用本地替身（驗證流程用，翻譯為假資料）")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="重播時間倍率（0 不等待）")
+    parser.add_argument("--scorer", help="參考譯文評分函式 module:function（預設字元 bigram F1）")
+    parser.add_argument("--outputs", help="並排翻譯輸出（TSV）")
+    parser.add_argument("--json", help="完整報告（JSON）")
+    args = parser.parse_args()
+    logger.configure(os.environ.get("LOG_LEVEL", "warning"))
+
+    sequences = load_corpus(args.corpus)
+    if not sequences:
+        print(f"No utterances found in {args.corpus}", file=sys.stderr)
+        sys.exit(1)
+    configs = load_configs(args.configs, args.model)
+
+    if args.replay:
+        client = ReplayClient(Cassette(args.replay), speed=args.replay_speed)
+    elif args.stand_in:
+        client = FakeGeminiClient()
+    else:
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            print("GEMINI_API_KEY is required (or use --replay / --stand-in)", file=sys.stderr)
+            sys.exit(1)
+        from google import genai
+        client = genai.Client(api_key=api_key)
+        if args.record:
+            client = RecordingClient(client, Cassette(args.record))
+
+    results = run_evaluation(sequences, configs, client, load_scorer(args.scorer))
+    print(f"{len(sequences)} sequences, {sum(len(s.utterances) for s in sequences)} lines, {len(configs)} configs")
+    print_summary(results)
+
+    if args.outputs:
+        with open(args.outputs, "w", encoding="utf-8", newline="") as f:
+            write_outputs(results, f)
+    if args.json:
+        report = [
+            {"name": r.name, "config": r.config, "summary": r.summary(), "tokens": r.tokens,
+             "sequences": {name: [asdict(line) for line in lines] for name, lines in r.sequences.items()}}
+            for r in results
+        ]
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
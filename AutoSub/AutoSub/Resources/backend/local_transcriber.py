@@ -0,0 +1,452 @@
+"""
+本地 CPU 語音辨識（Whisper 系列模型，不需網路與 Deepgram API）
+
+轉錄器介面：LocalTranscriber 與 Deepgram 版 Transcriber 都繼承 transcriber_base.BaseTranscriber，
+提供相同的方法、回呼與 last_flush_span；session 依 TRANSCRIBER_ENGINE 以 transcriber_from_settings() 選擇實作。
+本模組不匯入 deepgram，只用本地引擎時不需安裝 Deepgram SDK。
+
+串流分段解碼：
+- send_audio 只把 PCM 累積到解碼視窗（尚未確定的音訊），背景 decode 執行緒每 step_sec 秒新音訊解碼整個視窗
+- 連續兩次解碼一致、且結束在視窗尾端 HOLD_BACK_SEC 之前的段落確定為 final，其餘為 interim；
+  確定的段落從視窗移除，視窗超過 max_window_sec 時強制確定最後一段以外的段落
+- 以音量判斷停頓：尾端靜音達 endpointing_ms 時整個視窗確定並標記 speech_final，達 utterance_end_ms 送 UtteranceEnd；
+  只有靜音的視窗不解碼（省 CPU，也避免 Whisper 在靜音上產生幻覺文字）
+- 解碼結果以 BaseTranscriber 的 _handle_final / _handle_interim / _handle_utterance_end 送出，
+  buffer、切句、stale interim、自適應斷句與音訊時間範圍的處理與 Deepgram 路徑共用
+
+WhisperEngine 以 faster-whisper（CTranslate2，CPU int8）實作，為選用套件（pip install faster-whisper），
+未安裝時建立引擎會拋出 RuntimeError；引擎也可替換成任何提供 transcribe() 的物件。
+"""
+
+import math
+import sys
+import threading
+import time
+from array import array
+from typing import NamedTuple, Optional
+
+from logger import get_logger
+from metrics import counter, gauge, histogram
+from transcriber_base import AUDIO_BYTES, AUDIO_CHUNKS, BaseTranscriber
+
+log = get_logger("Local ASR")
+
+ENGINE_DEEPGRAM = "deepgram"
+ENGINE_WHISPER = "whisper"
+TRANSCRIBER_ENGINES = (ENGINE_DEEPGRAM, ENGINE_WHISPER)
+
+WHISPER_SAMPLE_RATE = 16000
+# Whisper 一次最多處理 30 秒音訊，視窗上限留一點餘裕
+MAX_WINDOW_LIMIT_SEC = 28.0
+
+DECODES = counter("autosub_local_decodes_total", "Local speech engine decode calls")
+DECODE_SECONDS = histogram("autosub_local_decode_seconds", "Local speech engine time per decode call")
+REAL_TIME_FACTOR = gauge("autosub_local_real_time_factor", "Cumulative local decode time per second of audio")
+SILENCE_SKIPPED = counter("autosub_local_silence_skipped_seconds_total", "Silent audio dropped without decoding")
+
+
+class SpeechSegment(NamedTuple):
+    """辨識出的一段文字（時間為秒，相對於送入引擎的音訊開頭）"""
+    start: float
+    end: float
+    text: str
+
+
+def whisper_language(language: Optional[str]) -> Optional[str]:
+    """Deepgram 語言代碼轉 Whisper（"zh-TW" → "zh"，"multi" 或空值表示自動偵測）"""
+    if not language or language == "multi":
+        return None
+    return language.split("-")[0].lower()
+
+
+def pcm_rms(pcm: bytes) -> float:
+    """16-bit PCM 的 RMS 音量（隔一個 sample 取樣，停頓判斷夠用）"""
+    samples = array("h")
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    samples = samples[::2]
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class WhisperEngine:
+    """
+    faster-whisper CPU 推論（模型於建立時載入，transcribe 可從多個 session 的 decode 執行緒呼叫）
+
+    Args:
+        model: 模型名稱（tiny / base / small / medium / large-v3 …）或本地 CTranslate2 模型目錄
+        cpu_threads: CTranslate2 intra-op 執行緒數（0 表示 CTranslate2 預設）
+        compute_type: 量化型別，CPU 建議 int8
+        model_dir: 模型下載 / 快取目錄（None 表示 Hugging Face 預設快取）
+        beam_size: beam search 寬度（1 為 greedy，延遲最低）
+        no_speech_threshold: 段落 no_speech 機率超過此值時丟棄
+    """
+
+    def __init__(self, model: str = "small", cpu_threads: int = 0, compute_type: str = "int8",
+                 model_dir: Optional[str] = None, beam_size: int = 1, no_speech_threshold: float = 0.6):
+        try:
+            import numpy
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError("Local transcription requires faster-whisper (pip install faster-whisper)") from e
+        self._np = numpy
+        self.model_name = model
+        self.cpu_threads = cpu_threads
+        self.beam_size = beam_size
+        self.no_speech_threshold = no_speech_threshold
+        started_at = time.perf_counter()
+        self._model = WhisperModel(
+            model, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads, download_root=model_dir,
+        )
+        log.info("Whisper model %s loaded in %.1fs (threads=%s, compute_type=%s)",
+                 model, time.perf_counter() - started_at, cpu_threads or "default", compute_type)
+
+    def _to_samples(self, pcm: bytes, sample_rate: int, channels: int):
+        """16-bit PCM → 16kHz mono float32（聲道平均，線性內插重取樣）"""
+        np = self._np
+        block_align = channels * 2
+        samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % block_align], dtype="<i2").astype(np.float32) / 32768.0
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        if sample_rate != WHISPER_SAMPLE_RATE and len(samples):
+            target_count = int(len(samples) * WHISPER_SAMPLE_RATE / sample_rate)
+            positions = np.arange(target_count, dtype=np.float64) * (sample_rate / WHISPER_SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        return samples
+
+    def transcribe(self, pcm: bytes, sample_rate: int, channels: int,
+                   language: Optional[str] = None, prompt: Optional[str] = None) -> list[SpeechSegment]:
+        segments, _ = self._model.transcribe(
+            self._to_samples(pcm, sample_rate, channels),
+            language=language,
+            beam_size=self.beam_size,
+            initial_prompt=prompt or None,
+            # 視窗會重疊解碼，不沿用模型自己的前文；溫度 fallback 會讓單次延遲翻倍，串流時不用
+            condition_on_previous_text=False,
+            temperature=0.0,
+            vad_filter=False,
+        )
+        return [
+            SpeechSegment(segment.start, segment.end, segment.text.strip())
+            for segment in segments
+            if segment.text.strip() and segment.no_speech_prob <= self.no_speech_threshold
+        ]
+
+
+class LocalTranscriber(BaseTranscriber):
+    """
+    以本地語音辨識引擎串流分段解碼的轉錄器（事件與 Deepgram 版相同）
+
+    Args:
+        engine: 提供 transcribe(pcm, sample_rate, channels, language=None, prompt=None) -> list[SpeechSegment] 的引擎
+        step_sec: 每累積多少秒新音訊解碼一次（解碼比這慢時，下一次解碼緊接著開始）
+        max_window_sec: 解碼視窗上限（上限 MAX_WINDOW_LIMIT_SEC）
+        silence_threshold: 低於此 RMS 音量視為靜音
+        其餘參數同 BaseTranscriber
+    """
+
+    # 視窗尾端多少秒內的段落先不確定（Whisper 常改寫正在說的句尾）
+    HOLD_BACK_SEC = 1.0
+    # 兩次解碼視為同一段落的起點誤差
+    AGREEMENT_TOLERANCE_SEC = 0.5
+    # 丟棄靜音時保留的前導音訊，避免切掉語音開頭
+    LEAD_IN_SEC = 0.5
+    # 帶入 prompt 的已確定文字長度
+    PROMPT_CHARS = 120
+    DECODE_JOIN_TIMEOUT_SEC = 10.0
+
+    def __init__(self, engine, step_sec: float = 1.0, max_window_sec: float = 15.0,
+                 silence_threshold: float = 300.0, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = engine
+        self.step_sec = max(0.1, step_sec)
+        self.max_window_sec = min(max(self.step_sec, max_window_sec), MAX_WINDOW_LIMIT_SEC)
+        self.silence_threshold = silence_threshold
+        self._block_align = self.channels * 2
+        self._decode_condition = threading.Condition()
+        self._decode_thread: Optional[threading.Thread] = None
+        self._decoding = False
+
+        # 解碼視窗（尚未確定的音訊）與其起點的串流時間；只有 decode 執行緒會從前端移除
+        self._window = bytearray()
+        self._window_start_sec = 0.0
+        self._received_sec = 0.0
+        self._decoded_until_sec = 0.0
+        self._last_voice_sec: Optional[float] = None
+        self._silence_sec = 0.0
+        self._pause_pending = False
+        self._utterance_end_pending = False
+        self._finalize_requested = False
+        # 上一次解碼中尚未確定的段落（串流時間），下一次解碼一致時才確定
+        self._hypothesis: list[SpeechSegment] = []
+        # 最近一次 UtteranceEnd 後是否有確定的結果
+        self._utterance_open = False
+        self._committed_text = ""
+
+        # 累計解碼時間（real-time factor = decode_seconds / 音訊秒數）
+        self.decode_seconds = 0.0
+        self.decode_count = 0
+
+    # ------------------------------------------------------------------
+    # 生命週期
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """啟動 decode 執行緒與 watchdog（stale interim / 斷句保留的處理與 Deepgram 版共用）"""
+        log.info("start() called (engine=%s)", type(self.engine).__name__)
+        self._start_time = time.time()
+        self._running = True
+        self._start_watchdog()
+        self._decode_thread = threading.Thread(target=self._decode_loop, name="local-decode", daemon=True)
+        self._decode_thread.start()
+
+    def stop(self) -> None:
+        with self._decode_condition:
+            self._running = False
+            self._decode_condition.notify_all()
+        if self._decode_thread and self._decode_thread.is_alive():
+            self._decode_thread.join(timeout=self.DECODE_JOIN_TIMEOUT_SEC)
+        self._decode_thread = None
+        self._stop_watchdog()
+
+    def send_audio(self, audio_data) -> None:
+        """把 PCM 加入解碼視窗並更新停頓狀態；解碼在背景執行緒進行，不阻塞呼叫端"""
+        if not self._running:
+            return
+        data = bytes(audio_data)
+        seconds = len(data) / self._bytes_per_second
+        voiced = pcm_rms(data) >= self.silence_threshold
+        with self._decode_condition:
+            self._window += data
+            self._received_sec += seconds
+            if voiced:
+                self._last_voice_sec = self._received_sec
+                self._silence_sec = 0.0
+            else:
+                previous_ms = self._silence_sec * 1000
+                self._silence_sec += seconds
+                silence_ms = self._silence_sec * 1000
+                if self._has_pending_speech() and previous_ms < self.endpointing_ms <= silence_ms:
+                    self._pause_pending = True
+                if previous_ms < self.utterance_end_ms <= silence_ms:
+                    self._utterance_end_pending = True
+            if self._decode_due():
+                self._decode_condition.notify_all()
+        AUDIO_CHUNKS.inc()
+        AUDIO_BYTES.inc(len(data))
+
+    def finalize(self, timeout: float = 10.0) -> None:
+        """解碼視窗內剩餘的音訊並確定全部結果，再 flush buffer（檔案模式用）"""
+        if self._running and self._decode_thread:
+            self._finalized_event.clear()
+            with self._decode_condition:
+                self._finalize_requested = True
+                self._decode_condition.notify_all()
+            if not self._finalized_event.wait(timeout):
+                log.warning("Finalize not completed after %ss", timeout)
+        self._flush_buffer("finalize")
+
+    def wait_decoded(self, timeout: float = 10.0) -> bool:
+        """等待 decode 執行緒處理完已到期的音訊（以超過即時的速度送音訊時作為背壓）"""
+        with self._decode_condition:
+            return self._decode_condition.wait_for(
+                lambda: not self._running or (not self._decoding and not self._decode_due()), timeout
+            )
+
+    # ------------------------------------------------------------------
+    # 解碼（decode 執行緒）
+    # ------------------------------------------------------------------
+
+    def _has_pending_speech(self) -> bool:
+        # 容許 1ms 誤差：視窗以 byte 為單位切齊，與累加的秒數可能有些微差距
+        return self._last_voice_sec is not None and self._last_voice_sec > self._window_start_sec + 0.001
+
+    def _decode_due(self) -> bool:
+        return (
+            self._finalize_requested
+            or self._pause_pending
+            or self._utterance_end_pending
+            # 容許累加秒數的浮點誤差
+            or self._received_sec - self._decoded_until_sec >= self.step_sec - 1e-6
+        )
+
+    def _decode_loop(self) -> None:
+        while True:
+            with self._decode_condition:
+                while self._running and not self._decode_due():
+                    self._decode_condition.wait()
+                if not self._running:
+                    return
+                finalize = self._finalize_requested
+                self._finalize_requested = False
+                self._pause_pending = False
+                self._utterance_end_pending = False
+                window = bytes(self._window)
+                window_start = self._window_start_sec
+                window_end = self._received_sec
+                pause = self._silence_sec * 1000 >= self.endpointing_ms
+                voiced = self._has_pending_speech()
+                self._decoded_until_sec = window_end
+                self._decoding = True
+            try:
+                if voiced:
+                    segments = self._decode(window, window_start)
+                    self._commit(segments, window_start, window_end, pause or finalize, pause)
+                else:
+                    self._drop_silence(window_start, window_end)
+                self._maybe_end_utterance()
+            except Exception as e:
+                log.error("Decode failed: %s: %s", type(e).__name__, e)
+                self._report_error(e)
+            finally:
+                if finalize:
+                    self._finalized_event.set()
+                with self._decode_condition:
+                    self._decoding = False
+                    self._decode_condition.notify_all()
+
+    def _decode(self, window: bytes, window_start: float) -> list[SpeechSegment]:
+        duration = len(window) / self._bytes_per_second
+        prompt = " ".join(self.keyterms + [self._committed_text]).strip()
+        started_at = time.perf_counter()
+        segments = self.engine.transcribe(
+            window, self.sample_rate, self.channels, language=whisper_language(self.language), prompt=prompt,
+        )
+        elapsed = time.perf_counter() - started_at
+        DECODES.inc()
+        DECODE_SECONDS.observe(elapsed)
+        self.decode_seconds += elapsed
+        self.decode_count += 1
+        if self._received_sec:
+            REAL_TIME_FACTOR.set(self.decode_seconds / self._received_sec)
+        log.debug("Decoded %.1fs window in %.2fs (%d segments)", duration, elapsed, len(segments))
+        return [
+            SpeechSegment(window_start + max(0.0, segment.start), window_start + min(segment.end, duration),
+                          segment.text.strip())
+            for segment in segments
+            if segment.text.strip()
+        ]
+
+    def _agrees(self, segment: SpeechSegment) -> bool:
+        """上一次解碼也在相近位置得到相同文字（local agreement）"""
+        return any(
+            previous.text == segment.text and abs(previous.start - segment.start) <= self.AGREEMENT_TOLERANCE_SEC
+            for previous in self._hypothesis
+        )
+
+    def _commit(self, segments: list[SpeechSegment], window_start: float, window_end: float,
+                commit_all: bool, pause: bool) -> None:
+        """決定確定 / 未確定的段落，送出對應結果並把已確定的音訊移出視窗"""
+        if commit_all:
+            committed, pending = segments, []
+        else:
+            committed = []
+            for segment in segments:
+                if segment.end > window_end - self.HOLD_BACK_SEC or not self._agrees(segment):
+                    break
+                committed.append(segment)
+            if not committed and window_end - window_start >= self.max_window_sec:
+                # 視窗已滿：最後一段以外全部確定，只有一段時整段確定
+                committed = segments[:-1] or segments
+            pending = segments[len(committed):]
+
+        events = []
+        for index, segment in enumerate(committed):
+            if index + 1 < len(committed):
+                following = committed[index + 1].start
+            else:
+                following = pending[0].start if pending else None
+            if following is None:
+                speech_final = pause
+            else:
+                speech_final = (following - segment.end) * 1000 >= self.endpointing_ms
+            events.append((self._handle_final, segment.text, (segment.start, segment.end), speech_final))
+        if pending:
+            text = "".join(segment.text for segment in pending)
+            events.append((self._handle_interim, text, (pending[0].start, pending[-1].end)))
+
+        if commit_all:
+            cut_sec = window_end
+        elif committed:
+            cut_sec = committed[-1].end
+        elif not segments and window_end - window_start >= self.max_window_sec:
+            # 有聲音但辨識不出文字（音樂等）：丟棄，只保留前導音訊
+            cut_sec = window_end - self.LEAD_IN_SEC
+        else:
+            cut_sec = window_start
+        with self._decode_condition:
+            self._trim_window(cut_sec)
+            self._hypothesis = pending
+            if committed:
+                self._utterance_open = True
+                committed_text = self._committed_text + "".join(segment.text for segment in committed)
+                self._committed_text = committed_text[-self.PROMPT_CHARS:]
+        self._dispatch(events)
+
+    def _drop_silence(self, window_start: float, window_end: float) -> None:
+        """視窗內只有靜音：不解碼，只保留前導音訊"""
+        with self._decode_condition:
+            before = self._window_start_sec
+            self._trim_window(max(window_start, window_end - self.LEAD_IN_SEC))
+            self._hypothesis = []
+        if self._window_start_sec > before:
+            SILENCE_SKIPPED.inc(self._window_start_sec - before)
+
+    def _trim_window(self, cut_sec: float) -> None:
+        """移除 cut_sec 之前的音訊（呼叫端持有 _decode_condition）"""
+        cut_bytes = round((cut_sec - self._window_start_sec) * self._bytes_per_second)
+        cut_bytes = min(max(0, cut_bytes - cut_bytes % self._block_align), len(self._window))
+        if cut_bytes:
+            del self._window[:cut_bytes]
+            self._window_start_sec += cut_bytes / self._bytes_per_second
+
+    def _maybe_end_utterance(self) -> None:
+        """確定的結果之後靜音達 utterance_end_ms：結束這段話（與 Deepgram 的 UtteranceEnd 相同，每段話一次）"""
+        with self._decode_condition:
+            if not self._utterance_open or self._hypothesis or self._silence_sec * 1000 < self.utterance_end_ms:
+                return
+            self._utterance_open = False
+        self._dispatch([(self._handle_utterance_end,)])
+
+    def _dispatch(self, events: list[tuple]) -> None:
+        """依序呼叫 (handler, *args)，與 Deepgram 版相同在 _message_lock 下處理"""
+        if not events or not self._running:
+            return
+        with self._message_lock:
+            for handler, *args in events:
+                handler(*args)
+
+
+def whisper_engine_from_settings(settings) -> WhisperEngine:
+    """依 session 設定載入 Whisper 模型（server 模式所有 session 共用一個）"""
+    return WhisperEngine(
+        model=settings.whisper_model,
+        cpu_threads=settings.whisper_threads,
+        compute_type=settings.whisper_compute_type,
+        model_dir=settings.whisper_model_dir or None,
+    )
+
+
+def transcriber_from_settings(settings, engine=None, deepgram_options: Optional[dict] = None,
+                              **kwargs) -> BaseTranscriber:
+    """
+    依 TRANSCRIBER_ENGINE 建立轉錄器
+
+    Args:
+        engine: 共用的本地引擎（None 表示依設定載入；deepgram 模式不使用）
+        deepgram_options: 只有 Deepgram 版使用的參數（client、on_status、重連 / 重播 / 輪替設定）
+        kwargs: 兩種實作共用的 BaseTranscriber 參數
+    """
+    if settings.transcriber_engine != ENGINE_WHISPER:
+        # 只在 deepgram 模式匯入（本地模式不需安裝 Deepgram SDK）
+        from transcriber import Transcriber
+
+        return Transcriber(api_key=settings.deepgram_key, **kwargs, **(deepgram_options or {}))
+    return LocalTranscriber(
+        engine or whisper_engine_from_settings(settings),
+        step_sec=settings.whisper_step_sec,
+        max_window_sec=settings.whisper_max_window_sec,
+        **kwargs,
+    )
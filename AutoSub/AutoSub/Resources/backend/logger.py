@@ -0,0 +1,214 @@
+"""
+分級、非同步的 stderr 日誌
+取代熱路徑上的 print(..., file=sys.stderr, flush=True)：
+
+- 分級（debug / info / warning / error），低於門檻的呼叫只做一次整數比較就返回
+- 延遲格式化：呼叫端只傳 format 字串與參數（% 格式），由寫入執行緒組字串
+- 佇列 + 背景寫入執行緒：listener / 翻譯執行緒不做 syscall；佇列滿時丟棄並計數，不阻塞
+- 高頻事件可抽樣（每 N 次輸出一次）
+
+輸出格式與原本相同：[Tag] message
+
+環境變數：
+- LOG_LEVEL: debug / info（預設）/ warning / error
+- LOG_QUEUE_SIZE: 佇列上限（預設 10000）
+"""
+
+import atexit
+import os
+import queue
+import sys
+import threading
+from typing import Optional, TextIO
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+
+_STOP = object()
+
+
+def parse_level(name: Optional[str], default: int = INFO) -> int:
+    if not name:
+        return default
+    return LEVEL_NAMES.get(name.strip().lower(), default)
+
+
+class _Writer:
+    """單一背景執行緒：從佇列取出紀錄、格式化後批次寫入 stream"""
+
+    def __init__(self, stream: Optional[TextIO], max_queue: int):
+        self._stream = stream
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream or sys.stderr
+
+    def submit(self, record: tuple) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="log-writer")
+                self._thread.start()
+
+    def _run(self) -> None:
+        reported_dropped = 0
+        while True:
+            record = self._queue.get()
+            lines = []
+            stop = False
+            while True:
+                if record is _STOP:
+                    stop = True
+                elif isinstance(record, threading.Event):
+                    self._write(lines)
+                    lines = []
+                    record.set()
+                else:
+                    lines.append(self._format(record))
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if self.dropped != reported_dropped:
+                lines.append(f"[Log] {self.dropped - reported_dropped} lines dropped (queue full)")
+                reported_dropped = self.dropped
+            self._write(lines)
+            if stop:
+                return
+
+    @staticmethod
+    def _format(record: tuple) -> str:
+        tag, message, args = record
+        if args:
+            try:
+                message = message % args
+            except (TypeError, ValueError) as e:
+                message = f"{message} {args!r} (format error: {e})"
+        return f"[{tag}] {message}"
+
+    def _write(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        try:
+            stream = self.stream
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """等待目前佇列內的紀錄寫完"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+
+class Logger:
+    """
+    具名 logger，tag 即輸出的 [Tag] 前綴
+
+    用法:
+        log = get_logger("Transcriber")
+        log.debug("transcript=%r is_final=%s", transcript, is_final)
+        log.sample("interim", 20, "interim #%d", count)
+    """
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self._counters: dict[str, int] = {}
+
+    def enabled(self, level: int) -> bool:
+        return level >= _level
+
+    def log(self, level: int, message: str, *args) -> None:
+        if level < _level:
+            return
+        _writer.submit((self.tag, message, args))
+
+    def debug(self, message: str, *args) -> None:
+        if DEBUG < _level:
+            return
+        _writer.submit((self.tag, message, args))
+
+    def info(self, message: str, *args) -> None:
+        if INFO < _level:
+            return
+        _writer.submit((self.tag, message, args))
+
+    def warning(self, message: str, *args) -> None:
+        if WARNING < _level:
+            return
+        _writer.submit((self.tag, message, args))
+
+    def error(self, message: str, *args) -> None:
+        if ERROR < _level:
+            return
+        _writer.submit((self.tag, message, args))
+
+    def sample(self, key: str, every: int, message: str, *args, level: int = DEBUG) -> None:
+        """高頻事件抽樣：同一個 key 每 every 次輸出一次（第 1 次一定輸出）"""
+        if level < _level:
+            return
+        count = self._counters.get(key, 0)
+        self._counters[key] = count + 1
+        if count % max(1, every):
+            return
+        _writer.submit((self.tag, message, args))
+
+
+_level = parse_level(os.environ.get("LOG_LEVEL"))
+_writer = _Writer(None, int(os.environ.get("LOG_QUEUE_SIZE", "10000")))
+_loggers: dict[str, Logger] = {}
+_loggers_lock = threading.Lock()
+
+
+def get_logger(tag: str) -> Logger:
+    logger = _loggers.get(tag)
+    if logger is None:
+        with _loggers_lock:
+            logger = _loggers.setdefault(tag, Logger(tag))
+    return logger
+
+
+def configure(level=None, stream: Optional[TextIO] = None, max_queue: Optional[int] = None) -> None:
+    """調整門檻（int 或名稱）、輸出 stream 與佇列上限（供測試與 benchmark）"""
+    global _level, _writer
+    if level is not None:
+        _level = level if isinstance(level, int) else parse_level(level, _level)
+    if stream is not None or max_queue is not None:
+        _writer.flush()
+        _writer = _Writer(stream or _writer._stream, max_queue or _writer._queue.maxsize)
+
+
+def current_level() -> int:
+    return _level
+
+
+def dropped_count() -> int:
+    return _writer.dropped
+
+
+def flush(timeout: float = 2.0) -> None:
+    _writer.flush(timeout)
+
+
+atexit.register(flush)
@@ -6,305 +6,68 @@ Auto-Sub Python Backend
 協議：
 - 輸入 (stdin)：二進位 PCM 音訊 (24kHz, 16-bit, stereo)
 - 輸出 (stdout)：JSON Lines 格式
+
+多個音訊來源共用一個 process 時改用 server.py（framed IPC）
 """
 
 import sys
-import os
 import json
-from transcriber import Transcriber
-from translator import Translator
+import threading
+from audio_ingest import FrameReader, frame_bytes_for
+from logger import flush as flush_log, get_logger
+from profiling import start_from_settings as start_profiling
+from shm_transport import ShmRingReader
+from session import (
+    BYTES_PER_SAMPLE,
+    SessionSettings,
+    SubtitleSession,
+    start_metrics,
+)
+
+log = get_logger("Python")
+# 每 N 個音訊 frame 輸出一次 debug 紀錄
+AUDIO_LOG_EVERY = 100
 
 # 確保即時輸出
 sys.stdout.reconfigure(line_buffering=True)
 
-# 音訊格式常數
-SAMPLE_RATE = 24000
-CHANNELS = 2
-BYTES_PER_SAMPLE = 2
-CHUNK_DURATION_MS = 100
-CHUNK_SIZE = SAMPLE_RATE * CHANNELS * BYTES_PER_SAMPLE * CHUNK_DURATION_MS // 1000  # 9600 bytes
-INCOMPLETE_SUFFIX = " [暫停]"
+# listener 執行緒與翻譯 worker 都會輸出，確保 JSON Lines 不交錯
+_output_lock = threading.Lock()
 
 
 def output_json(data: dict):
     """輸出 JSON 到 stdout"""
-    print(json.dumps(data, ensure_ascii=False), flush=True)
-
-
-def output_streaming_update(transcript_id: str, partial_translation: str):
-    """輸出 streaming 更新到 stdout"""
-    output_json({
-        "type": "translation_streaming",
-        "id": transcript_id,
-        "partial": partial_translation
-    })
-
-
-# ============================================================================
-# Translation Helper Functions (Tier 1-1 重構)
-# ============================================================================
-
-MAX_TRANSLATION_RETRIES = 3
-
-
-def translate_with_retry(
-    text: str,
-    prev_text: str | None,
-    prev_translation: str | None,
-    transcript_id: str,
-    translator: Translator,
-    max_retries: int = MAX_TRANSLATION_RETRIES
-) -> tuple[str, str | None] | None:
-    """
-    帶重試機制的 streaming 翻譯。
-
-    Args:
-        text: 當前要翻譯的原文
-        prev_text: 前句原文（上下文修正用）
-        prev_translation: 前句翻譯（上下文修正用）
-        transcript_id: 用於 streaming 更新的 ID
-        translator: 翻譯器實例
-        max_retries: 最大重試次數
-
-    Returns:
-        成功時返回 (current_translation, prev_correction) tuple
-        失敗時返回 None
-    """
-    for attempt in range(max_retries):
-        try:
-            print(f"[Python] Translating with context (attempt {attempt + 1})...", file=sys.stderr, flush=True)
-
-            # Streaming callback：即時更新 UI
-            def on_streaming(partial: str, correction):
-                output_streaming_update(transcript_id, partial)
-
-            current_trans, prev_correction = translator.translate_with_context_correction_streaming(
-                text, prev_text, prev_translation,
-                on_streaming_update=on_streaming
-            )
-
-            print(f"[Python] Translation result: current={current_trans}, correction={prev_correction}", file=sys.stderr, flush=True)
-
-            # 確保 current_trans 是有效字串
-            if current_trans and isinstance(current_trans, str) and current_trans.strip():
-                return (current_trans, prev_correction)
-            else:
-                print(f"[Python] Empty or invalid translation result, retrying...", file=sys.stderr, flush=True)
-                continue
-
-        except Exception as e:
-            print(f"[Python] Translation error: {e}", file=sys.stderr, flush=True)
-
-    return None
-
-
-def send_subtitle(transcript_id: str, original: str, translation: str):
-    """送出翻譯結果（subtitle）"""
-    output_json({
-        "type": "subtitle",
-        "id": transcript_id,
-        "original": original,
-        "translation": translation
-    })
-    print(f"[Python] Subtitle sent to stdout!", file=sys.stderr, flush=True)
-
-
-def send_translation_update(prev_id: str, prev_correction: str):
-    """送出前句修正（translation_update）"""
-    if prev_correction and prev_id:
-        output_json({
-            "type": "translation_update",
-            "id": prev_id,
-            "translation": prev_correction
-        })
-        print(f"[Python] Translation update sent for prev_id={prev_id}!", file=sys.stderr, flush=True)
-
-
-def send_translation_error(transcript_id: str, original: str, is_incomplete: bool):
-    """送出翻譯失敗的降級輸出"""
-    print(f"[Python] Translation failed after {MAX_TRANSLATION_RETRIES} attempts", file=sys.stderr, flush=True)
-    # 送出帶 id 的失敗字幕
-    output_json({
-        "type": "subtitle",
-        "id": transcript_id,
-        "original": original,
-        "translation": "[翻譯失敗]" + (INCOMPLETE_SUFFIX if is_incomplete else "")
-    })
-    # 送出錯誤通知
-    output_json({
-        "type": "error",
-        "message": "Translation failed",
-        "code": "TRANSLATE_ERROR"
-    })
+    line = json.dumps(data, ensure_ascii=False)
+    with _output_lock:
+        print(line, flush=True)
 
 
 def main():
     """主程式"""
-    print("[Python] main() started", file=sys.stderr, flush=True)
+    log.info("main() started")
 
     # 從環境變數讀取設定
-    deepgram_key = os.environ.get("DEEPGRAM_API_KEY")
-    gemini_key = os.environ.get("GEMINI_API_KEY")
-    source_lang = os.environ.get("SOURCE_LANGUAGE", "ja")
-    target_lang = os.environ.get("TARGET_LANGUAGE", "zh-TW")
-    gemini_model = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash-lite-preview-09-2025")
-    translation_context = os.environ.get("TRANSLATION_CONTEXT", "")
-    keyterms_raw = os.environ.get("DEEPGRAM_KEYTERMS", "")
-    keyterms = [line.strip() for line in keyterms_raw.splitlines() if line.strip()]
-
-    # Deepgram 斷句設定（Phase 1 調整後的新預設值）
-    endpointing_ms = int(os.environ.get("DEEPGRAM_ENDPOINTING_MS", "200"))
-    utterance_end_ms = int(os.environ.get("DEEPGRAM_UTTERANCE_END_MS", "1000"))
-    max_buffer_chars = int(os.environ.get("DEEPGRAM_MAX_BUFFER_CHARS", "50"))
-    interim_stale_timeout_sec = float(os.environ.get("DEEPGRAM_INTERIM_STALE_TIMEOUT_SEC", "4.0"))
-
-    # 新增：Gemini Context 設定（有預設值）
-    max_context_tokens = int(os.environ.get("GEMINI_MAX_CONTEXT_TOKENS", "20000"))
+    settings = SessionSettings.from_env()
+    settings.log_summary()
 
-    print(f"[Python] API keys present: deepgram={bool(deepgram_key)}, gemini={bool(gemini_key)}", file=sys.stderr, flush=True)
-    print(f"[Python] Deepgram config: endpointing_ms={endpointing_ms}, utterance_end_ms={utterance_end_ms}, max_buffer_chars={max_buffer_chars}, interim_stale_timeout_sec={interim_stale_timeout_sec}", file=sys.stderr, flush=True)
-    print(f"[Python] Deepgram keyterms: {len(keyterms)} items", file=sys.stderr, flush=True)
-    print(
-        f"[Python] Gemini config: model={gemini_model}, max_context_tokens={max_context_tokens}",
-        file=sys.stderr,
-        flush=True,
-    )
-    if translation_context.strip():
-        print(f"[Python] Translation context length: {len(translation_context)}", file=sys.stderr, flush=True)
-
-    if not deepgram_key or not gemini_key:
+    missing_keys = settings.missing_api_keys()
+    if missing_keys:
         output_json({
             "type": "error",
-            "message": "Missing API keys",
+            "message": f"Missing API keys: {', '.join(missing_keys)}",
             "code": "CONFIG_ERROR"
         })
         sys.exit(1)
 
-    # 初始化翻譯器
-    print("[Python] Initializing translator...", file=sys.stderr, flush=True)
-    translator = Translator(
-        api_key=gemini_key,
-        model=gemini_model,
-        source_language=source_lang,
-        target_language=target_lang,
-        max_context_tokens=max_context_tokens,
-        translation_context=translation_context,
-        keyterms=keyterms,
-    )
-    print("[Python] Translator initialized", file=sys.stderr, flush=True)
-
-    # Interim 回呼（即時顯示正在說的話）
-    def on_interim(text: str):
-        output_json({
-            "type": "interim",
-            "text": text
-        })
-
-    def on_transcriber_error(message: str, detail_code: str | None = None):
-        payload = {
-            "type": "error",
-            "message": message,
-            "code": "DEEPGRAM_ERROR"
-        }
-        if detail_code:
-            payload["detail_code"] = detail_code
-        output_json(payload)
-
-    # 儲存 transcriber 參考（用於更新前句翻譯）
-    transcriber_ref = [None]
-
-    # Phase 2: 翻譯回呼（使用 helper 函數簡化）
-    def on_transcript(
-        transcript_id: str,
-        text: str,
-        prev_id: str | None = None,
-        prev_text: str | None = None,
-        prev_translation: str | None = None
-    ):
-        print(f"[Python] on_transcript called with id={transcript_id}, text={text}", file=sys.stderr, flush=True)
-        if prev_id:
-            print(f"[Python] Previous context: prev_id={prev_id}, prev_text={prev_text}, prev_translation={prev_translation}", file=sys.stderr, flush=True)
-
-        # 1. 預處理
-        is_incomplete = text.endswith(INCOMPLETE_SUFFIX)
-        text_for_translation = text[:-len(INCOMPLETE_SUFFIX)] if is_incomplete else text
-
-        # 2. 立即送出原文（翻譯中狀態）
-        output_json({
-            "type": "transcript",
-            "id": transcript_id,
-            "text": text
-        })
-        print(f"[Python] Transcript sent to stdout!", file=sys.stderr, flush=True)
-
-        # 3. 執行翻譯（含重試）
-        result = translate_with_retry(
-            text_for_translation, prev_text, prev_translation,
-            transcript_id, translator
-        )
-
-        # 4. 根據結果送出對應輸出
-        if result:
-            current_trans, prev_correction = result
-            output_translation = current_trans + INCOMPLETE_SUFFIX if is_incomplete else current_trans
-
-            # 送出翻譯結果
-            send_subtitle(transcript_id, text, output_translation)
-
-            # 送出前句修正（若有）
-            send_translation_update(prev_id, prev_correction)
-
-            # 更新 transcriber 的前句翻譯記錄
-            if transcriber_ref[0]:
-                transcriber_ref[0].update_previous_translation(output_translation)
-        else:
-            # 翻譯失敗，送出降級輸出
-            send_translation_error(transcript_id, text, is_incomplete)
-
-    # 初始化轉錄器並開始處理
-    print("[Python] Initializing transcriber...", file=sys.stderr, flush=True)
+    profiler = start_profiling(settings)
+    session = SubtitleSession(settings, emit=output_json)
     try:
-        with Transcriber(
-            api_key=deepgram_key,
-            language=source_lang,
-            on_transcript=on_transcript,
-            on_interim=on_interim,
-            on_error=on_transcriber_error,
-            endpointing_ms=endpointing_ms,
-            utterance_end_ms=utterance_end_ms,
-            max_buffer_chars=max_buffer_chars,
-            interim_stale_timeout_sec=interim_stale_timeout_sec,
-            keyterms=keyterms,
-        ) as transcriber:
-            # 儲存 transcriber 參考
-            transcriber_ref[0] = transcriber
-            print("[Python] Transcriber connected!", file=sys.stderr, flush=True)
-            output_json({"type": "status", "status": "connected"})
-            print("[Python] Now reading audio from stdin...", file=sys.stderr, flush=True)
-
-            # 從 stdin 讀取音訊
-            audio_chunks_received = 0
-            while True:
-                try:
-                    audio_data = sys.stdin.buffer.read(CHUNK_SIZE)
-                    if not audio_data:
-                        print("[Python] stdin EOF received, exiting...", file=sys.stderr, flush=True)
-                        break
-                    audio_chunks_received += 1
-                    if audio_chunks_received % 100 == 1:  # 每 100 chunks 輸出一次
-                        print(f"[Python] Audio chunks received: {audio_chunks_received}", file=sys.stderr, flush=True)
-                    transcriber.send_audio(audio_data)
-                except Exception as e:
-                    output_json({
-                        "type": "error",
-                        "message": str(e),
-                        "code": "AUDIO_ERROR"
-                    })
-                    break
-
+        session.start()
     except Exception as e:
-        print(f"[Python] Deepgram connection error: {type(e).__name__}: {e}", file=sys.stderr, flush=True)
+        log.error("Deepgram connection error: %s: %s", type(e).__name__, e)
         import traceback
+        # traceback 直接寫 stderr，先把佇列內的紀錄寫完以保持順序
+        flush_log()
         traceback.print_exc(file=sys.stderr)
         output_json({
             "type": "error",
@@ -313,6 +76,64 @@ def main():
         })
         sys.exit(1)
 
+    source = sys.stdin.buffer
+    stop_metrics = start_metrics(settings, output_json)
+    try:
+        output_json({"type": "status", "status": "connected"})
+        log.info("Now reading audio from stdin...")
+
+        # 從 stdin 讀取音訊：readinto 預先配置的 ring，每次一個對齊 sample 的完整 frame。
+        # 設定 AUDIO_SHM_PATH 時音訊改走共享記憶體 ring，stdin 只收通知
+        block_align = settings.channels * BYTES_PER_SAMPLE
+        frame_bytes = frame_bytes_for(settings.frame_ms, settings.sample_rate, settings.channels, BYTES_PER_SAMPLE)
+        if settings.audio_shm_path:
+            try:
+                source = ShmRingReader(settings.audio_shm_path, sys.stdin.buffer, block_align)
+            except (OSError, ValueError) as e:
+                output_json({
+                    "type": "error",
+                    "message": f"Failed to open shared memory audio ring: {e}",
+                    "code": "AUDIO_ERROR"
+                })
+                return
+            log.info("Audio transport: shared memory (%s bytes)", source.capacity)
+        reader = FrameReader(source, frame_bytes, block_align)
+        frame_ms = frame_bytes * 1000 / (settings.sample_rate * settings.channels * BYTES_PER_SAMPLE)
+        log.info("Audio frame: %.0fms (%s bytes)", frame_ms, frame_bytes)
+        audio_chunks_received = 0
+        while True:
+            try:
+                audio_data = reader.read_frame()
+                if audio_data is None:
+                    log.info("stdin EOF received, exiting...")
+                    break
+                audio_chunks_received += 1
+                log.sample("audio_chunks", AUDIO_LOG_EVERY, "Audio chunks received: %s", audio_chunks_received)
+                if source is not sys.stdin.buffer:
+                    log.sample(
+                        "shm_ring", AUDIO_LOG_EVERY, "Shared memory ring: dropped_frames=%s, overruns=%s",
+                        source.dropped_frames, source.overruns,
+                    )
+                session.send_audio(audio_data)
+            except Exception as e:
+                output_json({
+                    "type": "error",
+                    "message": str(e),
+                    "code": "AUDIO_ERROR"
+                })
+                break
+    finally:
+        session.close()
+        stop_metrics()
+        if profiler:
+            profiler.stop()
+        if source is not sys.stdin.buffer:
+            log.info(
+                "Shared memory ring closed: dropped_frames=%s, overruns=%s, overrun_bytes=%s",
+                source.dropped_frames, source.overruns, source.overrun_bytes,
+            )
+            source.close()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,344 @@
+"""
+執行期指標（counter / gauge / histogram）
+各模組在 import 時向全域 registry 註冊指標，熱路徑只做一次加法（per-metric lock）：
+
+    from metrics import counter
+    FLUSHES = counter("autosub_transcriber_flushes_total", "...", labels=("trigger",))
+    FLUSHES.inc(trigger="speech_final")
+
+輸出：
+- StatsReporter：定期以 IPC {"type": "stats", ...} 送出快照（STATS_INTERVAL_SEC），
+  並呼叫 add_report_listener() 註冊的回呼（例如各 session 的 token_usage）
+- serve_http()：本機 Prometheus text format endpoint（METRICS_PORT，GET /metrics）
+
+server 模式下所有 session 共用同一個 registry，數值為整個 process 的合計。
+"""
+
+import bisect
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from logger import get_logger
+
+log = get_logger("Metrics")
+
+# 延遲 histogram 預設 bucket（秒）：涵蓋 Gemini TTFT 到 timeout（10 秒）
+DEFAULT_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        try:
+            key = tuple(str(labels[name]) for name in self.label_names)
+        except KeyError:
+            key = None
+        if key is None or len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return key
+
+    def _items(self) -> list[tuple[tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def _snapshot_value(self, value):
+        return value
+
+    def snapshot(self):
+        """無 label 時為單一值，否則為 {label 值（多個以逗號連接）: 值}"""
+        items = self._items()
+        if not self.label_names:
+            return self._snapshot_value(items[0][1]) if items else self._snapshot_value(self._empty())
+        return {",".join(key): self._snapshot_value(value) for key, value in items}
+
+    def _empty(self):
+        return 0
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size  # 最後一格為 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.bounds = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = _HistogramValue(len(self.bounds) + 1)
+            entry.buckets[index] += 1
+            entry.count += 1
+            entry.sum += value
+
+    def _items(self):
+        # 複製後釋放 lock，避免 observe() 在快照期間改動
+        with self._lock:
+            return sorted(
+                (key, (list(value.buckets), value.count, value.sum)) for key, value in self._values.items()
+            )
+
+    def _empty(self):
+        return [0] * (len(self.bounds) + 1), 0, 0.0
+
+    def quantile(self, q: float, buckets: list[int], count: int) -> Optional[float]:
+        """由 bucket 估計分位數（bucket 內線性內插，同 Prometheus histogram_quantile）"""
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(buckets):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if index == len(self.bounds):
+                    return self.bounds[-1] if self.bounds else None
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1] if self.bounds else None
+
+    def _snapshot_value(self, value):
+        buckets, count, total = value
+        result = {"count": count, "sum": round(total, 4)}
+        for name, q in (("p50", 0.5), ("p95", 0.95)):
+            estimate = self.quantile(q, buckets, count)
+            result[name] = None if estimate is None else round(estimate, 4)
+        return result
+
+
+class MetricsRegistry:
+    """指標容器；同名指標重複註冊時回傳既有的（模組可被多次載入）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, cls, name: str, help_text: str, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, tuple(labels), **kwargs)
+            elif type(metric) is not cls or metric.label_names != tuple(labels):
+                raise ValueError(f"Metric {name} already registered as {metric.kind} {metric.label_names}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labels=()) -> Counter:
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels=()) -> Gauge:
+        return self._register(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels=(),
+                  buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def _all(self) -> list[_Metric]:
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def snapshot(self) -> dict:
+        """{指標名稱: 值}（IPC stats 訊息用）"""
+        return {metric.name: metric.snapshot() for metric in self._all()}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self._all():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key, value in metric._items():
+                labels = list(zip(metric.label_names, key))
+                if metric.kind != "histogram":
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_number(value)}")
+                    continue
+                buckets, count, total = value
+                cumulative = 0
+                for bound, bucket_count in zip(metric.bounds + (math.inf,), buckets):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == math.inf else _format_number(bound)
+                    lines.append(f"{metric.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_number(total)}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: list[tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for name, value in labels:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, help_text: str, labels=()) -> Counter:
+    return REGISTRY.counter(name, help_text, labels)
+
+
+def gauge(name: str, help_text: str, labels=()) -> Gauge:
+    return REGISTRY.gauge(name, help_text, labels)
+
+
+def histogram(name: str, help_text: str, labels=(),
+              buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, help_text, labels, buckets)
+
+
+# 每次 stats 送出後呼叫的回呼（session 在存活期間註冊）
+_REPORT_LISTENERS: list[Callable[[], None]] = []
+_LISTENERS_LOCK = threading.Lock()
+
+
+def add_report_listener(listener: Callable[[], None]) -> None:
+    with _LISTENERS_LOCK:
+        _REPORT_LISTENERS.append(listener)
+
+
+def remove_report_listener(listener: Callable[[], None]) -> None:
+    with _LISTENERS_LOCK:
+        if listener in _REPORT_LISTENERS:
+            _REPORT_LISTENERS.remove(listener)
+
+
+class StatsReporter:
+    """
+    定期把 registry 快照以 IPC 送出：{"type": "stats", "uptime_sec": ..., "metrics": {...}}
+
+    Args:
+        emit: IPC 輸出函式
+        interval_sec: 送出間隔（秒），0 表示只在 stop() 時送一次
+        registry: 指標來源（預設全域 REGISTRY）
+    """
+
+    def __init__(self, emit: Callable[[dict], None], interval_sec: float,
+                 registry: Optional[MetricsRegistry] = None):
+        self.emit = emit
+        self.interval_sec = interval_sec
+        self.registry = registry or REGISTRY
+        self._started_at = time.time()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._started_at = time.time()
+        if self.interval_sec > 0:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="stats-reporter")
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval_sec):
+            self.report()
+
+    def report(self) -> None:
+        self.emit({
+            "type": "stats",
+            "uptime_sec": round(time.time() - self._started_at, 1),
+            "metrics": self.registry.snapshot(),
+        })
+        with _LISTENERS_LOCK:
+            listeners = list(_REPORT_LISTENERS)
+        for listener in listeners:
+            # 回呼失敗不可中斷 reporter 執行緒（之後的 stats / token_usage 都會停止）
+            try:
+                listener()
+            except Exception as e:
+                log.warning("Stats listener failed: %s", e)
+
+    def stop(self, final_report: bool = True) -> None:
+        """停止定期送出；final_report=True 時送出最後一次快照"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if final_report:
+            self.report()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_http(port: int, registry: Optional[MetricsRegistry] = None,
+               host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """在背景執行緒啟動 /metrics endpoint（只綁本機），回傳 server（shutdown() 停止）"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or REGISTRY})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    return server
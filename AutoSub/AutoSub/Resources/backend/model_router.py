@@ -0,0 +1,139 @@
+"""
+逐句模型路由（GEMINI_FAST_MODEL 設定時啟用）
+
+每句依長度、翻譯 backlog 與最近延遲在快速模型與主要模型（GEMINI_MODEL）之間選擇：
+- 短句（感嘆詞、附和）與 backlog 堆積時用快速模型
+- 其餘句子用主要模型
+- cascade：主要模型最近的 p95 延遲超過預算時，全部改用快速模型；
+  延遲樣本只保留 latency_window_sec 秒，主要模型閒置一段時間後樣本過期，自動再試
+
+兩個模型共用同一份翻譯歷史（見 Translator._chat_for），切換不會遺失上下文。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from logger import get_logger
+from metrics import counter
+
+log = get_logger("Router")
+
+ROUTES = counter("autosub_model_routes_total", "Per-utterance model routing decisions", labels=("model", "reason"))
+
+ROUTE_SHORT = "short"
+ROUTE_BACKLOG = "backlog"
+ROUTE_LATENCY = "latency"
+ROUTE_DEFAULT = "default"
+
+
+class ModelRouter:
+    """
+    快速 / 主要模型的逐句路由（翻譯 worker 執行緒呼叫）
+
+    Args:
+        fast_model: 快速模型
+        strong_model: 主要模型
+        short_chars: 原文字數低於此值用快速模型
+        busy_backlog: 佇列等待句數達此值用快速模型
+        latency_budget_sec: 主要模型 p95 延遲預算，超過時 cascade 到快速模型（0 停用）
+        latency_window_sec: 延遲樣本保留秒數
+        min_samples: 計算 p95 所需的最少樣本數
+        clock: 計時用的時鐘
+    """
+
+    # p95 降到預算的此比例以下才恢復使用主要模型（避免在門檻附近來回切換）
+    RECOVER_RATIO = 0.8
+
+    def __init__(
+        self,
+        fast_model: str,
+        strong_model: str,
+        short_chars: int = 12,
+        busy_backlog: int = 2,
+        latency_budget_sec: float = 2.5,
+        latency_window_sec: float = 60.0,
+        min_samples: int = 5,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.short_chars = short_chars
+        self.busy_backlog = max(1, busy_backlog)
+        self.latency_budget_sec = latency_budget_sec
+        self.latency_window_sec = latency_window_sec
+        self.min_samples = max(1, min_samples)
+        self.clock = clock
+        self._lock = threading.Lock()
+        # model → deque[(時間, 延遲秒數)]
+        self._latencies: dict[str, deque[tuple[float, float]]] = {}
+        self._degraded = False
+
+    def observe(self, model: str, latency_sec: float) -> None:
+        """一個 request 完成後的耗時"""
+        with self._lock:
+            self._latencies.setdefault(model, deque()).append((self.clock(), latency_sec))
+
+    def p95(self, model: str) -> Optional[float]:
+        """最近 latency_window_sec 秒的 p95 延遲，樣本不足時為 None"""
+        with self._lock:
+            return self._p95_locked(model)
+
+    def _p95_locked(self, model: str) -> Optional[float]:
+        samples = self._latencies.get(model)
+        if not samples:
+            return None
+        cutoff = self.clock() - self.latency_window_sec
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        if len(samples) < self.min_samples:
+            return None
+        ordered = sorted(latency for _, latency in samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    @property
+    def degraded(self) -> bool:
+        """主要模型延遲超過預算，全部改用快速模型中"""
+        return self._degraded
+
+    def _update_degraded_locked(self) -> None:
+        if not self.latency_budget_sec:
+            return
+        p95 = self._p95_locked(self.strong_model)
+        if not self._degraded and p95 is not None and p95 > self.latency_budget_sec:
+            self._degraded = True
+            log.warning("Primary model p95 %.2fs over budget %.2fs, routing to %s",
+                        p95, self.latency_budget_sec, self.fast_model)
+        elif self._degraded and (p95 is None or p95 < self.latency_budget_sec * self.RECOVER_RATIO):
+            self._degraded = False
+            log.info("Primary model latency recovered, routing long utterances to %s", self.strong_model)
+
+    def choose(self, text: str, backlog: int = 0) -> str:
+        """為一句（或一個 batch 的合併原文）選擇模型"""
+        with self._lock:
+            self._update_degraded_locked()
+            if self._degraded:
+                model, reason = self.fast_model, ROUTE_LATENCY
+            elif backlog >= self.busy_backlog:
+                model, reason = self.fast_model, ROUTE_BACKLOG
+            elif len(text.strip()) < self.short_chars:
+                model, reason = self.fast_model, ROUTE_SHORT
+            else:
+                model, reason = self.strong_model, ROUTE_DEFAULT
+        ROUTES.inc(model=model, reason=reason)
+        return model
+
+
+def router_from_settings(settings) -> Optional[ModelRouter]:
+    """GEMINI_FAST_MODEL 設定（且與 GEMINI_MODEL 不同）時建立路由器，否則回傳 None（整個 session 用同一個模型）"""
+    if not settings.fast_model or settings.fast_model == settings.gemini_model:
+        return None
+    return ModelRouter(
+        fast_model=settings.fast_model,
+        strong_model=settings.gemini_model,
+        short_chars=settings.router_short_chars,
+        busy_backlog=settings.router_busy_backlog,
+        latency_budget_sec=settings.router_latency_budget_sec,
+        latency_window_sec=settings.router_latency_window_sec,
+    )
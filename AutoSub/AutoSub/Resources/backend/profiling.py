@@ -0,0 +1,257 @@
+"""
+選用的內建 profiling（環境變數開啟，停用時不啟動任何執行緒、不掛 hook）
+
+- CPU：背景執行緒每 PROFILE_CPU_INTERVAL_MS 毫秒對所有執行緒取樣一次堆疊（sys._current_frames），
+  每 PROFILE_CPU_FLUSH_SEC 秒輸出一個 folded stacks 檔（cpu-*.folded，可直接餵給 flamegraph.pl / speedscope）
+- 記憶體：tracemalloc 每 PROFILE_MEMORY_INTERVAL_SEC 秒取快照，輸出與上一次、與第一次快照的差異（memory-*.txt）
+- 執行緒堆疊：PROFILE_STACK_DUMPS=1 時收到 SIGUSR1 輸出所有執行緒的堆疊（stacks-*.txt）
+  用法：kill -USR1 <backend pid>
+
+輸出到 DIAGNOSTICS_DIR，每種檔案最多保留 PROFILE_MAX_FILES 個（刪除最舊的）。
+"""
+
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+from typing import Optional
+
+from logger import get_logger
+
+log = get_logger("Profiler")
+
+MEMORY_TOP_LINES = 25
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profiler:
+    """
+    Args:
+        directory: 輸出目錄（不存在時建立）
+        cpu_interval_ms: CPU 取樣間隔（毫秒），0 表示停用
+        cpu_flush_sec: 每隔多久輸出一個 CPU profile 檔
+        memory_interval_sec: tracemalloc 快照間隔（秒），0 表示停用
+        memory_frames: tracemalloc 每個配置保留的 frame 數（越多越慢）
+        stack_dumps: 註冊 SIGUSR1 輸出執行緒堆疊
+        max_files: 每種檔案保留的最大數量
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        cpu_interval_ms: float = 0,
+        cpu_flush_sec: float = 60.0,
+        memory_interval_sec: float = 0,
+        memory_frames: int = 1,
+        stack_dumps: bool = False,
+        max_files: int = 20,
+    ):
+        self.directory = directory
+        self.cpu_interval_sec = max(0.0, cpu_interval_ms) / 1000
+        self.cpu_flush_sec = max(1.0, cpu_flush_sec)
+        self.memory_interval_sec = max(0.0, memory_interval_sec)
+        self.memory_frames = max(1, memory_frames)
+        self.stack_dumps = stack_dumps
+        self.max_files = max(1, max_files)
+        self._stop_event = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._samples: collections.Counter = collections.Counter()
+        self._samples_lock = threading.Lock()
+        self.sample_count = 0
+        self._baseline_snapshot = None
+        self._previous_snapshot = None
+        self._previous_signal_handler = None
+        self._started_tracemalloc = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cpu_interval_sec or self.memory_interval_sec or self.stack_dumps)
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop_event.clear()
+        if self.cpu_interval_sec:
+            self._spawn(self._cpu_loop, "profiler-cpu")
+        if self.memory_interval_sec:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.memory_frames)
+                self._started_tracemalloc = True
+            self._baseline_snapshot = self._previous_snapshot = self._take_snapshot()
+            self._spawn(self._memory_loop, "profiler-memory")
+        if self.stack_dumps and hasattr(signal, "SIGUSR1"):
+            try:
+                self._previous_signal_handler = signal.signal(signal.SIGUSR1, self._on_signal)
+            except ValueError:
+                # 非主執行緒無法註冊 signal handler
+                log.warning("Stack dumps unavailable: not on the main thread")
+        log.info(
+            "Profiling enabled: dir=%s, cpu_interval_ms=%s, memory_interval_sec=%s, stack_dumps=%s",
+            self.directory, self.cpu_interval_sec * 1000, self.memory_interval_sec, self.stack_dumps,
+        )
+
+    def stop(self) -> None:
+        """停止取樣並輸出最後一份 CPU / 記憶體結果"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+        if self.cpu_interval_sec:
+            self.flush_cpu()
+        if self.memory_interval_sec and tracemalloc.is_tracing():
+            self.snapshot_memory()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+        if self._previous_signal_handler is not None:
+            signal.signal(signal.SIGUSR1, self._previous_signal_handler)
+            self._previous_signal_handler = None
+
+    def _spawn(self, target, name: str) -> None:
+        thread = threading.Thread(target=target, daemon=True, name=name)
+        self._threads.append(thread)
+        thread.start()
+
+    # ---- 輸出檔案 ----
+
+    def _output_path(self, kind: str, extension: str) -> str:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{kind}-{stamp}.{extension}")
+        counter = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"{kind}-{stamp}-{counter}.{extension}")
+            counter += 1
+        return path
+
+    def _write(self, kind: str, extension: str, text: str) -> str:
+        path = self._output_path(kind, extension)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        self._rotate(kind)
+        return path
+
+    def _rotate(self, kind: str) -> None:
+        files = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.startswith(f"{kind}-")),
+            key=lambda entry: entry.stat().st_mtime_ns,
+        )
+        for entry in files[:-self.max_files]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    # ---- CPU 取樣 ----
+
+    def _cpu_loop(self) -> None:
+        own_id = threading.get_ident()
+        next_flush = time.monotonic() + self.cpu_flush_sec
+        while not self._stop_event.wait(self.cpu_interval_sec):
+            self.sample_cpu(exclude=own_id)
+            if time.monotonic() >= next_flush:
+                next_flush += self.cpu_flush_sec
+                self.flush_cpu()
+
+    def sample_cpu(self, exclude: Optional[int] = None) -> None:
+        """對所有執行緒取樣一次堆疊（root → leaf，以執行緒名稱為第一層）"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f"thread-{thread_id}"))
+            stacks.append(";".join(reversed(labels)))
+        with self._samples_lock:
+            self._samples.update(stacks)
+            self.sample_count += 1
+
+    def flush_cpu(self) -> Optional[str]:
+        """輸出目前累積的取樣（folded stacks）並清空；沒有取樣時不輸出"""
+        with self._samples_lock:
+            samples, self._samples = self._samples, collections.Counter()
+        if not samples:
+            return None
+        lines = [f"{stack} {count}" for stack, count in samples.most_common()]
+        return self._write("cpu", "folded", "\n".join(lines) + "\n")
+
+    # ---- 記憶體 ----
+
+    def _memory_loop(self) -> None:
+        while not self._stop_event.wait(self.memory_interval_sec):
+            self.snapshot_memory()
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def snapshot_memory(self) -> str:
+        """取 tracemalloc 快照，輸出與上一次、與第一次快照的差異"""
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB", ""]
+        for title, other in (("since previous snapshot", self._previous_snapshot),
+                             ("since first snapshot", self._baseline_snapshot)):
+            if other is None:
+                continue
+            lines.append(f"== top growth {title} ==")
+            for stat in snapshot.compare_to(other, "lineno")[:MEMORY_TOP_LINES]:
+                lines.append(str(stat))
+            lines.append("")
+        self._previous_snapshot = snapshot
+        if self._baseline_snapshot is None:
+            self._baseline_snapshot = snapshot
+        return self._write("memory", "txt", "\n".join(lines))
+
+    # ---- 執行緒堆疊 ----
+
+    def _on_signal(self, signum, frame) -> None:
+        # signal handler 在主執行緒執行，寫檔交給背景執行緒，避免打斷中的 I/O 被拖慢
+        threading.Thread(target=self.dump_stacks, args=("SIGUSR1",), daemon=True).start()
+
+    def dump_stacks(self, reason: str = "manual") -> str:
+        """輸出所有執行緒目前的堆疊"""
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        lines = [f"# thread stacks ({reason}) at {time.strftime('%Y-%m-%d %H:%M:%S')}", ""]
+        for thread_id, frame in sys._current_frames().items():
+            thread = threads.get(thread_id)
+            name = thread.name if thread else f"thread-{thread_id}"
+            daemon = " daemon" if thread is not None and thread.daemon else ""
+            lines.append(f"--- {name} (id={thread_id}{daemon}) ---")
+            lines.extend(line.rstrip("\n") for line in traceback.format_stack(frame))
+            lines.append("")
+        path = self._write("stacks", "txt", "\n".join(lines))
+        log.info("Thread stacks written to %s", path)
+        return path
+
+
+def start_from_settings(settings) -> Optional[Profiler]:
+    """依 SessionSettings 的 profile_* 設定啟動；全部停用時回傳 None（不建立任何物件）"""
+    if not (settings.profile_cpu_interval_ms or settings.profile_memory_interval_sec or settings.profile_stack_dumps):
+        return None
+    profiler = Profiler(
+        settings.diagnostics_dir,
+        cpu_interval_ms=settings.profile_cpu_interval_ms,
+        cpu_flush_sec=settings.profile_cpu_flush_sec,
+        memory_interval_sec=settings.profile_memory_interval_sec,
+        stack_dumps=settings.profile_stack_dumps,
+        max_files=settings.profile_max_files,
+    )
+    try:
+        profiler.start()
+    except OSError as e:
+        log.warning("Profiling disabled: %s", e)
+        return None
+    return profiler
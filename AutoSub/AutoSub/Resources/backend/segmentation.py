@@ -0,0 +1,218 @@
+"""
+自適應斷句（SEGMENTATION_MODE=adaptive）
+依觀察到的語速、翻譯佇列深度與 Gemini 延遲調整 Transcriber 的 flush 門檻：
+
+- 語速快 / 佇列堆積 / Gemini 變慢（壓力高）：max_buffer_chars 放大；翻譯 worker 忙碌時，
+  字數不足 min_flush_chars 的短句遇到 speech_final 先保留，與後續結果合併 → request 較少、較長。
+  保留的 buffer 在 worker 閒下來、UtteranceEnd 或超過 hold_timeout_sec 時送出
+  （worker 忙碌時送出的句子本來就要排隊，合併不會增加字幕延遲）
+- 語速慢且翻譯跟得上（壓力低）：max_buffer_chars 縮小，每個 speech_final 都送出 → 短句、低延遲
+
+endpointing_ms 是連線參數，只在建立新連線（重連 / 輪替）時套用目前的值；
+utterance_end_ms 維持固定（Deepgram 最小值為 1000，已是 flush 的最後保障）。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from metrics import gauge
+
+PRESSURE = gauge("autosub_segmentation_pressure", "Adaptive segmentation pressure (0 = snappy, 1 = coalesce)")
+
+SEGMENTATION_FIXED = "fixed"
+SEGMENTATION_ADAPTIVE = "adaptive"
+SEGMENTATION_MODES = (SEGMENTATION_FIXED, SEGMENTATION_ADAPTIVE)
+
+
+def _clamp(value: float) -> float:
+    return min(1.0, max(0.0, value))
+
+
+class SegmentationController:
+    """
+    斷句門檻控制器（listener、watchdog 與翻譯 worker 執行緒共用）
+
+    Args:
+        max_buffer_chars: 基準最大累積字數（壓力 0 時為 MIN_SCALE 倍，壓力 1 時為 MAX_SCALE 倍）
+        interim_stale_timeout_sec: 基準 interim 落地秒數
+        endpointing_ms: 基準靜音判定時間（壓力 1 時加倍）
+        slow_chars_per_sec: 語速低於此值視為慢（每秒音訊的字數，含停頓）
+        fast_chars_per_sec: 語速高於此值視為快
+        target_latency_sec: Gemini 延遲低於此值視為跟得上
+        max_latency_sec: Gemini 延遲高於此值視為最大壓力
+        busy_queue_depth: 佇列等待句數達此值視為最大壓力
+        hold_timeout_sec: 保留中的 buffer 最長等待秒數（watchdog 強制送出）
+        clock: 保留計時用的時鐘（replay 評估時可換成音訊時間）
+    """
+
+    MIN_SCALE = 0.6
+    MAX_SCALE = 2.0
+    # 最小送出字數為 max_buffer_chars 的比例（乘上壓力）
+    HOLD_RATIO = 0.5
+    # 語速以最近幾秒音訊的 final 結果計算
+    RATE_WINDOW_SEC = 20.0
+    LATENCY_SMOOTHING = 0.3
+
+    def __init__(
+        self,
+        max_buffer_chars: int = 50,
+        interim_stale_timeout_sec: float = 4.0,
+        endpointing_ms: int = 200,
+        slow_chars_per_sec: float = 4.0,
+        fast_chars_per_sec: float = 9.0,
+        target_latency_sec: float = 1.2,
+        max_latency_sec: float = 3.0,
+        busy_queue_depth: int = 3,
+        hold_timeout_sec: float = 2.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.base_max_buffer_chars = max_buffer_chars
+        self.base_stale_timeout_sec = interim_stale_timeout_sec
+        self.base_endpointing_ms = endpointing_ms
+        self.slow_chars_per_sec = slow_chars_per_sec
+        self.fast_chars_per_sec = max(fast_chars_per_sec, slow_chars_per_sec + 0.1)
+        self.target_latency_sec = target_latency_sec
+        self.max_latency_sec = max(max_latency_sec, target_latency_sec + 0.1)
+        self.busy_queue_depth = max(1, busy_queue_depth)
+        self.hold_timeout_sec = hold_timeout_sec
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        # (start_sec, end_sec, chars)：最近的 final 結果（音訊時間）
+        self._finals: deque[tuple[float, float, int]] = deque()
+        self._latency_sec: Optional[float] = None
+        self._queue_depth = 0
+        self._pressure = 0.0
+        self._held_since: Optional[float] = None
+        self._translating = False
+
+    # ---- 觀察 ----
+
+    def observe_final(self, text: str, span: Optional[tuple[float, float]]) -> None:
+        """listener 執行緒：每個 is_final 結果"""
+        if not span:
+            return
+        with self._lock:
+            self._finals.append((span[0], span[1], len(text.strip())))
+            while self._finals and span[1] - self._finals[0][0] > self.RATE_WINDOW_SEC:
+                self._finals.popleft()
+            self._update_locked()
+
+    def translation_started(self) -> None:
+        self._translating = True
+
+    def observe_translation(self, latency_sec: float) -> None:
+        """翻譯 worker：每個 request 完成後的耗時"""
+        with self._lock:
+            self._translating = False
+            if self._latency_sec is None:
+                self._latency_sec = latency_sec
+            else:
+                self._latency_sec += self.LATENCY_SMOOTHING * (latency_sec - self._latency_sec)
+            self._update_locked()
+
+    def observe_queue_depth(self, depth: int) -> None:
+        """入列 / 翻譯完成時的佇列等待句數"""
+        with self._lock:
+            self._queue_depth = depth
+            self._update_locked()
+
+    # ---- 狀態 ----
+
+    def _speech_rate_locked(self) -> Optional[float]:
+        if len(self._finals) < 2:
+            return None
+        elapsed = self._finals[-1][1] - self._finals[0][0]
+        if elapsed <= 0:
+            return None
+        return sum(chars for _, _, chars in self._finals) / elapsed
+
+    def _update_locked(self) -> None:
+        rate = self._speech_rate_locked()
+        rate_pressure = 0.0 if rate is None else _clamp(
+            (rate - self.slow_chars_per_sec) / (self.fast_chars_per_sec - self.slow_chars_per_sec)
+        )
+        latency_pressure = 0.0 if self._latency_sec is None else _clamp(
+            (self._latency_sec - self.target_latency_sec) / (self.max_latency_sec - self.target_latency_sec)
+        )
+        queue_pressure = _clamp(self._queue_depth / self.busy_queue_depth)
+        self._pressure = max(rate_pressure, latency_pressure, queue_pressure)
+        PRESSURE.set(round(self._pressure, 3))
+
+    @property
+    def pressure(self) -> float:
+        return self._pressure
+
+    @property
+    def busy(self) -> bool:
+        """翻譯 worker 處理中或佇列有等待的句子"""
+        return self._translating or self._queue_depth > 0
+
+    @property
+    def speech_rate(self) -> Optional[float]:
+        """每秒音訊的字數（含停頓），資料不足時為 None"""
+        with self._lock:
+            return self._speech_rate_locked()
+
+    # ---- 門檻 ----
+
+    @property
+    def max_buffer_chars(self) -> int:
+        scale = self.MIN_SCALE + (self.MAX_SCALE - self.MIN_SCALE) * self._pressure
+        return max(1, round(self.base_max_buffer_chars * scale))
+
+    @property
+    def min_flush_chars(self) -> int:
+        """worker 忙碌時 speech_final 的 buffer 少於此字數則先保留（壓力 0 時為 0，每次停頓都送出）"""
+        return round(self.max_buffer_chars * self.HOLD_RATIO * self._pressure)
+
+    @property
+    def interim_stale_timeout_sec(self) -> float:
+        return self.base_stale_timeout_sec * (0.75 + 0.75 * self._pressure)
+
+    @property
+    def endpointing_ms(self) -> int:
+        return round(self.base_endpointing_ms * (1 + self._pressure))
+
+    def should_flush_on_pause(self, buffer_chars: int) -> bool:
+        return not self.busy or buffer_chars >= self.min_flush_chars
+
+    # ---- 保留計時（由 Transcriber 在 _message_lock 下呼叫） ----
+
+    def hold(self) -> None:
+        """speech_final 時保留 buffer（已在保留中則沿用最早的時間）"""
+        if self._held_since is None:
+            self._held_since = self.clock()
+
+    def release(self) -> None:
+        self._held_since = None
+
+    @property
+    def hold_deadline(self) -> Optional[float]:
+        return None if self._held_since is None else self._held_since + self.hold_timeout_sec
+
+    def should_release_hold(self) -> bool:
+        """保留中且 worker 已閒置或超過 hold_timeout_sec"""
+        deadline = self.hold_deadline
+        return deadline is not None and (not self.busy or self.clock() >= deadline)
+
+    def describe(self) -> str:
+        return (f"pressure={self._pressure:.2f} max_buffer_chars={self.max_buffer_chars} "
+                f"min_flush_chars={self.min_flush_chars} stale_timeout={self.interim_stale_timeout_sec:.1f}s")
+
+
+def controller_from_settings(settings) -> Optional[SegmentationController]:
+    """SEGMENTATION_MODE=adaptive 時依 session 設定建立控制器，fixed 時回傳 None"""
+    if settings.segmentation_mode != SEGMENTATION_ADAPTIVE:
+        return None
+    return SegmentationController(
+        max_buffer_chars=settings.max_buffer_chars,
+        interim_stale_timeout_sec=settings.interim_stale_timeout_sec,
+        endpointing_ms=settings.endpointing_ms,
+        slow_chars_per_sec=settings.segmentation_slow_cps,
+        fast_chars_per_sec=settings.segmentation_fast_cps,
+        target_latency_sec=settings.segmentation_target_latency_sec,
+        hold_timeout_sec=settings.segmentation_hold_timeout_sec,
+    )
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Auto-Sub 多 session server 模式
+一個 backend process 同時服務多個音訊來源：每個 session 各自的 Transcriber 狀態與翻譯上下文，
+共用 interpreter、import、Gemini client（連線池 / 明確 cache）與 Deepgram client。
+
+協議：
+- 輸入 (stdin)：frame 序列，header 為 big-endian (kind: u8, session: u16, length: u32)，後接 payload
+  - FRAME_OPEN  (1)：開啟 session，payload 為 JSON（可為空），可覆寫
+                     source_lang / target_lang / extra_target_langs / translation_context / keyterms /
+                     sample_rate / channels
+  - FRAME_AUDIO (2)：PCM 音訊（格式同 main.py，或 open 時指定）
+  - FRAME_CLOSE (3)：結束 session（翻譯佇列清空後才關閉）
+- 輸出 (stdout)：JSON Lines，訊息同 main.py，並多帶 "session" 欄位；
+  session 連線後送出 status=connected，結束後送出 status=closed；
+  stats 訊息為整個 process 的指標合計，不帶 "session" 欄位
+
+其餘設定與 main.py 相同，由環境變數讀取
+"""
+
+import json
+import queue
+import struct
+import sys
+import threading
+from typing import BinaryIO, Callable, Optional
+
+from local_transcriber import ENGINE_WHISPER, whisper_engine_from_settings
+from logger import get_logger
+from profiling import start_from_settings as start_profiling
+from session import SessionSettings, SubtitleSession, start_metrics
+
+log = get_logger("Server")
+
+FRAME_HEADER = struct.Struct(">BHI")
+FRAME_OPEN = 1
+FRAME_AUDIO = 2
+FRAME_CLOSE = 3
+# 單一 frame payload 上限（防止 header 損毀時嘗試配置超大 buffer）
+MAX_FRAME_PAYLOAD = 16 * 1024 * 1024
+
+
+def encode_frame(kind: int, session_id: int, payload: bytes = b"") -> bytes:
+    """組出一個 frame（供 client 端與測試使用）"""
+    return FRAME_HEADER.pack(kind, session_id, len(payload)) + payload
+
+
+def _read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Optional[tuple[int, int, bytes]]:
+    """讀取一個 frame，EOF（或 frame 不完整）時回傳 None"""
+    header = _read_exact(stream, FRAME_HEADER.size)
+    if header is None:
+        return None
+    kind, session_id, length = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_PAYLOAD:
+        raise ValueError(f"Frame payload too large: {length} bytes")
+    payload = _read_exact(stream, length) if length else b""
+    if payload is None:
+        return None
+    return kind, session_id, payload
+
+
+class _SessionWorker(threading.Thread):
+    """
+    一個 session 的音訊餵送執行緒
+
+    連線建立與 send_audio 都在此執行緒進行，某個 session 連線慢或送音訊阻塞時不會卡住其他 session
+    """
+
+    def __init__(self, session_id: int, session: SubtitleSession, emit: Callable[[dict], None]):
+        super().__init__(daemon=True, name=f"session-{session_id}")
+        self.session_id = session_id
+        self.session = session
+        self._emit = emit
+        self._audio: queue.Queue = queue.Queue()
+
+    def put_audio(self, data: bytes) -> None:
+        self._audio.put(data)
+
+    def finish(self) -> None:
+        self._audio.put(None)
+
+    def run(self) -> None:
+        try:
+            self.session.start()
+        except Exception as e:
+            log.error("Session %s failed to start: %s: %s", self.session_id, type(e).__name__, e)
+            self._emit({
+                "type": "error",
+                "message": f"Failed to connect to speech service: {e}",
+                "code": "DEEPGRAM_ERROR"
+            })
+            self._emit({"type": "status", "status": "closed"})
+            return
+
+        self._emit({"type": "status", "status": "connected"})
+        try:
+            while True:
+                data = self._audio.get()
+                if data is None:
+                    break
+                self.session.send_audio(data)
+        except Exception as e:
+            self._emit({
+                "type": "error",
+                "message": str(e),
+                "code": "AUDIO_ERROR"
+            })
+        finally:
+            self.session.close(drain=True)
+            self._emit({"type": "status", "status": "closed"})
+            log.info("Session %s closed", self.session_id)
+
+
+class SessionServer:
+    """
+    多 session 多工器
+
+    Args:
+        settings: 預設 session 設定（FRAME_OPEN 的 JSON 可逐 session 覆寫）
+        emit: 輸出一則 IPC 訊息 (dict) -> None，需可從多個執行緒呼叫
+        gemini_client: 所有 session 共用的 genai.Client
+        deepgram_client: 所有 session 共用的 DeepgramClient
+        speech_engine: 所有 session 共用的本地語音辨識引擎（TRANSCRIBER_ENGINE=whisper，模型只載入一次）
+        max_sessions: 同時開啟的 session 上限
+    """
+
+    def __init__(
+        self,
+        settings: SessionSettings,
+        emit: Callable[[dict], None],
+        gemini_client=None,
+        deepgram_client=None,
+        speech_engine=None,
+        max_sessions: int = 8,
+    ):
+        self.settings = settings
+        self.emit = emit
+        self.gemini_client = gemini_client
+        self.deepgram_client = deepgram_client
+        self.speech_engine = speech_engine
+        self.max_sessions = max_sessions
+        self._workers: dict[int, _SessionWorker] = {}
+        # 已收到 close、仍在清空翻譯佇列的 session
+        self._closing: list[_SessionWorker] = []
+        self._lock = threading.Lock()
+
+    def _session_emit(self, session_id: int) -> Callable[[dict], None]:
+        def emit(data: dict) -> None:
+            self.emit({**data, "session": session_id})
+        return emit
+
+    @property
+    def session_count(self) -> int:
+        with self._lock:
+            return sum(1 for worker in self._workers.values() if worker.is_alive())
+
+    def open_session(self, session_id: int, overrides: Optional[dict] = None) -> None:
+        emit = self._session_emit(session_id)
+        with self._lock:
+            existing = self._workers.get(session_id)
+            if existing and existing.is_alive():
+                emit({"type": "error", "message": "Session already open", "code": "SESSION_ERROR"})
+                return
+            # 已收到 close 但仍在清空翻譯佇列：同一個 id 再開會有兩個 session 以相同 id 輸出
+            if any(worker.session_id == session_id and worker.is_alive() for worker in self._closing):
+                emit({"type": "error", "message": "Session still closing", "code": "SESSION_ERROR"})
+                return
+            active = sum(1 for worker in self._workers.values() if worker.is_alive())
+            if active >= self.max_sessions:
+                emit({"type": "error", "message": "Too many sessions", "code": "SESSION_ERROR"})
+                return
+            settings = self.settings.with_overrides(overrides or {})
+            session = SubtitleSession(
+                settings, emit,
+                gemini_client=self.gemini_client,
+                deepgram_client=self.deepgram_client,
+                speech_engine=self.speech_engine,
+            )
+            worker = _SessionWorker(session_id, session, emit)
+            self._workers[session_id] = worker
+        log.info("Session %s opening (source=%s, target=%s)", session_id, settings.source_lang, settings.target_lang)
+        worker.start()
+
+    def close_session(self, session_id: int) -> None:
+        with self._lock:
+            worker = self._workers.pop(session_id, None)
+            if worker is None:
+                return
+            self._closing = [w for w in self._closing if w.is_alive()]
+            self._closing.append(worker)
+        worker.finish()
+
+    def handle_frame(self, kind: int, session_id: int, payload: bytes) -> None:
+        if kind == FRAME_OPEN:
+            try:
+                overrides = json.loads(payload) if payload else {}
+            except json.JSONDecodeError as e:
+                self._session_emit(session_id)({
+                    "type": "error", "message": f"Invalid open payload: {e}", "code": "SESSION_ERROR"
+                })
+                return
+            self.open_session(session_id, overrides)
+        elif kind == FRAME_AUDIO:
+            with self._lock:
+                worker = self._workers.get(session_id)
+            if worker:
+                worker.put_audio(payload)
+        elif kind == FRAME_CLOSE:
+            self.close_session(session_id)
+        else:
+            log.warning("Unknown frame kind %s (session %s)", kind, session_id)
+
+    def serve(self, stream: BinaryIO) -> None:
+        """讀取 frame 直到 EOF，之後關閉所有 session"""
+        try:
+            while True:
+                frame = read_frame(stream)
+                if frame is None:
+                    log.info("Input EOF received, closing sessions...")
+                    break
+                self.handle_frame(*frame)
+        finally:
+            self.close_all()
+
+    def close_all(self) -> None:
+        """關閉所有 session，並等待全部清空後返回"""
+        with self._lock:
+            session_ids = list(self._workers)
+        for session_id in session_ids:
+            self.close_session(session_id)
+        with self._lock:
+            closing = list(self._closing)
+        for worker in closing:
+            worker.join()
+
+
+def main():
+    """主程式"""
+    from deepgram import DeepgramClient
+    from google import genai
+
+    from main import output_json
+
+    log.info("main() started")
+    settings = SessionSettings.from_env()
+    settings.log_summary()
+
+    missing_keys = settings.missing_api_keys()
+    if missing_keys:
+        output_json({
+            "type": "error",
+            "message": f"Missing API keys: {', '.join(missing_keys)}",
+            "code": "CONFIG_ERROR"
+        })
+        sys.exit(1)
+
+    speech_engine = None
+    if settings.transcriber_engine == ENGINE_WHISPER:
+        try:
+            speech_engine = whisper_engine_from_settings(settings)
+        except Exception as e:
+            output_json({"type": "error", "message": f"Failed to load speech model: {e}", "code": "CONFIG_ERROR"})
+            sys.exit(1)
+
+    server = SessionServer(
+        settings,
+        emit=output_json,
+        gemini_client=genai.Client(api_key=settings.gemini_key),
+        deepgram_client=DeepgramClient(api_key=settings.deepgram_key) if settings.deepgram_key else None,
+        speech_engine=speech_engine,
+    )
+    profiler = start_profiling(settings)
+    stop_metrics = start_metrics(settings, output_json)
+    try:
+        server.serve(sys.stdin.buffer)
+    finally:
+        stop_metrics()
+        if profiler:
+            profiler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,862 @@
+"""
+字幕 session pipeline
+一個音訊來源對應一個 session：Transcriber → 翻譯佇列 → Translator → 輸出（JSON Lines）
+
+單一 session 模式（main.py）與多 session server 模式（server.py）共用；
+每個 session 各自持有 Transcriber 狀態與翻譯上下文，
+server 模式下可傳入共用的 Gemini / Deepgram client（連線池與明確 cache 因此共用）。
+"""
+
+import copy
+import os
+import tempfile
+import time
+import uuid
+from typing import Callable, Mapping, Optional
+
+from audio_ingest import DEFAULT_FRAME_MS
+from correction_predictor import CorrectionPredictor, predictor_from_settings
+from correction_reviewer import CORRECTION_DEFERRED, CORRECTION_INLINE, CORRECTION_MODES, CorrectionReviewer
+from local_transcriber import ENGINE_DEEPGRAM, TRANSCRIBER_ENGINES, transcriber_from_settings
+from logger import get_logger
+from metrics import StatsReporter, add_report_listener, counter, remove_report_listener, serve_http
+from model_router import ModelRouter, router_from_settings
+from segmentation import SEGMENTATION_FIXED, SEGMENTATION_MODES, SegmentationController, controller_from_settings
+from subtitle_journal import SubtitleJournal
+from token_ledger import TokenLedger, ledger_from_settings
+from transcriber_base import BaseTranscriber
+from translation_queue import PendingUtterance, TranslationQueue
+from translator import Translator
+
+log = get_logger("Python")
+
+TRANSLATION_RETRIES = counter("autosub_session_translation_retries_total", "Translation attempts after the first")
+TRANSLATION_FAILURES = counter(
+    "autosub_session_translation_failures_total", "Utterances that failed translation after all retries"
+)
+
+# 音訊格式常數
+SAMPLE_RATE = 24000
+CHANNELS = 2
+BYTES_PER_SAMPLE = 2
+INCOMPLETE_SUFFIX = " [暫停]"
+SKIPPED_TRANSLATION = "[略過]"
+
+# Backlog 過舊時的處理方式
+STALE_ACTION_MERGE = "merge"          # 所有過舊句子合併成一個 request
+STALE_ACTION_SKIP = "skip"            # 不翻譯，直接標記略過
+STALE_ACTION_DOWNGRADE = "downgrade"  # 不帶歷史 / 上下文修正的快速翻譯（可換較便宜的模型）
+STALE_ACTIONS = (STALE_ACTION_MERGE, STALE_ACTION_SKIP, STALE_ACTION_DOWNGRADE)
+
+
+# ============================================================================
+# Translation Helper Functions (Tier 1-1 重構)
+# ============================================================================
+
+MAX_TRANSLATION_RETRIES = 3
+
+
+def translate_with_retry(
+    text: str,
+    prev_text: str | None,
+    prev_translation: str | None,
+    translator: Translator,
+    on_streaming: Optional[Callable[[str], None]] = None,
+    max_retries: int = MAX_TRANSLATION_RETRIES,
+    model: Optional[str] = None,
+) -> tuple[str, str | None] | None:
+    """
+    帶重試機制的 streaming 翻譯。
+
+    Args:
+        text: 當前要翻譯的原文
+        prev_text: 前句原文（上下文修正用）
+        prev_translation: 前句翻譯（上下文修正用）
+        translator: 翻譯器實例
+        on_streaming: streaming 更新回呼 (partial) -> None
+        max_retries: 最大重試次數
+        model: 路由選定的模型（None 表示主要模型）
+
+    Returns:
+        成功時返回 (current_translation, prev_correction) tuple
+        失敗時返回 None
+    """
+    for attempt in range(max_retries):
+        if attempt:
+            TRANSLATION_RETRIES.inc()
+        try:
+            log.debug("Translating with context (attempt %d)...", attempt + 1)
+
+            # Streaming callback：即時更新 UI
+            def on_streaming_update(partial: str, correction):
+                if on_streaming:
+                    on_streaming(partial)
+
+            current_trans, prev_correction = translator.translate_with_context_correction_streaming(
+                text, prev_text, prev_translation,
+                on_streaming_update=on_streaming_update, model=model,
+            )
+
+            log.debug("Translation result: current=%s, correction=%s", current_trans, prev_correction)
+
+            # 確保 current_trans 是有效字串
+            if current_trans and isinstance(current_trans, str) and current_trans.strip():
+                return (current_trans, prev_correction)
+            else:
+                log.warning("Empty or invalid translation result, retrying...")
+                continue
+
+        except Exception as e:
+            log.warning("Translation error: %s", e)
+
+    return None
+
+
+def strip_incomplete_suffix(text: str) -> str:
+    """移除未完成句標記，取得送翻譯的原文"""
+    return text[:-len(INCOMPLETE_SUFFIX)] if text.endswith(INCOMPLETE_SUFFIX) else text
+
+
+def translate_batch(
+    items: list[PendingUtterance],
+    prev_text: str | None,
+    prev_translation: str | None,
+    translator: Translator,
+    model: Optional[str] = None,
+) -> tuple[dict[str, str], str | None] | None:
+    """
+    合併翻譯 backlog 中的多句（model 為路由選定的模型，None 表示主要模型）。
+
+    Returns:
+        成功時返回 ({transcript_id: translation}, prev_correction)
+        失敗時返回 None（由呼叫端逐句翻譯）
+    """
+    try:
+        return translator.translate_batch(
+            [(item.transcript_id, strip_incomplete_suffix(item.text)) for item in items],
+            prev_text, prev_translation, model=model,
+        )
+    except Exception as e:
+        log.warning("Batch translation error: %s", e)
+        return None
+
+
+def start_metrics(settings: "SessionSettings", emit: Callable[[dict], None]) -> Callable[[], None]:
+    """
+    依設定啟動 stats 定期回報與 /metrics endpoint（整個 process 一份）
+
+    Returns:
+        停止函式：送出最後一次快照並關閉 endpoint
+    """
+    reporter = StatsReporter(emit, settings.stats_interval_sec)
+    reporter.start()
+    http_server = None
+    if settings.metrics_port:
+        try:
+            http_server = serve_http(settings.metrics_port)
+            log.info("Metrics endpoint: http://127.0.0.1:%d/metrics", settings.metrics_port)
+        except OSError as e:
+            log.warning("Metrics endpoint disabled: %s", e)
+
+    def stop() -> None:
+        reporter.stop()
+        if http_server:
+            http_server.shutdown()
+            http_server.server_close()
+
+    return stop
+
+
+class SessionSettings:
+    """一個 session 的設定（由環境變數讀取；server 模式可逐 session 覆寫部分欄位）"""
+
+    # server 模式 open 訊息可覆寫的欄位
+    OVERRIDABLE = (
+        "source_lang",
+        "target_lang",
+        "extra_target_langs",
+        "translation_context",
+        "keyterms",
+        "sample_rate",
+        "channels",
+        "profile_name",
+    )
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] = os.environ) -> "SessionSettings":
+        settings = cls()
+        settings.deepgram_key = env.get("DEEPGRAM_API_KEY")
+        settings.gemini_key = env.get("GEMINI_API_KEY")
+        settings.source_lang = env.get("SOURCE_LANGUAGE", "ja")
+        settings.target_lang = env.get("TARGET_LANGUAGE", "zh-TW")
+        # 額外目標語言（逗號分隔）：與主要語言在同一個 request 輸出，以 subtitle_extra 送出
+        settings.extra_target_langs = [
+            lang.strip() for lang in env.get("EXTRA_TARGET_LANGUAGES", "").split(",") if lang.strip()
+        ]
+        settings.gemini_model = env.get("GEMINI_MODEL", "gemini-2.5-flash-lite-preview-09-2025")
+        settings.translation_context = env.get("TRANSLATION_CONTEXT", "")
+        keyterms_raw = env.get("DEEPGRAM_KEYTERMS", "")
+        settings.keyterms = [line.strip() for line in keyterms_raw.splitlines() if line.strip()]
+        settings.sample_rate = SAMPLE_RATE
+        settings.channels = CHANNELS
+        # stdin 讀取的 frame 長度（毫秒，20~200）：越短首字延遲越低，但送出的訊息越多
+        settings.frame_ms = int(env.get("AUDIO_FRAME_MS", str(DEFAULT_FRAME_MS)))
+        # 共享記憶體音訊傳輸：host 建立的 ring 檔案路徑（空字串表示 PCM 直接走 stdin）
+        settings.audio_shm_path = env.get("AUDIO_SHM_PATH", "")
+
+        # 語音辨識引擎：deepgram（WebSocket）或 whisper（本地 CPU 串流分段解碼，見 local_transcriber.py，
+        # 不需 DEEPGRAM_API_KEY；下面的斷句設定兩者共用）
+        settings.transcriber_engine = env.get("TRANSCRIBER_ENGINE", ENGINE_DEEPGRAM)
+        if settings.transcriber_engine not in TRANSCRIBER_ENGINES:
+            log.warning("Unknown TRANSCRIBER_ENGINE=%s, using %s", settings.transcriber_engine, ENGINE_DEEPGRAM)
+            settings.transcriber_engine = ENGINE_DEEPGRAM
+        settings.whisper_model = env.get("WHISPER_MODEL", "small")
+        settings.whisper_model_dir = env.get("WHISPER_MODEL_DIR", "")
+        # CTranslate2 執行緒數（0 表示預設），見 bench_local_transcriber.py 的 real-time factor 比較
+        settings.whisper_threads = int(env.get("WHISPER_THREADS", "0"))
+        settings.whisper_compute_type = env.get("WHISPER_COMPUTE_TYPE", "int8")
+        settings.whisper_step_sec = float(env.get("WHISPER_STEP_SEC", "1.0"))
+        settings.whisper_max_window_sec = float(env.get("WHISPER_MAX_WINDOW_SEC", "15"))
+
+        # Deepgram 斷句設定（Phase 1 調整後的新預設值）
+        settings.endpointing_ms = int(env.get("DEEPGRAM_ENDPOINTING_MS", "200"))
+        settings.utterance_end_ms = int(env.get("DEEPGRAM_UTTERANCE_END_MS", "1000"))
+        settings.max_buffer_chars = int(env.get("DEEPGRAM_MAX_BUFFER_CHARS", "50"))
+        settings.interim_stale_timeout_sec = float(env.get("DEEPGRAM_INTERIM_STALE_TIMEOUT_SEC", "4.0"))
+        # 超過 max_buffer_chars 時在句子 / 子句邊界切開，剩餘部分留到下一句（設為 0 回到整段送出）
+        settings.boundary_flush = env.get("DEEPGRAM_BOUNDARY_FLUSH", "1") != "0"
+        # 斷線重連：指數退避，重連後重播 ring buffer 內最近的音訊（0 次表示不重連）
+        settings.reconnect_max_attempts = int(env.get("DEEPGRAM_RECONNECT_MAX_ATTEMPTS", "5"))
+        settings.reconnect_base_delay_sec = float(env.get("DEEPGRAM_RECONNECT_BASE_DELAY_SEC", "0.5"))
+        settings.replay_buffer_sec = float(env.get("DEEPGRAM_REPLAY_BUFFER_SEC", "10.0"))
+        # 連線輪替：每條連線送滿此秒數音訊後預先建立新連線，重疊後在停頓處切換（0 停用）
+        settings.rotate_interval_sec = float(env.get("DEEPGRAM_ROTATE_INTERVAL_SEC", "0"))
+        settings.rotate_overlap_sec = float(env.get("DEEPGRAM_ROTATE_OVERLAP_SEC", "2.0"))
+        # 斷句模式：fixed（上面的固定門檻）或 adaptive（依語速 / 佇列深度 / Gemini 延遲調整，見 segmentation.py）
+        settings.segmentation_mode = env.get("SEGMENTATION_MODE", SEGMENTATION_FIXED)
+        if settings.segmentation_mode not in SEGMENTATION_MODES:
+            log.warning("Unknown SEGMENTATION_MODE=%s, using %s", settings.segmentation_mode, SEGMENTATION_FIXED)
+            settings.segmentation_mode = SEGMENTATION_FIXED
+        settings.segmentation_slow_cps = float(env.get("SEGMENTATION_SLOW_CHARS_PER_SEC", "4.0"))
+        settings.segmentation_fast_cps = float(env.get("SEGMENTATION_FAST_CHARS_PER_SEC", "9.0"))
+        settings.segmentation_target_latency_sec = float(env.get("SEGMENTATION_TARGET_LATENCY_SEC", "1.2"))
+        settings.segmentation_hold_timeout_sec = float(env.get("SEGMENTATION_HOLD_TIMEOUT_SEC", "2.0"))
+
+        # 新增：Gemini Context 設定（有預設值）
+        settings.max_context_tokens = int(env.get("GEMINI_MAX_CONTEXT_TOKENS", "20000"))
+        # History 模式：chat（預設，累積到閾值後重建）或 window（固定大小滑動視窗）
+        settings.history_mode = env.get("GEMINI_HISTORY_MODE", "chat")
+        settings.history_window_turns = int(env.get("GEMINI_HISTORY_WINDOW_TURNS", "8"))
+        # 逐句模型路由：設定快速模型時，短句 / backlog / 主要模型延遲超過預算時改用快速模型（見 model_router.py）
+        settings.fast_model = env.get("GEMINI_FAST_MODEL") or None
+        settings.router_short_chars = int(env.get("MODEL_ROUTER_SHORT_CHARS", "12"))
+        settings.router_busy_backlog = int(env.get("MODEL_ROUTER_BUSY_BACKLOG", "2"))
+        settings.router_latency_budget_sec = float(env.get("MODEL_ROUTER_LATENCY_BUDGET_SEC", "2.5"))
+        settings.router_latency_window_sec = float(env.get("MODEL_ROUTER_LATENCY_WINDOW_SEC", "60"))
+        # Compact 每輪格式（指令只放 system instruction），設為 0 回到完整 prompt
+        settings.compact_history = env.get("GEMINI_COMPACT_HISTORY", "1") != "0"
+        # 明確 content cache：system instruction / 背景資訊 / keyterms 只上傳一次
+        settings.explicit_cache = env.get("GEMINI_EXPLICIT_CACHE", "0") == "1"
+        settings.cache_ttl_sec = int(env.get("GEMINI_CACHE_TTL_SEC", "3600"))
+        # 翻譯 backlog 合併：佇列累積達閾值時合併成一個 request（0 停用）
+        settings.batch_threshold = int(env.get("TRANSLATION_BATCH_THRESHOLD", "3"))
+        settings.max_batch_size = int(env.get("TRANSLATION_MAX_BATCH_SIZE", "6"))
+        # Backlog 過舊處理：字幕延遲超過 SUBTITLE_MAX_AGE_SEC（0 停用）時依 SUBTITLE_STALE_ACTION 處理
+        settings.subtitle_max_age_sec = float(env.get("SUBTITLE_MAX_AGE_SEC", "8.0"))
+        settings.stale_action = env.get("SUBTITLE_STALE_ACTION", STALE_ACTION_MERGE)
+        if settings.stale_action not in STALE_ACTIONS:
+            log.warning("Unknown SUBTITLE_STALE_ACTION=%s, using %s", settings.stale_action, STALE_ACTION_MERGE)
+            settings.stale_action = STALE_ACTION_MERGE
+        settings.downgrade_model = env.get("GEMINI_DOWNGRADE_MODEL") or None
+        # 前句修正：inline（當句 request 同時修正前句）或 deferred（當句只翻譯，修正在背景成批檢查，
+        # 見 correction_reviewer.py）
+        settings.correction_mode = env.get("TRANSLATION_CORRECTION_MODE", CORRECTION_INLINE)
+        if settings.correction_mode not in CORRECTION_MODES:
+            log.warning("Unknown TRANSLATION_CORRECTION_MODE=%s, using %s", settings.correction_mode, CORRECTION_INLINE)
+            settings.correction_mode = CORRECTION_INLINE
+        settings.correction_batch_size = int(env.get("CORRECTION_BATCH_SIZE", "3"))
+        settings.correction_max_delay_sec = float(env.get("CORRECTION_MAX_DELAY_SEC", "4.0"))
+        settings.correction_model = env.get("GEMINI_CORRECTION_MODEL") or None
+        # inline 模式的修正需求預測：預測前句不需修正時改用只帶原文的短 prompt（見 correction_predictor.py）
+        settings.correction_predictor = env.get("CORRECTION_PREDICTOR", "0") == "1"
+        settings.correction_predictor_threshold = float(env.get("CORRECTION_PREDICTOR_THRESHOLD", "0.5"))
+        settings.correction_predictor_max_gap_sec = float(env.get("CORRECTION_PREDICTOR_MAX_GAP_SEC", "3.0"))
+
+        # 字幕 journal：每個 session 一個 append-only 檔，批次 fsync（空字串表示停用）
+        settings.journal_dir = env.get("SUBTITLE_JOURNAL_DIR", "")
+        settings.journal_fsync_sec = float(env.get("SUBTITLE_JOURNAL_FSYNC_SEC", "1.0"))
+
+        # Token 帳本：依呼叫類型 / 模型記錄用量，session 結束時依 profile 累計到 TOKEN_LEDGER_PATH（空字串表示不保存）
+        settings.profile_name = env.get("AUTOSUB_PROFILE", "default")
+        settings.token_ledger_path = env.get("TOKEN_LEDGER_PATH", "")
+
+        # 執行期指標：每 STATS_INTERVAL_SEC 秒送出 stats 訊息（0 表示只在結束時送出），
+        # METRICS_PORT 非 0 時另在 127.0.0.1 提供 Prometheus 格式的 /metrics
+        settings.stats_interval_sec = float(env.get("STATS_INTERVAL_SEC", "30"))
+        settings.metrics_port = int(env.get("METRICS_PORT", "0"))
+
+        # 選用的 profiling（全部為 0 時停用）：輸出到 DIAGNOSTICS_DIR，見 profiling.py
+        settings.diagnostics_dir = env.get("DIAGNOSTICS_DIR") or os.path.join(
+            tempfile.gettempdir(), "autosub-diagnostics"
+        )
+        settings.profile_cpu_interval_ms = float(env.get("PROFILE_CPU_INTERVAL_MS", "0"))
+        settings.profile_cpu_flush_sec = float(env.get("PROFILE_CPU_FLUSH_SEC", "60"))
+        settings.profile_memory_interval_sec = float(env.get("PROFILE_MEMORY_INTERVAL_SEC", "0"))
+        settings.profile_stack_dumps = env.get("PROFILE_STACK_DUMPS", "0") == "1"
+        settings.profile_max_files = int(env.get("PROFILE_MAX_FILES", "20"))
+        return settings
+
+    def with_overrides(self, overrides: Mapping) -> "SessionSettings":
+        """回傳套用覆寫後的副本（未知欄位忽略）"""
+        settings = copy.copy(self)
+        for key in self.OVERRIDABLE:
+            if key in overrides:
+                setattr(settings, key, overrides[key])
+        return settings
+
+    def missing_api_keys(self) -> list[str]:
+        """啟動所需但未設定的 API key（本地語音辨識不需要 Deepgram）"""
+        missing = []
+        if self.transcriber_engine == ENGINE_DEEPGRAM and not self.deepgram_key:
+            missing.append("DEEPGRAM_API_KEY")
+        if not self.gemini_key:
+            missing.append("GEMINI_API_KEY")
+        return missing
+
+    def log_summary(self) -> None:
+        log.info("API keys present: deepgram=%s, gemini=%s", bool(self.deepgram_key), bool(self.gemini_key))
+        log.info(
+            "Transcriber engine: %s (whisper_model=%s, whisper_threads=%s, whisper_compute_type=%s, "
+            "whisper_step_sec=%s, whisper_max_window_sec=%s)",
+            self.transcriber_engine, self.whisper_model, self.whisper_threads, self.whisper_compute_type,
+            self.whisper_step_sec, self.whisper_max_window_sec,
+        )
+        log.info(
+            "Deepgram config: endpointing_ms=%s, utterance_end_ms=%s, max_buffer_chars=%s, "
+            "interim_stale_timeout_sec=%s, reconnect_max_attempts=%s, replay_buffer_sec=%s, rotate_interval_sec=%s, "
+            "segmentation_mode=%s, boundary_flush=%s",
+            self.endpointing_ms, self.utterance_end_ms, self.max_buffer_chars, self.interim_stale_timeout_sec,
+            self.reconnect_max_attempts, self.replay_buffer_sec, self.rotate_interval_sec, self.segmentation_mode,
+            self.boundary_flush,
+        )
+        log.info("Deepgram keyterms: %d items", len(self.keyterms))
+        log.info(
+            "Gemini config: model=%s, max_context_tokens=%s, extra_target_langs=%s, "
+            "history_mode=%s, history_window_turns=%s, compact_history=%s, explicit_cache=%s, "
+            "batch_threshold=%s, max_batch_size=%s, subtitle_max_age_sec=%s, stale_action=%s, "
+            "correction_mode=%s, correction_batch_size=%s, correction_max_delay_sec=%s, "
+            "correction_predictor=%s, correction_predictor_threshold=%s, "
+            "fast_model=%s, router_short_chars=%s, router_busy_backlog=%s, router_latency_budget_sec=%s, "
+            "router_latency_window_sec=%s",
+            self.gemini_model, self.max_context_tokens, self.extra_target_langs,
+            self.history_mode, self.history_window_turns, self.compact_history, self.explicit_cache,
+            self.batch_threshold, self.max_batch_size, self.subtitle_max_age_sec, self.stale_action,
+            self.correction_mode, self.correction_batch_size, self.correction_max_delay_sec,
+            self.correction_predictor, self.correction_predictor_threshold,
+            self.fast_model, self.router_short_chars, self.router_busy_backlog, self.router_latency_budget_sec,
+            self.router_latency_window_sec,
+        )
+        if self.translation_context.strip():
+            log.info("Translation context length: %d", len(self.translation_context))
+        log.info("Token ledger: profile=%s, path=%s", self.profile_name, self.token_ledger_path or "(not saved)")
+
+
+class SubtitleSession:
+    """
+    單一音訊來源的字幕 pipeline
+
+    使用 context manager 模式：
+        with SubtitleSession(settings, emit=output_json) as session:
+            session.send_audio(data)
+
+    Args:
+        settings: session 設定
+        emit: 輸出一則 IPC 訊息 (dict) -> None，需可從多個執行緒呼叫
+        gemini_client: 共用的 genai.Client（None 表示自行建立）
+        deepgram_client: 共用的 DeepgramClient（None 表示自行建立）
+        speech_engine: 共用的本地語音辨識引擎（TRANSCRIBER_ENGINE=whisper 時使用，None 表示依設定載入）
+    """
+
+    def __init__(
+        self,
+        settings: SessionSettings,
+        emit: Callable[[dict], None],
+        gemini_client=None,
+        deepgram_client=None,
+        speech_engine=None,
+    ):
+        self.settings = settings
+        self.emit = emit
+        self._gemini_client = gemini_client
+        self._deepgram_client = deepgram_client
+        self._speech_engine = speech_engine
+
+        self.translator: Optional[Translator] = None
+        self.transcriber: Optional[BaseTranscriber] = None
+        self.translation_queue: Optional[TranslationQueue] = None
+        self.journal: Optional[SubtitleJournal] = None
+        self.segmentation: Optional[SegmentationController] = None
+        self.correction_reviewer: Optional[CorrectionReviewer] = None
+        self.correction_predictor: Optional[CorrectionPredictor] = None
+        self.model_router: Optional[ModelRouter] = None
+        self.ledger: Optional[TokenLedger] = None
+
+        # 最近一句已送出的字幕 (id, text, translation)，作為下一句的上下文
+        # 翻譯在 worker 上非同步執行，因此由 worker 自行追蹤，而非沿用 transcriber 的前句記錄
+        self._previous_subtitle: Optional[tuple[str, str, Optional[str]]] = None
+        self._previous_span: Optional[tuple[float, float]] = None
+
+    # ------------------------------------------------------------------
+    # 生命週期
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """建立翻譯器、佇列與語音辨識（Deepgram 連線失敗或本地模型載入失敗時拋出例外，已建立的資源會釋放）"""
+        settings = self.settings
+
+        # 初始化翻譯器
+        log.info("Initializing translator...")
+        self.ledger = ledger_from_settings(settings)
+        # 每次 stats 送出時一併送出本 session 的 token 用量
+        add_report_listener(self._report_token_usage)
+        self.translator = Translator(
+            api_key=settings.gemini_key,
+            model=settings.gemini_model,
+            source_language=settings.source_lang,
+            target_language=settings.target_lang,
+            max_context_tokens=settings.max_context_tokens,
+            translation_context=settings.translation_context,
+            keyterms=settings.keyterms,
+            history_mode=settings.history_mode,
+            history_window_turns=settings.history_window_turns,
+            client=self._gemini_client,
+            compact_history=settings.compact_history,
+            explicit_cache=settings.explicit_cache,
+            cache_ttl_sec=settings.cache_ttl_sec,
+            extra_target_languages=settings.extra_target_langs,
+            correction_model=settings.correction_model,
+            ledger=self.ledger,
+        )
+        log.info("Translator initialized")
+        self.model_router = router_from_settings(settings)
+
+        if settings.journal_dir:
+            # 檔名加上隨機後綴：server 模式同一秒開啟的 session 或快速重啟不會追加到同一個檔案
+            journal_path = os.path.join(
+                os.path.expanduser(settings.journal_dir),
+                time.strftime("session-%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8] + ".jsonl",
+            )
+            try:
+                self.journal = SubtitleJournal(journal_path, fsync_interval_sec=settings.journal_fsync_sec)
+                log.info("Subtitle journal: %s", journal_path)
+            except OSError as e:
+                log.warning("Subtitle journal disabled: %s", e)
+
+        self.translation_queue = TranslationQueue(
+            on_items=self._on_translation_items,
+            batch_threshold=settings.batch_threshold,
+            max_batch_size=settings.max_batch_size,
+            max_age_sec=settings.subtitle_max_age_sec,
+            on_stale_items=self._on_stale_items,
+            on_backlog_status=self._on_backlog_status,
+        )
+        self.translation_queue.start()
+
+        if settings.correction_mode == CORRECTION_DEFERRED:
+            translation_queue = self.translation_queue
+            self.correction_reviewer = CorrectionReviewer(
+                review=self.translator.review_translations,
+                on_correction=self.send_translation_update,
+                is_busy=lambda: translation_queue.busy,
+                batch_size=settings.correction_batch_size,
+                max_delay_sec=settings.correction_max_delay_sec,
+            )
+            self.correction_reviewer.start()
+        else:
+            self.correction_predictor = predictor_from_settings(settings)
+
+        self.segmentation = controller_from_settings(settings)
+
+        # 初始化轉錄器
+        log.info("Initializing transcriber...")
+        try:
+            transcriber = self._create_transcriber()
+        except Exception:
+            self.close()
+            raise
+        try:
+            transcriber.start()
+        except Exception:
+            transcriber.stop()
+            self.close()
+            raise
+        self.transcriber = transcriber
+        log.info("Transcriber connected!")
+
+    def _create_transcriber(self) -> BaseTranscriber:
+        """依 TRANSCRIBER_ENGINE 建立 Deepgram 或本地轉錄器（本地模型在此載入）"""
+        settings = self.settings
+        return transcriber_from_settings(
+            settings,
+            engine=self._speech_engine,
+            language=settings.source_lang,
+            on_transcript=self._on_transcript,
+            on_interim=self._on_interim,
+            on_error=self._on_transcriber_error,
+            endpointing_ms=settings.endpointing_ms,
+            utterance_end_ms=settings.utterance_end_ms,
+            max_buffer_chars=settings.max_buffer_chars,
+            interim_stale_timeout_sec=settings.interim_stale_timeout_sec,
+            split_at_boundaries=settings.boundary_flush,
+            keyterms=settings.keyterms,
+            sample_rate=settings.sample_rate,
+            channels=settings.channels,
+            segmentation=self.segmentation,
+            deepgram_options=dict(
+                client=self._deepgram_client,
+                on_status=self._on_transcriber_status,
+                reconnect_max_attempts=settings.reconnect_max_attempts,
+                reconnect_base_delay_sec=settings.reconnect_base_delay_sec,
+                replay_buffer_sec=settings.replay_buffer_sec,
+                rotate_interval_sec=settings.rotate_interval_sec,
+                rotate_overlap_sec=settings.rotate_overlap_sec,
+            ),
+        )
+
+    def send_audio(self, audio_data: bytes) -> None:
+        if self.transcriber:
+            self.transcriber.send_audio(audio_data)
+
+    def close(self, drain: bool = False) -> None:
+        """
+        停止轉錄，等待翻譯佇列清空後釋放資源
+
+        Args:
+            drain: 先要求 Deepgram 輸出已送出音訊的剩餘結果（Finalize）再斷線
+        """
+        if self.transcriber:
+            if drain:
+                self.transcriber.finalize()
+            self.transcriber.stop()
+            self.transcriber = None
+        if self.translation_queue:
+            self.translation_queue.close()
+            self.translation_queue = None
+        if self.correction_reviewer:
+            # 翻譯佇列清空後才檢查剩餘的字幕（最後一句沒有後文）
+            self.correction_reviewer.close()
+            self.correction_reviewer = None
+        if self.translator:
+            self.translator.close()
+            self.translator = None
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        remove_report_listener(self._report_token_usage)
+        if self.ledger:
+            # 翻譯器關閉後才結算（背景檢查與摘要都已完成）
+            self.emit(self.ledger.snapshot(lifetime=self.ledger.save()))
+            self.ledger = None
+
+    def _report_token_usage(self) -> None:
+        """stats reporter 回呼：送出本 session 目前的 token 用量（不結算到累計檔）"""
+        ledger = self.ledger
+        if ledger:
+            self.emit(ledger.snapshot())
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    # ------------------------------------------------------------------
+    # 輸出
+    # ------------------------------------------------------------------
+
+    def output_streaming_update(self, transcript_id: str, partial_translation: str):
+        """輸出 streaming 更新"""
+        self.emit({
+            "type": "translation_streaming",
+            "id": transcript_id,
+            "partial": partial_translation,
+            "language": self.settings.target_lang
+        })
+
+    def send_subtitle(self, transcript_id: str, original: str, translation: str):
+        """送出翻譯結果（subtitle）"""
+        self.emit({
+            "type": "subtitle",
+            "id": transcript_id,
+            "original": original,
+            "translation": translation,
+            "language": self.settings.target_lang
+        })
+        if self.journal:
+            self.journal.record_subtitle(transcript_id, original, translation)
+        log.debug("Subtitle sent to stdout!")
+
+    def send_extra_translations(self, transcript_id: str, extras: dict[str, str], is_incomplete: bool):
+        """送出額外目標語言的翻譯（subtitle_extra，每個語言一則）"""
+        for language, translation in extras.items():
+            self.emit({
+                "type": "subtitle_extra",
+                "id": transcript_id,
+                "language": language,
+                "translation": translation + INCOMPLETE_SUFFIX if is_incomplete else translation
+            })
+
+    def send_translation_update(self, prev_id: str, prev_correction: str):
+        """送出前句修正（translation_update）"""
+        if prev_correction and prev_id:
+            self.emit({
+                "type": "translation_update",
+                "id": prev_id,
+                "translation": prev_correction,
+                "language": self.settings.target_lang
+            })
+            if self.journal:
+                self.journal.record_update(prev_id, prev_correction)
+            log.debug("Translation update sent for prev_id=%s!", prev_id)
+
+    def send_backlog_status(self, catching_up: bool, pending: int, oldest_age_sec: float, action: str):
+        """送出翻譯 backlog 追趕狀態（backlog）"""
+        self.emit({
+            "type": "backlog",
+            "status": "catching_up" if catching_up else "caught_up",
+            "pending": pending,
+            "oldest_age_sec": round(oldest_age_sec, 1),
+            "action": action
+        })
+        log.info("Backlog status: catching_up=%s, pending=%d, oldest_age=%.1fs", catching_up, pending, oldest_age_sec)
+
+    def send_translation_error(self, transcript_id: str, original: str, is_incomplete: bool):
+        """送出翻譯失敗的降級輸出"""
+        log.error("Translation failed after %d attempts", MAX_TRANSLATION_RETRIES)
+        TRANSLATION_FAILURES.inc()
+        # 送出帶 id 的失敗字幕
+        translation = "[翻譯失敗]" + (INCOMPLETE_SUFFIX if is_incomplete else "")
+        self.emit({
+            "type": "subtitle",
+            "id": transcript_id,
+            "original": original,
+            "translation": translation,
+            "language": self.settings.target_lang
+        })
+        if self.journal:
+            self.journal.record_subtitle(transcript_id, original, translation)
+        # 送出錯誤通知
+        self.emit({
+            "type": "error",
+            "message": "Translation failed",
+            "code": "TRANSLATE_ERROR"
+        })
+
+    # ------------------------------------------------------------------
+    # Transcriber 回呼（listener 執行緒）
+    # ------------------------------------------------------------------
+
+    def _on_interim(self, text: str):
+        """Interim 回呼（即時顯示正在說的話）"""
+        self.emit({
+            "type": "interim",
+            "text": text
+        })
+
+    def _on_transcriber_status(self, status: str):
+        """斷線重連狀態（reconnecting / reconnected）"""
+        self.emit({"type": "status", "status": status})
+
+    def _on_transcriber_error(self, message: str, detail_code: str | None = None):
+        payload = {
+            "type": "error",
+            "message": message,
+            "code": "DEEPGRAM_ERROR"
+        }
+        if detail_code:
+            payload["detail_code"] = detail_code
+        self.emit(payload)
+
+    def _on_transcript(
+        self,
+        transcript_id: str,
+        text: str,
+        prev_id: str | None = None,
+        prev_text: str | None = None,
+        prev_translation: str | None = None
+    ):
+        """Phase 2: 轉錄回呼（送出原文後入列，翻譯交給 worker）"""
+        log.debug("on_transcript called with id=%s, text=%s", transcript_id, text)
+
+        # 立即送出原文（翻譯中狀態）
+        self.emit({
+            "type": "transcript",
+            "id": transcript_id,
+            "text": text
+        })
+        log.debug("Transcript sent to stdout!")
+
+        # transcriber 在 start() 完成後才指定，連線建立前不會有回呼
+        span = self.transcriber.last_flush_span if self.transcriber else None
+        if self.journal:
+            self.journal.note_span(transcript_id, span)
+
+        self.translation_queue.put(PendingUtterance(
+            transcript_id, text, is_incomplete=text.endswith(INCOMPLETE_SUFFIX), span=span
+        ))
+        if self.segmentation:
+            self.segmentation.observe_queue_depth(self.translation_queue.depth())
+
+    # ------------------------------------------------------------------
+    # 翻譯 worker 回呼
+    # ------------------------------------------------------------------
+
+    def _previous_context(self, item: PendingUtterance) -> tuple[str | None, str | None, str | None]:
+        """
+        當句 request 的前句上下文 (id, text, translation)
+
+        deferred 模式不帶前句（修正交給背景檢查）；有修正預測器時，預測前句不需修正也不帶
+        """
+        if self.correction_reviewer or not self._previous_subtitle:
+            return None, None, None
+        prev_id, prev_text, prev_translation = self._previous_subtitle
+        if self.correction_predictor and prev_translation is not None:
+            gap_sec = None
+            if item.span and self._previous_span:
+                gap_sec = item.span[0] - self._previous_span[1]
+            if not self.correction_predictor.should_correct(prev_text, item.text, gap_sec):
+                return None, None, None
+        return self._previous_subtitle
+
+    def _route(self, text: str, backlog: int = 0) -> Optional[str]:
+        """逐句選擇模型（未啟用路由時回傳 None，沿用主要模型）"""
+        if not self.model_router:
+            return None
+        return self.model_router.choose(text, backlog + self.translation_queue.depth())
+
+    def _remember_subtitle(self, item: PendingUtterance, output_translation: Optional[str]) -> None:
+        """記錄已送出的字幕：作為下一句的上下文，deferred 模式另交給背景檢查"""
+        self._previous_subtitle = (item.transcript_id, item.text, output_translation)
+        self._previous_span = item.span
+        if self.ledger and item.span and output_translation and output_translation != SKIPPED_TRANSLATION:
+            self.ledger.add_translated_audio(item.span[1] - item.span[0])
+        if self.correction_reviewer and output_translation and output_translation != SKIPPED_TRANSLATION:
+            self.correction_reviewer.add(
+                item.transcript_id,
+                strip_incomplete_suffix(item.text),
+                strip_incomplete_suffix(output_translation),
+            )
+
+    def _translate_one(self, item: PendingUtterance):
+        """單句翻譯（含重試與上下文修正）"""
+        prev_id, prev_text, prev_translation = self._previous_context(item)
+        if prev_id:
+            log.debug("Previous context: prev_id=%s, prev_text=%s, prev_translation=%s", prev_id, prev_text, prev_translation)
+
+        model = self._route(item.text)
+        started_at = time.time()
+        result = translate_with_retry(
+            strip_incomplete_suffix(item.text), prev_text, prev_translation,
+            self.translator,
+            on_streaming=lambda partial: self.output_streaming_update(item.transcript_id, partial),
+            model=model,
+        )
+        if model:
+            # 失敗（逾時）也計入延遲，cascade 才能在主要模型卡住時生效
+            self.model_router.observe(model, time.time() - started_at)
+
+        if result:
+            current_trans, prev_correction = result
+            output_translation = current_trans + INCOMPLETE_SUFFIX if item.is_incomplete else current_trans
+
+            # 送出翻譯結果
+            self.send_subtitle(item.transcript_id, item.text, output_translation)
+            self.send_extra_translations(
+                item.transcript_id, self.translator.last_extra_translations, item.is_incomplete
+            )
+
+            # 送出前句修正（若有）
+            self.send_translation_update(prev_id, prev_correction)
+
+            self._remember_subtitle(item, output_translation)
+        else:
+            # 翻譯失敗，送出降級輸出
+            self.send_translation_error(item.transcript_id, item.text, item.is_incomplete)
+            self._remember_subtitle(item, None)
+
+    def _on_translation_items(self, items: list[PendingUtterance]):
+        """翻譯 worker 回呼：單句直接翻譯，backlog 累積時合併成一個 request"""
+        if not self.segmentation:
+            self._translate_items(items)
+            return
+        self.segmentation.translation_started()
+        started_at = time.time()
+        try:
+            self._translate_items(items)
+        finally:
+            self.segmentation.observe_translation(time.time() - started_at)
+            self.segmentation.observe_queue_depth(self.translation_queue.depth())
+            # worker 閒下來時立即送出保留中的短句，不等 watchdog
+            if self.transcriber:
+                self.transcriber.release_held_buffer()
+
+    def _translate_items(self, items: list[PendingUtterance]):
+        if len(items) == 1:
+            self._translate_one(items[0])
+            return
+
+        log.info("Translation backlog: batching %d utterances", len(items))
+        prev_id, prev_text, prev_translation = self._previous_context(items[0])
+        model = self._route("".join(item.text for item in items), backlog=len(items))
+        started_at = time.time()
+        batch_result = translate_batch(items, prev_text, prev_translation, self.translator, model=model)
+        if model:
+            self.model_router.observe(model, time.time() - started_at)
+        translations, prev_correction = batch_result or ({}, None)
+        batch_extras = self.translator.last_batch_extra_translations
+        self.send_translation_update(prev_id, prev_correction)
+
+        for item in items:
+            translation = translations.get(item.transcript_id)
+            if translation is None:
+                # batch 缺漏或失敗的句子逐句補翻
+                self._translate_one(item)
+                continue
+            output_translation = translation + INCOMPLETE_SUFFIX if item.is_incomplete else translation
+            self.send_subtitle(item.transcript_id, item.text, output_translation)
+            self.send_extra_translations(
+                item.transcript_id, batch_extras.get(item.transcript_id, {}), item.is_incomplete
+            )
+            self._remember_subtitle(item, output_translation)
+
+    def _on_stale_items(self, items: list[PendingUtterance]):
+        """翻譯 worker 回呼：處理延遲超過上限的句子，讓字幕收斂回即時"""
+        stale_action = self.settings.stale_action
+        if stale_action == STALE_ACTION_MERGE:
+            # 一次可能取出多達 stale_take_limit 句，依 max_batch_size 切開以免單一 request 過大
+            batch_size = max(1, self.settings.max_batch_size)
+            for start in range(0, len(items), batch_size):
+                self._on_translation_items(items[start:start + batch_size])
+            return
+
+        for item in items:
+            if stale_action == STALE_ACTION_SKIP:
+                self.send_subtitle(item.transcript_id, item.text, SKIPPED_TRANSLATION)
+                self._remember_subtitle(item, None)
+                continue
+
+            translation = self.translator.translate_without_context(
+                strip_incomplete_suffix(item.text), model=self.settings.downgrade_model
+            )
+            if translation:
+                output_translation = translation + INCOMPLETE_SUFFIX if item.is_incomplete else translation
+                self.send_subtitle(item.transcript_id, item.text, output_translation)
+                self._remember_subtitle(item, output_translation)
+            else:
+                self.send_translation_error(item.transcript_id, item.text, item.is_incomplete)
+                self._remember_subtitle(item, None)
+
+    def _on_backlog_status(self, catching_up: bool, pending: int, oldest_age_sec: float):
+        self.send_backlog_status(catching_up, pending, oldest_age_sec, self.settings.stale_action)
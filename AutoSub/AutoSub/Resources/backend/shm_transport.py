@@ -0,0 +1,200 @@
+"""
+共享記憶體音訊傳輸（選用）
+host 與 backend 之間以 mmap 檔案上的單一 producer / 單一 consumer ring buffer 傳 PCM，
+pipe 上只送 1 byte 的通知（doorbell），省去 pipe 的 kernel 複製與大區塊阻塞寫入。
+
+檔案格式（little-endian）：
+- 0:   magic "ASRB"、version (u32)、capacity (u64，資料區 bytes)
+- 64:  write_pos (u64)、dropped_frames (u64)        ← producer 擁有
+- 128: read_pos (u64)、overruns (u64)               ← consumer 擁有
+- 256: 資料區（capacity bytes）
+
+write_pos / read_pos 為自串流開始的絕對 byte 位置，位置 p 對應資料區 p % capacity。
+producer 先寫入資料再更新 write_pos，最後送 doorbell；consumer 讀完資料後更新 read_pos。
+兩端各自擁有的欄位放在不同 cache line，避免 false sharing。
+（Swift 端 producer 更新 write_pos 需使用 release 語意的 atomic store，確保資料先於位置可見）
+
+滿載處理：
+- 預設 producer 在空間不足時丟棄整個 frame 並累加 dropped_frames
+- overwrite=True 時 producer 不看 read_pos，直接覆寫最舊的資料；consumer 發現被超車時
+  跳到最舊的完整 sample 並累加 overruns（複製途中被覆寫的資料也會丟棄）
+
+pipe 關閉（EOF）表示串流結束，consumer 讀完 ring 內剩餘資料後回傳 EOF。
+"""
+
+import mmap
+import os
+import struct
+from typing import BinaryIO, Optional
+
+MAGIC = b"ASRB"
+VERSION = 1
+DATA_OFFSET = 256
+_INFO = struct.Struct("<4sIQ")
+_U64 = struct.Struct("<Q")
+_WRITE_POS = 64
+_DROPPED_FRAMES = 72
+_READ_POS = 128
+_OVERRUNS = 136
+DOORBELL = b"\x01"
+
+
+class _SharedRing:
+    def __init__(self, path: str, capacity: Optional[int] = None):
+        if capacity is not None:
+            if capacity <= 0:
+                raise ValueError("capacity must be positive")
+            with open(path, "wb") as f:
+                f.truncate(DATA_OFFSET + capacity)
+        self._file = open(path, "r+b")
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        if capacity is not None:
+            _INFO.pack_into(self._mmap, 0, MAGIC, VERSION, capacity)
+        magic, version, self.capacity = _INFO.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not an audio ring file: {path}")
+        if len(self._mmap) < DATA_OFFSET + self.capacity:
+            self.close()
+            raise ValueError(f"Audio ring file truncated: {path}")
+        self._data = memoryview(self._mmap)[DATA_OFFSET:DATA_OFFSET + self.capacity]
+
+    def _get(self, offset: int) -> int:
+        return _U64.unpack_from(self._mmap, offset)[0]
+
+    def _set(self, offset: int, value: int) -> None:
+        _U64.pack_into(self._mmap, offset, value)
+
+    @property
+    def write_pos(self) -> int:
+        return self._get(_WRITE_POS)
+
+    @property
+    def read_pos(self) -> int:
+        return self._get(_READ_POS)
+
+    @property
+    def free_bytes(self) -> int:
+        return max(0, self.capacity - (self.write_pos - self.read_pos))
+
+    @property
+    def dropped_frames(self) -> int:
+        return self._get(_DROPPED_FRAMES)
+
+    @property
+    def overruns(self) -> int:
+        return self._get(_OVERRUNS)
+
+    def close(self) -> None:
+        data = getattr(self, "_data", None)
+        if data is not None:
+            data.release()
+            self._data = None
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+
+class ShmRingProducer(_SharedRing):
+    """
+    參考 producer（host 端的 Python 版本，供測試與 benchmark）
+
+    Args:
+        path: ring 檔案路徑（會建立 / 覆寫）
+        capacity: 資料區 bytes 數
+        doorbell: 寫入通知的二進位串流（通常是 backend 的 stdin pipe）
+        overwrite: 空間不足時覆寫最舊資料（True）或丟棄新 frame（False）
+    """
+
+    def __init__(self, path: str, capacity: int, doorbell: BinaryIO, overwrite: bool = False):
+        super().__init__(path, capacity)
+        self._doorbell = doorbell
+        self.overwrite = overwrite
+
+    def write(self, frame) -> bool:
+        """寫入一個 frame 並送出通知；空間不足而丟棄時回傳 False"""
+        size = len(frame)
+        write_pos = self.write_pos
+        if size > self.capacity or (
+            not self.overwrite and write_pos + size - self.read_pos > self.capacity
+        ):
+            self._set(_DROPPED_FRAMES, self.dropped_frames + 1)
+            return False
+        start = write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        self._data[start:start + first] = frame[:first]
+        if first < size:
+            self._data[:size - first] = frame[first:]
+        self._set(_WRITE_POS, write_pos + size)
+        self._doorbell.write(DOORBELL)
+        self._doorbell.flush()
+        return True
+
+    def close(self) -> None:
+        """關閉 doorbell（consumer 讀完剩餘資料後收到 EOF）並釋放 mmap"""
+        try:
+            self._doorbell.close()
+        finally:
+            super().close()
+
+
+class ShmRingReader(_SharedRing):
+    """
+    backend 端 consumer，提供 readinto()，可直接交給 audio_ingest.FrameReader
+
+    沒有資料時阻塞在 doorbell 上；doorbell EOF 且 ring 已讀完時回傳 0（EOF）。
+
+    Args:
+        path: host 建立的 ring 檔案路徑
+        doorbell: 通知來源（通常是 sys.stdin.buffer）
+        block_align: 一個 sample frame 的 bytes 數，被超車時從對齊的位置繼續
+    """
+
+    def __init__(self, path: str, doorbell: BinaryIO, block_align: int):
+        super().__init__(path)
+        self._doorbell = doorbell
+        self.block_align = block_align
+        self._doorbell_eof = False
+        self.overrun_bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _skip_overrun(self, read_pos: int, write_pos: int) -> int:
+        oldest = write_pos - self.capacity
+        oldest += -oldest % self.block_align
+        self.overrun_bytes += oldest - read_pos
+        self._set(_OVERRUNS, self.overruns + 1)
+        self._set(_READ_POS, oldest)
+        return oldest
+
+    def readinto(self, buffer) -> int:
+        while True:
+            read_pos = self.read_pos
+            write_pos = self.write_pos
+            if write_pos - read_pos > self.capacity:
+                read_pos = self._skip_overrun(read_pos, write_pos)
+            available = write_pos - read_pos
+            if available > 0:
+                size = min(len(buffer), available)
+                start = read_pos % self.capacity
+                first = min(size, self.capacity - start)
+                buffer[:first] = self._data[start:start + first]
+                if first < size:
+                    buffer[first:size] = self._data[:size - first]
+                # 複製途中 producer（overwrite 模式）已覆寫這段資料：丟棄重讀
+                if self.write_pos - read_pos > self.capacity:
+                    self._skip_overrun(read_pos, self.write_pos)
+                    continue
+                self._set(_READ_POS, read_pos + size)
+                return size
+            if self._doorbell_eof:
+                return 0
+            if not self._read_doorbell():
+                self._doorbell_eof = True
+
+    def _read_doorbell(self) -> bool:
+        """等待 producer 通知，回傳 False 表示 doorbell 已 EOF"""
+        read1 = getattr(self._doorbell, "read1", None)
+        notice = read1(4096) if read1 else os.read(self._doorbell.fileno(), 4096)
+        return bool(notice)
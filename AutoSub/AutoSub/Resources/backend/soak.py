@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+長時間 soak test：以本地 Deepgram / Gemini 替身加速驅動完整 pipeline，檢查資源與延遲是否隨時間漂移
+
+SubtitleSession 以 --speed 倍速吃進 --hours 小時的音訊（每 --utterance-sec 秒一句），期間：
+- GEMINI_MAX_CONTEXT_TOKENS 調低，chat 歷史會反覆摘要重建
+- 每 --rotate-sec 秒音訊輪替一次 Deepgram 連線，每 --drop-sec 秒模擬一次斷線重連
+- streaming 翻譯每句建立 / 結束一個 producer 執行緒
+
+每 --sample-minutes 分鐘（音訊時間）取樣 RSS、執行緒數、開啟的 fd 數與該區間每句延遲
+（transcript 送出 → subtitle 送出，牆鐘時間）。暖機（--warmup）之後的第一個取樣為基準，
+最後一個取樣超過閾值即判定失敗（退出碼 1）。
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    python soak.py --hours 8 --speed 400
+    python soak.py --hours 8 --speed 400 --json soak-report.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from stand_ins import SAMPLE_LINES, current_rss_mb
+
+SAMPLE_RATE = 8000
+CHANNELS = 1
+CHUNK_SEC = 0.5
+DROP_OFFSET_SEC = 300.0
+
+
+@dataclass
+class Thresholds:
+    max_rss_growth_mb: float = 30.0
+    max_thread_growth: int = 2
+    max_fd_growth: int = 4
+    # 最後區間 p95 超過基準 p95 的倍數，且差距大於 latency_floor_ms 才算漂移（避免微秒級雜訊）
+    max_latency_ratio: float = 2.0
+    latency_floor_ms: float = 50.0
+
+
+@dataclass
+class Sample:
+    audio_hours: float
+    wall_sec: float
+    rss_mb: float
+    threads: int
+    fds: int
+    utterances: int
+    p50_ms: Optional[float]
+    p95_ms: Optional[float]
+    rebuilds: int
+    reconnects: int
+    rotations: int
+
+
+@dataclass
+class SoakResult:
+    samples: list[Sample] = field(default_factory=list)
+    failures: list[str] = field(default_factory=list)
+    utterances: int = 0
+    subtitles: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+
+def open_fd_count() -> int:
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return -1
+
+
+def _percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q * 100) - 1]
+
+
+def _metric_total(name: str) -> int:
+    """metrics registry 中某個 counter 所有 label 的合計"""
+    from metrics import REGISTRY
+
+    metric = REGISTRY.get(name)
+    if metric is None:
+        return 0
+    value = metric.snapshot()
+    return int(sum(value.values()) if isinstance(value, dict) else value)
+
+
+def evaluate_drift(samples: list[Sample], thresholds: Thresholds, warmup: float) -> list[str]:
+    """比較暖機後第一個取樣與最後一個取樣，回傳超過閾值的項目"""
+    if len(samples) < 2:
+        return ["not enough samples to evaluate drift"]
+    total_hours = samples[-1].audio_hours
+    steady = [s for s in samples if s.audio_hours >= total_hours * warmup]
+    if len(steady) < 2:
+        steady = samples[-2:]
+    base, last = steady[0], steady[-1]
+
+    failures = []
+    rss_growth = last.rss_mb - base.rss_mb
+    if rss_growth > thresholds.max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MB ({base.rss_mb:.1f} -> {last.rss_mb:.1f})")
+    if last.threads - base.threads > thresholds.max_thread_growth:
+        failures.append(f"thread count grew {base.threads} -> {last.threads}")
+    if base.fds >= 0 and last.fds - base.fds > thresholds.max_fd_growth:
+        failures.append(f"open fds grew {base.fds} -> {last.fds}")
+    if base.p95_ms is not None and last.p95_ms is not None:
+        limit = max(base.p95_ms * thresholds.max_latency_ratio, base.p95_ms + thresholds.latency_floor_ms)
+        if last.p95_ms > limit:
+            failures.append(f"p95 latency drifted {base.p95_ms:.1f} -> {last.p95_ms:.1f} ms")
+    return failures
+
+
+class _LatencyTracker:
+    """emit 回呼：記錄 transcript → subtitle 的延遲（多個執行緒呼叫）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[str, float] = {}
+        self._window: list[float] = []
+        self.utterances = 0
+        self.subtitles = 0
+        self.errors: list[dict] = []
+
+    def emit(self, data: dict) -> None:
+        now = time.perf_counter()
+        message_type = data.get("type")
+        with self._lock:
+            if message_type == "transcript":
+                self._pending[data["id"]] = now
+                self.utterances += 1
+            elif message_type == "subtitle":
+                started_at = self._pending.pop(data.get("id"), None)
+                self.subtitles += 1
+                if started_at is not None:
+                    self._window.append((now - started_at) * 1000)
+            elif message_type == "error":
+                self.errors.append(data)
+
+    def take_window(self) -> list[float]:
+        with self._lock:
+            window, self._window = self._window, []
+            return window
+
+
+def run_soak(
+    hours: float,
+    speed: float,
+    utterance_sec: float = 3.0,
+    sample_minutes: float = 10.0,
+    rotate_sec: float = 1800.0,
+    drop_sec: float = 3600.0,
+    max_context_tokens: int = 3000,
+    thresholds: Optional[Thresholds] = None,
+    warmup: float = 0.1,
+    progress=None,
+) -> SoakResult:
+    """
+    執行 soak test 並回傳取樣與判定結果
+
+    Args:
+        hours: 模擬的音訊時數
+        speed: 音訊秒數 / 牆鐘秒數（0 表示不限速；listener 會遠落後於音訊，
+               輪替切換時舊連線尚未派送的結果會遺失，只適合看資源漂移）
+        progress: 每次取樣後呼叫 (Sample) -> None
+    """
+    from session import SessionSettings, SubtitleSession
+    from stand_ins import FakeDeepgramClient, FakeGeminiClient, stamp_pcm
+
+    thresholds = thresholds or Thresholds()
+    total_sec = hours * 3600
+    script = []
+    t = 0.3
+    while t + 1.5 < total_sec:
+        script.append((t, t + 1.5, SAMPLE_LINES[len(script) % len(SAMPLE_LINES)]))
+        t += utterance_sec
+
+    settings = SessionSettings.from_env({
+        "GEMINI_MAX_CONTEXT_TOKENS": str(max_context_tokens),
+        "DEEPGRAM_ROTATE_INTERVAL_SEC": str(rotate_sec),
+        "STATS_INTERVAL_SEC": "0",
+    })
+    settings.sample_rate = SAMPLE_RATE
+    settings.channels = CHANNELS
+    # 加速執行時牆鐘時間遠小於音訊時間：停用依牆鐘判定的過舊處理，避免干擾延遲量測
+    settings.subtitle_max_age_sec = 0
+
+    tracker = _LatencyTracker()
+    deepgram = FakeDeepgramClient(script, stamped_audio=True)
+    gemini = FakeGeminiClient(keep_requests=16)
+    session = SubtitleSession(settings, tracker.emit, gemini_client=gemini, deepgram_client=deepgram)
+    result = SoakResult()
+
+    chunk_bytes = int(SAMPLE_RATE * CHANNELS * 2 * CHUNK_SEC)
+    silence = bytes(chunk_bytes)
+    sample_every_sec = sample_minutes * 60
+    next_sample_sec = sample_every_sec
+    # 斷線錯開輪替時間點 5 分鐘，否則斷線總是落在輪替重疊期間（改走切換到預備連線，不會重連）
+    next_drop_sec = drop_sec + DROP_OFFSET_SEC if drop_sec > 0 else float("inf")
+
+    def take_sample(audio_sec: float) -> None:
+        gc.collect()
+        latencies = tracker.take_window()
+        sample = Sample(
+            audio_hours=round(audio_sec / 3600, 3),
+            wall_sec=round(time.perf_counter() - started_at, 2),
+            rss_mb=round(current_rss_mb(), 2),
+            threads=threading.active_count(),
+            fds=open_fd_count(),
+            utterances=tracker.utterances,
+            p50_ms=_percentile(latencies, 0.5),
+            p95_ms=_percentile(latencies, 0.95),
+            rebuilds=_metric_total("autosub_translator_rebuilds_total"),
+            reconnects=_metric_total("autosub_transcriber_reconnects_total"),
+            rotations=_metric_total("autosub_transcriber_rotations_total"),
+        )
+        result.samples.append(sample)
+        if progress:
+            progress(sample)
+
+    def simulate_drop() -> None:
+        """
+        中斷目前連線，等切換到新連線再繼續餵音訊
+
+        加速時 listener 會落後於送出的音訊：先等已產生的結果送達，否則斷線時丟掉的結果
+        超出重播 buffer；退避是牆鐘時間，不等待同樣會超出重播 buffer（即時速度下兩者都不會發生）
+        """
+        transcriber = session.transcriber
+        connection = transcriber._connection
+        if connection is None or connection.closed:
+            return
+        deadline = time.time() + 30
+        while connection.pending_messages and time.time() < deadline:
+            time.sleep(0.005)
+        connection.drop()
+        while time.time() < deadline:
+            current = transcriber._connection
+            if current is not None and current is not connection and not transcriber._reconnecting:
+                return
+            time.sleep(0.01)
+
+    session.start()
+    started_at = time.perf_counter()
+    try:
+        audio_sec = 0.0
+        while audio_sec < total_sec:
+            session.send_audio(stamp_pcm(audio_sec, silence))
+            audio_sec += CHUNK_SEC
+            if audio_sec >= next_drop_sec:
+                next_drop_sec += drop_sec
+                simulate_drop()
+            if audio_sec >= next_sample_sec:
+                next_sample_sec += sample_every_sec
+                # 取樣前等翻譯跟上，讓每個區間的延遲只反映該區間
+                session.translation_queue.wait_idle(timeout=30)
+                take_sample(audio_sec)
+            if speed > 0:
+                ahead = audio_sec / speed - (time.perf_counter() - started_at)
+                if ahead > 0:
+                    time.sleep(ahead)
+    finally:
+        session.close(drain=True)
+
+    result.utterances = tracker.utterances
+    result.subtitles = tracker.subtitles
+    result.errors = tracker.errors
+    result.failures = evaluate_drift(result.samples, thresholds, warmup)
+    if tracker.utterances < len(script):
+        result.failures.append(f"{len(script) - tracker.utterances} scripted utterances were never transcribed")
+    if tracker.subtitles < tracker.utterances:
+        result.failures.append(f"{tracker.utterances - tracker.subtitles} utterances never got a subtitle")
+    return result
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return f"{value:>7.1f}" if value is not None else f"{'-':>7}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test the pipeline against local stand-ins")
+    parser.add_argument("--hours", type=float, default=8.0, help="模擬的音訊時數")
+    parser.add_argument("--speed", type=float, default=400.0, help="加速倍率（0 表示不限速）")
+    parser.add_argument("--utterance-sec", type=float, default=3.0)
+    parser.add_argument("--sample-minutes", type=float, default=10.0, help="取樣間隔（音訊分鐘）")
+    parser.add_argument("--rotate-sec", type=float, default=1800.0, help="連線輪替間隔（0 停用）")
+    parser.add_argument("--drop-sec", type=float, default=3600.0, help="模擬斷線間隔（0 停用）")
+    parser.add_argument("--max-context-tokens", type=int, default=3000)
+    parser.add_argument("--warmup", type=float, default=0.1, help="暖機比例（不列入基準）")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=Thresholds.max_rss_growth_mb)
+    parser.add_argument("--max-thread-growth", type=int, default=Thresholds.max_thread_growth)
+    parser.add_argument("--max-fd-growth", type=int, default=Thresholds.max_fd_growth)
+    parser.add_argument("--max-latency-ratio", type=float, default=Thresholds.max_latency_ratio)
+    parser.add_argument("--json", help="輸出 JSON 報告的路徑")
+    args = parser.parse_args()
+
+    # 只看 soak 結果，pipeline 的 info 日誌（重建 / 重連）太多
+    import logger
+    logger.configure("warning")
+
+    thresholds = Thresholds(
+        max_rss_growth_mb=args.max_rss_growth_mb,
+        max_thread_growth=args.max_thread_growth,
+        max_fd_growth=args.max_fd_growth,
+        max_latency_ratio=args.max_latency_ratio,
+    )
+    print(f"{'hours':>6} {'wall s':>7} | {'RSS MB':>7} {'thr':>4} {'fds':>4} | "
+          f"{'utter':>6} {'p50 ms':>7} {'p95 ms':>7} | {'rebuild':>7} {'reconn':>6} {'rotate':>6}")
+
+    def progress(sample: Sample) -> None:
+        print(f"{sample.audio_hours:>6.2f} {sample.wall_sec:>7.1f} | {sample.rss_mb:>7.1f} "
+              f"{sample.threads:>4} {sample.fds:>4} | {sample.utterances:>6} {_format_ms(sample.p50_ms)} "
+              f"{_format_ms(sample.p95_ms)} | {sample.rebuilds:>7} {sample.reconnects:>6} {sample.rotations:>6}",
+              flush=True)
+
+    result = run_soak(
+        hours=args.hours,
+        speed=args.speed,
+        utterance_sec=args.utterance_sec,
+        sample_minutes=args.sample_minutes,
+        rotate_sec=args.rotate_sec,
+        drop_sec=args.drop_sec,
+        max_context_tokens=args.max_context_tokens,
+        thresholds=thresholds,
+        warmup=args.warmup,
+        progress=progress,
+    )
+
+    print(f"\n{result.utterances} utterances, {result.subtitles} subtitles, {len(result.errors)} errors")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "passed": result.passed,
+                "failures": result.failures,
+                "utterances": result.utterances,
+                "subtitles": result.subtitles,
+                "errors": result.errors,
+                "samples": [asdict(sample) for sample in result.samples],
+            }, f, ensure_ascii=False, indent=2)
+    if result.passed:
+        print("PASS: no drift beyond thresholds")
+        return
+    for failure in result.failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
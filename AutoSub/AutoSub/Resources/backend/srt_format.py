@@ -0,0 +1,41 @@
+"""
+SRT 字幕格式化
+與 App 端 ExportService 的輸出一致：序號、時間範圍、內容（依模式）、空行
+"""
+
+from typing import Optional
+
+EXPORT_MODE_BILINGUAL = "bilingual"
+EXPORT_MODE_ORIGINAL = "original"
+EXPORT_MODE_TRANSLATION = "translation"
+EXPORT_MODES = (EXPORT_MODE_BILINGUAL, EXPORT_MODE_ORIGINAL, EXPORT_MODE_TRANSLATION)
+
+
+def format_srt_time(seconds: float) -> str:
+    """格式化時間為 SRT 格式 (HH:MM:SS,mmm)"""
+    millis_total = max(0, int(round(seconds * 1000)))
+    hours, rest = divmod(millis_total, 3_600_000)
+    minutes, rest = divmod(rest, 60_000)
+    secs, millis = divmod(rest, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def format_srt_entry(
+    index: int,
+    start: float,
+    end: float,
+    original: str,
+    translation: Optional[str],
+    mode: str = EXPORT_MODE_BILINGUAL,
+) -> str:
+    """輸出單一 SRT 區塊（含結尾空行），index 從 1 開始"""
+    lines = [str(index), f"{format_srt_time(start)} --> {format_srt_time(end)}"]
+    if mode == EXPORT_MODE_BILINGUAL:
+        lines.append(original)
+        if translation:
+            lines.append(translation)
+    elif mode == EXPORT_MODE_ORIGINAL:
+        lines.append(original)
+    else:
+        lines.append(translation or "")  # 空行佔位
+    return "\n".join(lines) + "\n\n"
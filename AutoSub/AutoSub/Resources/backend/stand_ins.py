@@ -0,0 +1,542 @@
+"""
+本地替身服務（Gemini / Deepgram）
+供測試與 benchmark 在無網路、無 API Key 的環境下驅動 Translator 與 Transcriber
+
+- 記錄每個 request 帶了哪些 contents / config，以及前綴來自 inline system instruction 或明確 cache
+- 依 prompt 大小模擬延遲（TTFT 隨輸入 token 線性成長，cache 命中的 token 較便宜）
+- 以字元數估算 token 數（CJK 約 1 字 1 token）
+"""
+
+import json
+import os
+import queue
+import re
+import resource
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+_QUOTED_RE = re.compile(r"「(.*?)」", re.S)
+_COMPACT_SOURCE_RE = re.compile(r"^原：(.*)$", re.M)
+_BATCH_LINE_RE = re.compile(r"^\[(b\d+)\] (.*)$", re.M)
+# 背景修正 prompt：標記 * 的是待檢查的句子
+REVIEW_LINE_RE = re.compile(r"^\[(r\d+)\](\*?) 原：(.*)｜譯：(.*)$", re.M)
+
+# benchmark / soak 共用的日常對話台詞
+SAMPLE_LINES = [
+    "今日はいい天気ですね",
+    "そうですね、散歩でも行きましょうか",
+    "駅前に新しいカフェができたらしいよ",
+    "本当？じゃあそこに行ってみよう",
+    "田中さんも誘ってみる？",
+    "彼は今日仕事だって言ってた",
+    "それは残念だね、また今度にしよう",
+    "ケーキが美味しいって評判なんだって",
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估 token 數（字元數）"""
+    return len(text or "")
+
+
+def config_value(config, key: str):
+    """從 GenerateContentConfig（或測試 stub）取出欄位值"""
+    if config is None:
+        return None
+    if hasattr(config, "kwargs"):
+        return config.kwargs.get(key)
+    return getattr(config, key, None)
+
+
+def content_text(content) -> str:
+    """將 str / types.Content / FakeContent 轉為純文字"""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, (list, tuple)):
+        return "\n".join(content_text(c) for c in content)
+    parts = getattr(content, "parts", None)
+    if parts is None and hasattr(content, "kwargs"):
+        parts = content.kwargs.get("parts")
+    if parts is None:
+        return str(content)
+    texts = []
+    for part in parts:
+        texts.append(part if isinstance(part, str) else (getattr(part, "text", "") or ""))
+    return "".join(texts)
+
+
+def current_rss_mb() -> float:
+    """目前 RSS（Linux 讀 /proc；其他平台以 peak RSS 近似）"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 單位為 bytes，Linux 為 KB
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def default_responder(prompt: str) -> str:
+    """預設回應：翻譯 prompt 中的「原：」行或第一個「」內的句子；batch prompt 則逐行回應；修正 prompt 不修正"""
+    if REVIEW_LINE_RE.search(prompt):
+        return json.dumps({"results": []})
+    batch_lines = _BATCH_LINE_RE.findall(prompt)
+    if batch_lines:
+        results = [
+            {"id": short_id, "current": f"譯:{source}", "correction": None}
+            for short_id, source in batch_lines
+        ]
+        return json.dumps({"results": results}, ensure_ascii=False)
+    match = _COMPACT_SOURCE_RE.search(prompt) or _QUOTED_RE.search(prompt)
+    source = match.group(1) if match else prompt.strip()
+    return json.dumps({"current": f"譯:{source}", "correction": None}, ensure_ascii=False)
+
+
+def multi_target_responder(languages: list[str]) -> Callable[[str], str]:
+    """預設回應再加上每個額外語言的 extra 翻譯（多目標語言用）"""
+    def respond(prompt: str) -> str:
+        result = json.loads(default_responder(prompt))
+        for entry in result.get("results", [result]):
+            source = entry["current"].removeprefix("譯:")
+            entry["extra"] = [{"language": lang, "text": f"{lang}:{source}"} for lang in languages]
+        return json.dumps(result, ensure_ascii=False)
+    return respond
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens: int, output_tokens: int, cached_tokens: int = 0):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.cached_content_token_count = cached_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text: str, usage_metadata: Optional[FakeUsage] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakePart:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeContent:
+    def __init__(self, role: str, text: str):
+        self.role = role
+        self.parts = [FakePart(text)]
+
+
+class FakeGeminiClient:
+    """
+    Gemini API 本地替身（models / chats 介面）
+
+    Args:
+        responder: (prompt_text) -> response_text，預設回傳 JSON 翻譯
+        base_latency_sec: 每個 request 的固定延遲
+        per_token_latency_sec: 每個輸入 token 增加的 TTFT
+        stream_chunks: streaming 回應切成幾個 chunk
+        cached_token_latency_ratio: cache 命中 token 的延遲比例
+        keep_requests: 只保留最近幾個 request 紀錄（None 表示全部保留；長時間執行時避免替身本身累積記憶體）
+        per_output_token_latency_sec: 每個輸出 token 的生成時間（第一個 chunk 之後才計入，不影響 TTFT）
+        model_latency_scale: {model: 倍數}，依模型放大 / 縮小 TTFT（未列出的模型為 1）
+    """
+
+    def __init__(
+        self,
+        responder: Optional[Callable[[str], str]] = None,
+        base_latency_sec: float = 0.0,
+        per_token_latency_sec: float = 0.0,
+        stream_chunks: int = 3,
+        cached_token_latency_ratio: float = 0.25,
+        keep_requests: Optional[int] = None,
+        per_output_token_latency_sec: float = 0.0,
+        model_latency_scale: Optional[dict[str, float]] = None,
+    ):
+        self.responder = responder or default_responder
+        self.cached_token_latency_ratio = cached_token_latency_ratio
+        self.base_latency_sec = base_latency_sec
+        self.per_token_latency_sec = per_token_latency_sec
+        # 輸出的生成時間：streaming 時每個 chunk 依字數延遲送出
+        self.per_output_token_latency_sec = per_output_token_latency_sec
+        # 依模型調整延遲（可在執行中修改，模擬某個模型變慢）
+        self.model_latency_scale = dict(model_latency_scale or {})
+        self.stream_chunks = max(1, stream_chunks)
+        self.requests = [] if keep_requests is None else deque(maxlen=keep_requests)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self.models = _FakeModels(self)
+        self.chats = _FakeChats(self)
+        self.caches = _FakeCaches(self)
+
+    # ------------------------------------------------------------------
+
+    def _record(self, kind: str, model: str, contents, config) -> dict:
+        cached_name = config_value(config, "cached_content")
+        cached_tokens = 0
+        if cached_name:
+            cache = self.caches.lookup(cached_name)
+            prefix = cache["system_instruction"]
+            cached_tokens = estimate_tokens(prefix)
+        else:
+            prefix = content_text(config_value(config, "system_instruction")) or None
+        request = {
+            "kind": kind,
+            "model": model,
+            "contents": contents,
+            "config": config,
+            "cached_content": cached_name,
+            "prefix": prefix,
+            "prompt_tokens": estimate_tokens(content_text(contents)) + estimate_tokens(prefix or ""),
+            "cached_tokens": cached_tokens,
+            "output_tokens": 0,
+            "started_at": time.time(),
+        }
+        with self._lock:
+            self.requests.append(request)
+            self.request_count += 1
+        return request
+
+    def _latency(self, request: dict) -> float:
+        uncached = request["prompt_tokens"] - request["cached_tokens"]
+        effective = uncached + request["cached_tokens"] * self.cached_token_latency_ratio
+        scale = self.model_latency_scale.get(request["model"], 1.0)
+        return scale * (self.base_latency_sec + self.per_token_latency_sec * effective)
+
+    def _usage(self, request: dict, text: str) -> FakeUsage:
+        return FakeUsage(request["prompt_tokens"], estimate_tokens(text), request["cached_tokens"])
+
+    def _respond(self, request: dict, last_text: str) -> FakeResponse:
+        time.sleep(self._latency(request))
+        text = self.responder(last_text)
+        request["output_tokens"] = estimate_tokens(text)
+        time.sleep(self.per_output_token_latency_sec * request["output_tokens"])
+        return FakeResponse(text, self._usage(request, text))
+
+    def _respond_stream(self, request: dict, last_text: str):
+        time.sleep(self._latency(request))
+        text = self.responder(last_text)
+        request["output_tokens"] = estimate_tokens(text)
+        size = max(1, -(-len(text) // self.stream_chunks))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        for index, piece in enumerate(pieces):
+            if index:
+                time.sleep(self.per_output_token_latency_sec * estimate_tokens(piece))
+            usage = None
+            if index == len(pieces) - 1:
+                usage = self._usage(request, text)
+            yield FakeResponse(piece, usage)
+
+
+class _FakeModels:
+    def __init__(self, client: FakeGeminiClient):
+        self._client = client
+
+    @staticmethod
+    def _last_text(contents) -> str:
+        if isinstance(contents, (list, tuple)) and contents:
+            return content_text(contents[-1])
+        return content_text(contents)
+
+    def generate_content(self, model, contents, config=None):
+        request = self._client._record("generate_content", model, contents, config)
+        return self._client._respond(request, self._last_text(contents))
+
+    def generate_content_stream(self, model, contents, config=None):
+        request = self._client._record("generate_content_stream", model, contents, config)
+        return self._client._respond_stream(request, self._last_text(contents))
+
+
+class FakeCachedContent:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _FakeCaches:
+    """明確 content cache 替身：記錄 create / update / delete，過期或刪除後引用會失敗"""
+
+    def __init__(self, client: FakeGeminiClient):
+        self._client = client
+        self._caches: dict[str, dict] = {}
+        self.events: list[tuple[str, str]] = []
+
+    @staticmethod
+    def _ttl_seconds(config) -> float:
+        ttl = config_value(config, "ttl") or "3600s"
+        return float(str(ttl).rstrip("s"))
+
+    def lookup(self, name: str) -> dict:
+        cache = self._caches.get(name)
+        if cache is None or cache["expires_at"] <= time.time():
+            raise RuntimeError(f"cached content not found or expired: {name}")
+        return cache
+
+    def create(self, model, config=None):
+        name = f"cachedContents/fake-{len(self.events) + 1}"
+        self._caches[name] = {
+            "model": model,
+            "system_instruction": content_text(config_value(config, "system_instruction")),
+            "expires_at": time.time() + self._ttl_seconds(config),
+        }
+        self.events.append(("create", name))
+        return FakeCachedContent(name)
+
+    def update(self, name, config=None):
+        cache = self.lookup(name)
+        cache["expires_at"] = time.time() + self._ttl_seconds(config)
+        self.events.append(("update", name))
+        return FakeCachedContent(name)
+
+    def delete(self, name):
+        self._caches.pop(name, None)
+        self.events.append(("delete", name))
+
+
+class _FakeChats:
+    def __init__(self, client: FakeGeminiClient):
+        self._client = client
+
+    def create(self, model, config=None, history=None):
+        return FakeChat(self._client, model, config, history)
+
+
+class FakeChat:
+    """Chat session 替身：自動累積 user / model 歷史"""
+
+    def __init__(self, client: FakeGeminiClient, model: str, config=None, history=None):
+        self._client = client
+        self._model = model
+        self._config = config
+        self._history = list(history or [])
+
+    def get_history(self):
+        return list(self._history)
+
+    def send_message(self, message, config=None):
+        contents = self._history + [FakeContent("user", content_text(message))]
+        request = self._client._record("chat", self._model, contents, config or self._config)
+        response = self._client._respond(request, content_text(message))
+        self._history = contents + [FakeContent("model", response.text)]
+        return response
+
+    def send_message_stream(self, message, config=None):
+        contents = self._history + [FakeContent("user", content_text(message))]
+        request = self._client._record("chat_stream", self._model, contents, config or self._config)
+        accumulated = ""
+        for chunk in self._client._respond_stream(request, content_text(message)):
+            accumulated += chunk.text
+            yield chunk
+        self._history = contents + [FakeContent("model", accumulated)]
+
+
+# ----------------------------------------------------------------------
+# Deepgram
+# ----------------------------------------------------------------------
+
+
+class FakeAlternative:
+    def __init__(self, transcript: str):
+        self.transcript = transcript
+
+
+class FakeChannel:
+    def __init__(self, transcript: str):
+        self.alternatives = [FakeAlternative(transcript)]
+
+
+class FakeResultsMessage:
+    """Deepgram Results 訊息替身（只帶 Transcriber 會讀的欄位）"""
+
+    type = "Results"
+
+    def __init__(self, transcript: str, start: float, end: float,
+                 is_final: bool, speech_final: bool, from_finalize: bool = False):
+        self.channel = FakeChannel(transcript)
+        self.start = start
+        self.duration = end - start
+        self.is_final = is_final
+        self.speech_final = speech_final
+        self.from_finalize = from_finalize
+
+
+_PCM_STAMP = struct.Struct("<d")
+
+
+def stamp_pcm(start_sec: float, data: bytes) -> bytes:
+    """在 PCM chunk 開頭寫入其串流時間，讓替身得知重連後重播的起點"""
+    return _PCM_STAMP.pack(start_sec) + data[_PCM_STAMP.size:]
+
+
+def _event_name(event) -> str:
+    return str(getattr(event, "value", event)).lower()
+
+
+class FakeDeepgramClient:
+    """
+    Deepgram listen v1 本地替身
+
+    依 script 中的 (start_sec, end_sec, text) 回應：收到的音訊時間越過 start 時送出 interim，
+    越過 end 時送出 final（speech_final=True）；Finalize 時把已開始的句子全部落地。
+    音訊時間由收到的 PCM bytes 與 connect 參數（sample_rate / channels）換算。
+
+    stamped_audio=True 時，每條連線以第一個 chunk 的 stamp_pcm() 時間為起點（script 為串流時間），
+    回傳的時間戳與真實服務相同，以連線起點為 0；起點之前已結束的句子不會再出現。
+
+    Args:
+        script: [(start_sec, end_sec, text), ...]，依時間排序
+        per_chunk_latency_sec: 每個 send_media 的處理延遲（模擬服務端吞吐上限）
+        stamped_audio: 是否從 PCM 讀取 stamp_pcm() 寫入的串流時間
+        fail_connects: 接下來幾次連線直接失敗（模擬服務暫時無法連線）
+    """
+
+    def __init__(self, script: list[tuple[float, float, str]], per_chunk_latency_sec: float = 0.0,
+                 stamped_audio: bool = False, fail_connects: int = 0):
+        self.script = sorted(script)
+        self.per_chunk_latency_sec = per_chunk_latency_sec
+        self.stamped_audio = stamped_audio
+        self.fail_connects = fail_connects
+        self.connect_calls: list[dict] = []
+        self.connections: list["FakeDeepgramConnection"] = []
+        self.listen = _FakeListen(self)
+
+
+class _FakeListen:
+    def __init__(self, client: FakeDeepgramClient):
+        self.v1 = _FakeListenV1(client)
+
+
+class _FakeListenV1:
+    def __init__(self, client: FakeDeepgramClient):
+        self._client = client
+
+    def connect(self, **kwargs):
+        self._client.connect_calls.append(kwargs)
+        return _FakeListenContext(self._client, kwargs)
+
+
+class _FakeListenContext:
+    def __init__(self, client: FakeDeepgramClient, options: dict):
+        self._client = client
+        self._options = options
+        self._connection: Optional[FakeDeepgramConnection] = None
+
+    def __enter__(self):
+        if self._client.fail_connects > 0:
+            self._client.fail_connects -= 1
+            raise ConnectionError("stand-in connect failure")
+        self._connection = FakeDeepgramConnection(self._client, self._options)
+        self._client.connections.append(self._connection)
+        return self._connection
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._connection:
+            self._connection.close()
+        return False
+
+
+class FakeDeepgramConnection:
+    """WebSocket 連線替身：訊息在 start_listening() 的執行緒中派送，與 SDK 相同"""
+
+    def __init__(self, client: FakeDeepgramClient, options: dict):
+        self._client = client
+        sample_rate = int(options.get("sample_rate", 24000))
+        channels = int(options.get("channels", 1))
+        self._bytes_per_second = sample_rate * channels * 2
+        self._handlers: dict[str, list[Callable]] = {}
+        self._messages: queue.Queue = queue.Queue()
+        self._next_event = 0
+        self._interim_sent = set()
+        self._origin_sec: Optional[float] = None
+        self.received_bytes = 0
+        self.controls: list[str] = []
+        self.closed = False
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.received_bytes / self._bytes_per_second
+
+    @property
+    def pending_messages(self) -> int:
+        """已產生但尚未派送給 listener 的訊息數"""
+        return self._messages.qsize()
+
+    def on(self, event, handler) -> None:
+        self._handlers.setdefault(_event_name(event), []).append(handler)
+
+    def start_listening(self) -> None:
+        while True:
+            message = self._messages.get()
+            if message is None:
+                return
+            for handler in self._handlers.get("message", []):
+                handler(message)
+
+    def send_media(self, message) -> None:
+        if self.closed:
+            raise RuntimeError("connection closed")
+        data = getattr(message, "data", message)
+        if self._origin_sec is None:
+            self._origin_sec = _PCM_STAMP.unpack_from(data)[0] if self._client.stamped_audio else 0.0
+        self.received_bytes += len(data)
+        if self._client.per_chunk_latency_sec:
+            time.sleep(self._client.per_chunk_latency_sec)
+        self._advance(self.audio_seconds, finalize=False)
+
+    def send_control(self, message) -> None:
+        control_type = getattr(message, "type", message)
+        self.controls.append(control_type)
+        if control_type == "Finalize":
+            self._advance(self.audio_seconds, finalize=True)
+            self._messages.put(FakeResultsMessage("", self.audio_seconds, self.audio_seconds,
+                                                  is_final=True, speech_final=False,
+                                                  from_finalize=True))
+        elif control_type == "CloseStream":
+            self.close()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._messages.put(None)
+
+    def drop(self) -> None:
+        """模擬連線意外中斷：尚未送出的結果遺失，之後 send_media 失敗"""
+        if not self.closed:
+            self.closed = True
+            try:
+                while True:
+                    self._messages.get_nowait()
+            except queue.Empty:
+                pass
+            self._messages.put(None)
+
+    def _advance(self, now: float, finalize: bool) -> None:
+        """now 為連線內時間；script 與 origin 為串流時間"""
+        origin = self._origin_sec or 0.0
+        now += origin
+        script = self._client.script
+        while self._next_event < len(script):
+            start, end, text = script[self._next_event]
+            if end <= origin:
+                # 連線起點前已結束的句子，這條連線聽不到
+                self._next_event += 1
+                continue
+            start = max(start, origin)
+            if end <= now or (finalize and start < now):
+                self._messages.put(FakeResultsMessage(text, start - origin, min(end, now) - origin,
+                                                      is_final=True, speech_final=True))
+                self._interim_sent.discard(self._next_event)
+                self._next_event += 1
+                continue
+            if start < now and self._next_event not in self._interim_sent:
+                self._interim_sent.add(self._next_event)
+                self._messages.put(FakeResultsMessage(text[: max(1, len(text) // 2)], start - origin,
+                                                      now - origin, is_final=False, speech_final=False))
+            break
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+字幕 journal（append-only autosave）
+每個 subtitle / translation_update 追加一行 JSON 到 journal 檔，背景執行緒批次 fsync；
+前句修正只追加 update 紀錄（讀取時以最後一筆為準），不需改寫既有內容。
+程式中途結束時最後一行可能不完整，讀取時略過。
+
+紀錄格式（JSON Lines）：
+    {"op": "subtitle", "id": ..., "original": ..., "translation": ..., "start": 1.2, "end": 3.4, "at": 1700000000.0}
+    {"op": "update", "id": ..., "translation": ..., "at": 1700000001.0}
+start / end 為音訊時間（秒，自串流開始），未知時為 null
+
+匯出 SRT（串流讀取，記憶體只保留修正紀錄）:
+    python subtitle_journal.py session.jsonl -o session.srt [--mode bilingual|original|translation]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+from logger import get_logger
+from srt_format import EXPORT_MODE_BILINGUAL, EXPORT_MODES, format_srt_entry
+
+log = get_logger("Journal")
+
+OP_SUBTITLE = "subtitle"
+OP_UPDATE = "update"
+# 沒有音訊時間時的預估字幕長度（與 App 端匯出一致）
+FALLBACK_DURATION_SEC = 3.0
+
+
+class SubtitleJournal:
+    """
+    Append-only 字幕 journal
+
+    Args:
+        path: journal 檔路徑（不存在時建立，存在時接續追加）
+        fsync_interval_sec: 批次 fsync 的最長間隔
+        fsync_batch: 累積多少筆未同步紀錄時提前 fsync
+    """
+
+    def __init__(self, path: str, fsync_interval_sec: float = 1.0, fsync_batch: int = 32):
+        self.path = path
+        self.fsync_interval_sec = fsync_interval_sec
+        self.fsync_batch = max(1, fsync_batch)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._cond = threading.Condition()
+        self._unsynced = 0
+        self._closed = False
+        # transcript id → 音訊時間範圍，subtitle 落地時取用
+        self._spans: dict[str, tuple[float, float]] = {}
+        self.sync_count = 0
+
+        self._thread = threading.Thread(target=self._sync_loop, daemon=True)
+        self._thread.start()
+
+    def note_span(self, transcript_id: str, span: Optional[tuple[float, float]]) -> None:
+        """記錄句子的音訊時間範圍（轉錄時呼叫，翻譯完成後寫入 subtitle 紀錄）"""
+        if span is None:
+            return
+        with self._cond:
+            self._spans[transcript_id] = span
+
+    def record_subtitle(self, transcript_id: str, original: str, translation: Optional[str]) -> None:
+        with self._cond:
+            start, end = self._spans.pop(transcript_id, (None, None))
+        self._append({
+            "op": OP_SUBTITLE,
+            "id": transcript_id,
+            "original": original,
+            "translation": translation,
+            "start": start,
+            "end": end,
+            "at": time.time(),
+        })
+
+    def record_update(self, transcript_id: str, translation: str) -> None:
+        self._append({
+            "op": OP_UPDATE,
+            "id": transcript_id,
+            "translation": translation,
+            "at": time.time(),
+        })
+
+    def _append(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._cond:
+            if self._closed:
+                return
+            self._file.write(line)
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch:
+                self._cond.notify()
+
+    def _sync_loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and self._unsynced < self.fsync_batch:
+                    self._cond.wait(self.fsync_interval_sec)
+                if self._closed:
+                    return
+                if not self._unsynced:
+                    continue
+                # 只在鎖內交給 OS，fsync 在鎖外進行，不阻塞寫入端
+                self._file.flush()
+                self._unsynced = 0
+                fd = self._file.fileno()
+            try:
+                os.fsync(fd)
+                self.sync_count += 1
+            except OSError as e:
+                log.warning("fsync failed: %s", e)
+
+    def close(self) -> None:
+        """同步剩餘紀錄並關閉檔案"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=2)
+        with self._cond:
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.sync_count += 1
+            finally:
+                self._file.close()
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """逐行讀取 journal，略過不完整或損毀的行"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and record.get("id"):
+                yield record
+
+
+def iter_subtitles(path: str) -> Iterator[dict]:
+    """
+    依寫入順序輸出字幕，translation 已套用最後一筆修正
+
+    兩趟讀取：第一趟只收集 update（數量遠少於字幕），第二趟串流輸出 subtitle
+    """
+    updates: dict[str, str] = {}
+    for record in iter_records(path):
+        if record.get("op") == OP_UPDATE:
+            updates[record["id"]] = record.get("translation")
+
+    for record in iter_records(path):
+        if record.get("op") == OP_SUBTITLE:
+            if record["id"] in updates:
+                record["translation"] = updates[record["id"]]
+            yield record
+
+
+def export_srt(journal_path: str, output, mode: str = EXPORT_MODE_BILINGUAL) -> int:
+    """
+    將 journal 串流匯出為 SRT
+
+    Args:
+        output: 可寫入文字的檔案物件
+
+    Returns:
+        輸出的字幕數
+    """
+    count = 0
+    last_end = 0.0
+    for record in iter_subtitles(journal_path):
+        start = record.get("start")
+        end = record.get("end")
+        if start is None:
+            start = last_end
+        if end is None or end <= start:
+            end = start + FALLBACK_DURATION_SEC
+        last_end = end
+        count += 1
+        output.write(format_srt_entry(count, start, end, record.get("original", ""),
+                                      record.get("translation"), mode))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a subtitle journal to SRT")
+    parser.add_argument("journal", help="journal 檔（JSON Lines）")
+    parser.add_argument("-o", "--output", help="輸出 SRT 路徑（預設為 journal 檔名改 .srt）")
+    parser.add_argument("--mode", choices=EXPORT_MODES, default=EXPORT_MODE_BILINGUAL)
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.splitext(args.journal)[0] + ".srt"
+    with open(output_path, "w", encoding="utf-8") as output:
+        count = export_srt(args.journal, output, args.mode)
+    log.info("Exported %d subtitles -> %s", count, output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import io
+import unittest
+
+from test_context_correction_flow import _load_module
+
+
+class _TrickleStream(io.RawIOBase):
+    """每次 readinto 最多給 step bytes（模擬 pipe 的 short read）"""
+
+    def __init__(self, data: bytes, step: int):
+        self._data = data
+        self._position = 0
+        self._step = step
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._data[self._position:self._position + min(self._step, len(buffer))]
+        buffer[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+class FrameReaderTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = _load_module("audio_ingest_under_test", "audio_ingest.py")
+
+    def test_frame_bytes_are_clamped_and_sample_aligned(self):
+        frame_bytes_for = self.module.frame_bytes_for
+        self.assertEqual(frame_bytes_for(100, 24000, 2), 9600)
+        self.assertEqual(frame_bytes_for(5, 24000, 2), frame_bytes_for(20, 24000, 2))
+        self.assertEqual(frame_bytes_for(1000, 24000, 2), frame_bytes_for(200, 24000, 2))
+        self.assertEqual(frame_bytes_for(20, 44100, 2) % 4, 0)
+
+    def test_short_reads_are_assembled_into_whole_frames(self):
+        data = bytes(range(256)) * 4 + b"\x01\x02\x03"
+        reader = self.module.FrameReader(_TrickleStream(data, step=7), frame_bytes=100, block_align=4)
+
+        frames = [bytes(frame) for frame in reader]
+
+        self.assertEqual([len(f) for f in frames], [100] * 10 + [24])
+        self.assertEqual(b"".join(frames), data[:1024])
+        self.assertEqual(reader.discarded_bytes, 3)
+        self.assertGreater(reader.short_reads, 0)
+
+    def test_slots_are_reused_without_allocation(self):
+        data = bytes(range(200)) * 2
+        reader = self.module.FrameReader(io.BytesIO(data), frame_bytes=40, block_align=4, slots=2)
+
+        first = reader.read_frame()
+        second = reader.read_frame()
+        self.assertEqual(bytes(first), data[:40])
+        third = reader.read_frame()
+        # 繞一圈後 slot 被覆寫
+        self.assertEqual(bytes(first), data[80:120])
+        self.assertIs(first, third)
+        self.assertEqual(bytes(second), data[40:80])
+
+    def test_pcm_ring_keeps_latest_bytes_across_wrap(self):
+        ring = self.module.PcmRing(10)
+        ring.append(b"abcdef")
+        ring.append(memoryview(b"ghijkl"))
+        self.assertEqual(ring.oldest_position, 2)
+        self.assertEqual(b"".join(bytes(s) for s in ring.segments(0, 4)), b"cdefghijkl")
+        self.assertEqual(b"".join(bytes(s) for s in ring.segments(8, 100)), b"ijkl")
+
+        ring.append(b"0123456789ABC")
+        self.assertEqual(b"".join(bytes(s) for s in ring.segments(0, 100)), b"3456789ABC")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -80,6 +80,8 @@ def _install_translator_stubs() -> None:
 
     types_module.ThinkingConfig = DummyThinkingConfig
     types_module.GenerateContentConfig = DummyGenerateContentConfig
+    types_module.CreateCachedContentConfig = DummyGenerateContentConfig
+    types_module.UpdateCachedContentConfig = DummyGenerateContentConfig
     types_module.Content = DummyContent
     types_module.Part = DummyPart
 
@@ -204,7 +206,12 @@ class TranslatorPromptBranchTests(unittest.TestCase):
         translator._target_label = "target"
         translator._context_correction_template = "CTX:{current_text}|{prev_text}|{prev_translation}"
         translator._simple_translate_template = "SIMPLE:{text}"
+        translator._context_reference_template = None
+        translator._history_tail_source = None
+        translator._turns_since_rebuild = 0
         translator._total_tokens = 0
+        translator.history_mode = self.translator_module.HISTORY_MODE_CHAT
+        translator.extra_target_languages = []
         translator.max_context_tokens = 999999
         translator._summarize_and_rebuild = lambda: None
         translator._fallback_translate = lambda text: f"FB:{text}"
@@ -253,5 +260,307 @@ class TranslatorPromptBranchTests(unittest.TestCase):
         self.assertTrue(observed["prompt"].startswith("SIMPLE:"))
 
 
+class TranslatorWindowHistoryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_translator_stubs()
+        cls.translator_module = _load_module("translator_window_under_test", "translator.py")
+        cls.stand_ins = _load_module("stand_ins_under_test", "stand_ins.py")
+
+    def _run_turns(self, history_mode, turns, window_turns=4):
+        client = self.stand_ins.FakeGeminiClient()
+        translator = self.translator_module.Translator(
+            api_key="dummy",
+            model="test-model",
+            history_mode=history_mode,
+            history_window_turns=window_turns,
+            client=client,
+        )
+        prev_text = prev_translation = None
+        for index in range(turns):
+            text = f"line-{index:03d}"
+            current, _ = translator.translate_with_context_correction_streaming(
+                text, prev_text, prev_translation
+            )
+            prev_text, prev_translation = text, current
+        return translator, client
+
+    def test_window_mode_keeps_prompt_size_bounded(self):
+        _, chat_client = self._run_turns("chat", 30)
+        _, window_client = self._run_turns("window", 30)
+
+        chat_tokens = [r["prompt_tokens"] for r in chat_client.requests if r["kind"] == "chat_stream"]
+        window_tokens = [
+            r["prompt_tokens"] for r in window_client.requests
+            if r["kind"] == "generate_content_stream"
+        ]
+
+        self.assertEqual(len(window_tokens), 30)
+        self.assertGreater(chat_tokens[-1], chat_tokens[10] * 2)
+        # 視窗填滿後，prompt 大小只受滾動摘要長度影響
+        self.assertLess(max(window_tokens[10:]), min(window_tokens[10:]) * 1.5)
+
+    def test_evicted_turns_roll_into_summary_handover(self):
+        translator, client = self._run_turns("window", 9, window_turns=4)
+
+        summary_requests = [r for r in client.requests if r["kind"] == "generate_content"]
+        self.assertEqual(len(summary_requests), 1)
+        self.assertTrue(translator._context_summary)
+        self.assertEqual(len(translator._window_turns), 4)
+
+        last_contents = client.requests[-1]["contents"]
+        first_text = self.stand_ins.content_text(last_contents[0])
+        self.assertIn(translator._context_summary, first_text)
+
+    def test_unknown_history_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.translator_module.Translator(
+                api_key="dummy", history_mode="bogus", client=self.stand_ins.FakeGeminiClient()
+            )
+
+
+class TranslatorCompactHistoryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_translator_stubs()
+        cls.translator_module = _load_module("translator_compact_under_test", "translator.py")
+        cls.stand_ins = _load_module("stand_ins_compact_under_test", "stand_ins.py")
+
+    def _make_translator(self, compact_history, max_context_tokens=20_000):
+        client = self.stand_ins.FakeGeminiClient()
+        translator = self.translator_module.Translator(
+            api_key="dummy",
+            model="test-model",
+            max_context_tokens=max_context_tokens,
+            compact_history=compact_history,
+            client=client,
+        )
+        return translator, client
+
+    def _drive(self, translator, turns):
+        prev_text = prev_translation = None
+        for index in range(turns):
+            text = f"これは{index}番目のテスト文です"
+            current, _ = translator.translate_with_context_correction_streaming(
+                text, prev_text, prev_translation
+            )
+            prev_text, prev_translation = text, current
+
+    def test_compact_turn_references_previous_line_from_history(self):
+        translator, client = self._make_translator(compact_history=True)
+        self._drive(translator, 2)
+
+        first_prompt = self.stand_ins.content_text(client.requests[0]["contents"][-1])
+        second_prompt = self.stand_ins.content_text(client.requests[1]["contents"][-1])
+
+        self.assertEqual(first_prompt, "原：これは0番目のテスト文です")
+        self.assertEqual(second_prompt, "原：これは1番目のテスト文です\n前譯：譯:これは0番目のテスト文です")
+        system_instruction = self.stand_ins.config_value(client.requests[0]["config"], "system_instruction")
+        self.assertIn("修正時機", system_instruction)
+
+    def test_compact_turn_includes_previous_source_after_rebuild(self):
+        translator, client = self._make_translator(compact_history=True)
+        self._drive(translator, 1)
+        translator._rebuild_session()
+
+        translator.translate_with_context_correction_streaming("次", "これは0番目のテスト文です", "前")
+        prompt = self.stand_ins.content_text(client.requests[-1]["contents"][-1])
+        self.assertIn("前：これは0番目のテスト文です", prompt)
+
+    def test_compact_history_fits_more_turns_per_rebuild(self):
+        legacy, _ = self._make_translator(compact_history=False, max_context_tokens=4_000)
+        compact, _ = self._make_translator(compact_history=True, max_context_tokens=4_000)
+        self._drive(legacy, 60)
+        self._drive(compact, 60)
+
+        self.assertTrue(legacy.rebuild_turn_counts)
+        self.assertTrue(compact.rebuild_turn_counts)
+        self.assertGreater(compact.rebuild_turn_counts[0], legacy.rebuild_turn_counts[0] * 2)
+
+
+class TranslatorExplicitCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_translator_stubs()
+        cls.translator_module = _load_module("translator_cache_under_test", "translator.py")
+        cls.stand_ins = _load_module("stand_ins_cache_under_test", "stand_ins.py")
+
+    def setUp(self):
+        self.translator_module._PREFIX_CACHES.clear()
+
+    def _make_translator(self, client, context="長い背景資訊" * 50):
+        return self.translator_module.Translator(
+            api_key="dummy",
+            model="test-model",
+            translation_context=context,
+            explicit_cache=True,
+            client=client,
+        )
+
+    def test_requests_point_at_cached_prefix_instead_of_inline_instruction(self):
+        client = self.stand_ins.FakeGeminiClient()
+        first = self._make_translator(client)
+        second = self._make_translator(client)
+
+        first.translate_with_context_correction_streaming("一", None, None)
+        second.translate_with_context_correction_streaming("二", None, None)
+
+        self.assertEqual([event for event, _ in client.caches.events], ["create"])
+        for request in client.requests:
+            self.assertIsNotNone(request["cached_content"])
+            self.assertIsNone(self.stand_ins.config_value(request["config"], "system_instruction"))
+            self.assertEqual(request["prefix"], first._system_instruction)
+            self.assertGreater(request["cached_tokens"], 0)
+
+    def test_cache_is_refreshed_before_expiry(self):
+        client = self.stand_ins.FakeGeminiClient()
+        translator = self._make_translator(client)
+        translator.translate_with_context_correction_streaming("一", None, None)
+
+        # 模擬 TTL 只剩 1 秒
+        entry = self.translator_module._PREFIX_CACHES[translator._cache_key]
+        entry["expires_at"] = time.time() + 1
+        translator._cache_expires_at = entry["expires_at"]
+        translator.translate_with_context_correction_streaming("二", "一", "譯:一")
+
+        self.assertEqual([event for event, _ in client.caches.events], ["create", "update"])
+        self.assertEqual(client.requests[-1]["cached_content"], client.requests[0]["cached_content"])
+
+    def test_falls_back_to_inline_instruction_when_cache_creation_fails(self):
+        client = self.stand_ins.FakeGeminiClient()
+
+        def failing_create(model, config=None):
+            raise RuntimeError("content too small for caching")
+
+        client.caches.create = failing_create
+        translator = self._make_translator(client, context="")
+        current, _ = translator.translate_with_context_correction_streaming("一", None, None)
+
+        self.assertEqual(current, "譯:一")
+        self.assertFalse(translator.explicit_cache)
+        self.assertIsNone(client.requests[-1]["cached_content"])
+        self.assertEqual(client.requests[-1]["prefix"], translator._system_instruction)
+
+    def test_close_deletes_cache_after_last_session(self):
+        client = self.stand_ins.FakeGeminiClient()
+        first = self._make_translator(client)
+        second = self._make_translator(client)
+        first.translate_with_context_correction_streaming("一", None, None)
+        second.translate_with_context_correction_streaming("二", None, None)
+
+        first.close()
+        self.assertNotIn("delete", [event for event, _ in client.caches.events])
+        second.close()
+        self.assertEqual(client.caches.events[-1][0], "delete")
+
+
+class TranslatorBatchTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_translator_stubs()
+        cls.translator_module = _load_module("translator_batch_under_test", "translator.py")
+        cls.stand_ins = _load_module("stand_ins_batch_under_test", "stand_ins.py")
+
+    def test_batch_results_are_split_back_by_id(self):
+        client = self.stand_ins.FakeGeminiClient()
+        translator = self.translator_module.Translator(api_key="dummy", model="test-model", client=client)
+
+        translations, correction = translator.translate_batch(
+            [("id-1", "一"), ("id-2", "二"), ("id-3", "三")],
+            prev_text="前", prev_translation="譯:前",
+        )
+
+        self.assertEqual(translations, {"id-1": "譯:一", "id-2": "譯:二", "id-3": "譯:三"})
+        self.assertIsNone(correction)
+        self.assertEqual(len(client.requests), 1)
+        request = client.requests[0]
+        self.assertIs(self.stand_ins.config_value(request["config"], "response_schema"),
+                      self.translator_module.BatchTranslationResult)
+        self.assertIn("前句翻譯：譯:前", self.stand_ins.content_text(request["contents"][-1]))
+
+    def test_first_result_correction_applies_to_previous_line(self):
+        def responder(prompt):
+            return ('{"results": [{"id": "b1", "current": "甲", "correction": "修正"},'
+                    ' {"id": "b2", "current": "乙", "correction": "ignored"}]}')
+
+        client = self.stand_ins.FakeGeminiClient(responder=responder)
+        translator = self.translator_module.Translator(api_key="dummy", model="test-model", client=client)
+
+        translations, correction = translator.translate_batch(
+            [("id-1", "一"), ("id-2", "二"), ("id-3", "三")], "前", "舊",
+        )
+
+        self.assertEqual(translations, {"id-1": "甲", "id-2": "乙"})
+        self.assertEqual(correction, "修正")
+
+    def test_correction_is_read_from_b1_even_when_reordered(self):
+        def responder(prompt):
+            return ('{"results": [{"id": "b2", "current": "乙", "correction": "ignored"},'
+                    ' {"id": "b1", "current": "甲", "correction": "修正"}]}')
+
+        client = self.stand_ins.FakeGeminiClient(responder=responder)
+        translator = self.translator_module.Translator(api_key="dummy", model="test-model", client=client)
+
+        translations, correction = translator.translate_batch([("id-1", "一"), ("id-2", "二")], "前", "舊")
+
+        self.assertEqual(translations, {"id-1": "甲", "id-2": "乙"})
+        self.assertEqual(correction, "修正")
+
+
+class TranslatorMultiTargetTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_translator_stubs()
+        cls.translator_module = _load_module("translator_multi_under_test", "translator.py")
+        cls.stand_ins = _load_module("stand_ins_multi_under_test", "stand_ins.py")
+
+    def _make_translator(self, responder, extra=("en", "ja")):
+        client = self.stand_ins.FakeGeminiClient(responder=responder)
+        translator = self.translator_module.Translator(
+            api_key="dummy", model="test-model", client=client,
+            extra_target_languages=list(extra),
+        )
+        return translator, client
+
+    def test_extra_languages_share_one_request(self):
+        translator, client = self._make_translator(self.stand_ins.multi_target_responder(["en", "ko"]))
+
+        current, _ = translator.translate_with_context_correction_streaming("今日は")
+
+        self.assertEqual(current, "譯:今日は")
+        # 未設定的語言（ko）忽略，模型沒回傳的語言（ja）不出現
+        self.assertEqual(translator.last_extra_translations, {"en": "en:今日は"})
+        self.assertEqual(len(client.requests), 1)
+        request = client.requests[0]
+        self.assertIs(self.stand_ins.config_value(request["config"], "response_schema"),
+                      self.translator_module.MultiTargetTranslationResult)
+        self.assertIn('"extra"', request["prefix"])
+        self.assertIn("英文", request["prefix"])
+
+    def test_primary_language_is_not_duplicated_as_extra(self):
+        translator, _ = self._make_translator(self.stand_ins.default_responder, extra=("zh-TW", "en", "en"))
+
+        self.assertEqual(translator.extra_target_languages, ["en"])
+
+    def test_batch_extras_are_keyed_by_transcript_id(self):
+        translator, _ = self._make_translator(self.stand_ins.multi_target_responder(["en"]))
+
+        translations, _ = translator.translate_batch([("id-1", "一"), ("id-2", "二"), ("id-3", "三")])
+
+        self.assertEqual(len(translations), 3)
+        self.assertEqual(translator.last_batch_extra_translations["id-2"], {"en": "en:二"})
+
+    def test_without_extra_languages_schema_is_unchanged(self):
+        client = self.stand_ins.FakeGeminiClient()
+        translator = self.translator_module.Translator(api_key="dummy", model="test-model", client=client)
+
+        translator.translate_with_context_correction_streaming("今日は")
+
+        self.assertIs(self.stand_ins.config_value(client.requests[0]["config"], "response_schema"),
+                      self.translator_module.TranslationResult)
+        self.assertNotIn('"extra"', client.requests[0]["prefix"])
+        self.assertEqual(translator.last_extra_translations, {})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class CorrectionPredictorTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        cls.module = _load_module("correction_predictor_under_test", "correction_predictor.py")
+
+    def test_incomplete_previous_line_always_corrects(self):
+        predictor = self.module.CorrectionPredictor()
+        self.assertTrue(predictor.should_correct("今日は雨が [暫停]", "降っていました。", gap_sec=10.0))
+
+    def test_fragment_or_continuation_corrects(self):
+        predictor = self.module.CorrectionPredictor()
+        self.assertTrue(predictor.should_correct("駅まで歩くのをやめて", "バスに乗りました"))
+        self.assertTrue(predictor.should_correct("雨が降っていたので、", "バスに乗りました"))
+        self.assertTrue(predictor.should_correct("昨日は忙しかった", "けど楽しかった"))
+
+    def test_complete_line_after_long_pause_skips(self):
+        predictor = self.module.CorrectionPredictor()
+        self.assertFalse(predictor.should_correct("今日はいい天気ですね", "散歩に行きましょう", gap_sec=1.0))
+        self.assertFalse(predictor.should_correct("彼は今日仕事だって。", "また今度にしよう。", gap_sec=5.0))
+
+    def test_punctuated_stream_treats_missing_period_as_cut(self):
+        predictor = self.module.CorrectionPredictor()
+        self.assertFalse(predictor.should_correct("今日はいい天気ですね。", "散歩に行きましょう。"))
+        # 有標點的轉錄結果中沒有句尾標點：句子在中途被切斷
+        self.assertTrue(predictor.should_correct("新しいプロジェクトの話を聞いて正直なところ少し驚", "きました。"))
+
+    def test_keyterms_and_references_raise_score(self):
+        predictor = self.module.CorrectionPredictor(keyterms=["田中"])
+        self.assertTrue(predictor.should_correct("田中さんも来るって", "楽しみだね", gap_sec=0.3))
+        self.assertGreater(
+            predictor.score("それは残念だね", "また今度にしよう"),
+            predictor.score("今日はいい天気ですね", "また今度にしよう"),
+        )
+
+
+class PredictedCorrectionSessionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_predictor_under_test", "stand_ins.py")
+        cls.session = _load_module("session_predictor_under_test", "session.py")
+
+    def _prompts(self, env, lines):
+        settings = self.session.SessionSettings.from_env(dict(env, SUBTITLE_MAX_AGE_SEC="0"))
+        client = self.stand_ins.FakeGeminiClient()
+        session = self.session.SubtitleSession(
+            settings, lambda message: None, gemini_client=client,
+            deepgram_client=self.stand_ins.FakeDeepgramClient([]),
+        )
+        session.start()
+        for index, text in enumerate(lines):
+            session._on_transcript(f"t{index}", text)
+            session.translation_queue.wait_idle(2)
+        session.close()
+        return [self.stand_ins.content_text(r["contents"]) for r in client.requests]
+
+    def test_predictor_drops_previous_line_only_when_unlikely_to_help(self):
+        lines = ["今日はいい天気ですね。", "散歩に行きましょう。", "駅まで歩くのをやめて", "バスに乗りました。"]
+        always = self._prompts({}, lines)
+        predicted = self._prompts({"CORRECTION_PREDICTOR": "1"}, lines)
+
+        self.assertEqual(["前譯" in prompt for prompt in always], [False, True, True, True])
+        self.assertEqual(["前譯" in prompt for prompt in predicted], [False, False, False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class CorrectionReviewerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = _load_module("correction_reviewer_under_test", "correction_reviewer.py")
+
+    def setUp(self):
+        self.now = [100.0]
+        self.busy = [False]
+        self.calls = []
+        self.corrections = []
+        self.reviewed = threading.Event()
+
+    def _reviewer(self, responses=None, **kwargs):
+        responses = responses or {}
+
+        def review(lines):
+            self.calls.append(lines)
+            self.reviewed.set()
+            return {line[0]: responses[line[0]] for line in lines if line[3] and line[0] in responses}
+
+        reviewer = self.module.CorrectionReviewer(
+            review=review,
+            on_correction=lambda transcript_id, text: self.corrections.append((transcript_id, text)),
+            is_busy=lambda: self.busy[0],
+            clock=lambda: self.now[0],
+            **kwargs,
+        )
+        reviewer.start()
+        self.addCleanup(reviewer.close, False)
+        return reviewer
+
+    def _wait_review(self):
+        self.assertTrue(self.reviewed.wait(2))
+        self.reviewed.clear()
+
+    def test_batch_waits_for_following_line(self):
+        reviewer = self._reviewer({"a": "譯:今日は雨で"}, batch_size=2, max_delay_sec=60)
+        for transcript_id in ("a", "b"):
+            reviewer.add(transcript_id, f"src-{transcript_id}", f"tr-{transcript_id}")
+        time.sleep(0.2)
+        # 第二句沒有後文，還不能湊滿一批
+        self.assertEqual(self.calls, [])
+
+        reviewer.add("c", "src-c", "tr-c")
+        self._wait_review()
+        self.assertEqual(self.calls[0], [
+            ("a", "src-a", "tr-a", True),
+            ("b", "src-b", "tr-b", True),
+            ("c", "src-c", "tr-c", False),
+        ])
+        self.assertEqual(self.corrections, [("a", "譯:今日は雨で")])
+        self.assertEqual(reviewer.pending(), 1)
+
+    def test_busy_worker_defers_until_overdue(self):
+        reviewer = self._reviewer(batch_size=1, max_delay_sec=4.0)
+        self.busy[0] = True
+        reviewer.add("a", "src-a", "tr-a")
+        reviewer.add("b", "src-b", "tr-b")
+        time.sleep(0.3)
+        self.assertEqual(self.calls, [])
+
+        self.now[0] += 4.0
+        self._wait_review()
+        self.assertEqual([line[0] for line in self.calls[0] if line[3]], ["a"])
+
+    def test_close_flushes_last_line_with_corrected_context(self):
+        reviewer = self._reviewer({"a": "fixed-a"}, batch_size=1, max_delay_sec=60)
+        reviewer.add("a", "src-a", "tr-a")
+        reviewer.add("b", "src-b", "tr-b")
+        self._wait_review()
+
+        reviewer.close()
+        # 最後一句在關閉時檢查，前文為修正後的翻譯
+        self.assertEqual(self.calls[1], [("a", "src-a", "fixed-a", False), ("b", "src-b", "tr-b", True)])
+
+    def test_close_does_not_wait_forever_on_stuck_review(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def review(lines):
+            self.reviewed.set()
+            release.wait(5)
+            return {}
+
+        reviewer = self.module.CorrectionReviewer(review=review, on_correction=lambda *args: None, batch_size=1)
+        reviewer.JOIN_TIMEOUT_SEC = 0.2
+        reviewer.start()
+        reviewer.add("a", "src-a", "tr-a")
+        reviewer.add("b", "src-b", "tr-b")
+        self._wait_review()
+
+        started_at = time.time()
+        reviewer.close()
+        self.assertLess(time.time() - started_at, 1.0)
+
+
+class DeferredCorrectionSessionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_review_under_test", "stand_ins.py")
+        cls.translator_module = _load_module("translator_review_under_test", "translator.py")
+        cls.session = _load_module("session_review_under_test", "session.py")
+
+    def _review_responder(self, prompt):
+        lines = self.stand_ins.REVIEW_LINE_RE.findall(prompt)
+        if not lines:
+            return self.stand_ins.default_responder(prompt)
+        results = [
+            {"id": short_id, "correction": f"修:{source}"}
+            for short_id, marked, source, _ in lines if marked and source.endswith("で")
+        ]
+        # 未標記的句子即使回傳也不採用
+        results += [{"id": short_id, "correction": "ignored"} for short_id, marked, *_ in lines if not marked]
+        return json.dumps({"results": results}, ensure_ascii=False)
+
+    def test_review_translations_maps_marked_lines_only(self):
+        client = self.stand_ins.FakeGeminiClient(responder=self._review_responder)
+        translator = self.translator_module.Translator(api_key="dummy", client=client, correction_model="review-model")
+        self.addCleanup(translator.close)
+
+        corrections = translator.review_translations([
+            ("t1", "今日は", "今天", False),
+            ("t2", "雨で", "下雨", True),
+            ("t3", "家にいた", "待在家", False),
+        ])
+
+        self.assertEqual(corrections, {"t2": "修:雨で"})
+        [request] = client.requests
+        self.assertEqual(request["model"], "review-model")
+        self.assertIn("[r2]* 原：雨で｜譯：下雨", request["contents"])
+
+    def test_review_with_other_model_does_not_use_main_model_cache(self):
+        client = self.stand_ins.FakeGeminiClient(responder=self._review_responder)
+        translator = self.translator_module.Translator(
+            api_key="dummy", model="gemini-3-flash", client=client, correction_model="gemini-2.5-flash",
+            translation_context="長い背景資訊" * 50, explicit_cache=True,
+        )
+        self.addCleanup(translator.close)
+        translator.translate_with_context_correction_streaming("雨で", None, None)
+
+        translator.review_translations([("t1", "雨で", "下雨", True)])
+
+        translate_request, review_request = client.requests
+        self.assertIsNotNone(translate_request["cached_content"])
+        # 明確 cache 只能配合建立時的模型：修正模型改帶 inline system instruction 與自己的 thinking 設定
+        self.assertIsNone(review_request["cached_content"])
+        self.assertEqual(review_request["prefix"], translator._system_instruction)
+        thinking = self.stand_ins.config_value(review_request["config"], "thinking_config")
+        self.assertEqual(self.stand_ins.config_value(thinking, "thinking_budget"), 0)
+
+    def test_deferred_mode_sends_bare_prompt_and_background_update(self):
+        settings = self.session.SessionSettings.from_env({
+            "TRANSLATION_CORRECTION_MODE": "deferred",
+            "CORRECTION_BATCH_SIZE": "1",
+            "SUBTITLE_MAX_AGE_SEC": "0",
+        })
+        messages = []
+        client = self.stand_ins.FakeGeminiClient(responder=self._review_responder)
+        session = self.session.SubtitleSession(
+            settings, messages.append, gemini_client=client, deepgram_client=self.stand_ins.FakeDeepgramClient([]),
+        )
+        session.start()
+        session._on_transcript("t1", "雨で")
+        session.translation_queue.wait_idle(2)
+        session._on_transcript("t2", "家にいた")
+        session.close()
+
+        translate_prompts = [
+            self.stand_ins.content_text(r["contents"]) for r in client.requests if r["kind"] != "generate_content"
+        ]
+        self.assertEqual(len(translate_prompts), 2)
+        self.assertTrue(all("前譯" not in prompt for prompt in translate_prompts))
+        updates = [m for m in messages if m["type"] == "translation_update"]
+        self.assertEqual(updates, [
+            {"type": "translation_update", "id": "t1", "translation": "修:雨で", "language": "zh-TW"},
+        ])
+
+    def test_inline_mode_is_default(self):
+        settings = self.session.SessionSettings.from_env({})
+        self.assertEqual(settings.correction_mode, "inline")
+        settings = self.session.SessionSettings.from_env({"TRANSLATION_CORRECTION_MODE": "bogus"})
+        self.assertEqual(settings.correction_mode, "inline")
+
+
+if __name__ == "__main__":
+    unittest.main()
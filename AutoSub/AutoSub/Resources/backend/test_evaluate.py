@@ -0,0 +1,125 @@
+import json
+import os
+import tempfile
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class EvaluateTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_evaluate_under_test", "stand_ins.py")
+        cls.module = _load_module("evaluate_under_test", "evaluate.py")
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_loads_journal_jsonl_and_text_corpora(self):
+        corpus = os.path.join(self.tmp, "corpus")
+        os.makedirs(corpus)
+        with open(os.path.join(corpus, "a-session.jsonl"), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "subtitle", "id": "t1", "original": "はい", "translation": "是"}) + "\n")
+            f.write(json.dumps({"op": "subtitle", "id": "t2", "original": "いいえ", "translation": "否"}) + "\n")
+            f.write(json.dumps({"op": "update", "id": "t1", "translation": "好的"}) + "\n")
+        with open(os.path.join(corpus, "b-lines.jsonl"), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"text": "おはよう", "reference": "早安"}) + "\n")
+        with open(os.path.join(corpus, "c.txt"), "w", encoding="utf-8") as f:
+            f.write("こんにちは\t你好\n\nさようなら\n")
+
+        sequences = self.module.load_corpus(corpus)
+
+        self.assertEqual([s.name for s in sequences], ["a-session", "b-lines", "c"])
+        self.assertEqual([(u.text, u.reference) for u in sequences[0].utterances], [("はい", "好的"), ("いいえ", "否")])
+        self.assertEqual(sequences[1].utterances[0].reference, "早安")
+        self.assertEqual([(u.text, u.reference) for u in sequences[2].utterances], [("こんにちは", "你好"), ("さようなら", None)])
+
+    def test_char_f1(self):
+        self.assertEqual(self.module.char_f1("今天天氣真好", "今天天氣真好"), 1.0)
+        self.assertEqual(self.module.char_f1("今天天氣真好", "去散步吧"), 0.0)
+        self.assertGreater(self.module.char_f1("今天天氣真好", "今天天氣不錯"), 0.3)
+
+    def test_corrections_apply_to_previous_line(self):
+        def responder(prompt):
+            if "前譯：" in prompt:
+                return json.dumps({"current": "B", "correction": "A2"})
+            return json.dumps({"current": "A", "correction": None})
+
+        sequence = self.module.TranscriptSequence("s", [self.module.Utterance("一"), self.module.Utterance("二")])
+        results = self.module.run_evaluation(
+            [sequence], [{"name": "c"}], self.stand_ins.FakeGeminiClient(responder=responder),
+        )
+
+        lines = results[0].sequences["s"]
+        self.assertEqual([line.translation for line in lines], ["A2", "B"])
+        self.assertEqual(results[0].summary()["correction_rate"], 1.0)
+        self.assertEqual(results[0].tokens["translate"]["requests"], 1)
+        self.assertEqual(results[0].tokens["correction"]["requests"], 1)
+
+    def test_configs_override_templates(self):
+        sequence = self.module.TranscriptSequence("s", [self.module.Utterance("一"), self.module.Utterance("二")])
+        client = self.stand_ins.FakeGeminiClient()
+        self.module.run_evaluation([sequence], [{
+            "name": "full-prompt",
+            "model": "m2",
+            "context_correction_template": "CONTEXT_CORRECTION_PROMPT_TEMPLATE",
+            "streaming": False,
+        }], client)
+
+        prompts = [self.stand_ins.content_text(r["contents"][-1]) for r in client.requests]
+        self.assertEqual({r["model"] for r in client.requests}, {"m2"})
+        self.assertIn("前句原文", prompts[-1])
+
+    def test_recorded_responses_replay_without_the_original_client(self):
+        cassette_path = os.path.join(self.tmp, "cassette.jsonl")
+        sequences = [self.module.TranscriptSequence("s", [
+            self.module.Utterance("今日はいい天気ですね。", "今天天氣真好呢。"),
+            self.module.Utterance("散歩に行きましょう。"),
+        ])]
+        configs = [{"name": "compact"}, {"name": "full", "compact_history": False}]
+        live = self.stand_ins.FakeGeminiClient(base_latency_sec=0.05)
+        recorder = self.module.RecordingClient(live, self.module.Cassette(cassette_path))
+        recorded = self.module.run_evaluation(sequences, configs, recorder)
+
+        replay = self.module.ReplayClient(self.module.Cassette(cassette_path), speed=1.0)
+        replayed = self.module.run_evaluation(sequences, configs, replay)
+
+        self.assertEqual(replay.misses, 0)
+        for before, after in zip(recorded, replayed):
+            self.assertEqual(
+                [line.translation for line in before.lines()], [line.translation for line in after.lines()],
+            )
+            self.assertEqual(before.tokens, after.tokens)
+            self.assertGreaterEqual(min(line.ttft_sec for line in after.lines()), 0.04)
+
+        changed = [self.module.TranscriptSequence("s", [self.module.Utterance("別の文")])]
+        missed = self.module.run_evaluation(changed, [{"name": "compact"}], replay)
+        self.assertGreater(missed[0].replay_misses, 0)
+
+    def test_side_by_side_outputs(self):
+        sequence = self.module.TranscriptSequence("s", [self.module.Utterance("一", "壹")])
+        results = self.module.run_evaluation(
+            [sequence], [{"name": "a"}, {"name": "b"}], self.stand_ins.FakeGeminiClient(),
+        )
+        path = os.path.join(self.tmp, "out.tsv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            self.module.write_outputs(results, f)
+
+        with open(path, encoding="utf-8") as f:
+            rows = [line.rstrip("\n").split("\t") for line in f]
+        self.assertEqual(rows[0], ["sequence", "line", "source", "reference", "a", "b"])
+        self.assertEqual(rows[1], ["s", "0", "一", "壹", "譯:一", "譯:一"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from types import SimpleNamespace
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class FlushBoundaryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.module = _load_module("transcriber_boundaries_under_test", "transcriber.py")
+        cls.base = _load_module("transcriber_base_boundaries_under_test", "transcriber_base.py")
+        cls.stand_ins = _load_module("stand_ins_boundaries_under_test", "stand_ins.py")
+
+    def _transcriber(self, **kwargs):
+        self.flushed = []
+        transcriber = self.module.Transcriber(
+            api_key="dummy",
+            on_transcript=lambda tid, text, *prev: self.flushed.append((text, transcriber.last_flush_span)),
+            **kwargs,
+        )
+        return transcriber
+
+    def _final(self, text, start, end, speech_final=False):
+        return self.stand_ins.FakeResultsMessage(text, start, end, is_final=True, speech_final=speech_final)
+
+    def test_find_flush_boundary_prefers_sentence_end(self):
+        find = self.base.find_flush_boundary
+        self.assertEqual(find("雨が降った。だから、バスに", 0), 6)
+        self.assertEqual(find("雨が降った、だからバスに", 0), 6)
+        # 句尾後的結尾引號歸入前段
+        self.assertEqual(find("「雨だ。」と言って", 0), 5)
+        # 切點需在 min_index 之後，之後再退而求 final 結果邊界
+        self.assertIsNone(find("雨だ。それでバスに乗った", 5))
+        self.assertEqual(find("雨だ。それでバスに乗った", 5, segment_ends=(3, 8)), 8)
+        self.assertIsNone(find("雨だ、それでバスに", 0, sentence_only=True))
+
+    def test_over_limit_splits_at_sentence_end_and_carries_remainder(self):
+        transcriber = self._transcriber(max_buffer_chars=12)
+        transcriber._on_message(self._final("今日は雨が降っていた。", 0.0, 2.2))
+        transcriber._on_message(self._final("だからバスに", 2.2, 3.4))
+        self.assertEqual([text for text, _ in self.flushed], ["今日は雨が降っていた。"])
+        self.assertAlmostEqual(self.flushed[0][1][1], 2.2)
+
+        transcriber._on_message(self._final("乗った。", 3.4, 4.2, speech_final=True))
+        self.assertEqual([text for text, _ in self.flushed], ["今日は雨が降っていた。", "だからバスに乗った。"])
+        self.assertAlmostEqual(self.flushed[1][1][0], 2.2)
+        self.assertEqual(self.flushed[1][1][1], 4.2)
+
+    def test_waits_for_sentence_end_until_hard_cap(self):
+        transcriber = self._transcriber(max_buffer_chars=10)
+        transcriber._on_message(self._final("朝から雨が降っていて", 0.0, 1.0))
+        transcriber._on_message(self._final("、寒い", 1.0, 1.3))
+        self.assertEqual(self.flushed, [])
+
+        # 15 字（1.5 倍）仍沒有句尾：切在子句邊界
+        transcriber._on_message(self._final("ので", 1.3, 1.5))
+        self.assertEqual([text for text, _ in self.flushed], ["朝から雨が降っていて、"])
+        self.assertEqual(transcriber._utterance_buffer, ["寒いので"])
+
+    def test_hard_cap_falls_back_to_segment_boundary_then_whole_buffer(self):
+        transcriber = self._transcriber(max_buffer_chars=10)
+        for index, text in enumerate(("朝から雨が降って", "いたのでバスに", "乗った")):
+            transcriber._on_message(self._final(text, index, index + 1))
+        # 兩個 final 合計 15 字時切在第一個 final 之後
+        self.assertEqual([text for text, _ in self.flushed], ["朝から雨が降って"])
+        self.assertEqual(transcriber._utterance_buffer, ["いたのでバスに", "乗った"])
+
+        transcriber = self._transcriber(max_buffer_chars=10)
+        transcriber._on_message(self._final("朝から雨が降っていたのでバスに乗った", 0.0, 2.0))
+        self.assertEqual([text for text, _ in self.flushed], ["朝から雨が降っていたのでバスに乗った"])
+
+    def test_disabled_flushes_whole_buffer_at_limit(self):
+        transcriber = self._transcriber(max_buffer_chars=12, split_at_boundaries=False)
+        transcriber._on_message(self._final("今日は雨が降っていた。", 0.0, 2.2))
+        transcriber._on_message(self._final("だからバスに", 2.2, 3.4))
+        self.assertEqual([text for text, _ in self.flushed], ["今日は雨が降っていた。だからバスに"])
+
+    def test_replay_fixture_removes_fragment_corrections(self):
+        bench = _load_module("bench_flush_boundaries_under_test", "bench_flush_boundaries.py")
+        args = SimpleNamespace(sentences=60, max_buffer_chars=50, max_context_tokens=20000)
+        whole = bench.run(False, args)
+        boundary = bench.run(True, args)
+
+        self.assertGreater(whole["corrections"], whole["utterances"] // 2)
+        self.assertEqual(boundary["fragments"], 0)
+        self.assertEqual(boundary["corrections"], 0)
+        self.assertLessEqual(boundary["requests"], whole["requests"] + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+import os
+import struct
+import subprocess
+import sys
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+SAMPLE_RATE = 24000
+CHANNELS = 2
+BYTES_PER_SEC = SAMPLE_RATE * CHANNELS * 2
+FRAME_SEC = 0.01
+
+
+def _tone(amplitude: int, seconds: float) -> bytes:
+    frames = int(SAMPLE_RATE * seconds)
+    high = struct.pack("<hh", amplitude, amplitude)
+    low = struct.pack("<hh", -amplitude, -amplitude)
+    return (high + low) * (frames // 2)
+
+
+def _silence(seconds: float) -> bytes:
+    return bytes(int(BYTES_PER_SEC * seconds))
+
+
+class _ToneEngine:
+    """
+    依振幅對應台詞的替身引擎：每段有聲區間是一句話，
+    區間碰到視窗尾端（還在說）時回傳與已說長度成比例的前綴
+    """
+
+    def __init__(self, module, lines):
+        self.module = module
+        # amplitude → (text, 秒數)
+        self.lines = lines
+        self.windows: list[float] = []
+
+    def transcribe(self, pcm, sample_rate, channels, language=None, prompt=None):
+        frame_bytes = int(sample_rate * FRAME_SEC) * channels * 2
+        levels = [abs(struct.unpack_from("<h", pcm, offset)[0])
+                  for offset in range(0, len(pcm) - frame_bytes + 1, frame_bytes)]
+        self.windows.append(len(levels) * FRAME_SEC)
+        segments = []
+        index = 0
+        while index < len(levels):
+            level = levels[index]
+            end = index
+            while end < len(levels) and levels[end] == level:
+                end += 1
+            if level in self.lines:
+                text, duration = self.lines[level]
+                spoken = (end - index) * FRAME_SEC
+                if end == len(levels) and spoken < duration - 1e-6:
+                    text = text[:int(len(text) * spoken / duration)]
+                if text:
+                    segments.append(self.module.SpeechSegment(index * FRAME_SEC, end * FRAME_SEC, text))
+            index = end
+        return segments
+
+
+class LocalTranscriberTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = _load_module("local_transcriber_under_test", "local_transcriber.py")
+
+    def _transcriber(self, lines, **kwargs):
+        engine = _ToneEngine(self.module, lines)
+        self.transcripts = []
+        self.interims = []
+        transcriber = self.module.LocalTranscriber(
+            engine,
+            step_sec=0.5,
+            on_transcript=lambda tid, text, *prev: self.transcripts.append((text, transcriber.last_flush_span)),
+            on_interim=self.interims.append,
+            endpointing_ms=300,
+            utterance_end_ms=1000,
+            sample_rate=SAMPLE_RATE,
+            channels=CHANNELS,
+            **kwargs,
+        )
+        transcriber.start()
+        self.addCleanup(transcriber.stop)
+        return transcriber, engine
+
+    @staticmethod
+    def _feed(transcriber, pcm):
+        chunk = BYTES_PER_SEC // 10
+        for offset in range(0, len(pcm), chunk):
+            transcriber.send_audio(pcm[offset:offset + chunk])
+            transcriber.wait_decoded(5)
+
+    def _assert_span(self, span, start, end):
+        self.assertAlmostEqual(span[0], start, places=1)
+        self.assertAlmostEqual(span[1], end, places=1)
+
+    def test_pauses_emit_one_transcript_per_utterance_with_spans(self):
+        transcriber, _ = self._transcriber({1000: ("今日はいい天気ですね。", 1.5), 2000: ("散歩に行こう。", 1.0)})
+        self._feed(transcriber, _tone(1000, 1.5) + _silence(1.5) + _tone(2000, 1.0) + _silence(1.5))
+        transcriber.finalize()
+
+        self.assertEqual([text for text, _ in self.transcripts], ["今日はいい天気ですね。", "散歩に行こう。"])
+        self._assert_span(self.transcripts[0][1], 0.0, 1.5)
+        self._assert_span(self.transcripts[1][1], 3.0, 4.0)
+        # 說話途中先以 interim 顯示前綴
+        self.assertTrue(any(0 < len(text) < len("今日はいい天気ですね。") for text in self.interims))
+
+    def test_continuous_speech_commits_agreed_segments_and_flushes_at_pause(self):
+        lines = {1000: ("一つ目、", 1.2), 2000: ("二つ目、", 1.2), 3000: ("三つ目。", 1.2)}
+        transcriber, engine = self._transcriber(lines)
+        gap = _silence(0.1)
+        self._feed(transcriber, _tone(1000, 1.2) + gap + _tone(2000, 1.2) + gap + _tone(3000, 1.2) + _silence(1.0))
+
+        self.assertEqual([text for text, _ in self.transcripts], ["一つ目、二つ目、三つ目。"])
+        self._assert_span(self.transcripts[0][1], 0.0, 3.8)
+        # 已確定的段落移出視窗，不再重複解碼
+        self.assertLess(max(engine.windows), 3.0)
+        self.assertIn("一つ目、二", "".join(self.interims))
+
+    def test_silence_is_not_decoded(self):
+        transcriber, engine = self._transcriber({1000: ("はい。", 0.5)})
+        self._feed(transcriber, _silence(3.0))
+        self.assertEqual(engine.windows, [])
+
+        self._feed(transcriber, _tone(1000, 0.5) + _silence(0.5))
+        self.assertEqual([text for text, _ in self.transcripts], ["はい。"])
+        self._assert_span(self.transcripts[0][1], 3.0, 3.5)
+        # 只保留 LEAD_IN_SEC 與一個 step 內的靜音
+        self.assertLess(max(engine.windows), 2.0)
+
+    def test_finalize_commits_unfinished_speech(self):
+        transcriber, _ = self._transcriber({1000: ("最後の一言", 0.8)})
+        self._feed(transcriber, _tone(1000, 0.8))
+        transcriber.finalize()
+
+        self.assertEqual([text for text, _ in self.transcripts], ["最後の一言"])
+
+    def test_import_does_not_need_deepgram(self):
+        # 新的直譯器裡匯入，避免其他測試已載入的 stub 影響結果
+        result = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, local_transcriber; print('deepgram' in sys.modules, 'transcriber' in sys.modules)"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.split(), ["False", "False"])
+
+    def test_language_mapping(self):
+        self.assertEqual(self.module.whisper_language("zh-TW"), "zh")
+        self.assertEqual(self.module.whisper_language("ja"), "ja")
+        self.assertIsNone(self.module.whisper_language("multi"))
+
+
+class LocalSessionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_local_under_test", "stand_ins.py")
+        cls.local = _load_module("local_transcriber_session_under_test", "local_transcriber.py")
+        cls.session = _load_module("session_local_under_test", "session.py")
+
+    def test_whisper_engine_needs_no_deepgram_key(self):
+        env = {"GEMINI_API_KEY": "key"}
+        self.assertEqual(self.session.SessionSettings.from_env(env).missing_api_keys(), ["DEEPGRAM_API_KEY"])
+        settings = self.session.SessionSettings.from_env(dict(env, TRANSCRIBER_ENGINE="whisper"))
+        self.assertEqual(settings.missing_api_keys(), [])
+
+    def test_session_uses_local_engine(self):
+        settings = self.session.SessionSettings.from_env({
+            "TRANSCRIBER_ENGINE": "whisper",
+            "WHISPER_STEP_SEC": "0.5",
+            "DEEPGRAM_ENDPOINTING_MS": "300",
+            "SUBTITLE_MAX_AGE_SEC": "0",
+        })
+        messages = []
+        session = self.session.SubtitleSession(
+            settings, messages.append, gemini_client=self.stand_ins.FakeGeminiClient(),
+            speech_engine=_ToneEngine(self.local, {1000: ("おはよう。", 1.0)}),
+        )
+        session.start()
+        self.assertEqual(type(session.transcriber).__name__, "LocalTranscriber")
+        pcm = _tone(1000, 1.0) + _silence(0.5)
+        chunk = BYTES_PER_SEC // 10
+        for offset in range(0, len(pcm), chunk):
+            session.send_audio(pcm[offset:offset + chunk])
+            session.transcriber.wait_decoded(5)
+        session.translation_queue.wait_idle(2)
+        session.close(drain=True)
+
+        subtitles = [message for message in messages if message["type"] == "subtitle"]
+        self.assertEqual([message["original"] for message in subtitles], ["おはよう。"])
+
+
+if __name__ == "__main__":
+    unittest.main()
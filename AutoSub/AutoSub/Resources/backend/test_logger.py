@@ -0,0 +1,90 @@
+import io
+import threading
+import unittest
+
+from test_context_correction_flow import _load_module
+
+
+class _Unformattable:
+    """被格式化時記錄呼叫執行緒"""
+
+    def __init__(self):
+        self.formatted_on = []
+
+    def __str__(self):
+        self.formatted_on.append(threading.current_thread().name)
+        return "value"
+
+
+class LoggerTests(unittest.TestCase):
+    def setUp(self):
+        self.module = _load_module("logger_under_test", "logger.py")
+        self.stream = io.StringIO()
+        self.module.configure("info", stream=self.stream, max_queue=100)
+
+    def _output(self):
+        self.module.flush()
+        return self.stream.getvalue().splitlines()
+
+    def test_below_level_is_not_enqueued_or_formatted(self):
+        log = self.module.get_logger("Test")
+        value = _Unformattable()
+        log.debug("hidden %s", value)
+        log.info("shown %s", 1)
+
+        self.assertEqual(self._output(), ["[Test] shown 1"])
+        self.assertEqual(value.formatted_on, [])
+
+    def test_formatting_happens_on_writer_thread(self):
+        log = self.module.get_logger("Test")
+        value = _Unformattable()
+        log.warning("got %s", value)
+
+        self.assertEqual(self._output(), ["[Test] got value"])
+        self.assertEqual(value.formatted_on, ["log-writer"])
+
+    def test_sample_emits_every_nth_call(self):
+        self.module.configure("debug")
+        log = self.module.get_logger("Test")
+        for index in range(10):
+            log.sample("interim", 4, "interim #%d", index)
+
+        self.assertEqual(self._output(), ["[Test] interim #0", "[Test] interim #4", "[Test] interim #8"])
+
+    def test_full_queue_drops_without_blocking_and_reports(self):
+        blocked = threading.Event()
+        release = threading.Event()
+
+        class _SlowStream(io.StringIO):
+            def write(self, text):
+                blocked.set()
+                release.wait(2)
+                return super().write(text)
+
+        stream = _SlowStream()
+        self.module.configure(stream=stream, max_queue=2)
+        log = self.module.get_logger("Test")
+        log.info("first")
+        blocked.wait(2)
+        # writer 卡在 write()：佇列只收得下 2 筆，其餘丟棄
+        for index in range(5):
+            log.info("line %d", index)
+        self.assertEqual(self.module.dropped_count(), 3)
+
+        release.set()
+        self.module.flush()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[:3], ["[Test] first", "[Test] line 0", "[Test] line 1"])
+        self.assertIn("[Log] 3 lines dropped (queue full)", lines)
+
+    def test_bad_format_arguments_do_not_raise(self):
+        log = self.module.get_logger("Test")
+        log.error("two values %s %s", 1)
+
+        output = self._output()
+        self.assertEqual(len(output), 1)
+        self.assertTrue(output[0].startswith("[Test] two values %s %s (1,)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import io
+import sys
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+SCRIPT = [
+    (0.2, 0.8, "おはようございます"),
+    (1.0, 1.6, "今日は会議があります"),
+]
+SAMPLE_RATE = 8000
+CHANNELS = 1
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = _load_module("metrics_under_test", "metrics.py")
+
+    def setUp(self):
+        self.registry = self.module.MetricsRegistry()
+
+    def test_counters_and_gauges_snapshot_by_label(self):
+        flushes = self.registry.counter("flushes_total", "Flushes", labels=("trigger",))
+        flushes.inc(trigger="speech_final")
+        flushes.inc(trigger="speech_final")
+        flushes.inc(trigger="utterance_end")
+        pending = self.registry.gauge("pending", "Pending")
+        pending.inc()
+        pending.inc()
+        pending.dec()
+
+        self.assertEqual(self.registry.snapshot(), {
+            "flushes_total": {"speech_final": 2, "utterance_end": 1},
+            "pending": 1,
+        })
+        # 同名重複註冊回傳同一個指標；型別不同則拒絕
+        self.assertIs(self.registry.counter("flushes_total", "Flushes", labels=("trigger",)), flushes)
+        with self.assertRaises(ValueError):
+            self.registry.gauge("flushes_total", "Flushes", labels=("trigger",))
+        with self.assertRaises(ValueError):
+            flushes.inc(reason="x")
+
+    def test_histogram_quantiles_interpolate_within_buckets(self):
+        latency = self.registry.histogram("latency_seconds", "Latency", buckets=(0.5, 1.0, 2.0))
+        for value in (0.2, 0.4, 0.6, 0.8, 1.5, 3.0):
+            latency.observe(value)
+
+        snapshot = self.registry.snapshot()["latency_seconds"]
+        self.assertEqual(snapshot["count"], 6)
+        self.assertAlmostEqual(snapshot["sum"], 6.5)
+        # 第 3 個值落在 (0.5, 1.0]：該 bucket 有 2 個值，內插到一半
+        self.assertAlmostEqual(snapshot["p50"], 0.75)
+        # 超出最大 bucket 時回報最大的上界
+        self.assertEqual(snapshot["p95"], 2.0)
+
+    def test_prometheus_text_format(self):
+        tokens = self.registry.counter("tokens_total", "Tokens", labels=("type",))
+        tokens.inc(120, type="input")
+        latency = self.registry.histogram("ttft_seconds", "TTFT", buckets=(0.5, 1.0))
+        latency.observe(0.3)
+        latency.observe(0.7)
+
+        text = self.registry.render_prometheus()
+
+        self.assertIn("# TYPE tokens_total counter\n", text)
+        self.assertIn('tokens_total{type="input"} 120\n', text)
+        self.assertIn('ttft_seconds_bucket{le="0.5"} 1\n', text)
+        self.assertIn('ttft_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('ttft_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn("ttft_seconds_count 2\n", text)
+
+    def test_http_endpoint_serves_metrics_only(self):
+        self.registry.counter("keepalives_total", "KeepAlives").inc(3)
+        server = self.module.serve_http(0, self.registry)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        with urllib.request.urlopen(f"{base}/metrics", timeout=2) as response:
+            self.assertIn("keepalives_total 3", response.read().decode())
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/", timeout=2)
+
+    def test_reporter_emits_final_snapshot_on_stop(self):
+        self.registry.counter("messages_total", "Messages").inc()
+        emitted = []
+        reporter = self.module.StatsReporter(emitted.append, interval_sec=0, registry=self.registry)
+        reporter.start()
+        reporter.stop()
+
+        self.assertEqual(len(emitted), 1)
+        self.assertEqual(emitted[0]["type"], "stats")
+        self.assertEqual(emitted[0]["metrics"], {"messages_total": 1})
+
+    def test_failing_listener_does_not_stop_reporter(self):
+        calls = []
+
+        def failing():
+            raise RuntimeError("boom")
+
+        self.module.add_report_listener(failing)
+        self.module.add_report_listener(lambda: calls.append(1))
+        self.addCleanup(self.module._REPORT_LISTENERS.clear)
+        emitted = []
+        reporter = self.module.StatsReporter(emitted.append, interval_sec=0.05, registry=self.registry)
+        reporter.start()
+        time.sleep(0.3)
+        reporter.stop()
+
+        # 失敗的回呼之後，其他回呼與之後的快照照常送出
+        self.assertGreater(len(emitted), 2)
+        self.assertEqual(len(calls), len(emitted))
+
+
+class PipelineMetricsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.server_module = _load_module("server_metrics_under_test", "server.py")
+        cls.stand_ins = _load_module("stand_ins_metrics_under_test", "stand_ins.py")
+        # transcriber / translator 以模組名稱 import metrics，指標登記在同一個全域 registry
+        cls.registry = sys.modules["metrics"].REGISTRY
+
+    def _value(self, name, **labels):
+        metric = self.registry.get(name)
+        return metric.value(**labels) if metric else 0
+
+    def test_pipeline_updates_transcriber_and_translator_metrics(self):
+        encode = self.server_module
+        settings = encode.SessionSettings.from_env({})
+        settings.sample_rate = SAMPLE_RATE
+        settings.channels = CHANNELS
+        server = encode.SessionServer(
+            settings, emit=lambda data: None,
+            gemini_client=self.stand_ins.FakeGeminiClient(),
+            deepgram_client=self.stand_ins.FakeDeepgramClient(SCRIPT),
+        )
+        before = {
+            "flushes": self._value("autosub_transcriber_flushes_total", trigger="speech_final"),
+            "chunks": self._value("autosub_transcriber_audio_chunks_total"),
+            "tokens": self._value("autosub_translator_tokens_total", type="input"),
+        }
+        frames = [(encode.FRAME_OPEN, 1, b"")]
+        frames += [(encode.FRAME_AUDIO, 1, b"\x00" * (SAMPLE_RATE * 2 // 10)) for _ in range(20)]
+        frames.append((encode.FRAME_CLOSE, 1, b""))
+        server.serve(io.BytesIO(b"".join(encode.encode_frame(*frame) for frame in frames)))
+
+        self.assertEqual(
+            self._value("autosub_transcriber_flushes_total", trigger="speech_final") - before["flushes"], 2
+        )
+        self.assertEqual(self._value("autosub_transcriber_audio_chunks_total") - before["chunks"], 20)
+        self.assertGreater(self._value("autosub_translator_tokens_total", type="input"), before["tokens"])
+        self.assertEqual(self._value("autosub_translation_queue_pending"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
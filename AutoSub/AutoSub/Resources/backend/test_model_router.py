@@ -0,0 +1,111 @@
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ModelRouterTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        cls.module = _load_module("model_router_under_test", "model_router.py")
+
+    def _router(self, **kwargs):
+        clock = _Clock()
+        router = self.module.ModelRouter("fast", "strong", clock=clock, **kwargs)
+        return router, clock
+
+    def test_routes_by_length_and_backlog(self):
+        router, _ = self._router(short_chars=6, busy_backlog=2)
+
+        self.assertEqual(router.choose("うん"), "fast")
+        self.assertEqual(router.choose("昨日の会議で決まったこと"), "strong")
+        self.assertEqual(router.choose("昨日の会議で決まったこと", backlog=2), "fast")
+
+    def test_cascades_when_primary_p95_over_budget_and_recovers_after_window(self):
+        router, clock = self._router(latency_budget_sec=2.0, latency_window_sec=30, min_samples=3)
+        long_text = "昨日の会議で決まったことを伝えてください"
+        for _ in range(3):
+            router.observe("strong", 4.0)
+
+        self.assertEqual(router.choose(long_text), "fast")
+        self.assertTrue(router.degraded)
+
+        clock.now += 31
+        self.assertIsNone(router.p95("strong"))
+        self.assertEqual(router.choose(long_text), "strong")
+        self.assertFalse(router.degraded)
+
+    def test_recovery_requires_p95_below_hysteresis(self):
+        router, clock = self._router(latency_budget_sec=2.0, latency_window_sec=30, min_samples=3)
+        long_text = "昨日の会議で決まったことを伝えてください"
+        for _ in range(3):
+            router.observe("strong", 3.0)
+        router.choose(long_text)
+        clock.now += 31
+        # 預算以下但未低於 RECOVER_RATIO：維持 cascade
+        for _ in range(3):
+            router.observe("strong", 1.9)
+        self.assertEqual(router.choose(long_text), "fast")
+        for _ in range(60):
+            router.observe("strong", 1.0)
+        self.assertEqual(router.choose(long_text), "strong")
+
+
+class RoutedTranslationTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_router_under_test", "stand_ins.py")
+        cls.session = _load_module("session_router_under_test", "session.py")
+
+    def _run(self, env, lines):
+        settings = self.session.SessionSettings.from_env(
+            dict(env, GEMINI_MODEL="strong-model", SUBTITLE_MAX_AGE_SEC="0", MODEL_ROUTER_SHORT_CHARS="6")
+        )
+        client = self.stand_ins.FakeGeminiClient()
+        session = self.session.SubtitleSession(
+            settings, lambda message: None, gemini_client=client,
+            deepgram_client=self.stand_ins.FakeDeepgramClient([]),
+        )
+        session.start()
+        for index, text in enumerate(lines):
+            session._on_transcript(f"t{index}", text)
+            session.translation_queue.wait_idle(2)
+        session.close()
+        return session, [r for r in client.requests if r["kind"].startswith("chat")]
+
+    def test_routing_is_opt_in(self):
+        session, requests = self._run({}, ["うん", "昨日の会議で決まったことです。"])
+
+        self.assertIsNone(session.model_router)
+        self.assertEqual({r["model"] for r in requests}, {"strong-model"})
+
+    def test_models_share_history_when_switching(self):
+        _, requests = self._run(
+            {"GEMINI_FAST_MODEL": "fast-model"},
+            ["昨日の会議で決まったことです。", "うん", "みんなに伝えておいてください。"],
+        )
+
+        self.assertEqual([r["model"] for r in requests], ["strong-model", "fast-model", "strong-model"])
+        fast_prompt = self.stand_ins.content_text(requests[1]["contents"])
+        last_prompt = self.stand_ins.content_text(requests[2]["contents"])
+        # 換模型重建 chat 時帶著先前的對話歷史（含另一個模型的回應）
+        self.assertTrue(fast_prompt.startswith("原：昨日の会議で決まったことです。\n{"))
+        self.assertIn('"current": "譯:うん"', last_prompt)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import signal
+import tempfile
+import threading
+import time
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+def _busy_worker(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+
+class ProfilerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.module = _load_module("profiling_under_test", "profiling.py")
+        cls.session = _load_module("session_profiling_under_test", "session.py")
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.directory = self._tmp.name
+
+    def _files(self, prefix):
+        return sorted(name for name in os.listdir(self.directory) if name.startswith(prefix))
+
+    def test_disabled_settings_start_nothing(self):
+        settings = self.session.SessionSettings.from_env({"DIAGNOSTICS_DIR": self.directory})
+        threads_before = threading.active_count()
+
+        self.assertIsNone(self.module.start_from_settings(settings))
+        self.assertEqual(threading.active_count(), threads_before)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_cpu_samples_all_threads_as_folded_stacks(self):
+        stop_event = threading.Event()
+        worker = threading.Thread(target=_busy_worker, args=(stop_event,), name="busy-worker")
+        worker.start()
+        profiler = self.module.Profiler(self.directory, cpu_interval_ms=2)
+        profiler.start()
+        time.sleep(0.2)
+        profiler.stop()
+        stop_event.set()
+        worker.join()
+
+        self.assertGreater(profiler.sample_count, 5)
+        [name] = self._files("cpu-")
+        with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        busy = [line for line in lines if line.startswith("busy-worker;")]
+        self.assertTrue(busy)
+        self.assertIn("test_profiling.py:_busy_worker", busy[0])
+        # 每行為「堆疊 次數」，取樣執行緒本身不列入
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertFalse(any(line.startswith("profiler-cpu;") for line in lines))
+
+    def test_memory_snapshot_reports_growth(self):
+        profiler = self.module.Profiler(self.directory, memory_interval_sec=3600)
+        profiler.start()
+        retained = [bytearray(1024) for _ in range(200)]
+        path = profiler.snapshot_memory()
+        profiler.stop()
+
+        with open(path, encoding="utf-8") as f:
+            report = f.read()
+        self.assertIn("== top growth since previous snapshot ==", report)
+        self.assertIn("test_profiling.py", report)
+        self.assertEqual(len(retained), 200)
+
+    @unittest.skipUnless(hasattr(signal, "SIGUSR1"), "SIGUSR1 not available")
+    def test_sigusr1_dumps_thread_stacks(self):
+        profiler = self.module.Profiler(self.directory, stack_dumps=True)
+        profiler.start()
+        self.addCleanup(profiler.stop)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        deadline = time.time() + 2
+        while not self._files("stacks-") and time.time() < deadline:
+            time.sleep(0.01)
+
+        [name] = self._files("stacks-")
+        with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+            dump = f.read()
+        self.assertIn("(SIGUSR1)", dump)
+        self.assertIn("--- MainThread", dump)
+        self.assertIn("test_sigusr1_dumps_thread_stacks", dump)
+
+    def test_output_files_rotate(self):
+        profiler = self.module.Profiler(self.directory, stack_dumps=False, max_files=3)
+        for _ in range(5):
+            profiler.dump_stacks()
+
+        self.assertEqual(len(self._files("stacks-")), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class SegmentationControllerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.module = _load_module("segmentation_under_test", "segmentation.py")
+
+    def _controller(self, **kwargs):
+        self.now = 0.0
+        return self.module.SegmentationController(clock=lambda: self.now, **kwargs)
+
+    def _speak(self, controller, chars_per_sec, seconds=10):
+        # 每秒一個 final
+        for second in range(seconds):
+            controller.observe_final("あ" * int(chars_per_sec), (second, second + 1))
+
+    def test_slow_speech_uses_short_snappy_thresholds(self):
+        controller = self._controller(max_buffer_chars=50)
+        self._speak(controller, 3)
+
+        self.assertEqual(controller.pressure, 0.0)
+        self.assertEqual(controller.max_buffer_chars, 30)
+        self.assertEqual(controller.min_flush_chars, 0)
+        self.assertEqual(controller.interim_stale_timeout_sec, 3.0)
+
+    def test_fast_speech_raises_thresholds(self):
+        controller = self._controller(max_buffer_chars=50, endpointing_ms=200)
+        self._speak(controller, 12)
+
+        self.assertEqual(controller.pressure, 1.0)
+        self.assertEqual(controller.max_buffer_chars, 100)
+        self.assertEqual(controller.min_flush_chars, 50)
+        self.assertEqual(controller.endpointing_ms, 400)
+
+    def test_queue_depth_and_latency_raise_pressure(self):
+        controller = self._controller(target_latency_sec=1.0, max_latency_sec=3.0, busy_queue_depth=4)
+        controller.observe_queue_depth(2)
+        self.assertEqual(controller.pressure, 0.5)
+        controller.observe_queue_depth(0)
+        controller.observe_translation(3.0)
+        self.assertEqual(controller.pressure, 1.0)
+
+    def test_short_utterances_are_held_only_while_worker_is_busy(self):
+        controller = self._controller(hold_timeout_sec=2.0)
+        self._speak(controller, 12)
+        self.assertTrue(controller.should_flush_on_pause(5))
+
+        controller.translation_started()
+        self.assertFalse(controller.should_flush_on_pause(5))
+        self.assertTrue(controller.should_flush_on_pause(controller.min_flush_chars))
+
+        controller.hold()
+        self.assertFalse(controller.should_release_hold())
+        controller.observe_translation(1.0)
+        self.assertTrue(controller.should_release_hold())
+
+    def test_hold_times_out_while_worker_stays_busy(self):
+        controller = self._controller(hold_timeout_sec=2.0)
+        controller.translation_started()
+        controller.hold()
+        self.now = 1.9
+        self.assertFalse(controller.should_release_hold())
+        self.now = 2.0
+        self.assertTrue(controller.should_release_hold())
+        controller.release()
+        self.assertIsNone(controller.hold_deadline)
+
+
+class AdaptiveTranscriberTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.segmentation = _load_module("segmentation_transcriber_under_test", "segmentation.py")
+        cls.transcriber_module = _load_module("transcriber_segmentation_under_test", "transcriber.py")
+        cls.stand_ins = _load_module("stand_ins_segmentation_under_test", "stand_ins.py")
+        cls.session = _load_module("session_segmentation_under_test", "session.py")
+        cls.bench = _load_module("bench_segmentation_under_test", "bench_segmentation.py")
+
+    def _final(self, text, start, end):
+        return self.stand_ins.FakeResultsMessage(text, start, end, is_final=True, speech_final=True)
+
+    def test_held_utterances_are_merged_and_released_when_worker_idles(self):
+        controller = self.segmentation.SegmentationController()
+        transcripts = []
+        transcriber = self.transcriber_module.Transcriber(
+            api_key="dummy", on_transcript=lambda tid, text, *prev: transcripts.append(text),
+            segmentation=controller,
+        )
+        # 佇列堆積：壓力最大且 worker 忙碌
+        controller.translation_started()
+        controller.observe_queue_depth(3)
+        transcriber._on_message(self._final("今日はいい天気ですね", 0.0, 1.0))
+        transcriber._on_message(self._final("そうですね", 1.2, 1.8))
+        self.assertEqual(transcripts, [])
+
+        transcriber.release_held_buffer()
+        self.assertEqual(transcripts, [])
+        controller.observe_translation(1.0)
+        controller.observe_queue_depth(0)
+        transcriber.release_held_buffer()
+        self.assertEqual(transcripts, ["今日はいい天気ですねそうですね"])
+        self.assertEqual(transcriber.last_flush_span, (0.0, 1.8))
+
+    def test_adaptive_mode_is_opt_in(self):
+        settings = self.session.SessionSettings.from_env({})
+        self.assertEqual(settings.segmentation_mode, "fixed")
+        self.assertIsNone(self.segmentation.controller_from_settings(settings))
+
+        settings = self.session.SessionSettings.from_env({"SEGMENTATION_MODE": "adaptive"})
+        controller = self.segmentation.controller_from_settings(settings)
+        self.assertEqual(controller.base_max_buffer_chars, settings.max_buffer_chars)
+
+        settings = self.session.SessionSettings.from_env({"SEGMENTATION_MODE": "bogus"})
+        self.assertEqual(settings.segmentation_mode, "fixed")
+
+    def test_replay_fixture_fast_speech_with_slow_gemini_catches_up(self):
+        fixed = self.bench.run("variety", "slow", adaptive=False, minutes=3)
+        adaptive = self.bench.run("variety", "slow", adaptive=True, minutes=3)
+
+        self.assertLess(adaptive["utterances"], fixed["utterances"])
+        self.assertLessEqual(adaptive["requests"], fixed["requests"])
+        self.assertLess(adaptive["p95_latency"], fixed["p95_latency"])
+
+    def test_replay_fixture_slow_speech_is_unchanged(self):
+        fixed = self.bench.run("drama", "normal", adaptive=False, minutes=3)
+        adaptive = self.bench.run("drama", "normal", adaptive=True, minutes=3)
+
+        self.assertEqual(adaptive, fixed)
+
+
+if __name__ == "__main__":
+    unittest.main()
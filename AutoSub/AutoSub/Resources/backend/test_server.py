@@ -0,0 +1,135 @@
+import io
+import json
+import threading
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+SCRIPT = [
+    (0.2, 0.8, "おはようございます"),
+    (1.0, 1.6, "今日は会議があります"),
+]
+SAMPLE_RATE = 8000
+CHANNELS = 1
+
+
+def _pcm(seconds: float) -> bytes:
+    return b"\x00" * int(seconds * SAMPLE_RATE * CHANNELS * 2)
+
+
+class SessionServerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.server_module = _load_module("server_under_test", "server.py")
+        cls.stand_ins = _load_module("stand_ins_server_under_test", "stand_ins.py")
+
+    def setUp(self):
+        self.messages = []
+        self._lock = threading.Lock()
+        settings = self.server_module.SessionSettings.from_env({})
+        settings.sample_rate = SAMPLE_RATE
+        settings.channels = CHANNELS
+        self.gemini = self.stand_ins.FakeGeminiClient()
+        self.deepgram = self.stand_ins.FakeDeepgramClient(SCRIPT)
+        self.server = self.server_module.SessionServer(
+            settings, emit=self._emit,
+            gemini_client=self.gemini, deepgram_client=self.deepgram,
+            max_sessions=2,
+        )
+
+    def _emit(self, data):
+        with self._lock:
+            self.messages.append(data)
+
+    def _of(self, session_id, message_type):
+        return [m for m in self.messages if m.get("session") == session_id and m["type"] == message_type]
+
+    def _serve(self, frames):
+        stream = io.BytesIO(b"".join(self.server_module.encode_frame(*frame) for frame in frames))
+        self.server.serve(stream)
+
+    def test_interleaved_sessions_keep_separate_output_and_share_clients(self):
+        encode = self.server_module
+        frames = [
+            (encode.FRAME_OPEN, 1, b""),
+            (encode.FRAME_OPEN, 2, json.dumps({"target_lang": "en"}).encode()),
+        ]
+        for _ in range(20):
+            frames.append((encode.FRAME_AUDIO, 1, _pcm(0.1)))
+            frames.append((encode.FRAME_AUDIO, 2, _pcm(0.1)))
+        frames += [(encode.FRAME_CLOSE, 1, b""), (encode.FRAME_CLOSE, 2, b"")]
+
+        self._serve(frames)
+
+        for session_id in (1, 2):
+            subtitles = self._of(session_id, "subtitle")
+            self.assertEqual([s["original"] for s in subtitles], [text for _, _, text in SCRIPT])
+            statuses = [m["status"] for m in self._of(session_id, "status")]
+            self.assertEqual(statuses, ["connected", "closed"])
+
+        # 兩個 session 共用同一個 Deepgram / Gemini client，各自一條連線與一個 chat
+        self.assertEqual(len(self.deepgram.connections), 2)
+        self.assertEqual(len({id(r["config"]) for r in self.gemini.requests}), 2)
+        prefixes = {r["prefix"] for r in self.gemini.requests}
+        self.assertEqual(sum("英文" in p for p in prefixes), 1)
+
+    def test_extra_target_languages_are_tagged_per_message(self):
+        encode = self.server_module
+        self.gemini.responder = self.stand_ins.multi_target_responder(["en"])
+        frames = [(encode.FRAME_OPEN, 1, json.dumps({"extra_target_langs": ["en"]}).encode())]
+        frames += [(encode.FRAME_AUDIO, 1, _pcm(0.1)) for _ in range(20)]
+        frames.append((encode.FRAME_CLOSE, 1, b""))
+
+        self._serve(frames)
+
+        subtitles = self._of(1, "subtitle")
+        extras = self._of(1, "subtitle_extra")
+        self.assertEqual({s["language"] for s in subtitles}, {"zh-TW"})
+        self.assertEqual([(e["id"], e["language"]) for e in extras], [(s["id"], "en") for s in subtitles])
+        self.assertEqual(extras[0]["translation"], "en:おはようございます")
+        # 一條 STT 串流、每句一個翻譯 request
+        self.assertEqual(len(self.deepgram.connections), 1)
+        self.assertEqual(len(self.gemini.requests), len(subtitles))
+
+    def test_session_limit_is_enforced(self):
+        encode = self.server_module
+        self._serve([
+            (encode.FRAME_OPEN, 1, b""),
+            (encode.FRAME_OPEN, 2, b""),
+            (encode.FRAME_OPEN, 3, b""),
+        ])
+
+        errors = self._of(3, "error")
+        self.assertEqual(errors[0]["code"], "SESSION_ERROR")
+        self.assertEqual(len(self.deepgram.connections), 2)
+
+    def test_reopening_an_id_that_is_still_closing_is_rejected(self):
+        encode = self.server_module
+        self.gemini.base_latency_sec = 0.3
+        frames = [(encode.FRAME_OPEN, 1, b"")]
+        frames += [(encode.FRAME_AUDIO, 1, _pcm(0.1)) for _ in range(20)]
+        frames += [(encode.FRAME_CLOSE, 1, b""), (encode.FRAME_OPEN, 1, b"")]
+
+        self._serve(frames)
+
+        # 第一個 session 仍在清空翻譯佇列，重開被拒絕，輸出只來自一個 session
+        errors = self._of(1, "error")
+        self.assertEqual([(e["code"], e["message"]) for e in errors], [("SESSION_ERROR", "Session still closing")])
+        self.assertEqual([m["status"] for m in self._of(1, "status")], ["connected", "closed"])
+        self.assertEqual(len(self.deepgram.connections), 1)
+
+    def test_truncated_frame_is_treated_as_eof(self):
+        encode = self.server_module
+        data = encode.encode_frame(encode.FRAME_AUDIO, 1, _pcm(0.1))
+        self.assertIsNone(encode.read_frame(io.BytesIO(data[:-10])))
+        self.assertEqual(encode.read_frame(io.BytesIO(data))[:2], (encode.FRAME_AUDIO, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from test_context_correction_flow import _load_module
+
+BLOCK_ALIGN = 4
+
+
+class ShmTransportTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = _load_module("shm_transport_under_test", "shm_transport.py")
+        cls.ingest = _load_module("audio_ingest_shm_under_test", "audio_ingest.py")
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, "audio.ring")
+        read_fd, write_fd = os.pipe()
+        self.doorbell_in = os.fdopen(read_fd, "rb")
+        self.doorbell_out = os.fdopen(write_fd, "wb")
+        self.addCleanup(self.doorbell_in.close)
+
+    def _producer(self, capacity, overwrite=False):
+        return self.module.ShmRingProducer(self.path, capacity, self.doorbell_out, overwrite=overwrite)
+
+    def _reader(self):
+        reader = self.module.ShmRingReader(self.path, self.doorbell_in, BLOCK_ALIGN)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_frames_round_trip_across_wrap(self):
+        frames = [bytes([index % 256]) * 96 for index in range(200)]
+        producer = self._producer(capacity=1000)
+        reader = self._reader()
+
+        def produce():
+            for frame in frames:
+                # 滿了就等 consumer（測試中不丟 frame）
+                while producer.free_bytes < len(frame):
+                    threading.Event().wait(0.001)
+                producer.write(frame)
+            producer.close()
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        received = [bytes(f) for f in self.ingest.FrameReader(reader, frame_bytes=96, block_align=BLOCK_ALIGN)]
+        thread.join()
+
+        self.assertEqual(received, frames)
+        self.assertEqual(reader.overruns, 0)
+        # 每個 frame 在 pipe 上只有 1 byte 通知
+        self.assertEqual(reader.read_pos, 96 * 200)
+
+    def test_full_ring_drops_frames_and_counts_them(self):
+        producer = self._producer(capacity=256)
+        results = [producer.write(b"\x00" * 96) for _ in range(4)]
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(producer.dropped_frames, 2)
+
+        reader = self._reader()
+        self.assertEqual(reader.dropped_frames, 2)
+        buffer = bytearray(1024)
+        self.assertEqual(reader.readinto(buffer), 192)
+        self.assertTrue(producer.write(b"\x00" * 96))
+        producer.close()
+
+    def test_overwrite_mode_counts_overrun_and_resyncs_on_sample_boundary(self):
+        producer = self._producer(capacity=100, overwrite=True)
+        reader = self._reader()
+        for index in range(5):
+            producer.write(bytes([index]) * 30)
+        producer.close()
+
+        buffer = bytearray(1024)
+        size = reader.readinto(buffer)
+        # 150 bytes 寫入、容量 100：最舊完整 sample 從位置 52 開始
+        self.assertEqual(reader.overruns, 1)
+        self.assertEqual(reader.overrun_bytes, 52)
+        self.assertEqual(size, 98)
+        self.assertEqual(bytes(buffer[:size]), bytes([1]) * 8 + bytes([2]) * 30 + bytes([3]) * 30 + bytes([4]) * 30)
+        self.assertEqual(reader.readinto(buffer), 0)
+
+    def test_rejects_foreign_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\x00" * 512)
+        with self.assertRaises(ValueError):
+            self.module.ShmRingReader(self.path, self.doorbell_in, BLOCK_ALIGN)
+        self.doorbell_out.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class SoakHarnessTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.module = _load_module("soak_under_test", "soak.py")
+
+    def _sample(self, hours, rss_mb=30.0, threads=6, fds=4, p95_ms=5.0):
+        return self.module.Sample(
+            audio_hours=hours, wall_sec=hours, rss_mb=rss_mb, threads=threads, fds=fds,
+            utterances=0, p50_ms=p95_ms, p95_ms=p95_ms, rebuilds=0, reconnects=0, rotations=0,
+        )
+
+    def test_short_run_exercises_rebuilds_rotation_and_reconnect(self):
+        result = self.module.run_soak(
+            hours=0.5, speed=2000, sample_minutes=5, rotate_sec=600, drop_sec=600, max_context_tokens=2000,
+        )
+
+        self.assertEqual(result.failures, [])
+        self.assertEqual(len(result.samples), 6)
+        self.assertEqual(result.utterances, 600)
+        self.assertEqual(result.subtitles, 600)
+        last = result.samples[-1]
+        self.assertGreater(last.rebuilds, 0)
+        self.assertGreater(last.rotations, 0)
+        self.assertGreater(last.reconnects, 0)
+
+    def test_drift_is_measured_after_warmup(self):
+        thresholds = self.module.Thresholds(max_rss_growth_mb=10, max_thread_growth=2)
+        # 暖機期間的成長不計入
+        samples = [self._sample(0.5, rss_mb=10), self._sample(1.0, rss_mb=30), self._sample(8.0, rss_mb=35)]
+        self.assertEqual(self.module.evaluate_drift(samples, thresholds, warmup=0.1), [])
+
+        samples.append(self._sample(8.5, rss_mb=45, threads=12))
+        failures = self.module.evaluate_drift(samples, thresholds, warmup=0.1)
+        self.assertEqual(len(failures), 2)
+        self.assertIn("RSS grew 15.0 MB", failures[0])
+        self.assertIn("thread count grew 6 -> 12", failures[1])
+
+    def test_latency_drift_needs_ratio_and_absolute_floor(self):
+        thresholds = self.module.Thresholds(max_latency_ratio=2.0, latency_floor_ms=50)
+        samples = [self._sample(1.0, p95_ms=5.0), self._sample(8.0, p95_ms=40.0)]
+        self.assertEqual(self.module.evaluate_drift(samples, thresholds, warmup=0), [])
+
+        samples[-1] = self._sample(8.0, p95_ms=120.0)
+        self.assertEqual(
+            self.module.evaluate_drift(samples, thresholds, warmup=0),
+            ["p95 latency drifted 5.0 -> 120.0 ms"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
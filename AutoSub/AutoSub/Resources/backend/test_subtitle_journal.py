@@ -0,0 +1,133 @@
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from subtitle_journal import SubtitleJournal, export_srt, iter_subtitles
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class SubtitleJournalTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "journal", "session.jsonl")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_subtitles_carry_audio_span_and_latest_correction(self):
+        journal = SubtitleJournal(self.path)
+        journal.note_span("a", (0.5, 2.0))
+        journal.note_span("b", (3.0, 4.5))
+        journal.record_subtitle("a", "一", "譯一")
+        journal.record_subtitle("b", "二", "譯二")
+        journal.record_update("a", "修正一")
+        journal.record_update("a", "再修正一")
+        journal.close()
+
+        subtitles = list(iter_subtitles(self.path))
+        self.assertEqual([(s["id"], s["translation"]) for s in subtitles], [("a", "再修正一"), ("b", "譯二")])
+        self.assertEqual((subtitles[0]["start"], subtitles[0]["end"]), (0.5, 2.0))
+
+    def test_truncated_last_line_is_ignored(self):
+        journal = SubtitleJournal(self.path)
+        journal.record_subtitle("a", "一", "譯一")
+        journal.close()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"op": "subtitle", "id": "b", "orig')  # 寫到一半中斷
+
+        self.assertEqual([s["id"] for s in iter_subtitles(self.path)], ["a"])
+
+    def _wait_for_sync_count(self, journal, count):
+        deadline = time.time() + 2
+        while journal.sync_count < count and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_fsync_is_batched(self):
+        journal = SubtitleJournal(self.path, fsync_interval_sec=60, fsync_batch=50)
+        for index in range(50):
+            journal.record_subtitle(str(index), "原", "譯")
+        self._wait_for_sync_count(journal, 1)
+        self.assertEqual(journal.sync_count, 1)
+
+        # 未達 batch 也未到間隔：不同步
+        for index in range(50, 99):
+            journal.record_subtitle(str(index), "原", "譯")
+        time.sleep(0.1)
+        self.assertEqual(journal.sync_count, 1)
+
+        journal.close()
+        self.assertEqual(journal.sync_count, 2)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 99)
+
+    def test_fsync_interval_flushes_small_batches(self):
+        journal = SubtitleJournal(self.path, fsync_interval_sec=0.05, fsync_batch=50)
+        journal.record_subtitle("a", "原", "譯")
+        self._wait_for_sync_count(journal, 1)
+        self.assertEqual(journal.sync_count, 1)
+        journal.close()
+
+    def test_reopen_appends_to_existing_journal(self):
+        for transcript_id in ("a", "b"):
+            journal = SubtitleJournal(self.path)
+            journal.record_subtitle(transcript_id, "原", "譯")
+            journal.close()
+
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["id"] for line in f], ["a", "b"])
+
+    def test_export_srt_falls_back_to_estimated_times(self):
+        journal = SubtitleJournal(self.path)
+        journal.note_span("a", (1.0, 2.5))
+        journal.record_subtitle("a", "一", "譯一")
+        journal.record_subtitle("b", "二", None)
+        journal.close()
+
+        output = io.StringIO()
+        count = export_srt(self.path, output)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(
+            output.getvalue(),
+            "1\n00:00:01,000 --> 00:00:02,500\n一\n譯一\n\n"
+            "2\n00:00:02,500 --> 00:00:05,500\n二\n\n",
+        )
+
+
+class SessionJournalTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_journal_under_test", "stand_ins.py")
+        cls.session = _load_module("session_journal_under_test", "session.py")
+
+    def test_sessions_opened_in_the_same_second_use_separate_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings = self.session.SessionSettings.from_env({"SUBTITLE_JOURNAL_DIR": tmp})
+            sessions = [
+                self.session.SubtitleSession(
+                    settings, lambda message: None, gemini_client=self.stand_ins.FakeGeminiClient(),
+                    deepgram_client=self.stand_ins.FakeDeepgramClient([]),
+                )
+                for _ in range(2)
+            ]
+            for session in sessions:
+                session.start()
+            paths = {session.journal.path for session in sessions}
+            for session in sessions:
+                session.close()
+
+            self.assertEqual(len(paths), 2)
+            self.assertEqual(sorted(os.listdir(tmp)), sorted(os.path.basename(path) for path in paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+import json
+import os
+import tempfile
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+
+class _Usage:
+    def __init__(self, prompt, output, cached=None):
+        self.prompt_token_count = prompt
+        self.candidates_token_count = output
+        self.cached_content_token_count = cached
+
+
+class TokenLedgerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        cls.module = _load_module("token_ledger_under_test", "token_ledger.py")
+
+    def test_records_by_call_type_and_model(self):
+        ledger = self.module.TokenLedger(profile="drama")
+        ledger.record("translate", "m1", _Usage(100, 20, 80))
+        ledger.record("translate", "m1", _Usage(110, 30))
+        ledger.record("summary", "m1", _Usage(900, 200))
+        ledger.record("fallback", "m2", None)
+
+        calls = ledger.snapshot()["session"]["calls"]
+        self.assertEqual(calls["translate/m1"], {"requests": 2, "input": 210, "output": 50, "cached": 80})
+        self.assertEqual(calls["summary/m1"]["input"], 900)
+        self.assertNotIn("fallback/m2", calls)
+        self.assertEqual(ledger.totals()["translate"]["requests"], 2)
+
+    def test_tokens_per_translated_minute(self):
+        ledger = self.module.TokenLedger()
+        self.assertIsNone(ledger.tokens_per_minute())
+        ledger.record("translate", "m1", _Usage(500, 100))
+        ledger.add_translated_audio(30.0)
+
+        self.assertEqual(ledger.tokens_per_minute(), 1200.0)
+
+    def test_gauge_sums_all_sessions_in_process(self):
+        module = _load_module("token_ledger_gauge_under_test", "token_ledger.py")
+        busy = module.TokenLedger(profile="drama")
+        quiet = module.TokenLedger(profile="news")
+        busy.record("translate", "m1", _Usage(500, 100))
+        busy.add_translated_audio(30.0)
+        # 另一個 session 更新時不會覆寫成自己的值
+        quiet.add_translated_audio(30.0)
+
+        self.assertEqual(quiet.tokens_per_minute(), 0.0)
+        self.assertEqual(module.TOKENS_PER_MINUTE.value(), 600.0)
+
+    def test_save_accumulates_across_sessions_per_profile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ledger", "token_ledger.json")
+            first = self.module.TokenLedger(profile="drama", path=path)
+            first.record("translate", "m1", _Usage(100, 10))
+            first.add_translated_audio(60.0)
+            first.save()
+            # 重複結算只寫入增量
+            first.record("translate", "m1", _Usage(50, 5))
+            first.save()
+
+            second = self.module.TokenLedger(profile="drama", path=path)
+            second.record("handover", "m1", _Usage(300, 3))
+            lifetime = second.save()
+            self.module.TokenLedger(profile="news", path=path).save()
+
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+
+        self.assertEqual(lifetime["sessions"], 2)
+        self.assertEqual(lifetime["calls"]["translate/m1"], {"requests": 2, "input": 150, "output": 15, "cached": 0})
+        self.assertEqual(lifetime["calls"]["handover/m1"]["input"], 300)
+        self.assertEqual(lifetime["tokens_per_minute"], 468.0)
+        self.assertEqual(data["profiles"]["drama"], lifetime)
+        self.assertEqual(data["profiles"]["news"]["sessions"], 0)
+
+    def test_unreadable_file_starts_fresh(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "token_ledger.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("{not json")
+            ledger = self.module.TokenLedger(path=path)
+            ledger.record("translate", "m1", _Usage(10, 1))
+
+            self.assertEqual(ledger.save()["calls"]["translate/m1"]["input"], 10)
+
+
+class TranslatorLedgerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_translator_ledger_under_test", "stand_ins.py")
+        cls.translator = _load_module("translator_ledger_under_test", "translator.py")
+        cls.ledger = _load_module("token_ledger_translator_under_test", "token_ledger.py")
+
+    def test_summary_handover_and_fallback_are_counted(self):
+        ledger = self.ledger.TokenLedger()
+        translator = self.translator.Translator(
+            api_key="stand-in", model="m1", client=self.stand_ins.FakeGeminiClient(),
+            max_context_tokens=150, ledger=ledger,
+        )
+        previous = (None, None)
+        for text in ["今日はいい天気ですね。", "散歩に行こう。", "駅まで歩くのをやめて", "バスに乗りました。"]:
+            current, _ = translator.translate_with_context_correction_streaming(text, *previous)
+            previous = (text, current)
+        translator.translate_without_context("はい")
+        translator.close()
+
+        totals = ledger.totals()
+        self.assertEqual(totals["translate"]["requests"], 1)
+        self.assertEqual(totals["correction"]["requests"], 3)
+        self.assertGreater(totals["summary"]["requests"], 0)
+        self.assertEqual(totals["handover"]["requests"], totals["summary"]["requests"])
+        self.assertEqual(totals["fallback"]["requests"], 1)
+
+    def test_file_mode_segments_are_counted(self):
+        ledger = self.ledger.TokenLedger()
+        translator = self.translator.Translator(
+            api_key="stand-in", model="m1", client=self.stand_ins.FakeGeminiClient(), ledger=ledger,
+        )
+        translator.translate_segment("散歩に行こう。", ["今日はいい天気ですね。"])
+        translator.close()
+
+        calls = ledger.snapshot()["session"]["calls"]
+        self.assertEqual(calls["translate/m1"]["requests"], 1)
+        self.assertGreater(calls["translate/m1"]["input"], 0)
+
+
+class SessionLedgerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_ledger_under_test", "stand_ins.py")
+        cls.session = _load_module("session_ledger_under_test", "session.py")
+
+    def test_session_records_call_types_and_emits_usage_on_close(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "token_ledger.json")
+            settings = self.session.SessionSettings.from_env({
+                "GEMINI_MODEL": "m1",
+                "SUBTITLE_MAX_AGE_SEC": "0",
+                "AUTOSUB_PROFILE": "drama",
+                "TOKEN_LEDGER_PATH": path,
+            })
+            messages = []
+            session = self.session.SubtitleSession(
+                settings, messages.append, gemini_client=self.stand_ins.FakeGeminiClient(),
+                deepgram_client=self.stand_ins.FakeDeepgramClient([]),
+            )
+            session.start()
+            for index, (text, span) in enumerate((("今日はいい天気ですね。", (0.0, 2.0)), ("散歩に行こう。", (3.0, 4.0)))):
+                session.transcriber.last_flush_span = span
+                session._on_transcript(f"t{index}", text)
+                session.translation_queue.wait_idle(2)
+            session.close()
+
+        usage = [message for message in messages if message["type"] == "token_usage"]
+        self.assertEqual(len(usage), 1)
+        calls = usage[0]["session"]["calls"]
+        self.assertEqual(calls["translate/m1"]["requests"], 1)
+        self.assertEqual(calls["correction/m1"]["requests"], 1)
+        self.assertEqual(usage[0]["session"]["translated_sec"], 3.0)
+        self.assertIsNotNone(usage[0]["session"]["tokens_per_minute"])
+        self.assertEqual(usage[0]["profile"], "drama")
+        self.assertEqual(usage[0]["lifetime"]["sessions"], 1)
+
+    def test_session_emits_usage_on_stats_tick(self):
+        settings = self.session.SessionSettings.from_env({"GEMINI_MODEL": "m1", "SUBTITLE_MAX_AGE_SEC": "0"})
+        messages = []
+        session = self.session.SubtitleSession(
+            settings, messages.append, gemini_client=self.stand_ins.FakeGeminiClient(),
+            deepgram_client=self.stand_ins.FakeDeepgramClient([]),
+        )
+        reporter = self.session.StatsReporter(lambda message: None, 0)
+        session.start()
+        session._on_transcript("t0", "今日はいい天気ですね。")
+        session.translation_queue.wait_idle(2)
+        reporter.report()
+        session.close()
+        reporter.report()
+
+        usage = [message for message in messages if message["type"] == "token_usage"]
+        # 一次來自 stats tick（不含跨 session 累計），一次來自 close；close 之後不再送出
+        self.assertEqual(len(usage), 2)
+        self.assertNotIn("lifetime", usage[0])
+        self.assertEqual(usage[0]["session"]["calls"]["translate/m1"]["requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+import wave
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+
+SCRIPT = [
+    (0.5, 2.0, "おはようございます"),
+    (3.0, 5.5, "今日は会議があります"),
+    (7.0, 9.0, "田中さんが来ます"),
+    (11.0, 12.4, "よろしくお願いします"),
+]
+AUDIO_SECONDS = 12.0  # 最後一句在音訊結尾前尚未結束，需靠 Finalize 落地
+
+
+class TranscribeFileTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.module = _load_module("transcribe_file_under_test", "transcribe_file.py")
+        cls.stand_ins = _load_module("stand_ins_file_under_test", "stand_ins.py")
+        cls.translator_module = _load_module("translator_file_under_test", "translator.py")
+
+    def _run(self, sample_rate=16000, channels=1, gemini_latency_sec=0.0, workers=4, responder=None):
+        deepgram = self.stand_ins.FakeDeepgramClient(SCRIPT)
+        gemini = self.stand_ins.FakeGeminiClient(responder=responder, base_latency_sec=gemini_latency_sec)
+        translator = self.translator_module.Translator(
+            api_key="dummy", model="test-model", client=gemini, parallel_requests=workers,
+        )
+
+        def factory(on_transcript, rate, chans):
+            return self.module.Transcriber(
+                api_key="dummy", on_transcript=on_transcript,
+                sample_rate=rate, channels=chans, client=deepgram,
+            )
+
+        pcm = io.BytesIO(b"\x00" * int(AUDIO_SECONDS * sample_rate * channels * 2))
+        started_at = time.time()
+        segments, audio_seconds = self.module.transcribe_stream(
+            pcm.read, sample_rate, channels, factory,
+            translate=translator.translate_segment, workers=workers, context_lines=2,
+        )
+        elapsed = time.time() - started_at
+        translator.close()
+        return segments, audio_seconds, elapsed, deepgram, gemini
+
+    def test_segments_carry_audio_timestamps_and_translations(self):
+        segments, audio_seconds, _, deepgram, _ = self._run()
+
+        self.assertAlmostEqual(audio_seconds, AUDIO_SECONDS)
+        self.assertEqual([s.text for s in segments], [text for _, _, text in SCRIPT])
+        self.assertEqual([(s.start, s.end) for s in segments[:3]], [(0.5, 2.0), (3.0, 5.5), (7.0, 9.0)])
+        self.assertEqual(segments[-1].start, 11.0)
+        self.assertEqual([s.translation for s in segments], [f"譯:{text}" for _, _, text in SCRIPT])
+        self.assertEqual(deepgram.connect_calls[0]["sample_rate"], 16000)
+        self.assertEqual(deepgram.connect_calls[0]["channels"], 1)
+        self.assertIn("Finalize", deepgram.connections[0].controls)
+
+    def test_translation_prompt_includes_previous_source_lines(self):
+        _, _, _, _, gemini = self._run()
+
+        prompts = {self.stand_ins.content_text(r["contents"]) for r in gemini.requests}
+        last = next(p for p in prompts if "原：よろしくお願いします" in p)
+        self.assertIn("今日は会議があります", last)
+        self.assertIn("田中さんが来ます", last)
+        self.assertNotIn("おはようございます", last)
+
+    def test_translations_run_concurrently_faster_than_real_time(self):
+        _, audio_seconds, elapsed, _, _ = self._run(gemini_latency_sec=0.2, workers=4)
+
+        # 4 段各 0.2 秒，序列處理至少 0.8 秒
+        self.assertLess(elapsed, 0.7)
+        self.assertLess(elapsed / audio_seconds, 0.1)
+
+    def test_segment_requests_are_recorded_in_metrics(self):
+        def segment_count():
+            return self.translator_module.REQUEST_SECONDS.snapshot().get("segment", {}).get("count", 0)
+
+        before = segment_count()
+        self._run()
+
+        self.assertEqual(segment_count() - before, len(SCRIPT))
+
+    def test_fallback_translations_also_run_concurrently(self):
+        # 回應不是 JSON，每段都走降級翻譯
+        segments, _, elapsed, _, gemini = self._run(
+            gemini_latency_sec=0.2, workers=4, responder=lambda prompt: "譯文",
+        )
+
+        self.assertEqual([s.translation for s in segments], ["譯文"] * len(SCRIPT))
+        self.assertEqual(len(gemini.requests), 2 * len(SCRIPT))
+        # 降級翻譯若排進單執行緒 executor，4 段至少 0.2 + 4 * 0.2 秒
+        self.assertLess(elapsed, 0.8)
+
+    def test_write_srt_matches_app_export_format(self):
+        segments, _, _, _, _ = self._run()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.srt")
+            self.module.write_srt(segments, path)
+            with open(path, encoding="utf-8") as f:
+                content = f.read()
+
+        self.assertTrue(content.startswith(
+            "1\n00:00:00,500 --> 00:00:02,000\nおはようございます\n譯:おはようございます\n\n2\n"
+        ))
+        self.assertEqual(content.count(" --> "), len(SCRIPT))
+
+    def test_open_audio_reads_wav_header(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "in.wav")
+            with wave.open(path, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(16000)
+                wav.writeframes(b"\x00\x00" * 16000)
+
+            with self.module.open_audio(path) as (read, sample_rate, channels):
+                data = b""
+                while chunk := read(3200):
+                    data += chunk
+
+        self.assertEqual((sample_rate, channels), (16000, 1))
+        self.assertEqual(len(data), 32000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import threading
+import time
+import unittest
+
+from test_context_correction_flow import _install_deepgram_stubs, _load_module
+
+SCRIPT = [
+    (0.2, 0.8, "おはようございます"),
+    (1.0, 1.6, "今日は会議があります"),
+    (2.0, 2.6, "よろしくお願いします"),
+]
+SAMPLE_RATE = 8000
+CHANNELS = 1
+CHUNK_SEC = 0.25
+
+
+class _TranscriberStandInTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        cls.transcriber_module = _load_module("transcriber_reconnect_under_test", "transcriber.py")
+        cls.stand_ins = _load_module("stand_ins_reconnect_under_test", "stand_ins.py")
+
+    def setUp(self):
+        self.transcripts = []
+        self.statuses = []
+        self.errors = []
+        self.flushed = threading.Event()
+
+    def _make(self, client, **kwargs):
+        def on_transcript(transcript_id, text, prev_id, prev_text, prev_translation):
+            self.transcripts.append((text, prev_text, transcriber.last_flush_span))
+            self.flushed.set()
+
+        transcriber = self.transcriber_module.Transcriber(
+            api_key="stand-in",
+            on_transcript=on_transcript,
+            on_error=lambda message, detail_code=None: self.errors.append((message, detail_code)),
+            on_status=self.statuses.append,
+            sample_rate=SAMPLE_RATE,
+            channels=CHANNELS,
+            client=client,
+            reconnect_base_delay_sec=0.01,
+            **kwargs,
+        )
+        return transcriber
+
+    def _chunk(self, index: int) -> bytes:
+        data = b"\x00" * int(CHUNK_SEC * SAMPLE_RATE * CHANNELS * 2)
+        return self.stand_ins.stamp_pcm(index * CHUNK_SEC, data)
+
+    def _wait_for(self, predicate, timeout=2.0):
+        deadline = time.time() + timeout
+        while not predicate() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(predicate())
+
+
+class TranscriberReconnectTests(_TranscriberStandInTestCase):
+    def test_reconnect_replays_recent_audio_without_duplicates(self):
+        client = self.stand_ins.FakeDeepgramClient(SCRIPT, stamped_audio=True)
+        transcriber = self._make(client)
+        transcriber.start()
+        try:
+            # 1.25 秒：第一句已落地、第二句只有 interim
+            for index in range(5):
+                transcriber.send_audio(self._chunk(index))
+            self._wait_for(lambda: len(self.transcripts) == 1)
+
+            client.connections[0].drop()
+            for index in range(5, 12):
+                transcriber.send_audio(self._chunk(index))
+            self._wait_for(lambda: len(self.transcripts) == 3)
+        finally:
+            transcriber.stop()
+
+        self.assertEqual([text for text, _, _ in self.transcripts], [text for _, _, text in SCRIPT])
+        # 前句上下文跨越重連保留
+        self.assertEqual(self.transcripts[1][1], SCRIPT[0][2])
+        # 新連線的時間戳換算回串流時間
+        self.assertEqual(self.transcripts[1][2], (1.0, 1.6))
+        self.assertEqual(len(client.connections), 2)
+        # 從包含最後落地結果（0.8 秒）的 chunk 開始重播
+        self.assertEqual(client.connections[1]._origin_sec, 0.75)
+        self.assertEqual(self.statuses, ["reconnecting", "reconnected"])
+        self.assertEqual(transcriber.reconnect_count, 1)
+        self.assertEqual(self.errors, [])
+
+    def test_reconnect_backs_off_and_reports_failure(self):
+        client = self.stand_ins.FakeDeepgramClient(SCRIPT, stamped_audio=True)
+        transcriber = self._make(client, reconnect_max_attempts=3)
+        transcriber.start()
+        try:
+            transcriber.send_audio(self._chunk(0))
+            client.fail_connects = 10
+            client.connections[0].drop()
+            self._wait_for(lambda: self.errors)
+        finally:
+            transcriber.stop()
+
+        self.assertEqual(self.errors[0][1], "RECONNECT_FAILED")
+        self.assertEqual(client.fail_connects, 7)
+        self.assertEqual(self.statuses, ["reconnecting"])
+
+    def test_replayed_results_inside_finalized_range_are_dropped(self):
+        transcriber = self._make(None)
+        transcriber._running = True
+        results = self.stand_ins.FakeResultsMessage
+        transcriber._on_message(results("おはよう", 0.2, 0.8, is_final=True, speech_final=True))
+        self.assertEqual(len(self.transcripts), 1)
+
+        # 重連後以 0.5 秒為起點：同一句時間戳略有出入、同時跨越邊界
+        transcriber._stream_offset_sec = 0.5
+        transcriber._on_message(results("おはよう", 0.0, 0.31, is_final=True, speech_final=True))
+        transcriber._on_message(results("よう", 0.0, 0.3, is_final=False, speech_final=False))
+        self.assertEqual(len(self.transcripts), 1)
+
+        transcriber._on_message(results("こんにちは", 0.5, 1.0, is_final=True, speech_final=True))
+        self.assertEqual([text for text, _, _ in self.transcripts], ["おはよう", "こんにちは"])
+        self.assertEqual(self.transcripts[1][2], (1.0, 1.5))
+
+
+class TranscriberRotationTests(_TranscriberStandInTestCase):
+    def test_rotation_switches_at_pause_without_duplicates(self):
+        client = self.stand_ins.FakeDeepgramClient(SCRIPT, stamped_audio=True)
+        transcriber = self._make(client, rotate_interval_sec=1.0, rotate_overlap_sec=0.5)
+        transcriber.start()
+        try:
+            for index in range(4):
+                transcriber.send_audio(self._chunk(index))
+            self._wait_for(lambda: transcriber._standby_connection is not None)
+            for index in range(4, 12):
+                transcriber.send_audio(self._chunk(index))
+            self._wait_for(lambda: len(self.transcripts) == 3)
+            self._wait_for(lambda: client.connections[0].closed)
+            self.assertIs(transcriber._connection, client.connections[1])
+        finally:
+            transcriber.stop()
+
+        self.assertEqual([text for text, _, _ in self.transcripts], [text for _, _, text in SCRIPT])
+        self.assertEqual(self.transcripts[2][2], (2.0, 2.6))
+        self.assertEqual(client.connections[1]._origin_sec, 1.0)
+        self.assertEqual(transcriber.rotation_count, 1)
+        self.assertEqual(self.statuses, [])
+
+    def test_primary_drop_during_overlap_promotes_standby(self):
+        client = self.stand_ins.FakeDeepgramClient(SCRIPT, stamped_audio=True)
+        transcriber = self._make(client)
+        transcriber.start()
+        try:
+            for index in range(4):
+                transcriber.send_audio(self._chunk(index))
+            self._wait_for(lambda: len(self.transcripts) == 1)
+            self.assertTrue(transcriber.rotate())
+            self.assertFalse(transcriber.rotate())
+            self._wait_for(lambda: transcriber._standby_connection is not None)
+
+            client.connections[0].drop()
+            for index in range(4, 12):
+                transcriber.send_audio(self._chunk(index))
+            self._wait_for(lambda: len(self.transcripts) == 3)
+        finally:
+            transcriber.stop()
+
+        self.assertEqual([text for text, _, _ in self.transcripts], [text for _, _, text in SCRIPT])
+        self.assertEqual(len(client.connect_calls), 2)
+        self.assertEqual(transcriber.rotation_count, 1)
+        self.assertEqual(self.statuses, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import threading
+import time
+import unittest
+
+from test_context_correction_flow import (
+    _install_deepgram_stubs,
+    _install_translator_stubs,
+    _load_module,
+)
+from translation_queue import PendingUtterance, TranslationQueue
+
+
+class TranslationQueueTests(unittest.TestCase):
+    def _make_queue(self, batch_threshold=3, max_batch_size=6, gate=None):
+        seen = []
+
+        def on_items(items):
+            if gate is not None:
+                gate.wait(timeout=2)
+            seen.append([item.text for item in items])
+
+        queue = TranslationQueue(on_items, batch_threshold=batch_threshold, max_batch_size=max_batch_size)
+        queue.start()
+        return queue, seen
+
+    def test_single_items_are_processed_one_by_one_without_backlog(self):
+        queue, seen = self._make_queue()
+        for text in ("A", "B"):
+            queue.put(PendingUtterance(text, text))
+            self.assertTrue(queue.wait_idle(timeout=2))
+        queue.close()
+
+        self.assertEqual(seen, [["A"], ["B"]])
+
+    def test_backlog_over_threshold_is_merged_in_order(self):
+        gate = threading.Event()
+        queue, seen = self._make_queue(batch_threshold=3, max_batch_size=4, gate=gate)
+        # 第一句卡在 handler，後面五句累積成 backlog
+        for text in ("A", "B", "C", "D", "E", "F"):
+            queue.put(PendingUtterance(text, text))
+            time.sleep(0.01)
+        gate.set()
+        queue.close()
+
+        self.assertEqual(seen, [["A"], ["B", "C", "D", "E"], ["F"]])
+
+    def test_threshold_zero_disables_batching(self):
+        gate = threading.Event()
+        queue, seen = self._make_queue(batch_threshold=0, gate=gate)
+        for text in ("A", "B", "C", "D"):
+            queue.put(PendingUtterance(text, text))
+        gate.set()
+        queue.close()
+
+        self.assertEqual(seen, [["A"], ["B"], ["C"], ["D"]])
+
+    def test_handler_error_does_not_stop_worker(self):
+        seen = []
+
+        def on_items(items):
+            if items[0].text == "boom":
+                raise RuntimeError("boom")
+            seen.append(items[0].text)
+
+        queue = TranslationQueue(on_items, batch_threshold=0)
+        queue.start()
+        queue.put(PendingUtterance("1", "boom"))
+        queue.put(PendingUtterance("2", "ok"))
+        queue.close()
+
+        self.assertEqual(seen, ["ok"])
+
+    def test_stale_items_are_handed_over_together_with_backlog_signal(self):
+        gate = threading.Event()
+        normal, stale, statuses = [], [], []
+
+        def on_items(items):
+            gate.wait(timeout=2)
+            normal.append([item.text for item in items])
+
+        queue = TranslationQueue(
+            on_items,
+            batch_threshold=0,
+            max_age_sec=5.0,
+            on_stale_items=lambda items: stale.append([item.text for item in items]),
+            on_backlog_status=lambda catching_up, pending, age: statuses.append((catching_up, pending)),
+        )
+        queue.start()
+        queue.put(PendingUtterance("0", "fresh"))
+        time.sleep(0.05)
+        old = time.time() - 10
+        for text in ("A", "B", "C"):
+            queue.put(PendingUtterance(text, text, enqueued_at=old))
+        queue.put(PendingUtterance("D", "D"))
+        gate.set()
+        queue.close()
+
+        self.assertEqual(stale, [["A", "B", "C"]])
+        self.assertEqual(normal, [["fresh"], ["D"]])
+        self.assertEqual(statuses[0], (True, 1))
+        self.assertEqual(statuses[-1][0], False)
+
+    def test_merge_policy_converges_back_to_real_time(self):
+        lags = []
+
+        def slow_request(items):
+            time.sleep(0.03)  # 每個 request 固定延遲，與句數無關
+            now = time.time()
+            lags.extend(now - item.enqueued_at for item in items)
+
+        queue = TranslationQueue(
+            slow_request, batch_threshold=0, max_age_sec=0.1, on_stale_items=slow_request
+        )
+        queue.start()
+        for index in range(60):
+            queue.put(PendingUtterance(str(index), str(index)))
+            time.sleep(0.01)
+        queue.close()
+
+        self.assertEqual(len(lags), 60)
+        # 逐句處理會落後約 1.2 秒；過舊合併讓延遲維持在上限附近
+        self.assertLess(max(lags[-20:]), 0.35)
+
+
+class SessionTranslationTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _install_deepgram_stubs()
+        _install_translator_stubs()
+        cls.stand_ins = _load_module("stand_ins_stale_under_test", "stand_ins.py")
+        cls.session = _load_module("session_stale_under_test", "session.py")
+
+    def test_merged_stale_items_are_split_by_max_batch_size(self):
+        settings = self.session.SessionSettings.from_env({"TRANSLATION_MAX_BATCH_SIZE": "6"})
+        session = self.session.SubtitleSession(
+            settings, lambda message: None, gemini_client=self.stand_ins.FakeGeminiClient(),
+        )
+        batches = []
+        session._on_translation_items = lambda items: batches.append([item.text for item in items])
+
+        session._on_stale_items([PendingUtterance(str(index), str(index)) for index in range(20)])
+
+        self.assertEqual([len(batch) for batch in batches], [6, 6, 6, 2])
+        self.assertEqual(sum(batches, []), [str(index) for index in range(20)])
+
+    def test_failed_subtitle_carries_target_language(self):
+        settings = self.session.SessionSettings.from_env({"TARGET_LANGUAGE": "en"})
+        messages = []
+        session = self.session.SubtitleSession(
+            settings, messages.append, gemini_client=self.stand_ins.FakeGeminiClient(),
+        )
+
+        session.send_translation_error("t1", "こんにちは", is_incomplete=False)
+
+        subtitle = next(message for message in messages if message["type"] == "subtitle")
+        self.assertEqual(subtitle["translation"], "[翻譯失敗]")
+        self.assertEqual(subtitle["language"], "en")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+"""
+Token 用量帳本（per session / profile）
+
+Translator 在每個 Gemini 回應後依呼叫類型記錄 usage metadata：
+- translate：當句翻譯（只帶原文的 prompt、batch）
+- correction：帶前句的上下文修正 prompt、deferred 模式的背景檢查
+- summary：context 超過上限時的摘要、window 模式的滾動摘要
+- handover：摘要帶入新 session
+- fallback：不帶歷史的降級翻譯
+
+帳本依 (類型, 模型) 累計 input / output / cached token 與 request 數，cached 是 input 中命中快取的部分。
+session 結束時把本次增量合併到 TOKEN_LEDGER_PATH（JSON），依 profile 累計跨 session 的總量；
+「每分鐘翻譯音訊的 token 數」作為效率指標：IPC token_usage 訊息（每次 stats 送出時與 session 結束時）
+帶本 session 的值，gauge 則是整個 process 所有 session 的合計（server 模式下各 session 不互相覆寫）。
+"""
+
+import json
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from logger import get_logger
+from metrics import counter, gauge
+
+log = get_logger("Ledger")
+
+CALL_TRANSLATE = "translate"
+CALL_CORRECTION = "correction"
+CALL_SUMMARY = "summary"
+CALL_HANDOVER = "handover"
+CALL_FALLBACK = "fallback"
+CALL_TYPES = (CALL_TRANSLATE, CALL_CORRECTION, CALL_SUMMARY, CALL_HANDOVER, CALL_FALLBACK)
+
+LEDGER_TOKENS = counter(
+    "autosub_ledger_tokens_total", "Gemini tokens by call type and model", labels=("call_type", "model", "type"),
+)
+TOKENS_PER_MINUTE = gauge(
+    "autosub_tokens_per_translated_minute",
+    "Input + output tokens per minute of translated audio, summed over all sessions in the process",
+)
+
+_USAGE_FIELDS = (
+    ("input", "prompt_token_count"),
+    ("output", "candidates_token_count"),
+    ("cached", "cached_content_token_count"),
+)
+LEDGER_VERSION = 1
+# server 模式多個 session 可能同時結算到同一個檔案
+_FILE_LOCK = threading.Lock()
+# 整個 process 的合計（TOKENS_PER_MINUTE gauge 用）
+_PROCESS_LOCK = threading.Lock()
+_process_tokens = 0
+_process_translated_sec = 0.0
+
+
+def _empty_entry() -> dict:
+    return {"requests": 0, "input": 0, "output": 0, "cached": 0}
+
+
+def _add_entry(target: dict, source: dict) -> None:
+    for field, value in source.items():
+        target[field] = target.get(field, 0) + value
+
+
+def _tokens_per_minute(calls: dict, translated_sec: float) -> Optional[float]:
+    if translated_sec <= 0:
+        return None
+    tokens = sum(entry["input"] + entry["output"] for entry in calls.values())
+    return round(tokens / (translated_sec / 60), 1)
+
+
+def _add_process_usage(tokens: int = 0, translated_sec: float = 0.0) -> None:
+    """累加到 process 合計並更新 gauge"""
+    global _process_tokens, _process_translated_sec
+    with _PROCESS_LOCK:
+        _process_tokens += tokens
+        _process_translated_sec += translated_sec
+        if _process_translated_sec > 0:
+            TOKENS_PER_MINUTE.set(round(_process_tokens / (_process_translated_sec / 60), 1))
+
+
+class TokenLedger:
+    """
+    一個 session 的 token 帳本（執行緒安全：翻譯 worker 與背景檢查都會記錄）
+
+    Args:
+        profile: 累計用的 profile 名稱
+        path: 跨 session 累計檔路徑（None 表示不保存）
+    """
+
+    def __init__(self, profile: str = "default", path: Optional[str] = None):
+        self.profile = profile or "default"
+        self.path = os.path.expanduser(path) if path else None
+        self._lock = threading.Lock()
+        # "call_type/model" → {"requests", "input", "output", "cached"}
+        self._calls: dict[str, dict] = {}
+        self._translated_sec = 0.0
+        # 已合併到檔案的部分（save() 可重複呼叫，只寫入增量）
+        self._saved_calls: dict[str, dict] = {}
+        self._saved_translated_sec = 0.0
+
+    def record(self, call_type: str, model: str, usage) -> None:
+        """記錄一個回應的 usage metadata（None 表示沒有用量資訊）"""
+        if usage is None:
+            return
+        values = {}
+        for token_type, field in _USAGE_FIELDS:
+            value = getattr(usage, field, None)
+            values[token_type] = value if isinstance(value, int) else 0
+        with self._lock:
+            entry = self._calls.setdefault(f"{call_type}/{model}", _empty_entry())
+            entry["requests"] += 1
+            _add_entry(entry, values)
+        for token_type, value in values.items():
+            if value:
+                LEDGER_TOKENS.inc(value, call_type=call_type, model=model, type=token_type)
+        _add_process_usage(tokens=values["input"] + values["output"])
+
+    def add_translated_audio(self, seconds: float) -> None:
+        """已送出字幕涵蓋的音訊長度"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._translated_sec += seconds
+        _add_process_usage(translated_sec=seconds)
+
+    def tokens_per_minute(self) -> Optional[float]:
+        """本 session 每分鐘翻譯音訊的 input + output token 數（尚無翻譯音訊時為 None）"""
+        with self._lock:
+            return _tokens_per_minute(self._calls, self._translated_sec)
+
+    def totals(self) -> dict:
+        """本 session 依類型加總（不分模型）"""
+        totals: dict[str, dict] = {}
+        with self._lock:
+            for key, entry in self._calls.items():
+                _add_entry(totals.setdefault(key.split("/", 1)[0], _empty_entry()), entry)
+        return totals
+
+    def snapshot(self, lifetime: Optional[dict] = None) -> dict:
+        """IPC token_usage 訊息內容：本 session 明細與（若有）此 profile 的跨 session 累計"""
+        with self._lock:
+            calls = {key: dict(entry) for key, entry in self._calls.items()}
+            translated_sec = self._translated_sec
+        message = {
+            "type": "token_usage",
+            "profile": self.profile,
+            "session": {
+                "calls": calls,
+                "translated_sec": round(translated_sec, 1),
+                "tokens_per_minute": _tokens_per_minute(calls, translated_sec),
+            },
+        }
+        if lifetime is not None:
+            message["lifetime"] = lifetime
+        return message
+
+    # ------------------------------------------------------------------
+    # 跨 session 累計
+    # ------------------------------------------------------------------
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == LEDGER_VERSION:
+                return data
+            log.warning("Ignoring token ledger with unknown format: %s", self.path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning("Token ledger unreadable, starting fresh: %s", e)
+        return {"version": LEDGER_VERSION, "profiles": {}}
+
+    def save(self) -> Optional[dict]:
+        """
+        把尚未保存的增量合併到累計檔（寫入暫存檔後 rename）
+
+        Returns:
+            此 profile 的累計內容；未設定 path 或寫入失敗時為 None
+        """
+        if not self.path:
+            return None
+        with _FILE_LOCK, self._lock:
+            delta_calls = {}
+            for key, entry in self._calls.items():
+                saved = self._saved_calls.get(key, _empty_entry())
+                delta = {field: value - saved.get(field, 0) for field, value in entry.items()}
+                if any(delta.values()):
+                    delta_calls[key] = delta
+            delta_sec = self._translated_sec - self._saved_translated_sec
+            first_save = not self._saved_calls and not self._saved_translated_sec
+            data = self._load()
+            profile = data["profiles"].setdefault(
+                self.profile, {"sessions": 0, "translated_sec": 0.0, "calls": {}}
+            )
+            if first_save and (delta_calls or delta_sec):
+                profile["sessions"] += 1
+            profile["translated_sec"] = round(profile["translated_sec"] + delta_sec, 3)
+            for key, delta in delta_calls.items():
+                _add_entry(profile["calls"].setdefault(key, _empty_entry()), delta)
+            profile["tokens_per_minute"] = _tokens_per_minute(profile["calls"], profile["translated_sec"])
+            tmp_path = None
+            try:
+                directory = os.path.dirname(self.path) or "."
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token-ledger-", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                log.warning("Failed to save token ledger: %s", e)
+                if tmp_path and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                return None
+            self._saved_calls = {key: dict(entry) for key, entry in self._calls.items()}
+            self._saved_translated_sec = self._translated_sec
+        return profile
+
+
+def ledger_from_settings(settings) -> TokenLedger:
+    """依 session 設定建立帳本（TOKEN_LEDGER_PATH 為空時只記錄本 session）"""
+    return TokenLedger(profile=settings.profile_name, path=settings.token_ledger_path or None)
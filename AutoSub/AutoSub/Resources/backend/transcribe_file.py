@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+離線檔案模式：錄好的音訊檔 / PCM dump 直接轉成 SRT
+不依即時時鐘送音訊，而是以 Deepgram 可接受的最快速度串流，各段翻譯以有限併發平行處理
+
+用法:
+    cd AutoSub/AutoSub/Resources/backend
+    DEEPGRAM_API_KEY=xxx GEMINI_API_KEY=xxx python transcribe_file.py episode.wav -o episode.srt
+    python transcribe_file.py dump.pcm --sample-rate 24000 --channels 2 -o dump.srt
+
+輸入格式：
+- .wav（16-bit PCM）：取樣率 / 聲道從檔頭讀取
+- .pcm / .raw（或 --raw）：16-bit little-endian PCM，預設與即時模式相同（24kHz stereo）
+- 其他格式：需系統安裝 ffmpeg，轉為 24kHz stereo PCM 後串流
+
+語言、模型、斷句等設定沿用 main.py 的環境變數
+（SOURCE_LANGUAGE、TARGET_LANGUAGE、GEMINI_MODEL、TRANSLATION_CONTEXT、DEEPGRAM_KEYTERMS、DEEPGRAM_*）
+完成後在 stderr 輸出 real-time factor（處理時間 / 音訊長度）
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from typing import Callable, Iterator, Optional
+
+from srt_format import EXPORT_MODE_BILINGUAL, EXPORT_MODES, format_srt_entry
+from transcriber import Transcriber
+from translator import Translator
+
+BYTES_PER_SAMPLE = 2
+DEFAULT_SAMPLE_RATE = 24000
+DEFAULT_CHANNELS = 2
+RAW_EXTENSIONS = (".pcm", ".raw")
+# 沒有音訊時間資訊時的預估字幕長度（與 App 端匯出一致）
+FALLBACK_DURATION_SEC = 3.0
+
+
+class FileSegment:
+    """一段已落地的字幕（音訊時間以秒計，自檔案開頭起算）"""
+
+    __slots__ = ("start", "end", "text", "translation")
+
+    def __init__(self, start: float, end: float, text: str):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.translation: Optional[str] = None
+
+
+@contextlib.contextmanager
+def open_audio(
+    path: str,
+    raw: bool = False,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    channels: int = DEFAULT_CHANNELS,
+) -> Iterator[tuple[Callable[[int], bytes], int, int]]:
+    """
+    開啟音訊來源
+
+    Yields:
+        (read(nbytes) -> bytes, sample_rate, channels)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if raw or extension in RAW_EXTENSIONS:
+        with open(path, "rb") as f:
+            yield f.read, sample_rate, channels
+        return
+
+    if extension == ".wav":
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != BYTES_PER_SAMPLE:
+                raise ValueError(f"Only 16-bit PCM WAV is supported (got {wav.getsampwidth() * 8}-bit)")
+            frame_size = wav.getnchannels() * BYTES_PER_SAMPLE
+            yield (lambda n: wav.readframes(max(1, n // frame_size))), wav.getframerate(), wav.getnchannels()
+        return
+
+    if not shutil.which("ffmpeg"):
+        raise ValueError(f"Unsupported format '{extension}' (install ffmpeg or pass WAV / raw PCM)")
+    process = subprocess.Popen(
+        ["ffmpeg", "-v", "error", "-i", path,
+         "-f", "s16le", "-acodec", "pcm_s16le",
+         "-ar", str(DEFAULT_SAMPLE_RATE), "-ac", str(DEFAULT_CHANNELS), "-"],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        yield process.stdout.read, DEFAULT_SAMPLE_RATE, DEFAULT_CHANNELS
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def transcribe_stream(
+    read: Callable[[int], bytes],
+    sample_rate: int,
+    channels: int,
+    transcriber_factory: Callable[..., Transcriber],
+    translate: Optional[Callable[[str, list[str]], str]] = None,
+    workers: int = 4,
+    context_lines: int = 3,
+    chunk_ms: int = 100,
+) -> tuple[list[FileSegment], float]:
+    """
+    串流整個音訊來源並翻譯各段
+
+    Args:
+        read: read(nbytes) -> bytes，讀完回傳空 bytes
+        transcriber_factory: (on_transcript, sample_rate, channels) -> Transcriber
+        translate: (text, context_sources) -> translation，None 表示只轉錄
+        workers: 翻譯併發上限
+        context_lines: 每段翻譯帶入的前文句數
+
+    Returns:
+        (依開始時間排序的字幕段落, 音訊長度秒數)
+    """
+    segments: list[FileSegment] = []
+    futures: list[tuple[FileSegment, concurrent.futures.Future]] = []
+    lock = threading.Lock()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers))
+    transcriber_ref: list[Optional[Transcriber]] = [None]
+
+    def on_transcript(transcript_id, text, prev_id=None, prev_text=None, prev_translation=None):
+        if text.endswith(Transcriber.INCOMPLETE_SUFFIX):
+            text = text[:-len(Transcriber.INCOMPLETE_SUFFIX)]
+        text = text.strip()
+        if not text:
+            return
+        with lock:
+            last_end = segments[-1].end if segments else 0.0
+            span = transcriber_ref[0].last_flush_span if transcriber_ref[0] else None
+            start, end = span if span else (last_end, last_end + FALLBACK_DURATION_SEC)
+            segment = FileSegment(start, max(end, start + 0.001), text)
+            context = [s.text for s in segments[-context_lines:]] if context_lines > 0 else []
+            segments.append(segment)
+            if translate:
+                futures.append((segment, executor.submit(translate, text, context)))
+        print(f"[File] Segment {len(segments)} [{start:.2f}-{end:.2f}] {text}", file=sys.stderr, flush=True)
+
+    chunk_bytes = max(1, sample_rate * channels * BYTES_PER_SAMPLE * chunk_ms // 1000)
+    total_bytes = 0
+    try:
+        with transcriber_factory(on_transcript, sample_rate, channels) as transcriber:
+            transcriber_ref[0] = transcriber
+            while True:
+                chunk = read(chunk_bytes)
+                if not chunk:
+                    break
+                transcriber.send_audio(chunk)
+                total_bytes += len(chunk)
+            transcriber.finalize()
+
+        for segment, future in futures:
+            try:
+                segment.translation = future.result()
+            except Exception as e:
+                print(f"[File] Translation failed: {e}", file=sys.stderr, flush=True)
+                segment.translation = ""
+    finally:
+        executor.shutdown(wait=True)
+
+    audio_seconds = total_bytes / (sample_rate * channels * BYTES_PER_SAMPLE)
+    return sorted(segments, key=lambda s: s.start), audio_seconds
+
+
+def write_srt(segments: list[FileSegment], path: str, mode: str = EXPORT_MODE_BILINGUAL) -> None:
+    """以 App 端匯出相同的格式寫出 SRT"""
+    with open(path, "w", encoding="utf-8") as f:
+        for index, segment in enumerate(segments, start=1):
+            f.write(format_srt_entry(index, segment.start, segment.end,
+                                     segment.text, segment.translation, mode))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe and translate an audio file to SRT")
+    parser.add_argument("input", help="音訊檔（.wav / .pcm / .raw，或 ffmpeg 可讀的格式）")
+    parser.add_argument("-o", "--output", help="輸出 SRT 路徑（預設為輸入檔名改 .srt）")
+    parser.add_argument("--raw", action="store_true", help="視為 16-bit little-endian PCM")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE)
+    parser.add_argument("--channels", type=int, default=DEFAULT_CHANNELS)
+    parser.add_argument("--workers", type=int, default=4, help="翻譯併發上限")
+    parser.add_argument("--context-lines", type=int, default=3, help="每段翻譯帶入的前文句數")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="每次送出的音訊長度")
+    parser.add_argument("--mode", choices=EXPORT_MODES, default=EXPORT_MODE_BILINGUAL)
+    parser.add_argument("--no-translate", action="store_true", help="只轉錄，不翻譯")
+    args = parser.parse_args()
+
+    deepgram_key = os.environ.get("DEEPGRAM_API_KEY")
+    gemini_key = os.environ.get("GEMINI_API_KEY")
+    if not deepgram_key or (not gemini_key and not args.no_translate):
+        print("錯誤: 需要 DEEPGRAM_API_KEY 與 GEMINI_API_KEY 環境變數", file=sys.stderr)
+        sys.exit(1)
+
+    source_lang = os.environ.get("SOURCE_LANGUAGE", "ja")
+    keyterms_raw = os.environ.get("DEEPGRAM_KEYTERMS", "")
+    keyterms = [line.strip() for line in keyterms_raw.splitlines() if line.strip()]
+
+    translator = None
+    if not args.no_translate:
+        translator = Translator(
+            api_key=gemini_key,
+            model=os.environ.get("GEMINI_MODEL", "gemini-2.5-flash-lite-preview-09-2025"),
+            source_language=source_lang,
+            target_language=os.environ.get("TARGET_LANGUAGE", "zh-TW"),
+            translation_context=os.environ.get("TRANSLATION_CONTEXT", ""),
+            keyterms=keyterms,
+            parallel_requests=args.workers,
+        )
+
+    def transcriber_factory(on_transcript, sample_rate, channels):
+        return Transcriber(
+            api_key=deepgram_key,
+            language=source_lang,
+            on_transcript=on_transcript,
+            endpointing_ms=int(os.environ.get("DEEPGRAM_ENDPOINTING_MS", "200")),
+            utterance_end_ms=int(os.environ.get("DEEPGRAM_UTTERANCE_END_MS", "1000")),
+            max_buffer_chars=int(os.environ.get("DEEPGRAM_MAX_BUFFER_CHARS", "50")),
+            split_at_boundaries=os.environ.get("DEEPGRAM_BOUNDARY_FLUSH", "1") != "0",
+            keyterms=keyterms,
+            sample_rate=sample_rate,
+            channels=channels,
+        )
+
+    output_path = args.output or os.path.splitext(args.input)[0] + ".srt"
+    started_at = time.time()
+    try:
+        with open_audio(args.input, args.raw, args.sample_rate, args.channels) as (read, sample_rate, channels):
+            segments, audio_seconds = transcribe_stream(
+                read, sample_rate, channels, transcriber_factory,
+                translate=translator.translate_segment if translator else None,
+                workers=args.workers,
+                context_lines=args.context_lines,
+                chunk_ms=args.chunk_ms,
+            )
+    finally:
+        if translator:
+            translator.close()
+    elapsed = time.time() - started_at
+
+    write_srt(segments, output_path, args.mode)
+    rtf = elapsed / audio_seconds if audio_seconds else 0.0
+    print(f"[File] {len(segments)} segments -> {output_path}", file=sys.stderr, flush=True)
+    print(f"[File] audio {audio_seconds:.1f}s processed in {elapsed:.1f}s "
+          f"(RTF {rtf:.3f}, {1 / rtf if rtf else 0:.1f}x real-time)", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    main()
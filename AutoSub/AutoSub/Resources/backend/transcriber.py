@@ -2,23 +2,42 @@
 Deepgram 即時語音轉文字模組
 使用 Deepgram SDK v5.3.2
 基於 PoC 驗證成功的同步實作
+
+buffer / flush / interim 的處理在 transcriber_base.BaseTranscriber，
+這裡負責 Deepgram 連線、keepalive、斷線重連、重播去重與連線輪替
 """
 
-import sys
 import threading
 import time
-import uuid
+from collections import deque
 from typing import Callable, Optional
 
+from audio_ingest import PcmRing
 from deepgram import DeepgramClient
 from deepgram.core.events import EventType
 from deepgram.extensions.types.sockets import (
     ListenV1ControlMessage,
     ListenV1MediaMessage,
 )
+from logger import get_logger
+from metrics import counter
+from segmentation import SegmentationController
+from transcriber_base import AUDIO_BYTES, AUDIO_CHUNKS, BaseTranscriber
+
+log = get_logger("Transcriber")
+deepgram_log = get_logger("Deepgram Error")
+listener_log = get_logger("Listener Error")
+
+MESSAGES = counter("autosub_transcriber_messages_total", "Deepgram messages received", labels=("type",))
+KEEPALIVES = counter("autosub_transcriber_keepalives_total", "KeepAlive messages sent")
+RECONNECTS = counter("autosub_transcriber_reconnects_total", "Reconnect outcomes", labels=("result",))
+ROTATIONS = counter("autosub_transcriber_rotations_total", "Make-before-break connection rotations")
+REPLAYED_DUPLICATES = counter(
+    "autosub_transcriber_replayed_duplicates_total", "Results dropped as duplicates of replayed audio"
+)
 
 
-class Transcriber:
+class Transcriber(BaseTranscriber):
     """
     Deepgram 即時轉錄器
 
@@ -29,8 +48,15 @@ class Transcriber:
 
     KEEPALIVE_INTERVAL_SEC = 3.0
     AUDIO_IDLE_THRESHOLD_SEC = 2.0
-    WATCHDOG_TICK_SEC = 0.5
-    INCOMPLETE_SUFFIX = " [暫停]"
+    RECONNECT_MAX_DELAY_SEC = 8.0
+    # 重播 / 輪替重疊視窗內，起點早於已落地範圍、結束時間落在範圍內（含此容差）的結果視為重複
+    REPLAY_DEDUP_TOLERANCE_SEC = 0.3
+    # 起點與已落地範圍終點的比較容差（浮點誤差；正常串流的下一個結果從終點開始）
+    REPLAY_BOUNDARY_EPSILON_SEC = 0.02
+    RECENT_FINALS_LIMIT = 8
+    # 輪替重疊超過此秒數仍等不到停頓時，在下一個 final 結果後直接切換
+    ROTATE_MAX_OVERLAP_SEC = 30.0
+
 
     def __init__(
         self,
@@ -44,6 +70,17 @@ class Transcriber:
         max_buffer_chars: int = 50,
         interim_stale_timeout_sec: float = 4.0,
         keyterms: Optional[list[str]] = None,
+        sample_rate: int = 24000,
+        channels: int = 2,
+        client=None,
+        on_status: Optional[Callable[[str], None]] = None,
+        reconnect_max_attempts: int = 5,
+        reconnect_base_delay_sec: float = 0.5,
+        replay_buffer_sec: float = 10.0,
+        rotate_interval_sec: float = 0.0,
+        rotate_overlap_sec: float = 2.0,
+        segmentation: Optional[SegmentationController] = None,
+        split_at_boundaries: bool = True,
     ):
         """
         初始化轉錄器
@@ -63,161 +100,513 @@ class Transcriber:
             max_buffer_chars: 最大累積字數，預設 50（減少 38%）
             interim_stale_timeout_sec: interim 無更新超過此秒數即落地為 [暫停]，預設 4.0 秒
             keyterms: Deepgram keyterm 提示詞清單（可為 None）
+            sample_rate: PCM 取樣率，預設 24000
+            channels: PCM 聲道數，預設 2
+            client: 已建立的 DeepgramClient（可空，供共用連線或本地替身使用）
+            on_status: 連線狀態回呼 (status: str) -> None，斷線時為 "reconnecting"，重連成功為 "reconnected"
+            reconnect_max_attempts: 斷線後最多重連次數（0 表示不重連，只回報錯誤）
+            reconnect_base_delay_sec: 重連退避的起始延遲，每次失敗加倍（上限 RECONNECT_MAX_DELAY_SEC）
+            replay_buffer_sec: 保留最近多少秒的 PCM，重連後從最後落地的結果之後重播
+            rotate_interval_sec: 每條連線送滿此秒數音訊後預先輪替到新連線（0 表示停用，可用 rotate() 手動觸發）
+            rotate_overlap_sec: 輪替時新舊連線同時收音訊的最短秒數，之後在停頓處切換
+            segmentation: 自適應斷句控制器（None 表示使用上面的固定門檻）
+            split_at_boundaries: 超過 max_buffer_chars 時在最後一個句尾切開，剩餘部分留在 buffer；
+                                 句尾太前面或沒有句尾時最多累積到 HARD_CAP_RATIO 倍，再改在子句邊界切開；
+                                 False 時整段送出
         """
+        super().__init__(
+            language=language,
+            on_transcript=on_transcript,
+            on_interim=on_interim,
+            on_error=on_error,
+            endpointing_ms=endpointing_ms,
+            utterance_end_ms=utterance_end_ms,
+            max_buffer_chars=max_buffer_chars,
+            interim_stale_timeout_sec=interim_stale_timeout_sec,
+            keyterms=keyterms,
+            sample_rate=sample_rate,
+            channels=channels,
+            segmentation=segmentation,
+            split_at_boundaries=split_at_boundaries,
+        )
         self.api_key = api_key
-        self.language = language
-        self.on_transcript = on_transcript
-        self.on_interim = on_interim
-        self.on_error = on_error
-        self.endpointing_ms = endpointing_ms
-        self.utterance_end_ms = utterance_end_ms
-        self._interim_stale_timeout_sec = interim_stale_timeout_sec
-        self.keyterms = keyterms or []
-
-        self._client: Optional[DeepgramClient] = None
+        self.on_status = on_status
+        self.reconnect_max_attempts = reconnect_max_attempts
+        self.reconnect_base_delay_sec = reconnect_base_delay_sec
+        self.rotate_interval_sec = rotate_interval_sec
+        self.rotate_overlap_sec = rotate_overlap_sec
+
+        self._client: Optional[DeepgramClient] = client
         self._context_manager = None
         self._connection = None
         self._listener_thread: Optional[threading.Thread] = None
-        self._keepalive_thread: Optional[threading.Thread] = None
-        self._keepalive_stop_event = threading.Event()
-        self._state_lock = threading.Lock()
-        self._running = False
-        self._start_time: float = 0
         self._last_audio_sent_at: float = 0
         self._last_keepalive_sent_at: float = 0
-        self._last_interim_text: Optional[str] = None
-        self._last_interim_updated_at: float = 0
-        self._utterance_buffer: list[str] = []  # 累積 buffer
-        self._max_buffer_chars: int = max_buffer_chars  # 最大累積字數，超過就強制 flush
 
-        # Phase 2: 追蹤前一句資訊（用於上下文修正）
-        # 格式: (id, text, translation)
-        self._previous_transcript: Optional[tuple[str, str, Optional[str]]] = None
+        # 斷線重連：最近音訊的 ring buffer（預先配置，送入的 frame 只做複製）、各 frame 的起點位置，
+        # 與目前連線的時間基準。Deepgram 每條連線的時間戳都從 0 開始，重播起點即新連線的 offset
+        self._send_lock = threading.Lock()
+        self._reconnect_lock = threading.Lock()
+        block_align = channels * 2
+        replay_capacity = int(max(0.0, replay_buffer_sec) * self._bytes_per_second)
+        self._replay_ring = PcmRing(replay_capacity - replay_capacity % block_align)
+        self._replay_frame_starts: deque[int] = deque()
+        self._audio_sent_sec = 0.0
+        self._stream_offset_sec = 0.0
+        self._stream_generation = 0
+        self._generation_counter = 0
+        self._reconnecting = False
+        self._reconnect_thread: Optional[threading.Thread] = None
+        # 已落地（is_final）結果的最晚結束時間與最近幾句文字，用於去除重播產生的重複結果
+        self._last_final_end_sec = 0.0
+        self._recent_finals: deque[str] = deque(maxlen=self.RECENT_FINALS_LIMIT)
+        self.reconnect_count = 0
+
+        # 連線輪替（make-before-break）：預備連線與其在切換前收到的訊息。
+        # 所有連線的訊息處理都在 _message_lock 下進行，切換時先處理預備連線已收到的訊息
+        self._standby_context_manager = None
+        self._standby_connection = None
+        self._standby_generation = 0
+        self._standby_offset_sec = 0.0
+        self._standby_messages: list = []
+        self._rotating = False
+        self._rotation_retry_at_sec = 0.0
+        self.rotation_count = 0
 
     def start(self) -> None:
         """啟動 Deepgram 連線"""
-        print("[Transcriber] start() called", file=sys.stderr, flush=True)
+        log.info("start() called")
         self._start_time = time.time()
         self._running = True
 
-        # 建立客戶端
-        print("[Transcriber] Creating DeepgramClient...", file=sys.stderr, flush=True)
-        self._client = DeepgramClient(api_key=self.api_key)
-        print("[Transcriber] DeepgramClient created", file=sys.stderr, flush=True)
+        # 建立客戶端（已注入時沿用）
+        if self._client is None:
+            log.info("Creating DeepgramClient...")
+            self._client = DeepgramClient(api_key=self.api_key)
+            log.info("DeepgramClient created")
+
+        context_manager, connection = self._open_connection()
+        self._attach_connection(context_manager, connection, offset_sec=0.0)
+
+        now = time.time()
+        self._last_audio_sent_at = now
+        self._last_keepalive_sent_at = now
+        self._start_watchdog()
+
+        # 等待連線建立
+        time.sleep(0.1)
 
-        # 建立 WebSocket 連線
-        print("[Transcriber] Connecting to Deepgram...", file=sys.stderr, flush=True)
+    def _open_connection(self):
+        """建立 WebSocket 連線，回傳 (context_manager, connection)"""
+        log.info("Connecting to Deepgram...")
         connect_kwargs = dict(
             model="nova-3",
             language=self.language,
             smart_format=True,
             interim_results=True,
-            endpointing=self.endpointing_ms,
+            endpointing=self.segmentation.endpointing_ms if self.segmentation else self.endpointing_ms,
             utterance_end_ms=self.utterance_end_ms,
             vad_events=True,
             encoding="linear16",
-            sample_rate=24000,
-            channels=2,
+            sample_rate=self.sample_rate,
+            channels=self.channels,
         )
         if self.keyterms:
             connect_kwargs["keyterm"] = self.keyterms
-        self._context_manager = self._client.listen.v1.connect(**connect_kwargs)
-        print("[Transcriber] Entering context manager...", file=sys.stderr, flush=True)
+        context_manager = self._client.listen.v1.connect(**connect_kwargs)
+        log.debug("Entering context manager...")
 
         # 使用 timeout 機制來診斷連線問題
         import concurrent.futures
-        def connect_with_timeout():
-            return self._context_manager.__enter__()
 
         try:
             with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(connect_with_timeout)
-                self._connection = future.result(timeout=10)  # 10 秒超時
-            print("[Transcriber] WebSocket connected!", file=sys.stderr, flush=True)
+                future = executor.submit(context_manager.__enter__)
+                connection = future.result(timeout=10)  # 10 秒超時
+            log.info("WebSocket connected!")
         except concurrent.futures.TimeoutError:
-            print("[Transcriber] ERROR: Connection timed out after 10 seconds!", file=sys.stderr, flush=True)
+            log.error("ERROR: Connection timed out after 10 seconds!")
             raise Exception("Deepgram connection timeout")
+        return context_manager, connection
+
+    def _attach_connection(self, context_manager, connection, offset_sec: float, standby: bool = False) -> None:
+        """切換到新連線（或掛上輪替用的預備連線）：註冊事件處理並在背景執行緒監聽"""
+        self._generation_counter += 1
+        generation = self._generation_counter
 
         # 註冊事件處理
         # 注意：SDK v5.x 沒有獨立的 UTTERANCE_END 事件
         # 所有訊息類型都透過 MESSAGE 事件接收，需檢查 message.type
-        self._connection.on(EventType.MESSAGE, self._on_message)
-        self._connection.on(EventType.ERROR, self._on_error)
+        connection.on(EventType.MESSAGE, lambda message: self._on_stream_message(generation, message))
+        connection.on(EventType.ERROR, lambda error: self._on_stream_error(generation, error))
+        with self._message_lock:
+            if standby:
+                self._standby_context_manager = context_manager
+                self._standby_connection = connection
+                self._standby_generation = generation
+                self._standby_offset_sec = offset_sec
+                self._standby_messages = []
+            else:
+                self._stream_generation = generation
+                self._stream_offset_sec = offset_sec
+                self._context_manager = context_manager
+                self._connection = connection
 
-        # 在背景線程中運行監聽
+        # 在背景線程中運行監聽；監聽結束而 Transcriber 仍在執行，表示連線中斷
         def listen_loop():
             try:
-                self._connection.start_listening()
+                connection.start_listening()
             except Exception as e:
                 if self._running:
-                    print(f"[Listener Error] {e}", file=sys.stderr)
-
-        now = time.time()
-        self._last_audio_sent_at = now
-        self._last_keepalive_sent_at = now
-        self._clear_interim_state()
-        self._keepalive_stop_event.clear()
-        self._keepalive_thread = threading.Thread(target=self._keepalive_loop, daemon=True)
-        self._keepalive_thread.start()
+                    listener_log.error("%s", e)
+            if not self._running:
+                return
+            if generation == self._stream_generation:
+                self._connection_lost(connection, "listener exited")
+            elif generation == self._standby_generation:
+                self._discard_standby("listener exited")
 
         self._listener_thread = threading.Thread(target=listen_loop, daemon=True)
         self._listener_thread.start()
 
-        # 等待連線建立
-        time.sleep(0.1)
-
     def stop(self) -> None:
         """停止 Deepgram 連線"""
         self._running = False
-        self._keepalive_stop_event.set()
-        if self._keepalive_thread and self._keepalive_thread.is_alive():
-            self._keepalive_thread.join(timeout=0.5)
-        self._keepalive_thread = None
-        if self._context_manager:
+        self._stop_watchdog()
+        if self._reconnect_thread and self._reconnect_thread.is_alive():
+            self._reconnect_thread.join(timeout=1.0)
+        self._reconnect_thread = None
+        with self._send_lock:
+            self._discard_standby(None)
+            self._close_context(self._context_manager)
+            self._context_manager = None
+            self._connection = None
+
+    @staticmethod
+    def _close_context(context_manager) -> None:
+        if context_manager:
             try:
-                self._context_manager.__exit__(None, None, None)
+                context_manager.__exit__(None, None, None)
             except Exception:
                 pass
-            self._context_manager = None
-            self._connection = None
 
-    def send_audio(self, audio_data: bytes) -> None:
-        """發送音訊資料到 Deepgram"""
-        if self._connection and self._running:
+    def send_audio(self, audio_data) -> None:
+        """
+        發送音訊資料到 Deepgram；斷線重連期間音訊只留在 ring buffer，連上後重播
+
+        audio_data 可為 bytes 或 memoryview（如 FrameReader 的 slot），返回後不再引用
+        """
+        if not self._running:
+            return
+        with self._send_lock:
+            self._remember_audio(audio_data)
+            connection = None if self._reconnecting else self._connection
+            if connection is None:
+                return
+            standby = self._standby_connection
+            if standby is not None:
+                try:
+                    standby.send_media(ListenV1MediaMessage(audio_data))
+                except Exception as e:
+                    self._discard_standby(e)
             try:
-                self._connection.send_media(ListenV1MediaMessage(audio_data))
+                connection.send_media(ListenV1MediaMessage(audio_data))
                 self._last_audio_sent_at = time.time()
-            except Exception:
-                pass  # 連線已關閉時忽略
+                AUDIO_CHUNKS.inc()
+                AUDIO_BYTES.inc(len(audio_data))
+                error = None
+            except Exception as e:
+                error = e
+        if error is not None:
+            self._connection_lost(connection, error)
+        elif self._rotation_due():
+            self.rotate()
+
+    def _remember_audio(self, audio_data) -> None:
+        """記錄串流時間，並把 PCM 複製進 ring buffer（超過容量時覆寫最舊的）"""
+        ring = self._replay_ring
+        if ring.capacity:
+            self._replay_frame_starts.append(ring.total_bytes)
+            ring.append(audio_data)
+            oldest = ring.oldest_position
+            while self._replay_frame_starts and self._replay_frame_starts[0] < oldest:
+                self._replay_frame_starts.popleft()
+        else:
+            ring.append(audio_data)
+        self._audio_sent_sec = ring.total_bytes / self._bytes_per_second
 
-    def _keepalive_loop(self) -> None:
-        """在無音訊期間送 keepalive，並將長時間卡住的 interim 強制落地。"""
-        while self._running and not self._keepalive_stop_event.wait(self.WATCHDOG_TICK_SEC):
-            stale_interim = self._take_stale_interim_text()
-            if stale_interim:
-                self._emit_incomplete_transcript(stale_interim)
+    def _connection_lost(self, connection, reason) -> None:
+        """目前連線中斷：在背景以指數退避重連（同一條連線只觸發一次）"""
+        with self._reconnect_lock:
+            if not self._running or self._reconnecting or connection is not self._connection:
+                return
+            if self._standby_connection is not None:
+                # 輪替中：預備連線已在收音訊，直接切換過去
+                log.warning("Connection lost (%s) during rotation, switching to standby", reason)
+                self._switch_to_standby()
+                return
+            if self.reconnect_max_attempts <= 0:
+                self._connection = None
+                self._report_error(reason)
+                return
+            self._reconnecting = True
+            old_context_manager = self._context_manager
+            self._reconnect_thread = threading.Thread(
+                target=self._reconnect_loop, args=(old_context_manager,), daemon=True
+            )
+        log.warning("Connection lost (%s), reconnecting...", reason)
+        self._notify_status("reconnecting")
+        self._reconnect_thread.start()
 
-            if not self._connection:
-                continue
+    def _reconnect_loop(self, old_context_manager) -> None:
+        self._close_context(old_context_manager)
+        # 中斷時的 interim 由重播重新產生；buffer 與前句上下文保留
+        self._clear_interim_state()
+        self._interim_span = None
 
-            idle_seconds = time.time() - self._last_audio_sent_at
-            if idle_seconds < self.AUDIO_IDLE_THRESHOLD_SEC:
+        for attempt in range(self.reconnect_max_attempts):
+            delay = min(self.reconnect_base_delay_sec * (2 ** attempt), self.RECONNECT_MAX_DELAY_SEC)
+            if self._stop_event.wait(delay):
+                return  # stop() 已呼叫
+            try:
+                context_manager, connection = self._open_connection()
+            except Exception as e:
+                log.warning("Reconnect attempt %d/%d failed: %s", attempt + 1, self.reconnect_max_attempts, e)
                 continue
 
-            try:
-                now = time.time()
-                if now - self._last_keepalive_sent_at < self.KEEPALIVE_INTERVAL_SEC:
+            with self._send_lock:
+                if not self._running:
+                    self._close_context(context_manager)
+                    return
+                try:
+                    replayed_sec = self._replay(context_manager, connection)
+                except Exception as e:
+                    log.warning("Replay after reconnect failed: %s", e)
+                    self._close_context(context_manager)
                     continue
-                self._connection.send_control(ListenV1ControlMessage(type="KeepAlive"))
-                self._last_keepalive_sent_at = now
+                self._reconnecting = False
+                self._last_audio_sent_at = time.time()
+            self.reconnect_count += 1
+            RECONNECTS.inc(result="success")
+            log.info("Reconnected after %d attempt(s), replayed %.2fs audio", attempt + 1, replayed_sec)
+            self._notify_status("reconnected")
+            return
+
+        with self._send_lock:
+            self._connection = None
+            self._context_manager = None
+            self._reconnecting = False
+        RECONNECTS.inc(result="failed")
+        self._report_error(
+            f"Deepgram reconnect failed after {self.reconnect_max_attempts} attempts",
+            detail_code="RECONNECT_FAILED",
+        )
+
+    def _replay(self, context_manager, connection) -> float:
+        """
+        切到新連線並重播 ring buffer（呼叫端持有 _send_lock）
+
+        從包含最後落地結果結束時間的 frame 開始，之前的音訊已轉錄完成不再重送；
+        重播起點為新連線的時間基準。回傳重播的秒數
+        """
+        ring = self._replay_ring
+        final_position = int(self._last_final_end_sec * self._bytes_per_second)
+        start = ring.total_bytes
+        for frame_start in self._replay_frame_starts:
+            if frame_start > final_position:
+                if start == ring.total_bytes:
+                    start = frame_start
+                break
+            start = frame_start
+        offset = start / self._bytes_per_second
+        if offset > self._last_final_end_sec + self.REPLAY_DEDUP_TOLERANCE_SEC:
+            log.warning("Replay buffer exceeded, %.2fs audio lost", offset - self._last_final_end_sec)
+
+        self._attach_connection(context_manager, connection, offset_sec=offset)
+        chunk_bytes = self._bytes_per_second // 10 - (self._bytes_per_second // 10) % (self.channels * 2)
+        for segment in ring.segments(start, max(chunk_bytes, self.channels * 2)):
+            connection.send_media(ListenV1MediaMessage(segment))
+        return self._audio_sent_sec - offset
+
+    def _rotation_due(self) -> bool:
+        return (
+            self.rotate_interval_sec > 0
+            and not self._rotating
+            and not self._reconnecting
+            and self._audio_sent_sec >= self._rotation_retry_at_sec
+            and self._audio_sent_sec - self._stream_offset_sec >= self.rotate_interval_sec
+        )
+
+    def rotate(self) -> bool:
+        """
+        make-before-break 輪替：背景建立新連線，重疊收音訊至少 rotate_overlap_sec 後在停頓處切換，
+        再關閉舊連線。已在輪替或重連中時回傳 False
+        """
+        with self._reconnect_lock:
+            if not self._running or self._rotating or self._reconnecting or self._connection is None:
+                return False
+            self._rotating = True
+        log.info("Rotating connection after %.1fs audio", self._audio_sent_sec - self._stream_offset_sec)
+        threading.Thread(target=self._open_standby, daemon=True).start()
+        return True
+
+    def _open_standby(self) -> None:
+        try:
+            context_manager, connection = self._open_connection()
+        except Exception as e:
+            log.warning("Standby connection failed: %s", e)
+            self._rotation_retry_at_sec = self._audio_sent_sec + self.RECONNECT_MAX_DELAY_SEC
+            self._rotating = False
+            return
+        with self._send_lock:
+            if not self._running or self._reconnecting:
+                self._rotating = False
+                self._close_context(context_manager)
+                return
+            # 預備連線從下一個 chunk 開始收音訊，其時間基準為目前串流時間
+            self._attach_connection(context_manager, connection, offset_sec=self._audio_sent_sec, standby=True)
+
+    def _maybe_switch(self) -> None:
+        """重疊夠久且位於停頓（buffer 與 interim 皆空）時切到預備連線（呼叫端持有 _message_lock）"""
+        if self._standby_connection is None:
+            return
+        overlap = self._audio_sent_sec - self._standby_offset_sec
+        if overlap < self.rotate_overlap_sec:
+            return
+        idle = not self._utterance_buffer and not self._last_interim_text
+        if idle or overlap >= self.ROTATE_MAX_OVERLAP_SEC:
+            self._switch_to_standby()
+
+    def _switch_to_standby(self) -> None:
+        """
+        預備連線成為目前連線，舊連線在背景關閉
+
+        切換點之前的文字以舊連線為準：預備連線先前收到的訊息依序重新處理，
+        落在已落地範圍內的結果由 _is_replayed_duplicate 去除，之後的結果照常輸出
+        """
+        with self._message_lock:
+            if self._standby_connection is None:
+                return
+            old_context_manager = self._context_manager
+            self._context_manager = self._standby_context_manager
+            self._connection = self._standby_connection
+            self._stream_generation = self._standby_generation
+            self._stream_offset_sec = self._standby_offset_sec
+            pending = self._standby_messages
+            self._standby_context_manager = None
+            self._standby_connection = None
+            self._standby_generation = 0
+            self._standby_messages = []
+            self._rotating = False
+            self.rotation_count += 1
+            ROTATIONS.inc()
+            # 舊連線的 interim 由新連線重新產生
+            self._clear_interim_state()
+            self._interim_span = None
+            log.info("Switched to rotated connection at %.2fs (%d overlap messages)",
+                     self._last_final_end_sec, len(pending))
+            for message in pending:
+                self._on_message(message)
+        threading.Thread(target=self._close_context, args=(old_context_manager,), daemon=True).start()
+
+    def _discard_standby(self, reason) -> None:
+        """放棄預備連線（送音訊失敗、斷線或停止時），目前連線不受影響"""
+        with self._message_lock:
+            context_manager = self._standby_context_manager
+            if context_manager is None:
+                return
+            self._standby_context_manager = None
+            self._standby_connection = None
+            self._standby_generation = 0
+            self._standby_messages = []
+            self._rotating = False
+        if reason is not None:
+            log.warning("Standby connection discarded: %s", reason)
+            self._rotation_retry_at_sec = self._audio_sent_sec + self.RECONNECT_MAX_DELAY_SEC
+        threading.Thread(target=self._close_context, args=(context_manager,), daemon=True).start()
+
+    def _notify_status(self, status: str) -> None:
+        if self.on_status:
+            self.on_status(status)
+
+    def finalize(self, timeout: float = 10.0) -> None:
+        """音訊送完後要求 Deepgram 輸出剩餘結果，並 flush buffer（檔案模式用）"""
+        self._discard_standby("finalize")
+        if self._connection and self._running:
+            self._finalized_event.clear()
+            try:
+                self._connection.send_control(ListenV1ControlMessage(type="Finalize"))
+                if not self._finalized_event.wait(timeout):
+                    log.warning("Finalize not acknowledged after %ss", timeout)
             except Exception as e:
-                if self._running:
-                    self._report_error(e)
+                log.warning("Finalize failed: %s", e)
+        self._flush_buffer("finalize")
+
+    @staticmethod
+    def _message_span(message) -> Optional[tuple[float, float]]:
+        start = getattr(message, "start", None)
+        duration = getattr(message, "duration", None)
+        if start is None or duration is None:
+            return None
+        return (float(start), float(start) + float(duration))
+
+    def _on_watchdog_tick(self) -> None:
+        """除了 interim 落地與保留 buffer 送出，在無音訊期間送 keepalive、在停頓處切到預備連線"""
+        super()._on_watchdog_tick()
+
+        if self._standby_connection is not None:
+            # 停頓時沒有新訊息觸發切換，由 watchdog 檢查
+            with self._message_lock:
+                self._maybe_switch()
+
+        connection = self._connection
+        if not connection or self._reconnecting:
+            return
+
+        idle_seconds = time.time() - self._last_audio_sent_at
+        if idle_seconds < self.AUDIO_IDLE_THRESHOLD_SEC:
+            return
+
+        try:
+            now = time.time()
+            if now - self._last_keepalive_sent_at < self.KEEPALIVE_INTERVAL_SEC:
                 return
+            connection.send_control(ListenV1ControlMessage(type="KeepAlive"))
+            self._last_keepalive_sent_at = now
+            KEEPALIVES.inc()
+        except Exception as e:
+            self._connection_lost(connection, e)
+
+
+    def _on_stream_message(self, generation: int, message) -> None:
+        """只處理目前連線的訊息；預備連線的訊息暫存到切換時處理，已被取代的舊連線訊息丟棄"""
+        with self._message_lock:
+            if generation == self._stream_generation:
+                self._on_message(message)
+                self._maybe_switch()
+            elif generation == self._standby_generation:
+                self._standby_messages.append(message)
+
+    def _on_stream_error(self, generation: int, error) -> None:
+        if generation == self._stream_generation:
+            self._on_error(error)
+        elif self._running:
+            deepgram_log.warning("(inactive connection) %s", error)
+
+    def _is_replayed_duplicate(self, transcript: str, span: tuple[float, float], is_final: bool) -> bool:
+        """重播 / 輪替重疊視窗內已經落地過的結果（正常串流中下一個結果從已落地範圍終點開始）"""
+        boundary = self._last_final_end_sec
+        if span[0] >= boundary - self.REPLAY_BOUNDARY_EPSILON_SEC:
+            return False
+        if span[1] <= boundary + self.REPLAY_DEDUP_TOLERANCE_SEC:
+            return True
+        # 跨越邊界：時間戳與前一次辨識略有出入，文字相同仍視為重複
+        return is_final and transcript.strip() in self._recent_finals
 
     def _on_message(self, message) -> None:
         """處理轉錄訊息（SDK v5.x 所有訊息類型都透過此 callback）"""
         msg_type = getattr(message, "type", "Unknown")
+        MESSAGES.inc(type=msg_type)
 
         if msg_type == "Results":
             channel = getattr(message, "channel", None)
@@ -227,137 +616,46 @@ class Transcriber:
                     transcript = getattr(alternatives[0], "transcript", "")
                     is_final = getattr(message, "is_final", False)
                     speech_final = getattr(message, "speech_final", False)
+                    span = self._message_span(message)
+                    if span:
+                        span = (span[0] + self._stream_offset_sec, span[1] + self._stream_offset_sec)
+
+                    if transcript.strip() and span and self._is_replayed_duplicate(transcript, span, is_final):
+                        log.debug("Dropped replayed duplicate: '%s'", transcript)
+                        REPLAYED_DUPLICATES.inc()
+                        transcript = ""
 
                     # 只有在有 transcript 內容時才處理
                     if transcript.strip():
-                        print(f"[Transcriber] transcript='{transcript}', is_final={is_final}, speech_final={speech_final}", file=sys.stderr, flush=True)
+                        log.sample(
+                            "results", self.LOG_SAMPLE_EVERY, "transcript='%s', is_final=%s, speech_final=%s",
+                            transcript, is_final, speech_final,
+                        )
 
                         if is_final:
-                            self._clear_interim_state()
-                            # 累積到 buffer
-                            self._utterance_buffer.append(transcript)
-                            buffer_chars = sum(len(t) for t in self._utterance_buffer)
-                            print(f"[Transcriber] Added to buffer (items: {len(self._utterance_buffer)}, chars: {buffer_chars})", file=sys.stderr, flush=True)
-
-                            # 超過最大字數限制，強制 flush
-                            if buffer_chars >= self._max_buffer_chars:
-                                print(f"[Transcriber] Max buffer chars reached, forced flush", file=sys.stderr, flush=True)
-                                self._flush_buffer()
-
-                            # speech_final=True 表示說話者停頓，flush buffer
-                            if speech_final and self._utterance_buffer:
-                                print(f"[Transcriber] speech_final triggered flush", file=sys.stderr, flush=True)
-                                self._flush_buffer()
+                            self._recent_finals.append(transcript.strip())
+                            if span:
+                                self._last_final_end_sec = max(self._last_final_end_sec, span[1])
+                            self._handle_final(transcript, span, speech_final)
                         else:
-                            # is_final=False：輸出 interim result（buffer + 當前 interim）
-                            buffer_text = "".join(self._utterance_buffer)
-                            combined = buffer_text + transcript
-                            self._update_interim_state(combined)
-                            if self.on_interim:
-                                self.on_interim(combined)
+                            self._handle_interim(transcript, span)
                 else:
-                    print(f"[Transcriber] No alternatives in channel", file=sys.stderr, flush=True)
+                    log.sample("no_alternatives", self.LOG_SAMPLE_EVERY, "No alternatives in channel")
             else:
-                print(f"[Transcriber] No channel in message", file=sys.stderr, flush=True)
+                log.sample("no_channel", self.LOG_SAMPLE_EVERY, "No channel in message")
+
+            if getattr(message, "from_finalize", False):
+                self._finalized_event.set()
 
         elif msg_type == "UtteranceEnd":
             # UtteranceEnd 事件：基於 utterance_end_ms 的超時觸發
-            print(f"[Transcriber] UtteranceEnd event received", file=sys.stderr, flush=True)
-            if self._utterance_buffer:
-                print(f"[Transcriber] UtteranceEnd triggered flush", file=sys.stderr, flush=True)
-                self._flush_buffer()
-
-    def _flush_buffer(self) -> None:
-        """輸出累積的 buffer 並清空"""
-        if not self._utterance_buffer:
-            return
-        self._clear_interim_state()
-
-        full_transcript = "".join(self._utterance_buffer)
-        self._utterance_buffer.clear()
-
-        print(f"[Transcriber] FLUSH - Sending to callback: {full_transcript}", file=sys.stderr, flush=True)
-        if self.on_transcript and full_transcript.strip():
-            # 生成 UUID 並傳給回呼
-            transcript_id = str(uuid.uuid4())
-            previous = self._previous_transcript
-
-            # 先記錄當前句，讓 callback 內 update_previous_translation()
-            # 可以正確更新到「當前句」的 translation。
-            self._previous_transcript = (transcript_id, full_transcript, None)
-
-            # Phase 2: 傳遞前一句資訊（若有）
-            if previous:
-                prev_id, prev_text, prev_translation = previous
-                self.on_transcript(
-                    transcript_id, full_transcript,
-                    prev_id, prev_text, prev_translation
-                )
-            else:
-                # 第一句或無前句資訊時
-                self.on_transcript(
-                    transcript_id, full_transcript,
-                    None, None, None
-                )
-
-    def _emit_incomplete_transcript(self, text: str) -> None:
-        """將長時間卡住的 interim 強制落地為未完成句，進入正常翻譯流程。"""
-        if not self.on_transcript:
-            return
-
-        trimmed = text.strip()
-        if not trimmed:
-            return
-
-        full_transcript = trimmed + self.INCOMPLETE_SUFFIX
-        transcript_id = str(uuid.uuid4())
-        previous = self._previous_transcript
-        self._previous_transcript = (transcript_id, full_transcript, None)
-
-        if previous:
-            prev_id, prev_text, prev_translation = previous
-            self.on_transcript(
-                transcript_id, full_transcript,
-                prev_id, prev_text, prev_translation
-            )
-        else:
-            self.on_transcript(
-                transcript_id, full_transcript,
-                None, None, None
-            )
-
-    def _update_interim_state(self, text: str) -> None:
-        with self._state_lock:
-            self._last_interim_text = text
-            self._last_interim_updated_at = time.time()
-
-    def _clear_interim_state(self) -> None:
-        with self._state_lock:
-            self._last_interim_text = None
-            self._last_interim_updated_at = 0
-
-    def _take_stale_interim_text(self) -> Optional[str]:
-        with self._state_lock:
-            if not self._last_interim_text:
-                return None
-            if time.time() - self._last_interim_updated_at < self._interim_stale_timeout_sec:
-                return None
-
-            text = self._last_interim_text
-            self._last_interim_text = None
-            self._last_interim_updated_at = 0
-            return text
-
-    def update_previous_translation(self, translation: str) -> None:
-        """更新前一句的翻譯結果（由 main.py 呼叫）"""
-        if self._previous_transcript:
-            prev_id, prev_text, _ = self._previous_transcript
-            self._previous_transcript = (prev_id, prev_text, translation)
+            log.debug("UtteranceEnd event received")
+            self._handle_utterance_end()
 
     def _on_error(self, error) -> None:
         """處理錯誤"""
         if self._running:
-            print(f"[Deepgram Error] {error}", file=sys.stderr)
+            deepgram_log.error("%s", error)
             self._report_error(error)
 
     @staticmethod
@@ -366,21 +664,3 @@ class Transcriber:
         if "net0001" in lowered or "did not receive audio data" in lowered:
             return "NET0001_IDLE_TIMEOUT"
         return None
-
-    def _report_error(self, error) -> None:
-        if not self.on_error:
-            return
-
-        error_text = str(error)
-        detail_code = self._extract_detail_code(error_text)
-        try:
-            self.on_error(error_text, detail_code)
-        except TypeError:
-            self.on_error(error_text)
-
-    def __enter__(self):
-        self.start()
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.stop()
@@ -0,0 +1,443 @@
+"""
+轉錄器共用基底：interim / final / flush 事件與 buffer 處理
+
+語音辨識實作（transcriber.py 的 Deepgram 版、local_transcriber.py 的本地 Whisper 版）繼承 BaseTranscriber，
+各自負責音訊的傳送與辨識，辨識結果以下列方法交給基底（呼叫端持有 _message_lock）：
+- _handle_interim(text, span)：尚未確定的結果，與 buffer 合併後以 on_interim 顯示
+- _handle_final(text, span, speech_final)：確定的結果，累積到 buffer；speech_final 表示其後停頓
+- _handle_utterance_end()：一段話結束（靜音達 utterance_end_ms），送出 buffer
+
+buffer 累積、邊界切句、stale interim 落地、自適應斷句保留、音訊時間範圍與前句上下文都在這裡處理；
+本模組不依賴任何語音辨識 SDK。
+"""
+
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from logger import get_logger
+from metrics import counter
+from segmentation import SegmentationController
+
+log = get_logger("Transcriber")
+
+FLUSHES = counter("autosub_transcriber_flushes_total", "Utterances emitted", labels=("trigger",))
+AUDIO_CHUNKS = counter("autosub_transcriber_audio_chunks_total", "Audio frames sent to the speech engine")
+AUDIO_BYTES = counter("autosub_transcriber_audio_bytes_total", "PCM bytes sent to the speech engine")
+
+# 超過 max_buffer_chars 時優先在句尾切開，其次子句；邊界後緊接的括號 / 引號一併歸入前段
+SENTENCE_BOUNDARIES = frozenset("。．！？!?…♪")
+CLAUSE_BOUNDARIES = frozenset("、，,;；：")
+BOUNDARY_CLOSERS = frozenset("」』）)】〉》\"'”’")
+
+
+def _after_closers(text: str, index: int) -> int:
+    """index 為邊界字元之後的位置，略過緊接的結尾括號 / 引號"""
+    while index < len(text) and text[index] in BOUNDARY_CLOSERS:
+        index += 1
+    return index
+
+
+def find_flush_boundary(text: str, min_index: int, segment_ends: tuple[int, ...] = (),
+                        sentence_only: bool = False) -> Optional[int]:
+    """
+    找出 buffer 的切點（切點之前送出，之後留在 buffer）
+
+    依序找最後一個句尾、子句邊界、final 結果之間的邊界（停頓處），
+    切點需在 min_index 之後（避免切出過短的片段）；找不到時回傳 None。
+
+    Args:
+        text: buffer 全文
+        min_index: 切點的最小位置
+        segment_ends: 各個 final 結果在全文中的結束位置
+        sentence_only: 只找句尾
+    """
+    for boundaries in (SENTENCE_BOUNDARIES, CLAUSE_BOUNDARIES):
+        if sentence_only and boundaries is CLAUSE_BOUNDARIES:
+            return None
+        for index in range(len(text) - 1, max(0, min_index - 1) - 1, -1):
+            if text[index] in boundaries:
+                return _after_closers(text, index + 1)
+    for end in reversed(segment_ends):
+        if min_index <= end < len(text):
+            return end
+    return None
+
+
+class BaseTranscriber:
+    """
+    轉錄器介面與共用的事件處理
+
+    子類別實作 start / stop / send_audio / finalize，並在 start / stop 時呼叫
+    _start_watchdog / _stop_watchdog；可覆寫 _on_watchdog_tick 加入自己的定期工作。
+
+    使用 context manager 模式：
+        with transcriber as t:
+            t.send_audio(data)
+    """
+
+    WATCHDOG_TICK_SEC = 0.5
+    INCOMPLETE_SUFFIX = " [暫停]"
+    # 每則訊息的 debug 紀錄抽樣輸出（每 N 則一次）
+    LOG_SAMPLE_EVERY = 20
+    # 邊界切分（比例皆相對於 max_buffer_chars）：句尾在 BOUNDARY_PREFERRED_RATIO 之後時直接切開；
+    # 否則繼續累積，等後面的句尾，到 HARD_CAP_RATIO 時改切在 BOUNDARY_MIN_RATIO 之後最後一個句尾 /
+    # 子句 / final 結果邊界，都沒有才整段送出
+    BOUNDARY_MIN_RATIO = 0.3
+    BOUNDARY_PREFERRED_RATIO = 0.7
+    HARD_CAP_RATIO = 1.5
+
+    def __init__(
+        self,
+        language: str = "ja",
+        on_transcript: Optional[Callable[..., None]] = None,
+        on_interim: Optional[Callable[[str], None]] = None,
+        on_error: Optional[Callable[..., None]] = None,
+        endpointing_ms: int = 200,
+        utterance_end_ms: int = 1000,
+        max_buffer_chars: int = 50,
+        interim_stale_timeout_sec: float = 4.0,
+        keyterms: Optional[list[str]] = None,
+        sample_rate: int = 24000,
+        channels: int = 2,
+        segmentation: Optional[SegmentationController] = None,
+        split_at_boundaries: bool = True,
+    ):
+        """
+        Args:
+            language: 語言代碼 (預設 "ja" 日語)
+            on_transcript: 轉錄完成回呼，支援兩種簽名：
+                           - (id: str, text: str) -> None（無前句資訊）
+                           - (id: str, text: str, prev_id: str|None, prev_text: str|None, prev_translation: str|None) -> None
+            on_interim: 即時結果回呼 (text: str) -> None，顯示正在說的話
+            on_error: 錯誤回呼，支援兩種簽名：
+                      - (message: str) -> None
+                      - (message: str, detail_code: str|None) -> None
+            endpointing_ms: 靜音判定時間 (毫秒)，預設 200ms（減半以縮短延遲）
+            utterance_end_ms: utterance 超時時間 (毫秒)，預設 1000ms（Deepgram 最小值為 1000）
+            max_buffer_chars: 最大累積字數，預設 50（減少 38%）
+            interim_stale_timeout_sec: interim 無更新超過此秒數即落地為 [暫停]，預設 4.0 秒
+            keyterms: 辨識提示詞清單（可為 None）
+            sample_rate: PCM 取樣率，預設 24000
+            channels: PCM 聲道數，預設 2
+            segmentation: 自適應斷句控制器（None 表示使用上面的固定門檻）
+            split_at_boundaries: 超過 max_buffer_chars 時在最後一個句尾切開，剩餘部分留在 buffer；
+                                 句尾太前面或沒有句尾時最多累積到 HARD_CAP_RATIO 倍，再改在子句邊界切開；
+                                 False 時整段送出
+        """
+        self.language = language
+        self.on_transcript = on_transcript
+        self.on_interim = on_interim
+        self.on_error = on_error
+        self.endpointing_ms = endpointing_ms
+        self.utterance_end_ms = utterance_end_ms
+        self._interim_stale_timeout_sec = interim_stale_timeout_sec
+        self.keyterms = keyterms or []
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.segmentation = segmentation
+        self.split_at_boundaries = split_at_boundaries
+        self._bytes_per_second = sample_rate * channels * 2
+
+        self._state_lock = threading.Lock()
+        # 結果處理（_handle_*、flush）都在此 lock 下進行
+        self._message_lock = threading.RLock()
+        self._running = False
+        self._start_time: float = 0
+        self._watchdog_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._last_interim_text: Optional[str] = None
+        self._last_interim_updated_at: float = 0
+        self._utterance_buffer: list[str] = []  # 累積 buffer
+        self._max_buffer_chars: int = max_buffer_chars  # 最大累積字數，超過就強制 flush
+
+        # Phase 2: 追蹤前一句資訊（用於上下文修正）
+        # 格式: (id, text, translation)
+        self._previous_transcript: Optional[tuple[str, str, Optional[str]]] = None
+
+        # 音訊時間（秒，自串流開始）：buffer 內 final 結果與最新 interim 的範圍
+        self._buffer_span: Optional[tuple[float, float]] = None
+        self._interim_span: Optional[tuple[float, float]] = None
+        # 最近一次送出的句子的音訊時間範圍，on_transcript 回呼中可讀取
+        self.last_flush_span: Optional[tuple[float, float]] = None
+        self._finalized_event = threading.Event()
+
+    # ------------------------------------------------------------------
+    # 介面（子類別實作）
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+    def send_audio(self, audio_data) -> None:
+        """送出 PCM（bytes 或 memoryview，返回後不再引用）"""
+        raise NotImplementedError
+
+    def finalize(self, timeout: float = 10.0) -> None:
+        """音訊送完後輸出剩餘結果，並 flush buffer（檔案模式用）"""
+        raise NotImplementedError
+
+    def rotate(self) -> bool:
+        """輪替連線（沒有連線的實作回傳 False）"""
+        return False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Watchdog
+    # ------------------------------------------------------------------
+
+    def _start_watchdog(self) -> None:
+        self._clear_interim_state()
+        self._stop_event.clear()
+        self._watchdog_thread = threading.Thread(target=self._watchdog_loop, daemon=True)
+        self._watchdog_thread.start()
+
+    def _stop_watchdog(self) -> None:
+        self._stop_event.set()
+        if self._watchdog_thread and self._watchdog_thread.is_alive():
+            self._watchdog_thread.join(timeout=0.5)
+        self._watchdog_thread = None
+
+    def _watchdog_loop(self) -> None:
+        while self._running and not self._stop_event.wait(self.WATCHDOG_TICK_SEC):
+            self._on_watchdog_tick()
+
+    def _on_watchdog_tick(self) -> None:
+        """將長時間卡住的 interim 強制落地，並送出超過保留時間的 buffer"""
+        stale_interim = self._take_stale_interim_text()
+        if stale_interim:
+            self._emit_incomplete_transcript(stale_interim)
+
+        if self.segmentation and self.segmentation.should_release_hold():
+            self.release_held_buffer()
+
+    # ------------------------------------------------------------------
+    # 辨識結果（呼叫端持有 _message_lock）
+    # ------------------------------------------------------------------
+
+    def _handle_final(self, transcript: str, span: Optional[tuple[float, float]], speech_final: bool) -> None:
+        """確定的結果：累積到 buffer，超過字數或停頓時送出"""
+        self._clear_interim_state()
+        self._utterance_buffer.append(transcript)
+        if span:
+            start = self._buffer_span[0] if self._buffer_span else span[0]
+            self._buffer_span = (start, span[1])
+        buffer_chars = sum(len(t) for t in self._utterance_buffer)
+        log.sample(
+            "buffer", self.LOG_SAMPLE_EVERY, "Added to buffer (items: %d, chars: %d)",
+            len(self._utterance_buffer), buffer_chars,
+        )
+
+        # 超過最大字數限制，強制 flush
+        segmentation = self.segmentation
+        if segmentation:
+            segmentation.observe_final(transcript, span)
+        max_chars = segmentation.max_buffer_chars if segmentation else self._max_buffer_chars
+        if buffer_chars >= max_chars:
+            self._flush_over_limit(max_chars)
+
+        # speech_final=True 表示說話者停頓，flush buffer
+        # （自適應斷句壓力高時，字數不足的短句先保留，與後續結果合併送出）
+        if speech_final and self._utterance_buffer:
+            buffer_chars = sum(len(t) for t in self._utterance_buffer)
+            if segmentation and not segmentation.should_flush_on_pause(buffer_chars):
+                segmentation.hold()
+                log.debug("speech_final held (%s)", segmentation.describe())
+            else:
+                log.debug("speech_final triggered flush")
+                self._flush_buffer("speech_final")
+
+    def _handle_interim(self, transcript: str, span: Optional[tuple[float, float]]) -> None:
+        """尚未確定的結果：輸出 interim（buffer + 當前 interim）"""
+        buffer_text = "".join(self._utterance_buffer)
+        combined = buffer_text + transcript
+        if span:
+            start = self._buffer_span[0] if self._buffer_span else span[0]
+            self._interim_span = (start, span[1])
+        self._update_interim_state(combined)
+        if self.on_interim:
+            self.on_interim(combined)
+
+    def _handle_utterance_end(self) -> None:
+        """一段話結束：送出 buffer"""
+        if self._utterance_buffer:
+            log.debug("UtteranceEnd triggered flush")
+            self._flush_buffer("utterance_end")
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+
+    def _flush_buffer(self, trigger: str = "manual") -> None:
+        """輸出累積的 buffer 並清空（trigger 為觸發原因，記入 flushes 指標）"""
+        if not self._utterance_buffer:
+            return
+        FLUSHES.inc(trigger=trigger)
+        self._clear_interim_state()
+        if self.segmentation:
+            self.segmentation.release()
+
+        full_transcript = "".join(self._utterance_buffer)
+        self._utterance_buffer.clear()
+        self.last_flush_span = self._buffer_span
+        self._buffer_span = None
+
+        log.debug("FLUSH - Sending to callback: %s", full_transcript)
+        if self.on_transcript and full_transcript.strip():
+            # 生成 UUID 並傳給回呼
+            transcript_id = str(uuid.uuid4())
+            previous = self._previous_transcript
+
+            # 先記錄當前句，讓 callback 內 update_previous_translation()
+            # 可以正確更新到「當前句」的 translation。
+            self._previous_transcript = (transcript_id, full_transcript, None)
+
+            # Phase 2: 傳遞前一句資訊（若有）
+            if previous:
+                prev_id, prev_text, prev_translation = previous
+                self.on_transcript(
+                    transcript_id, full_transcript,
+                    prev_id, prev_text, prev_translation
+                )
+            else:
+                # 第一句或無前句資訊時
+                self.on_transcript(
+                    transcript_id, full_transcript,
+                    None, None, None
+                )
+
+    def _flush_over_limit(self, max_chars: int) -> None:
+        """buffer 超過 max_chars：在最後一個邊界切開送出前段，剩餘部分留在 buffer 等後續結果"""
+        if not self.split_at_boundaries:
+            log.debug("Max buffer chars reached, forced flush")
+            self._flush_buffer("max_chars")
+            return
+
+        while self._utterance_buffer:
+            text = "".join(self._utterance_buffer)
+            if len(text) < max_chars:
+                return
+            segment_ends = []
+            for segment in self._utterance_buffer[:-1]:
+                segment_ends.append((segment_ends[-1] if segment_ends else 0) + len(segment))
+            split = find_flush_boundary(text, int(max_chars * self.BOUNDARY_PREFERRED_RATIO), sentence_only=True)
+            if split is None:
+                if len(text) < max_chars * self.HARD_CAP_RATIO:
+                    log.debug("No sentence boundary near %d chars, waiting for more", len(text))
+                    return
+                split = find_flush_boundary(text, int(max_chars * self.BOUNDARY_MIN_RATIO), tuple(segment_ends))
+            if split is None or split >= len(text):
+                log.debug("Max buffer chars reached, flushing whole buffer")
+                self._flush_buffer("boundary" if split else "max_chars")
+                return
+
+            # 音訊時間依字數比例分配（日文結果沒有可靠的逐字時間）
+            span = self._buffer_span
+            split_sec = span[0] + (span[1] - span[0]) * split / len(text) if span else None
+            log.debug("Splitting buffer at boundary %d/%d", split, len(text))
+            self._utterance_buffer[:] = [text[:split]]
+            if span:
+                self._buffer_span = (span[0], split_sec)
+            self._flush_buffer("boundary")
+            self._utterance_buffer.append(text[split:])
+            if span:
+                self._buffer_span = (split_sec, span[1])
+
+    def release_held_buffer(self) -> None:
+        """自適應斷句保留的 buffer 在翻譯 worker 閒置或超過 hold_timeout_sec 時送出（watchdog / worker 呼叫）"""
+        with self._message_lock:
+            if self.segmentation and self.segmentation.should_release_hold():
+                log.debug("Releasing held buffer")
+                self._flush_buffer("hold_release")
+
+    def _emit_incomplete_transcript(self, text: str) -> None:
+        """將長時間卡住的 interim 強制落地為未完成句，進入正常翻譯流程。"""
+        if not self.on_transcript:
+            return
+
+        trimmed = text.strip()
+        if not trimmed:
+            return
+
+        FLUSHES.inc(trigger="stale_interim")
+        full_transcript = trimmed + self.INCOMPLETE_SUFFIX
+        self.last_flush_span = self._interim_span
+        self._interim_span = None
+        transcript_id = str(uuid.uuid4())
+        previous = self._previous_transcript
+        self._previous_transcript = (transcript_id, full_transcript, None)
+
+        if previous:
+            prev_id, prev_text, prev_translation = previous
+            self.on_transcript(
+                transcript_id, full_transcript,
+                prev_id, prev_text, prev_translation
+            )
+        else:
+            self.on_transcript(
+                transcript_id, full_transcript,
+                None, None, None
+            )
+
+    # ------------------------------------------------------------------
+    # Interim 狀態
+    # ------------------------------------------------------------------
+
+    def _update_interim_state(self, text: str) -> None:
+        with self._state_lock:
+            self._last_interim_text = text
+            self._last_interim_updated_at = time.time()
+
+    def _clear_interim_state(self) -> None:
+        with self._state_lock:
+            self._last_interim_text = None
+            self._last_interim_updated_at = 0
+
+    def _take_stale_interim_text(self) -> Optional[str]:
+        with self._state_lock:
+            if not self._last_interim_text:
+                return None
+            timeout = self.segmentation.interim_stale_timeout_sec if self.segmentation else self._interim_stale_timeout_sec
+            if time.time() - self._last_interim_updated_at < timeout:
+                return None
+
+            text = self._last_interim_text
+            self._last_interim_text = None
+            self._last_interim_updated_at = 0
+            return text
+
+    def update_previous_translation(self, translation: str) -> None:
+        """更新前一句的翻譯結果（由 main.py 呼叫）"""
+        if self._previous_transcript:
+            prev_id, prev_text, _ = self._previous_transcript
+            self._previous_transcript = (prev_id, prev_text, translation)
+
+    # ------------------------------------------------------------------
+    # 錯誤回報
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _extract_detail_code(error_text: str) -> Optional[str]:
+        """由錯誤訊息判斷細項代碼（子類別依服務覆寫）"""
+        return None
+
+    def _report_error(self, error, detail_code: Optional[str] = None) -> None:
+        if not self.on_error:
+            return
+
+        error_text = str(error)
+        detail_code = detail_code or self._extract_detail_code(error_text)
+        try:
+            self.on_error(error_text, detail_code)
+        except TypeError:
+            self.on_error(error_text)
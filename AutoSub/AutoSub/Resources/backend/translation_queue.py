@@ -0,0 +1,202 @@
+"""
+翻譯佇列
+Deepgram listener 執行緒只負責入列，翻譯在背景 worker 依序執行；
+backlog 達到閾值時一次取出多句，交給 handler 合併成一個 batch request。
+最舊一句的等待時間超過 max_age_sec 時，所有過舊的句子一起交給 on_stale_items
+（由呼叫端決定合併 / 略過 / 降級），讓字幕在 Gemini 變慢後能收斂回即時。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from logger import get_logger
+from metrics import counter, gauge, histogram
+
+log = get_logger("TranslationQueue")
+
+PENDING = gauge("autosub_translation_queue_pending", "Utterances waiting for translation")
+WAIT_SECONDS = histogram(
+    "autosub_translation_queue_wait_seconds", "Time from enqueue to translation start",
+    buckets=(0.1, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0),
+)
+TAKES = counter("autosub_translation_queue_takes_total", "Work items handed to the worker", labels=("kind",))
+
+
+class PendingUtterance:
+    """等待翻譯的一句字幕"""
+
+    __slots__ = ("transcript_id", "text", "is_incomplete", "enqueued_at", "span")
+
+    def __init__(self, transcript_id: str, text: str, is_incomplete: bool = False,
+                 enqueued_at: Optional[float] = None, span: Optional[tuple[float, float]] = None):
+        self.transcript_id = transcript_id
+        self.text = text
+        self.is_incomplete = is_incomplete
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+        # 音訊時間範圍（秒），未知時為 None
+        self.span = span
+
+    def __repr__(self) -> str:
+        return f"PendingUtterance({self.transcript_id!r}, {self.text!r})"
+
+
+class TranslationQueue:
+    """
+    單一 worker 的翻譯佇列
+
+    Args:
+        on_items: worker 執行緒上的處理回呼 (items: list[PendingUtterance]) -> None
+                  一般為 1 句；backlog 達 batch_threshold 時為多句
+        batch_threshold: 佇列中（含正要處理的這句）達此數量即合併，0 表示停用合併
+        max_batch_size: 單次合併的最大句數
+        max_age_sec: 可接受的最大字幕延遲（秒），0 表示停用過舊處理
+        on_stale_items: 過舊句子的處理回呼 (items) -> None，未設定時沿用 on_items
+        on_backlog_status: 追趕狀態變化回呼 (catching_up, pending, oldest_age_sec) -> None
+        stale_take_limit: 單次取出過舊句子的上限
+    """
+
+    def __init__(
+        self,
+        on_items: Callable[[list[PendingUtterance]], None],
+        batch_threshold: int = 3,
+        max_batch_size: int = 6,
+        max_age_sec: float = 0.0,
+        on_stale_items: Optional[Callable[[list[PendingUtterance]], None]] = None,
+        on_backlog_status: Optional[Callable[[bool, int, float], None]] = None,
+        stale_take_limit: int = 20,
+    ):
+        self.on_items = on_items
+        self.batch_threshold = batch_threshold
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_age_sec = max_age_sec
+        self.on_stale_items = on_stale_items
+        self.on_backlog_status = on_backlog_status
+        self.stale_take_limit = max(1, stale_take_limit)
+        self._catching_up = False
+        self._items: deque[PendingUtterance] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._busy = False
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def put(self, item: PendingUtterance) -> None:
+        with self._condition:
+            self._items.append(item)
+            PENDING.inc()
+            self._condition.notify()
+
+    def depth(self) -> int:
+        """尚未完成的句數（含處理中的 batch 不計）"""
+        with self._condition:
+            return len(self._items)
+
+    @property
+    def busy(self) -> bool:
+        """佇列有等待的句子或 worker 處理中"""
+        with self._condition:
+            return bool(self._items) or self._busy
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待佇列清空且 worker 閒置"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while self._items or self._busy:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """停止收件，等待剩餘項目處理完畢"""
+        self.wait_idle(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker:
+            self._worker.join(timeout=1.0)
+
+    def oldest_age(self) -> float:
+        """最舊一句已等待的秒數（佇列空時為 0）"""
+        with self._condition:
+            return self._oldest_age_locked(time.time())
+
+    def _oldest_age_locked(self, now: float) -> float:
+        if not self._items:
+            return 0.0
+        return now - self._items[0].enqueued_at
+
+    def _take(self) -> Optional[tuple[list[PendingUtterance], bool]]:
+        """取出下一批：(items, is_stale)"""
+        with self._condition:
+            while not self._items and not self._closed:
+                self._condition.wait()
+            if not self._items:
+                return None
+            self._busy = True
+
+            now = time.time()
+            if self.max_age_sec and self._oldest_age_locked(now) > self.max_age_sec:
+                stale = []
+                while (self._items and len(stale) < self.stale_take_limit
+                       and now - self._items[0].enqueued_at > self.max_age_sec):
+                    stale.append(self._items.popleft())
+                self._record_take(stale, "stale", now)
+                return stale, True
+
+            count = 1
+            if self.batch_threshold and len(self._items) >= self.batch_threshold:
+                count = min(len(self._items), self.max_batch_size)
+            items = [self._items.popleft() for _ in range(count)]
+            self._record_take(items, "batch" if count > 1 else "single", now)
+            return items, False
+
+    @staticmethod
+    def _record_take(items: list[PendingUtterance], kind: str, now: float) -> None:
+        PENDING.dec(len(items))
+        TAKES.inc(kind=kind)
+        for item in items:
+            WAIT_SECONDS.observe(max(0.0, now - item.enqueued_at))
+
+    def _notify_backlog(self, catching_up: bool) -> None:
+        if catching_up == self._catching_up:
+            return
+        self._catching_up = catching_up
+        if not self.on_backlog_status:
+            return
+        with self._condition:
+            pending = len(self._items)
+            oldest_age = self._oldest_age_locked(time.time())
+        try:
+            self.on_backlog_status(catching_up, pending, oldest_age)
+        except Exception as e:
+            log.warning("Backlog status error: %s", e)
+
+    def _run(self) -> None:
+        while True:
+            taken = self._take()
+            if taken is None:
+                return
+            batch, is_stale = taken
+            try:
+                if is_stale:
+                    self._notify_backlog(True)
+                    log.info("%d stale items (oldest %.1fs)", len(batch), time.time() - batch[0].enqueued_at)
+                    (self.on_stale_items or self.on_items)(batch)
+                else:
+                    self.on_items(batch)
+            except Exception as e:
+                log.error("Handler error: %s: %s", type(e).__name__, e)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    caught_up = self._oldest_age_locked(time.time()) <= self.max_age_sec
+                    self._condition.notify_all()
+                if self._catching_up and caught_up:
+                    self._notify_backlog(False)
@@ -6,22 +6,118 @@ Gemini 翻譯模組
 """
 
 import concurrent.futures
+import hashlib
 import json
-import sys
+import threading
+import time
+from collections import deque
 from typing import Optional, Tuple
 from google import genai
 from google.genai import types
 from pydantic import BaseModel
 
+from logger import get_logger
+from metrics import counter, histogram
+from token_ledger import (
+    CALL_CORRECTION,
+    CALL_FALLBACK,
+    CALL_HANDOVER,
+    CALL_SUMMARY,
+    CALL_TRANSLATE,
+    TokenLedger,
+)
+
+log = get_logger("Translator")
+
+REQUEST_SECONDS = histogram(
+    "autosub_translator_request_seconds", "Gemini request wall time", labels=("kind",)
+)
+TTFT_SECONDS = histogram("autosub_translator_ttft_seconds", "Time to first streamed chunk")
+TOKENS = counter("autosub_translator_tokens_total", "Gemini tokens reported in usage metadata", labels=("type",))
+TIMEOUTS = counter("autosub_translator_timeouts_total", "Gemini requests that timed out", labels=("kind",))
+REBUILDS = counter("autosub_translator_rebuilds_total", "Session / window rebuilds", labels=("reason",))
+FALLBACKS = counter("autosub_translator_fallbacks_total", "History-free fallback translations", labels=("result",))
+STREAM_FAILURES = counter(
+    "autosub_translator_stream_failures_total", "Streaming requests that fell back to blocking"
+)
+_USAGE_FIELDS = (
+    ("input", "prompt_token_count"),
+    ("output", "candidates_token_count"),
+    ("cached", "cached_content_token_count"),
+)
+
+
+def _record_request(kind: str, started_at: float, usage) -> None:
+    """記錄一次 Gemini request 的耗時與 token 用量"""
+    REQUEST_SECONDS.observe(time.time() - started_at, kind=kind)
+    if usage is None:
+        return
+    for token_type, field in _USAGE_FIELDS:
+        value = getattr(usage, field, None)
+        if isinstance(value, int) and value:
+            TOKENS.inc(value, type=token_type)
+
 # API 呼叫 timeout（秒）
 API_TIMEOUT_SECONDS = 10
 
+# History 模式
+# - chat：Chat Session 累積完整歷史，超過 token 閾值後摘要重建
+# - window：只保留最近 N 輪 + 滾動摘要，每次以 generate_content 明確組 request
+HISTORY_MODE_CHAT = "chat"
+HISTORY_MODE_WINDOW = "window"
+HISTORY_MODES = (HISTORY_MODE_CHAT, HISTORY_MODE_WINDOW)
+
+# 明確 content cache：system instruction（含背景資訊、keyterms）只上傳一次
+# 剩餘 TTL 低於此比例時，在下一個 request 前先延長
+CACHE_REFRESH_RATIO = 0.2
+
+# 同一 process 內相同 profile（model + system instruction）共用同一個 cache
+# key -> {"name": str, "expires_at": float, "refs": int}
+_PREFIX_CACHES: dict[str, dict] = {}
+_PREFIX_CACHES_LOCK = threading.Lock()
+
 
 class TranslationResult(BaseModel):
     current: str
     correction: Optional[str] = None
 
 
+class BatchTranslationItem(TranslationResult):
+    id: str
+
+
+class BatchTranslationResult(BaseModel):
+    results: list[BatchTranslationItem]
+
+
+# 多目標語言：主要語言仍為 current / correction，其他語言放在 extra（每個語言一項）
+class LanguageTranslation(BaseModel):
+    language: str
+    text: str
+
+
+class MultiTargetTranslationResult(TranslationResult):
+    extra: Optional[list[LanguageTranslation]] = None
+
+
+class MultiTargetBatchTranslationItem(MultiTargetTranslationResult):
+    id: str
+
+
+class MultiTargetBatchTranslationResult(BaseModel):
+    results: list[MultiTargetBatchTranslationItem]
+
+
+# 兩階段翻譯的背景修正：只回傳需要修正的句子
+class CorrectionItem(BaseModel):
+    id: str
+    correction: str
+
+
+class CorrectionReviewResult(BaseModel):
+    results: list[CorrectionItem]
+
+
 SYSTEM_INSTRUCTION_TEMPLATE = """你是專業的{source_label}即時字幕翻譯員。請將{source_label}翻譯成{target_label}。
 
 翻譯規則：
@@ -29,7 +125,7 @@ SYSTEM_INSTRUCTION_TEMPLATE = """你是專業的{source_label}即時字幕翻譯
 2. 人名保留原文發音的音譯，前後文中同一人名請保持一致
 3. 作品名、專有名詞使用常見譯法
 4. 只輸出翻譯結果，不要加任何解釋
-5. 若句子明顯不完整，可根據上下文適當補充或延續前句{keyterms_block}
+5. 若句子明顯不完整，可根據上下文適當補充或延續前句{keyterms_block}{turn_format_block}{extra_targets_block}
 注意：這是即時字幕翻譯，請參考之前的對話歷史保持翻譯一致性。{context_block}"""
 
 SUMMARIZE_PROMPT_TEMPLATE = """請根據以上翻譯歷史，整理：
@@ -44,6 +140,9 @@ CONTEXT_HANDOVER_TEMPLATE = """延續之前的翻譯工作。以下是已確定
 
 請繼續保持翻譯一致性。"""
 
+# window 模式下 handover 之後的固定 model 回應（與 chat 模式 JSON mode 一致）
+WINDOW_HANDOVER_ACK = '{"current": "", "correction": null}'
+
 
 CONTEXT_CORRECTION_PROMPT_TEMPLATE = """翻譯以下{source_label}句子，並根據上下文判斷是否需要修正前句翻譯。
 
@@ -66,6 +165,71 @@ SIMPLE_TRANSLATE_PROMPT_TEMPLATE = """翻譯以下{source_label}句子：
 
 翻譯結果放入 "current"，correction 設為 null。"""
 
+# Compact 格式：指令只放在 system instruction 一次，每輪只帶最少的原文 / 前句參照
+# 歷史中每輪因此只剩幾十個 token，同樣的 token 預算可容納數倍輪次
+COMPACT_TURN_FORMAT_BLOCK = """
+
+輸入格式（每輪）：
+- 原：要翻譯的句子，翻譯結果放入 "current"
+- 前：前句原文（省略時即為上一輪的「原」）
+- 前譯：前句目前的翻譯
+若需修正前句翻譯則將修正後的完整翻譯填入 "correction"，否則設為 null；沒有「前譯」時 correction 設為 null。
+
+修正時機：
+- 發現前句翻譯有誤譯或語意不通
+- 當前句子提供了新的上下文使前句翻譯更清晰
+- 人名/專有名詞在前句翻譯不一致
+"""
+
+COMPACT_CONTEXT_CORRECTION_PROMPT_TEMPLATE = """原：{current_text}
+前：{prev_text}
+前譯：{prev_translation}"""
+
+# 前句即為歷史中上一輪的原文時，省略前句原文只帶翻譯
+COMPACT_CONTEXT_REFERENCE_PROMPT_TEMPLATE = """原：{current_text}
+前譯：{prev_translation}"""
+
+COMPACT_SIMPLE_TRANSLATE_PROMPT_TEMPLATE = """原：{text}"""
+
+# Backlog 累積時，多句合併成一個 structured request
+BATCH_TRANSLATE_PROMPT_TEMPLATE = """依序翻譯以下多句{source_label}，每句一個結果放入 "results"：id 原樣帶回，翻譯放入 "current"。
+{prev_block}
+{lines}"""
+
+EXTRA_TARGETS_BLOCK = """
+
+多語輸出：每句同時翻譯成{extra_labels}，放入 "extra"，每個語言一項（language 為語言代碼 {extra_codes}，text 為該語言翻譯）。
+"current" 與 "correction" 只針對{target_label}。
+"""
+
+# 離線檔案模式：各段獨立平行翻譯，以前幾句原文作為上下文窗口
+SEGMENT_TRANSLATE_PROMPT_TEMPLATE = """翻譯以下{source_label}句子，翻譯結果放入 "current"，correction 設為 null。
+{context_block}
+原：{text}"""
+
+SEGMENT_CONTEXT_BLOCK_TEMPLATE = """前文（僅供參考，不需翻譯）：
+{lines}
+"""
+
+# 兩階段翻譯：已送出的字幕在背景依前後文檢查，修正結果以 translation_update 送出
+REVIEW_PROMPT_TEMPLATE = """以下是即時字幕依時間順序的{source_label}原文與目前的{target_label}翻譯。
+根據前後文檢查標記 * 的句子，只列出需要修正的句子：id 原樣帶回，修正後的完整{target_label}翻譯放入 "correction"；
+都不需修正時 "results" 為空陣列。未標記 * 的句子只是上下文，不要列出。
+
+修正時機：
+- 誤譯或語意不通
+- 後文提供了新的上下文使翻譯更清晰（例如句子在中途被切斷）
+- 人名/專有名詞前後不一致
+
+{lines}"""
+
+REVIEW_LINE_TEMPLATE = "[{short_id}]{mark} 原：{source}｜譯：{translation}"
+
+BATCH_PREV_BLOCK_TEMPLATE = """前句原文：{prev_text}
+前句翻譯：{prev_translation}
+只有第一句的 "correction" 可用來修正前句翻譯（不需修正則為 null），其餘句子的 correction 設為 null。
+"""
+
 
 LANGUAGE_LABELS = {
     "ja": "日文",
@@ -77,12 +241,22 @@ LANGUAGE_LABELS = {
 
 
 class Translator:
-    """Gemini 翻譯器（使用 Chat Session 保持上下文，最大化隱式快取效益）"""
+    """Gemini 翻譯器（使用 Chat Session 保持上下文，最大化隱式快取效益）
+
+    history_mode="window" 時改用 ring buffer 保留最近 N 輪 + 滾動摘要，
+    每次 request 大小維持穩定，不再隨 session 單調成長。
+    explicit_cache=True 時將 system instruction 上傳為 cached content，
+    每個 request 只帶 cache 名稱；建立失敗（例如低於最小 token 數）則退回隱式快取。
+    """
 
-    def _resolve_thinking_config(self) -> Optional[types.ThinkingConfig]:
-        if self.model.startswith("gemini-3"):
+    # token 帳本（None 表示不記錄）
+    ledger: Optional[TokenLedger] = None
+
+    def _resolve_thinking_config(self, model: Optional[str] = None) -> Optional[types.ThinkingConfig]:
+        model = model or self.model
+        if model.startswith("gemini-3"):
             return types.ThinkingConfig(thinking_level="minimal")
-        if self.model.startswith("gemini-2.5"):
+        if model.startswith("gemini-2.5"):
             return types.ThinkingConfig(thinking_budget=0)
         return None
 
@@ -95,6 +269,16 @@ class Translator:
         max_context_tokens: int = 20_000,
         translation_context: str = "",
         keyterms: Optional[list[str]] = None,
+        history_mode: str = HISTORY_MODE_CHAT,
+        history_window_turns: int = 8,
+        client=None,
+        compact_history: bool = True,
+        explicit_cache: bool = False,
+        cache_ttl_sec: int = 3600,
+        extra_target_languages: Optional[list[str]] = None,
+        correction_model: Optional[str] = None,
+        ledger: Optional[TokenLedger] = None,
+        parallel_requests: int = 1,
     ):
         """
         初始化翻譯器
@@ -107,12 +291,34 @@ class Translator:
             max_context_tokens: 最大 context tokens 閾值 (預設 20K)
             translation_context: 翻譯背景資訊（可空）
             keyterms: 重要詞彙提示清單（可空）
+            history_mode: "chat"（預設）或 "window"（固定大小滑動視窗 + 滾動摘要）
+            history_window_turns: window 模式保留的最近輪數
+            client: 已建立的 genai.Client（可空，供共用連線或本地替身使用）
+            compact_history: 使用 compact 每輪格式（指令只在 system instruction 出現一次）
+            explicit_cache: 將 system instruction 上傳為明確 content cache
+            cache_ttl_sec: 明確 cache 的 TTL（秒），到期前自動延長
+            extra_target_languages: 同一個 request 額外輸出的目標語言（可空），
+                                    結果見 last_extra_translations / last_batch_extra_translations
+            correction_model: review_translations() 使用的模型（None 表示沿用 model）
+            ledger: 依呼叫類型記錄 token 用量的帳本（可空）
+            parallel_requests: 不經 chat session 的 request（背景檢查、translate_segment）併發上限，
+                               檔案模式設為翻譯 worker 數
         """
-        self.client = genai.Client(api_key=api_key)
+        if history_mode not in HISTORY_MODES:
+            raise ValueError(f"Unknown history_mode: {history_mode}")
+        self.client = client or genai.Client(api_key=api_key)
         self.model = model
+        self.correction_model = correction_model
+        self.ledger = ledger
+        self.history_mode = history_mode
+        self.history_window_turns = max(1, history_window_turns)
+        self.compact_history = compact_history
         self.max_context_tokens = max_context_tokens
         self.source_language = source_language
         self.target_language = target_language
+        self.extra_target_languages = [
+            lang for lang in dict.fromkeys(extra_target_languages or []) if lang != target_language
+        ]
 
         source_label = LANGUAGE_LABELS.get(source_language, source_language)
         target_label = LANGUAGE_LABELS.get(target_language, target_language)
@@ -129,72 +335,411 @@ class Translator:
             keyterms_text = "、".join(top_keyterms)
             keyterms_block = f"\n6. 重要詞彙提示：{keyterms_text}，請在翻譯中保持這些詞彙的一致性。\n"
 
+        extra_targets_block = ""
+        if self.extra_target_languages:
+            extra_targets_block = EXTRA_TARGETS_BLOCK.format(
+                extra_labels="、".join(
+                    LANGUAGE_LABELS.get(lang, lang) for lang in self.extra_target_languages
+                ),
+                extra_codes="、".join(self.extra_target_languages),
+                target_label=target_label,
+            )
+
         self._system_instruction = SYSTEM_INSTRUCTION_TEMPLATE.format(
             source_label=source_label,
             target_label=target_label,
             keyterms_block=keyterms_block,
+            turn_format_block=COMPACT_TURN_FORMAT_BLOCK if compact_history else "",
+            extra_targets_block=extra_targets_block,
             context_block=context_block,
         )
         self._summarize_prompt = SUMMARIZE_PROMPT_TEMPLATE.format(
             source_label=source_label,
             target_label=target_label,
         )
-        self._context_correction_template = CONTEXT_CORRECTION_PROMPT_TEMPLATE
-        self._simple_translate_template = SIMPLE_TRANSLATE_PROMPT_TEMPLATE
+        if compact_history:
+            self._context_correction_template = COMPACT_CONTEXT_CORRECTION_PROMPT_TEMPLATE
+            self._context_reference_template = COMPACT_CONTEXT_REFERENCE_PROMPT_TEMPLATE
+            self._simple_translate_template = COMPACT_SIMPLE_TRANSLATE_PROMPT_TEMPLATE
+        else:
+            self._context_correction_template = CONTEXT_CORRECTION_PROMPT_TEMPLATE
+            self._context_reference_template = None
+            self._simple_translate_template = SIMPLE_TRANSLATE_PROMPT_TEMPLATE
         self._source_label = source_label
         self._target_label = target_label
 
+        self.explicit_cache = explicit_cache
+        self.cache_ttl_sec = max(60, cache_ttl_sec)
+        self._cache_key = hashlib.sha256(
+            f"{self.model}\n{self._system_instruction}".encode("utf-8")
+        ).hexdigest()[:16]
+        self._cache_name: Optional[str] = None
+        self._cache_expires_at: float = 0
+        self._cache_registered = False
+        self._build_configs()
+        self._create_chat()
+        self._total_tokens = 0
+        self._context_summary: str = ""  # 上一個 session 的摘要
+        # 目前歷史最後一輪的原文（compact 格式用來省略前句原文）與本 session 輪數
+        self._history_tail_source: Optional[str] = None
+        self._turns_since_rebuild = 0
+        self.rebuild_turn_counts: list[int] = []  # 每次摘要重建時累積的輪數
+        # window 模式：最近 N 輪 (user prompt, model response) 與待摘要的淘汰輪
+        self._window_turns: deque[tuple[str, str]] = deque(maxlen=self.history_window_turns)
+        self._evicted_turns: list[tuple[str, str]] = []
+        self.last_ttft_sec: Optional[float] = None  # 最近一次 streaming 的首 chunk 延遲
+        # 最近一次翻譯的額外語言結果 {language: text}；batch 則為 {transcript_id: {language: text}}
+        self.last_extra_translations: dict[str, str] = {}
+        self.last_batch_extra_translations: dict[str, dict[str, str]] = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        # 不經 chat session 的 request（背景檢查、檔案模式）：不排在即時翻譯後面，但同樣有 timeout
+        self._side_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, parallel_requests))
+
+    def _build_configs(self) -> None:
+        """建立 JSON mode 與 plain text config（有明確 cache 時改帶 cached_content）"""
         thinking_config = self._resolve_thinking_config()
+        if self._cache_name:
+            prefix_kwargs = dict(cached_content=self._cache_name)
+        else:
+            prefix_kwargs = dict(system_instruction=self._system_instruction)
         config_kwargs = dict(
-            system_instruction=self._system_instruction,
+            **prefix_kwargs,
             temperature=0.2,
             response_mime_type="application/json",
-            response_schema=TranslationResult,
+            response_schema=MultiTargetTranslationResult if self.extra_target_languages else TranslationResult,
         )
         if thinking_config is not None:
             config_kwargs["thinking_config"] = thinking_config
         self._config = types.GenerateContentConfig(**config_kwargs)
         # Summarization 用的 plain text config（不帶 JSON schema）
         plain_kwargs = dict(
-            system_instruction=self._system_instruction,
+            **prefix_kwargs,
             temperature=0.2,
         )
         if thinking_config is not None:
             plain_kwargs["thinking_config"] = thinking_config
         self._plain_config = types.GenerateContentConfig(**plain_kwargs)
+        # Batch 翻譯用：同樣的前綴，array-of-results schema
+        batch_kwargs = dict(
+            config_kwargs,
+            response_schema=(
+                MultiTargetBatchTranslationResult if self.extra_target_languages else BatchTranslationResult
+            ),
+        )
+        self._batch_config = types.GenerateContentConfig(**batch_kwargs)
+        # 背景修正用：只回傳修正的 schema；明確 cache 綁定主要模型，另設修正模型時改帶 inline system instruction
+        if self.correction_model and self.correction_model != self.model:
+            review_kwargs = dict(
+                system_instruction=self._system_instruction,
+                temperature=0.2,
+                response_mime_type="application/json",
+                response_schema=CorrectionReviewResult,
+            )
+            review_thinking = self._resolve_thinking_config(self.correction_model)
+            if review_thinking is not None:
+                review_kwargs["thinking_config"] = review_thinking
+        else:
+            review_kwargs = dict(config_kwargs, response_schema=CorrectionReviewResult)
+        self._review_config = types.GenerateContentConfig(**review_kwargs)
+        # 逐句路由到其他模型時的 (config, batch_config)，依模型建立一次
+        self._routed_configs: dict[str, tuple] = {}
+
+    def _configs_for(self, model: Optional[str]) -> tuple:
+        """
+        回傳指定模型的 (config, batch_config)
+
+        明確 cache 綁定主要模型，路由到其他模型時改帶 inline system instruction，
+        thinking 設定依該模型決定。
+        """
+        if not model or model == self.model:
+            return self._config, self._batch_config
+        configs = self._routed_configs.get(model)
+        if configs is None:
+            config_kwargs = dict(
+                system_instruction=self._system_instruction,
+                temperature=0.2,
+                response_mime_type="application/json",
+                response_schema=MultiTargetTranslationResult if self.extra_target_languages else TranslationResult,
+            )
+            thinking_config = self._resolve_thinking_config(model)
+            if thinking_config is not None:
+                config_kwargs["thinking_config"] = thinking_config
+            batch_kwargs = dict(
+                config_kwargs,
+                response_schema=(
+                    MultiTargetBatchTranslationResult if self.extra_target_languages else BatchTranslationResult
+                ),
+            )
+            configs = (types.GenerateContentConfig(**config_kwargs), types.GenerateContentConfig(**batch_kwargs))
+            self._routed_configs[model] = configs
+        return configs
+
+    def _create_chat(self, model: Optional[str] = None, history=None) -> None:
+        """建立 chat session（綁定模型與 config）"""
+        model = model or self.model
         self._chat = self.client.chats.create(
-            model=self.model,
-            config=self._config,
+            model=model,
+            config=self._configs_for(model)[0],
+            history=history or None,
         )
-        self._total_tokens = 0
-        self._context_summary: str = ""  # 上一個 session 的摘要
-        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._chat_model = model
+
+    @staticmethod
+    def _route_kwargs(model: Optional[str]) -> dict:
+        """只在有路由模型時才帶 model 參數"""
+        return {"model": model} if model else {}
+
+    def _account(self, call_type: str, response, model: Optional[str] = None) -> None:
+        """把回應的 usage metadata 記入帳本"""
+        if self.ledger and response is not None:
+            self.ledger.record(call_type, model or self.model, getattr(response, "usage_metadata", None))
+
+    @staticmethod
+    def _translate_call_type(prev_text: Optional[str], prev_translation: Optional[str]) -> str:
+        """帶前句（上下文修正 prompt，見 _build_prompt）記為 correction，否則為 translate"""
+        return CALL_CORRECTION if prev_text is not None and prev_translation is not None else CALL_TRANSLATE
+
+    def _chat_for(self, model: Optional[str]):
+        """
+        回傳綁定指定模型的 chat session
+
+        chat session 無法逐則訊息換模型：模型不同時帶著目前歷史重建，
+        各模型共用同一份歷史（路由切換不會遺失上下文）。
+        """
+        model = model or self.model
+        if model != self._chat_model:
+            log.debug("Switching chat model: %s -> %s", self._chat_model, model)
+            self._create_chat(model, history=self._chat.get_history())
+        return self._chat
+
+    # ------------------------------------------------------------------
+    # Explicit content cache
+    # ------------------------------------------------------------------
+
+    def _ensure_cached_prefix(self) -> None:
+        """確保明確 cache 存在且未接近過期；必要時建立或延長，失敗則退回隱式快取"""
+        if not self.explicit_cache:
+            return
+        now = time.time()
+        refresh_margin = self.cache_ttl_sec * CACHE_REFRESH_RATIO
+        if self._cache_name and self._cache_expires_at - now > refresh_margin:
+            return
+
+        ttl = f"{self.cache_ttl_sec}s"
+        previous_name = self._cache_name
+        try:
+            with _PREFIX_CACHES_LOCK:
+                entry = _PREFIX_CACHES.get(self._cache_key)
+                if entry is None or entry["expires_at"] <= now:
+                    cache = self.client.caches.create(
+                        model=self.model,
+                        config=types.CreateCachedContentConfig(
+                            display_name=f"autosub-{self._cache_key}",
+                            system_instruction=self._system_instruction,
+                            ttl=ttl,
+                        ),
+                    )
+                    refs = entry["refs"] if entry else 0
+                    entry = {"name": cache.name, "expires_at": now + self.cache_ttl_sec, "refs": refs}
+                    _PREFIX_CACHES[self._cache_key] = entry
+                    log.info("Explicit cache created: %s", cache.name)
+                elif entry["expires_at"] - now <= refresh_margin:
+                    self.client.caches.update(
+                        name=entry["name"],
+                        config=types.UpdateCachedContentConfig(ttl=ttl),
+                    )
+                    entry["expires_at"] = now + self.cache_ttl_sec
+                    log.info("Explicit cache refreshed: %s", entry['name'])
+                if not self._cache_registered:
+                    entry["refs"] += 1
+                    self._cache_registered = True
+                self._cache_name = entry["name"]
+                self._cache_expires_at = entry["expires_at"]
+        except Exception as e:
+            log.warning("Explicit cache unavailable (%s), using implicit caching", e)
+            self.explicit_cache = False
+            self._cache_name = None
+
+        if self._cache_name != previous_name:
+            self._build_configs()
+            # Chat session 綁定建立時的 config，cache 名稱變動時帶著歷史重建
+            history = self._chat.get_history() if self.history_mode == HISTORY_MODE_CHAT else None
+            self._create_chat(history=history)
+
+    def close(self) -> None:
+        """釋放資源（最後一個使用者離開時刪除明確 cache）"""
+        if self._cache_registered:
+            with _PREFIX_CACHES_LOCK:
+                entry = _PREFIX_CACHES.get(self._cache_key)
+                if entry:
+                    entry["refs"] -= 1
+                    if entry["refs"] <= 0:
+                        del _PREFIX_CACHES[self._cache_key]
+                        try:
+                            self.client.caches.delete(name=entry["name"])
+                        except Exception as e:
+                            log.warning("Cache delete failed: %s", e)
+            self._cache_registered = False
+            self._cache_name = None
+        self._executor.shutdown(wait=False)
+        self._side_executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+    # Window history helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _text_content(role: str, text: str):
+        return types.Content(role=role, parts=[types.Part.from_text(text=text)])
+
+    def _window_contents(self, turns) -> list:
+        """組出 window 模式的歷史 contents：摘要 handover + 指定輪次"""
+        contents = []
+        if self._context_summary:
+            contents.append(self._text_content(
+                "user", CONTEXT_HANDOVER_TEMPLATE.format(summary=self._context_summary)
+            ))
+            contents.append(self._text_content("model", WINDOW_HANDOVER_ACK))
+        for prompt, response_text in turns:
+            contents.append(self._text_content("user", prompt))
+            contents.append(self._text_content("model", response_text))
+        return contents
+
+    def _build_request_contents(self, prompt: str) -> list:
+        """window 模式：歷史 + 當前 prompt"""
+        return self._window_contents(self._window_turns) + [self._text_content("user", prompt)]
+
+    def _record_window_turn(self, prompt: str, response_text: str) -> None:
+        """記錄一輪到 ring buffer，被擠出的輪次留待滾動摘要"""
+        if len(self._window_turns) == self._window_turns.maxlen:
+            self._evicted_turns.append(self._window_turns[0])
+        self._window_turns.append((prompt, response_text))
+
+    def _maybe_roll_window_summary(self) -> None:
+        """淘汰輪次累積滿一個視窗後，併入滾動摘要"""
+        if len(self._evicted_turns) < self.history_window_turns:
+            return
+        evicted = self._evicted_turns
+        self._evicted_turns = []
+        log.info("Rolling window summary (%s evicted turns)...", len(evicted))
+        try:
+            summary_contents = self._window_contents(evicted) + [
+                self._text_content("user", self._summarize_prompt)
+            ]
+            summary_response = self._generate_content_with_timeout(
+                contents=summary_contents,
+                config=self._plain_config,
+                timeout=20,
+            )
+            self._account(CALL_SUMMARY, summary_response)
+            summary = (summary_response.text or "").strip()
+            if summary:
+                self._context_summary = summary
+                log.info("Window summary updated (%s chars)", len(summary))
+        except Exception as e:
+            # 摘要失敗時保留舊摘要，被淘汰的輪次直接捨棄
+            log.warning("Window summary failed: %s", e)
+
+    def _build_prompt(
+        self,
+        current_text: str,
+        prev_text: Optional[str],
+        prev_translation: Optional[str],
+    ) -> str:
+        """根據是否有前句決定使用哪個 prompt"""
+        if prev_text is not None and prev_translation is not None:
+            template = self._context_correction_template
+            if self._context_reference_template and prev_text == self._history_tail_source:
+                template = self._context_reference_template
+            return template.format(
+                source_label=self._source_label,
+                target_label=self._target_label,
+                current_text=current_text,
+                prev_text=prev_text,
+                prev_translation=prev_translation
+            )
+        return self._simple_translate_template.format(
+            source_label=self._source_label,
+            text=current_text,
+        )
+
+    def _note_turn(self, source_text: Optional[str]) -> None:
+        """記錄一輪已寫入歷史（None 表示這一輪不是單句格式，下一句的前句不可只帶引用）"""
+        self._history_tail_source = source_text
+        self._turns_since_rebuild += 1
+
+    def _reset_turn_tracking(self) -> None:
+        self._history_tail_source = None
+        self._turns_since_rebuild = 0
+
+    def _after_response(self) -> None:
+        """window 模式在回傳結果後做摘要維護（對應 chat 模式的 rebuild 時機）"""
+        if self.history_mode == HISTORY_MODE_WINDOW:
+            self._maybe_roll_window_summary()
+
+    def _send_message_with_timeout(
+        self,
+        prompt: str,
+        timeout: int = API_TIMEOUT_SECONDS,
+        batch: bool = False,
+        model: Optional[str] = None,
+    ):
+        """發送訊息到 chat session（window 模式為 generate_content），帶 timeout 機制
+
+        batch=True 時改用 array-of-results schema（chat 模式以單次 config 覆寫）
+        model 指定時改用該模型（None 表示主要模型）
+        """
+        self._ensure_cached_prefix()
+        config, batch_config = self._configs_for(model)
+        if self.history_mode == HISTORY_MODE_WINDOW:
+            contents = self._build_request_contents(prompt)
+            request_config = batch_config if batch else config
+
+            def do_send():
+                return self.client.models.generate_content(
+                    model=model or self.model,
+                    contents=contents,
+                    config=request_config,
+                )
+        else:
+            chat_ref = self._chat_for(model)
+
+            if batch:
+                def do_send():
+                    return chat_ref.send_message(prompt, config=batch_config)
+            else:
+                def do_send():
+                    return chat_ref.send_message(prompt)
 
-    def _send_message_with_timeout(self, prompt: str, timeout: int = API_TIMEOUT_SECONDS):
-        """發送訊息到 chat session，帶 timeout 機制"""
-        future = self._executor.submit(self._chat.send_message, prompt)
+        kind = "batch" if batch else "message"
+        started_at = time.time()
+        future = self._executor.submit(do_send)
         try:
-            return future.result(timeout=timeout)
+            response = future.result(timeout=timeout)
+            _record_request(kind, started_at, getattr(response, "usage_metadata", None))
+            if self.history_mode == HISTORY_MODE_WINDOW:
+                self._record_window_turn(prompt, (response.text or "").strip())
+            return response
         except concurrent.futures.TimeoutError:
-            print(f"[Translator] API call timed out after {timeout} seconds",
-                  file=sys.stderr, flush=True)
+            TIMEOUTS.inc(kind=kind)
+            log.warning("API call timed out after %s seconds", timeout)
             raise TimeoutError(f"Gemini API call timed out after {timeout} seconds")
 
     def _send_message_stream_with_timeout(
         self,
         prompt: str,
         timeout: int = API_TIMEOUT_SECONDS,
-        on_chunk=None
+        on_chunk=None,
+        model: Optional[str] = None,
     ):
         """Streaming 版本，每收到 chunk 呼叫 callback，支援 timeout 和 token 追蹤
 
         使用 producer-consumer 模式確保 timeout 在 iterator 阻塞時也能生效。
         Timeout 後會等待 producer 收斂並重建 session，避免並發存取問題。
         """
-        import time
-        import threading
         import queue
 
+        self._ensure_cached_prefix()
         accumulated = ""
         last_chunk = None
         chunk_queue = queue.Queue()
@@ -202,9 +747,23 @@ class Translator:
         done_flag = [False]
         cancel_flag = [False]  # 用於通知 producer 取消
 
-        # 重要：在啟動 thread 前先 capture chat reference
+        # 重要：在啟動 thread 前先 capture chat reference / window contents
         # 避免 producer 在 rebuild 後存取到新的 chat
-        chat_ref = self._chat
+        if self.history_mode == HISTORY_MODE_WINDOW:
+            contents = self._build_request_contents(prompt)
+            config = self._configs_for(model)[0]
+
+            def open_stream():
+                return self.client.models.generate_content_stream(
+                    model=model or self.model,
+                    contents=contents,
+                    config=config,
+                )
+        else:
+            chat_ref = self._chat_for(model)
+
+            def open_stream():
+                return chat_ref.send_message_stream(prompt)
 
         def producer():
             """在背景執行緒中迭代 streaming response"""
@@ -214,7 +773,7 @@ class Translator:
                     chunk_queue.put(('cancelled', None))
                     return
 
-                response = chat_ref.send_message_stream(prompt)
+                response = open_stream()
                 for chunk in response:
                     # 檢查是否被取消
                     if cancel_flag[0]:
@@ -233,6 +792,7 @@ class Translator:
         thread = threading.Thread(target=producer, daemon=True)
         thread.start()
         start_time = time.time()
+        self.last_ttft_sec = None
 
         try:
             # Consumer: 從 queue 取出 chunks，並檢查 timeout
@@ -263,6 +823,9 @@ class Translator:
                 elif msg_type == 'chunk':
                     chunk = data
                     chunk_text = chunk.text or ""
+                    if self.last_ttft_sec is None and chunk_text:
+                        self.last_ttft_sec = time.time() - start_time
+                        TTFT_SECONDS.observe(self.last_ttft_sec)
                     accumulated += chunk_text
                     if on_chunk and chunk_text:
                         on_chunk(chunk_text)
@@ -272,19 +835,38 @@ class Translator:
             usage_metadata = None
             if last_chunk and hasattr(last_chunk, 'usage_metadata'):
                 usage_metadata = last_chunk.usage_metadata
+            _record_request("stream", start_time, usage_metadata)
+
+            if self.history_mode == HISTORY_MODE_WINDOW:
+                self._record_window_turn(prompt, accumulated.strip())
 
             return accumulated, usage_metadata
 
         except TimeoutError:
             # Timeout 後：通知 producer 取消並等待收斂
             cancel_flag[0] = True
+            TIMEOUTS.inc(kind="stream")
             # 等待 producer 結束（最多 0.5 秒）
             thread.join(timeout=0.5)
             # 重建 session 確保狀態乾淨
-            print("[Translator] Streaming timeout, rebuilding session...", file=sys.stderr, flush=True)
+            log.warning("Streaming timeout, rebuilding session...")
             self._rebuild_session()
             raise
 
+    def _parse_extra(self, result) -> dict[str, str]:
+        """從 JSON 結果取出設定中的額外語言翻譯 {language: text}"""
+        extras: dict[str, str] = {}
+        if not self.extra_target_languages or not isinstance(result, dict):
+            return extras
+        for entry in result.get("extra") or []:
+            if not isinstance(entry, dict):
+                continue
+            language = entry.get("language")
+            text = entry.get("text")
+            if language in self.extra_target_languages and isinstance(text, str) and text.strip():
+                extras[language] = text
+        return extras
+
     def _extract_partial_current(self, accumulated_json: str) -> Optional[str]:
         """從不完整 JSON 中提取 current 欄位（用於 streaming 更新）"""
         import re
@@ -311,20 +893,31 @@ class Translator:
 
         return None
 
-    def _generate_content_with_timeout(self, contents, config, timeout: int = API_TIMEOUT_SECONDS):
-        """呼叫 generate_content，帶 timeout 機制"""
+    def _generate_content_with_timeout(
+        self,
+        contents,
+        config,
+        timeout: int = API_TIMEOUT_SECONDS,
+        model: Optional[str] = None,
+        kind: str = "generate",
+        executor: Optional[concurrent.futures.Executor] = None,
+    ):
+        """呼叫 generate_content，帶 timeout 機制（model 可覆寫；executor 預設為即時翻譯的單執行緒 executor）"""
         def do_generate():
             return self.client.models.generate_content(
-                model=self.model,
+                model=model or self.model,
                 contents=contents,
                 config=config,
             )
-        future = self._executor.submit(do_generate)
+        started_at = time.time()
+        future = (executor or self._executor).submit(do_generate)
         try:
-            return future.result(timeout=timeout)
+            response = future.result(timeout=timeout)
+            _record_request(kind, started_at, getattr(response, "usage_metadata", None))
+            return response
         except concurrent.futures.TimeoutError:
-            print(f"[Translator] generate_content timed out after {timeout} seconds",
-                  file=sys.stderr, flush=True)
+            TIMEOUTS.inc(kind=kind)
+            log.warning("generate_content timed out after %s seconds", timeout)
             raise TimeoutError(f"Gemini generate_content timed out after {timeout} seconds")
 
     def translate(self, text: str) -> str:
@@ -337,16 +930,16 @@ class Translator:
         Returns:
             翻譯後的目標語言文字
         """
+        self.last_extra_translations = {}
         if not text.strip():
             return ""
 
         try:
-            prompt = self._simple_translate_template.format(
-                source_label=self._source_label,
-                text=text,
-            )
-            print(f"[Translator] Sending message (translate)...", file=sys.stderr, flush=True)
+            prompt = self._build_prompt(text, None, None)
+            log.debug("Sending message (translate)...")
             response = self._send_message_with_timeout(prompt)
+            self._account(CALL_TRANSLATE, response)
+            self._note_turn(text)
 
             # 追蹤 token 使用量
             needs_rebuild = False
@@ -360,10 +953,10 @@ class Translator:
                     self._total_tokens = total
 
                 # Debug log: 每次翻譯的 token 統計
-                print(f"[Translator] Tokens - total: {self._total_tokens}, "
-                      f"input: {input_tokens}, output: {output_tokens}, "
-                      f"limit: {self.max_context_tokens}",
-                      file=sys.stderr, flush=True)
+                log.debug(
+                    "Tokens - total: %s, input: %s, output: %s, limit: %s",
+                    self._total_tokens, input_tokens, output_tokens, self.max_context_tokens,
+                )
 
                 # 標記是否需要重建（但先返回結果）
                 if self._total_tokens > self.max_context_tokens:
@@ -374,34 +967,41 @@ class Translator:
             try:
                 result = json.loads(response_text)
                 translation = result.get("current", "")
+                self.last_extra_translations = self._parse_extra(result)
             except json.JSONDecodeError:
-                print(f"[Translator] JSON parse error in translate(), using fallback",
-                      file=sys.stderr, flush=True)
+                log.warning("JSON parse error in translate(), using fallback")
                 translation = self._fallback_translate(text)
 
             # 返回結果後才做 context rebuild（避免阻塞翻譯結果返回）
             if needs_rebuild:
-                print(f"[Translator] Token limit reached ({self._total_tokens}), summarizing and rebuilding...",
-                      file=sys.stderr, flush=True)
+                log.info("Token limit reached (%s), summarizing and rebuilding...", self._total_tokens)
                 self._summarize_and_rebuild()
+            self._after_response()
 
             return translation
 
         except Exception as e:
-            print(f"[Translator] Error: {e}, rebuilding session...", file=sys.stderr, flush=True)
+            log.warning("Error: %s, rebuilding session...", e)
             self._rebuild_session()
             return self._fallback_translate(text)
 
     def _summarize_and_rebuild(self) -> None:
         """萃取摘要後重建 session，保持翻譯一致性"""
-        print(f"[Translator] === Starting context rebuild (tokens: {self._total_tokens}) ===",
-              file=sys.stderr, flush=True)
+        REBUILDS.inc(reason="token_limit")
+        log.info(
+            "=== Starting context rebuild (tokens: %s, turns: %s) ===",
+            self._total_tokens, self._turns_since_rebuild,
+        )
+        self.rebuild_turn_counts.append(self._turns_since_rebuild)
+        self._reset_turn_tracking()
 
         # Step 1: 用 generate_content() + chat history 做摘要（不經過 JSON mode chat）
-        print("[Translator] Step 1: Requesting summary via generate_content...",
-              file=sys.stderr, flush=True)
+        log.info("Step 1: Requesting summary via generate_content...")
         try:
-            history = self._chat.get_history()
+            if self.history_mode == HISTORY_MODE_WINDOW:
+                history = self._window_contents(list(self._evicted_turns) + list(self._window_turns))
+            else:
+                history = self._chat.get_history()
             summary_contents = list(history) + [
                 types.Content(
                     role="user",
@@ -414,50 +1014,71 @@ class Translator:
                 config=self._plain_config,  # 無 JSON schema，自由格式文字
                 timeout=20,  # 摘要可能需要較長時間
             )
+            self._account(CALL_SUMMARY, summary_response)
             self._context_summary = summary_response.text.strip()
-            print(f"[Translator] Summary received ({len(self._context_summary)} chars):\n"
-                  f"---\n{self._context_summary}\n---", file=sys.stderr, flush=True)
+            log.info(
+                "Summary received (%s chars):\n---\n%s\n---",
+                len(self._context_summary), self._context_summary,
+            )
         except Exception as e:
-            print(f"[Translator] Summarization failed: {e}", file=sys.stderr, flush=True)
+            log.warning("Summarization failed: %s", e)
             self._context_summary = ""
 
+        if self.history_mode == HISTORY_MODE_WINDOW:
+            # window 模式：清空 ring buffer，摘要會自動作為 handover 帶入之後的 request
+            self._window_turns.clear()
+            self._evicted_turns = []
+            self._total_tokens = 0
+            log.info("=== Window reset with summary ===")
+            return
+
         # Step 2: 重建 session（自動帶 JSON mode config）
-        print("[Translator] Step 2: Creating new session...", file=sys.stderr, flush=True)
-        self._chat = self.client.chats.create(
-            model=self.model,
-            config=self._config,
-        )
+        log.info("Step 2: Creating new session...")
+        self._create_chat()
         self._total_tokens = 0
-        print("[Translator] New session created, tokens reset to 0", file=sys.stderr, flush=True)
+        log.info("New session created, tokens reset to 0")
 
         # Step 3: 帶入摘要作為上下文（handover 回應是 JSON，忽略即可）
         if self._context_summary:
-            print("[Translator] Step 3: Handing over context to new session...",
-                  file=sys.stderr, flush=True)
+            log.info("Step 3: Handing over context to new session...")
             handover_msg = CONTEXT_HANDOVER_TEMPLATE.format(summary=self._context_summary)
             try:
-                self._send_message_with_timeout(handover_msg)
-                print("[Translator] Context handover successful", file=sys.stderr, flush=True)
+                self._account(CALL_HANDOVER, self._send_message_with_timeout(handover_msg))
+                log.info("Context handover successful")
             except Exception as e:
-                print(f"[Translator] Handover failed: {e}", file=sys.stderr, flush=True)
+                log.warning("Handover failed: %s", e)
         else:
-            print("[Translator] Step 3: Skipped (no summary available)", file=sys.stderr, flush=True)
+            log.info("Step 3: Skipped (no summary available)")
 
-        print("[Translator] === Context rebuild complete ===", file=sys.stderr, flush=True)
+        log.info("=== Context rebuild complete ===")
 
     def _rebuild_session(self) -> None:
-        """重建空的 session（無摘要，用於錯誤恢復）"""
-        self._chat = self.client.chats.create(
-            model=self.model,
-            config=self._config,
-        )
+        """重建空的 session（無摘要，用於錯誤恢復）
+
+        window 模式沒有 server 端 session 狀態，只清空最近輪次，保留滾動摘要。
+        """
+        REBUILDS.inc(reason="reset")
+        self._reset_turn_tracking()
+        if self.history_mode == HISTORY_MODE_WINDOW:
+            self._window_turns.clear()
+            self._evicted_turns = []
+            self._total_tokens = 0
+            log.info("Window cleared (summary kept)")
+            return
+        self._create_chat()
         self._total_tokens = 0
-        print("[Translator] Session rebuilt (no context)", file=sys.stderr, flush=True)
+        log.info("Session rebuilt (no context)")
+
+    def _fallback_translate(self, text: str, model: Optional[str] = None,
+                            executor: Optional[concurrent.futures.Executor] = None) -> str:
+        """
+        降級翻譯：不使用 history
 
-    def _fallback_translate(self, text: str) -> str:
-        """降級翻譯：不使用 history"""
+        executor 預設為即時翻譯的單執行緒 executor；translate_segment 由多個 worker 平行呼叫，
+        改用併發的 side executor，避免被排成一列
+        """
         try:
-            print(f"[Translator] Fallback translate...", file=sys.stderr, flush=True)
+            log.info("Fallback translate...")
             contents = (
                 f"將以下{self._source_label}翻譯成{self._target_label}，"
                 f"只輸出翻譯結果：\n{text}"
@@ -467,12 +1088,131 @@ class Translator:
                 contents=contents,
                 config=config,
                 timeout=API_TIMEOUT_SECONDS,
+                model=model,
+                executor=executor,
             )
+            self._account(CALL_FALLBACK, response, model)
+            FALLBACKS.inc(result="ok")
             return response.text.strip()
         except Exception as e:
-            print(f"[Translator] Fallback also failed: {e}", file=sys.stderr, flush=True)
+            FALLBACKS.inc(result="failed")
+            log.error("Fallback also failed: %s", e)
+            return ""
+
+    def translate_without_context(self, text: str, model: Optional[str] = None) -> str:
+        """
+        不帶歷史、不做上下文修正的快速翻譯（backlog 過舊時降級用）
+
+        Args:
+            text: 原文
+            model: 改用的模型（例如較便宜的模型），None 表示沿用目前模型
+
+        Returns:
+            翻譯結果，失敗時為空字串
+        """
+        if not text.strip():
+            return ""
+        return self._fallback_translate(text, model=model)
+
+    def translate_segment(self, text: str, context_sources: Optional[list[str]] = None) -> str:
+        """
+        不經 chat session、不寫入 history 的單段翻譯（離線檔案模式用）
+
+        不經過即時翻譯的單執行緒 executor，可由呼叫端多執行緒平行呼叫
+        （併發上限為 parallel_requests，同樣有 API_TIMEOUT_SECONDS 的 timeout）。
+
+        Args:
+            text: 原文
+            context_sources: 此段之前的幾句原文（依時間順序），作為上下文參考
+
+        Returns:
+            翻譯結果，失敗時為空字串
+        """
+        if not text.strip():
             return ""
 
+        context_block = ""
+        if context_sources:
+            context_block = SEGMENT_CONTEXT_BLOCK_TEMPLATE.format(
+                lines="\n".join(context_sources)
+            )
+        prompt = SEGMENT_TRANSLATE_PROMPT_TEMPLATE.format(
+            source_label=self._source_label,
+            context_block=context_block,
+            text=text,
+        )
+        try:
+            response = self._generate_content_with_timeout(
+                contents=prompt,
+                config=self._config,
+                kind="segment",
+                executor=self._side_executor,
+            )
+            self._account(CALL_TRANSLATE, response)
+            result = json.loads((response.text or "").strip())
+            current = result.get("current")
+            if isinstance(current, str) and current.strip():
+                return current
+        except Exception as e:
+            log.warning("Segment translate failed: %s", e)
+        return self._fallback_translate(text, executor=self._side_executor)
+
+    def review_translations(self, lines: list[tuple[str, str, str, bool]]) -> dict[str, str]:
+        """
+        依前後文檢查已送出的翻譯（兩階段翻譯的背景修正）
+
+        不經 chat session、不寫入 history，也不經過即時翻譯的單執行緒 executor，
+        可在背景執行緒與即時翻譯同時進行（同樣有 API_TIMEOUT_SECONDS 的 timeout）。
+
+        Args:
+            lines: [(transcript_id, 原文, 目前翻譯, 是否檢查)]，依時間順序；不檢查的句子只作為上下文
+
+        Returns:
+            {transcript_id: 修正後的翻譯}，只含需要修正的句子；失敗時為空 dict
+        """
+        short_ids = {}
+        rendered = []
+        for index, (transcript_id, source, translation, reviewable) in enumerate(lines):
+            short_id = f"r{index + 1}"
+            if reviewable:
+                short_ids[short_id] = transcript_id
+            rendered.append(REVIEW_LINE_TEMPLATE.format(
+                short_id=short_id, mark="*" if reviewable else "", source=source, translation=translation,
+            ))
+        if not short_ids:
+            return {}
+        prompt = REVIEW_PROMPT_TEMPLATE.format(
+            source_label=self._source_label,
+            target_label=self._target_label,
+            lines="\n".join(rendered),
+        )
+
+        try:
+            response = self._generate_content_with_timeout(
+                contents=prompt,
+                config=self._review_config,
+                model=self.correction_model,
+                kind="review",
+                executor=self._side_executor,
+            )
+            self._account(CALL_CORRECTION, response, self.correction_model)
+            result = json.loads((response.text or "").strip())
+        except Exception as e:
+            log.warning("Correction review failed: %s", e)
+            return {}
+
+        corrections: dict[str, str] = {}
+        entries = result.get("results") if isinstance(result, dict) else None
+        for entry in entries or []:
+            if not isinstance(entry, dict):
+                continue
+            transcript_id = short_ids.get(str(entry.get("id", "")).strip("[]*"))
+            correction = entry.get("correction")
+            if transcript_id and isinstance(correction, str) and correction.strip():
+                corrections[transcript_id] = correction
+        log.debug("Review: %s/%s lines corrected", len(corrections), len(short_ids))
+        return corrections
+
     def reset_context(self) -> None:
         """重置對話上下文（切換影片時呼叫）"""
         self._rebuild_session()
@@ -481,7 +1221,8 @@ class Translator:
         self,
         current_text: str,
         prev_text: Optional[str] = None,
-        prev_translation: Optional[str] = None
+        prev_translation: Optional[str] = None,
+        model: Optional[str] = None,
     ) -> Tuple[str, Optional[str]]:
         """
         翻譯當前文字，並根據上下文可能修正前句翻譯
@@ -490,31 +1231,22 @@ class Translator:
             current_text: 當前要翻譯的原文
             prev_text: 前句原文（可選）
             prev_translation: 前句翻譯（可選）
+            model: 這句改用的模型（None 表示主要模型，歷史共用）
 
         Returns:
             (current_translation, corrected_previous_translation or None)
         """
+        self.last_extra_translations = {}
         if not current_text.strip():
             return ("", None)
 
         try:
-            # 根據是否有前句決定使用哪個 prompt
-            if prev_text is not None and prev_translation is not None:
-                prompt = self._context_correction_template.format(
-                    source_label=self._source_label,
-                    target_label=self._target_label,
-                    current_text=current_text,
-                    prev_text=prev_text,
-                    prev_translation=prev_translation
-                )
-            else:
-                prompt = self._simple_translate_template.format(
-                    source_label=self._source_label,
-                    text=current_text,
-                )
+            prompt = self._build_prompt(current_text, prev_text, prev_translation)
 
-            print(f"[Translator] Sending message (context correction)...", file=sys.stderr, flush=True)
-            response = self._send_message_with_timeout(prompt)
+            log.debug("Sending message (context correction)...")
+            response = self._send_message_with_timeout(prompt, **self._route_kwargs(model))
+            self._account(self._translate_call_type(prev_text, prev_translation), response, model)
+            self._note_turn(current_text)
 
             # 追蹤 token 使用量
             needs_rebuild = False
@@ -527,9 +1259,10 @@ class Translator:
                 if total is not None:
                     self._total_tokens = total
 
-                print(f"[Translator] Context correction - total: {self._total_tokens}, "
-                      f"input: {input_tokens}, output: {output_tokens}",
-                      file=sys.stderr, flush=True)
+                log.debug(
+                    "Context correction - total: %s, input: %s, output: %s",
+                    self._total_tokens, input_tokens, output_tokens,
+                )
 
                 # 標記是否需要重建（但先返回結果）
                 if self._total_tokens > self.max_context_tokens:
@@ -537,43 +1270,42 @@ class Translator:
 
             # 解析 JSON 回應（structured output 保證合法 JSON）
             response_text = response.text.strip()
-            print(f"[Translator] Raw response: {response_text}", file=sys.stderr, flush=True)
+            log.debug("Raw response: %s", response_text)
 
             try:
                 result = json.loads(response_text)
                 current_trans = result.get("current", "")
                 correction = result.get("correction")
+                self.last_extra_translations = self._parse_extra(result)
 
                 # 空字串視為無修正
                 if isinstance(correction, str) and correction.strip() == "":
                     correction = None
 
-                print(f"[Translator] Parsed - current: {current_trans}, correction: {correction}",
-                      file=sys.stderr, flush=True)
+                log.debug("Parsed - current: %s, correction: %s", current_trans, correction)
 
                 # 返回結果後才做 context rebuild（避免阻塞翻譯結果返回）
                 if needs_rebuild:
-                    print(f"[Translator] Token limit reached ({self._total_tokens}), summarizing...",
-                          file=sys.stderr, flush=True)
+                    log.info("Token limit reached (%s), summarizing...", self._total_tokens)
                     self._summarize_and_rebuild()
+                self._after_response()
 
                 return (current_trans, correction)
 
             except json.JSONDecodeError as e:
-                print(f"[Translator] JSON parse error: {e}, using fallback",
-                      file=sys.stderr, flush=True)
+                log.warning("JSON parse error: %s, using fallback", e)
                 fallback = self._fallback_translate(current_text)
 
                 # 即使解析失敗，也要處理 rebuild
                 if needs_rebuild:
-                    print(f"[Translator] Token limit reached ({self._total_tokens}), summarizing...",
-                          file=sys.stderr, flush=True)
+                    log.info("Token limit reached (%s), summarizing...", self._total_tokens)
                     self._summarize_and_rebuild()
+                self._after_response()
 
                 return (fallback, None)
 
         except Exception as e:
-            print(f"[Translator] Context correction error: {e}", file=sys.stderr, flush=True)
+            log.warning("Context correction error: %s", e)
             # 發生錯誤時，嘗試用舊方法翻譯
             fallback = self._fallback_translate(current_text)
             return (fallback, None)
@@ -583,7 +1315,8 @@ class Translator:
         current_text: str,
         prev_text: Optional[str] = None,
         prev_translation: Optional[str] = None,
-        on_streaming_update=None
+        on_streaming_update=None,
+        model: Optional[str] = None,
     ) -> Tuple[str, Optional[str]]:
         """
         Streaming 翻譯，支援即時回饋 + token 追蹤
@@ -593,29 +1326,16 @@ class Translator:
             prev_text: 前句原文（可選）
             prev_translation: 前句翻譯（可選）
             on_streaming_update: callback(partial_translation, correction) 用於即時更新
+            model: 這句改用的模型（None 表示主要模型，歷史共用）
 
         Returns:
             (current_translation, corrected_previous_translation or None)
         """
-        import time
-
+        self.last_extra_translations = {}
         if not current_text.strip():
             return ("", None)
 
-        # 根據是否有前句決定使用哪個 prompt
-        if prev_text is not None and prev_translation is not None:
-            prompt = self._context_correction_template.format(
-                source_label=self._source_label,
-                target_label=self._target_label,
-                current_text=current_text,
-                prev_text=prev_text,
-                prev_translation=prev_translation
-            )
-        else:
-            prompt = self._simple_translate_template.format(
-                source_label=self._source_label,
-                text=current_text,
-            )
+        prompt = self._build_prompt(current_text, prev_text, prev_translation)
 
         # 嘗試 streaming，失敗則降級為 blocking
         try:
@@ -637,40 +1357,132 @@ class Translator:
                     on_streaming_update(partial, None)
                     last_update_time = time.time()
 
-            print(f"[Translator] Streaming message (context correction)...", file=sys.stderr, flush=True)
+            log.debug("Streaming message (context correction)...")
             response_text, usage_metadata = self._send_message_stream_with_timeout(
-                prompt, timeout=API_TIMEOUT_SECONDS, on_chunk=on_chunk
+                prompt, timeout=API_TIMEOUT_SECONDS, on_chunk=on_chunk, **self._route_kwargs(model)
             )
+            if self.ledger and usage_metadata is not None:
+                call_type = self._translate_call_type(prev_text, prev_translation)
+                self.ledger.record(call_type, model or self.model, usage_metadata)
+            self._note_turn(current_text)
 
             # 解析完整 JSON
             result = json.loads(response_text.strip())
             current_trans = result.get("current", "")
             correction = result.get("correction")
+            self.last_extra_translations = self._parse_extra(result)
 
             # 空字串視為無修正
             if isinstance(correction, str) and correction.strip() == "":
                 correction = None
 
-            print(f"[Translator] Streaming complete - current: {current_trans}, correction: {correction}",
-                  file=sys.stderr, flush=True)
+            log.debug("Streaming complete - current: %s, correction: %s", current_trans, correction)
 
             # Token 追蹤（維持同等管理）
             if usage_metadata:
                 total = getattr(usage_metadata, 'total_token_count', None)
+                cached = getattr(usage_metadata, 'cached_content_token_count', None)
                 if total is not None:
                     self._total_tokens = total
-                    print(f"[Translator] Streaming tokens: {self._total_tokens}", file=sys.stderr, flush=True)
+                    log.debug("Streaming tokens: %s, cached: %s", self._total_tokens, cached)
                     if self._total_tokens > self.max_context_tokens:
-                        print(f"[Translator] Token limit reached ({self._total_tokens}), summarizing...",
-                              file=sys.stderr, flush=True)
+                        log.info("Token limit reached (%s), summarizing...", self._total_tokens)
                         self._summarize_and_rebuild()
+            self._after_response()
 
             return (current_trans, correction)
 
         except Exception as e:
-            print(f"[Translator] Streaming failed: {e}, falling back to blocking...",
-                  file=sys.stderr, flush=True)
+            STREAM_FAILURES.inc()
+            log.warning("Streaming failed: %s, falling back to blocking...", e)
             # 降級為 blocking
             return self.translate_with_context_correction(
-                current_text, prev_text, prev_translation
+                current_text, prev_text, prev_translation, model=model
+            )
+
+    def translate_batch(
+        self,
+        items: list[tuple[str, str]],
+        prev_text: Optional[str] = None,
+        prev_translation: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Tuple[dict[str, str], Optional[str]]:
+        """
+        將 backlog 中多句合併為一個 structured request 翻譯
+
+        Args:
+            items: [(transcript_id, text), ...]，依時間順序
+            prev_text: batch 前一句原文（可選）
+            prev_translation: batch 前一句翻譯（可選）
+            model: 改用的模型（None 表示主要模型，歷史共用）
+
+        Returns:
+            ({transcript_id: translation}, corrected_previous_translation or None)
+            缺漏的 id 不會出現在 dict 中，由呼叫端個別補翻
+        """
+        self.last_batch_extra_translations = {}
+        # 用短 id 節省 token，回來再對應回 transcript_id
+        short_ids = {f"b{index + 1}": transcript_id for index, (transcript_id, _) in enumerate(items)}
+        lines = "\n".join(
+            f"[b{index + 1}] {text}" for index, (_, text) in enumerate(items)
+        )
+        prev_block = ""
+        if prev_text is not None and prev_translation is not None:
+            prev_block = BATCH_PREV_BLOCK_TEMPLATE.format(
+                prev_text=prev_text,
+                prev_translation=prev_translation,
+            )
+        prompt = BATCH_TRANSLATE_PROMPT_TEMPLATE.format(
+            source_label=self._source_label,
+            prev_block=prev_block,
+            lines=lines,
+        )
+
+        log.debug("Sending batch message (%s items)...", len(items))
+        response = self._send_message_with_timeout(prompt, batch=True, **self._route_kwargs(model))
+        self._account(CALL_TRANSLATE, response, model)
+        # batch prompt 不是單句格式，之後的前句一律帶完整原文
+        self._note_turn(None)
+
+        needs_rebuild = False
+        usage = getattr(response, 'usage_metadata', None)
+        if usage:
+            total = getattr(usage, 'total_token_count', None)
+            if total is not None:
+                self._total_tokens = total
+                needs_rebuild = self._total_tokens > self.max_context_tokens
+            log.debug(
+                "Batch tokens - total: %s, input: %s, output: %s",
+                self._total_tokens, getattr(usage, 'prompt_token_count', None), getattr(usage, 'candidates_token_count', None),
             )
+
+        translations: dict[str, str] = {}
+        correction = None
+        try:
+            result = json.loads((response.text or "").strip())
+            for entry in result.get("results") or []:
+                short_id = str(entry.get("id", "")).strip("[]")
+                transcript_id = short_ids.get(short_id)
+                current = entry.get("current")
+                if transcript_id and isinstance(current, str) and current.strip():
+                    translations[transcript_id] = current
+                    extras = self._parse_extra(entry)
+                    if extras:
+                        self.last_batch_extra_translations[transcript_id] = extras
+                # 前句修正只看 b1（模型可能調換輸出順序）
+                if short_id == "b1":
+                    correction = entry.get("correction")
+        except (json.JSONDecodeError, AttributeError) as e:
+            log.warning("Batch JSON parse error: %s", e)
+
+        if isinstance(correction, str) and correction.strip() == "":
+            correction = None
+
+        log.debug("Batch parsed %s/%s items, correction: %s", len(translations), len(items), correction)
+
+        if needs_rebuild:
+            log.info("Token limit reached (%s), summarizing...", self._total_tokens)
+            self._summarize_and_rebuild()
+        self._after_response()
+
+        return translations, correction
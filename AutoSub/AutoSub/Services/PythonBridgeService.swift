@@ -103,6 +103,9 @@ class PythonBridgeService: ObservableObject {
     /// Phase 1B: Streaming 翻譯回呼（id, partial_translation）
     var onTranslationStreaming: ((UUID, String) -> Void)?
 
+    /// 翻譯 backlog 追趕狀態回呼（isCatchingUp, pending）
+    var onBacklogStatus: ((Bool, Int) -> Void)?
+
     /// 錯誤回呼
     var onError: ((String) -> Void)?
 
@@ -199,6 +202,22 @@ class PythonBridgeService: ObservableObject {
         env["DEEPGRAM_UTTERANCE_END_MS"] = String(config.deepgramUtteranceEndMs)
         env["DEEPGRAM_MAX_BUFFER_CHARS"] = String(config.deepgramMaxBufferChars)
         env["DEEPGRAM_INTERIM_STALE_TIMEOUT_SEC"] = String(config.interimStaleTimeoutSec)
+        // 字幕 journal（autosave）：後端逐句追加寫入 Application Support/AutoSub/Journals
+        if env["SUBTITLE_JOURNAL_DIR"] == nil {
+            env["SUBTITLE_JOURNAL_DIR"] = venvPath.deletingLastPathComponent()
+                .appendingPathComponent("Journals").path
+        }
+        // Token 帳本：依 profile 累計跨 session 的 token 用量到 Application Support/AutoSub/token_ledger.json
+        env["AUTOSUB_PROFILE"] = config.profiles.first(where: { $0.id == config.selectedProfileId })?.name ?? "default"
+        if env["TOKEN_LEDGER_PATH"] == nil {
+            env["TOKEN_LEDGER_PATH"] = venvPath.deletingLastPathComponent()
+                .appendingPathComponent("token_ledger.json").path
+        }
+        // Profiling 輸出（PROFILE_* 環境變數開啟時才會寫入）：Application Support/AutoSub/Diagnostics
+        if env["DIAGNOSTICS_DIR"] == nil {
+            env["DIAGNOSTICS_DIR"] = venvPath.deletingLastPathComponent()
+                .appendingPathComponent("Diagnostics").path
+        }
         process?.environment = env
 
         // 5. 連接管道
@@ -381,6 +400,25 @@ class PythonBridgeService: ObservableObject {
                     self.onTranslationStreaming?(id, partial)
                 }
 
+            case "backlog":
+                // 翻譯落後即時音訊時的追趕狀態
+                if let status = json["status"] as? String {
+                    let pending = json["pending"] as? Int ?? 0
+                    self.onBacklogStatus?(status == "catching_up", pending)
+                }
+
+            case "subtitle_extra":
+                // 額外目標語言（EXTRA_TARGET_LANGUAGES）：字幕覆蓋層目前只顯示主要語言
+                break
+
+            case "stats":
+                // 後端定期送出的執行期指標快照（STATS_INTERVAL_SEC），目前只供除錯
+                break
+
+            case "token_usage":
+                // 本 session 的 token 用量（隨 stats 定期送出；session 結束時另帶此 profile 的跨 session 累計），目前只供除錯
+                break
+
             default:
                 print("[PythonBridge] Unknown message type: \(type)")
             }
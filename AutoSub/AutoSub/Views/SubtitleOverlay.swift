@@ -49,6 +49,18 @@ struct SubtitleOverlay: View {
                 .padding(.top, 8)
             }
 
+            // 翻譯落後時提示正在追趕
+            if appState.isCatchingUp {
+                HStack {
+                    Spacer()
+                    Text("字幕追趕中…")
+                        .font(.caption)
+                        .foregroundColor(.yellow.opacity(0.9))
+                }
+                .padding(.trailing, 12)
+                .padding(.top, 6)
+            }
+
             // 字幕內容（帶捲軸）
             ScrollViewReader { proxy in
                 ScrollView(.vertical, showsIndicators: !appState.isSubtitleLocked) {